@@ -6,6 +6,10 @@ import { apiClient } from '@/lib/api-client'
 import { GraduationCap, BookOpen, Clock, MapPin, Users, Calendar } from 'lucide-react'
 import { Skeleton } from '@/components/ui/skeleton'
 
+interface DashboardResumo {
+  contagens: DashboardStats
+}
+
 interface DashboardStats {
   professores: number
   disciplinas: number
@@ -29,22 +33,15 @@ export default function DashboardPage() {
   useEffect(() => {
     async function loadStats() {
       try {
-        const [professores, disciplinas, turnos, espacos, usuarios, horarios] = await Promise.all([
-          apiClient.get<any[]>('/professores/?limit=1000').catch(() => []),
-          apiClient.get<any[]>('/disciplinas/?limit=1000').catch(() => []),
-          apiClient.get<any[]>('/turnos/?limit=1000').catch(() => []),
-          apiClient.get<any[]>('/espacos/?limit=1000').catch(() => []),
-          apiClient.get<any[]>('/usuarios/?limit=1000').catch(() => []),
-          apiClient.get<any[]>('/horarios/?limit=1000').catch(() => []),
-        ])
+        const { contagens } = await apiClient.get<DashboardResumo>('/dashboard/resumo')
 
         setStats({
-          professores: professores.length,
-          disciplinas: disciplinas.length,
-          turnos: turnos.length,
-          espacos: espacos.length,
-          usuarios: usuarios.length,
-          horarios: horarios.length,
+          professores: contagens.professores,
+          disciplinas: contagens.disciplinas,
+          turnos: contagens.turnos,
+          espacos: contagens.espacos,
+          usuarios: contagens.usuarios,
+          horarios: contagens.horarios,
         })
       } catch (error) {
         console.error('Error loading stats:', error)
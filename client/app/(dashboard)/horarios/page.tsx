@@ -1,7 +1,7 @@
 'use client'
 
 import React from "react"
-import { useEffect, useState } from 'react'
+import { useEffect, useRef, useState } from 'react'
 import { Button } from '@/components/ui/button'
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from '@/components/ui/card'
 import { Dialog, DialogContent, DialogDescription, DialogHeader, DialogTitle, DialogTrigger } from '@/components/ui/dialog'
@@ -73,6 +73,25 @@ interface Horario {
   observacoes?: string
 }
 
+interface EditorBundle {
+  turno_id: number | null
+  horarios: Horario[]
+  professores: Record<number, { id: number; nome: string }>
+  disciplinas: Record<number, Disciplina>
+  turmas: Record<number, Turma>
+  turnos: Record<number, Turno>
+  periodos_aula: Record<number, PeriodoAula>
+  professor_disciplinas: Array<{ professor_id: number; disciplina_id: number }>
+  turma_disciplinas: Array<{ turma_id: number; disciplina_id: number }>
+}
+
+interface HorarioEvento {
+  tabela: string
+  op: 'insert' | 'update' | 'delete' | 'recarregar'
+  id: number
+  dados: Partial<Horario>
+}
+
 const diasSemana = [
   { value: 'segunda', label: 'Segunda-feira' },
   { value: 'terca', label: 'Terça-feira' },
@@ -109,30 +128,67 @@ export default function HorariosPage() {
     observacoes: '',
   })
 
+  // Tabelas do último bundle, usadas para completar os deltas recebidos em tempo real
+  const bundleRef = useRef<EditorBundle | null>(null)
+
   useEffect(() => {
     loadData()
   }, [])
 
+  useEffect(() => {
+    const fonte = new EventSource('/api/eventos/?tabelas=horarios')
+    fonte.addEventListener('horarios', (e) => {
+      const evento = JSON.parse((e as MessageEvent).data) as HorarioEvento
+      const bundle = bundleRef.current
+      if (evento.op === 'recarregar' || !bundle) {
+        loadData()
+        return
+      }
+      if (evento.op === 'delete') {
+        setHorarios((prev) => prev.filter((h) => h.id !== evento.id))
+        return
+      }
+      setHorarios((prev) => {
+        const atual = prev.find((h) => h.id === evento.id)
+        // delta parcial (ex.: só o slot) de um horário que não está na lista
+        if (!atual && evento.dados.professor_id === undefined) return prev
+        const linha = { ...atual, ...evento.dados } as Horario
+        const professor = bundle.professores[linha.professor_id]
+        const completo: Horario = {
+          ...linha,
+          professor: professor ? { id: professor.id, usuario: { nome: professor.nome } } : undefined,
+          disciplina: bundle.disciplinas[linha.disciplina_id],
+          turma: bundle.turmas[linha.turma_id],
+          turno: bundle.turnos[linha.turno_id],
+        }
+        return atual ? prev.map((h) => (h.id === evento.id ? completo : h)) : [...prev, completo]
+      })
+    })
+    return () => fonte.close()
+  }, [])
+
   async function loadData() {
     try {
-      const [horariosData, professoresData, disciplinasData, turmasData, turnosData, periodosData, linksData, turmaLinksData] = await Promise.all([
-        apiClient.get<Horario[]>('/horarios/?limit=1000'),
-        apiClient.get<Professor[]>('/professores/?limit=1000'),
-        apiClient.get<Disciplina[]>('/disciplinas/?limit=1000'),
-        apiClient.get<Turma[]>('/turmas/?limit=1000'),
-        apiClient.get<Turno[]>('/turnos/?limit=1000'),
-        apiClient.get<PeriodoAula[]>('/periodos-aula/?limit=1000'),
-        apiClient.get<any[]>('/professor-disciplinas/'),
-        apiClient.get<any[]>('/turma-disciplinas/'),
-      ])
-      setHorarios(horariosData)
+      const bundle = await apiClient.get<EditorBundle>('/horarios/editor-bundle')
+      bundleRef.current = bundle
+      const professoresData: Professor[] = Object.values(bundle.professores).map((p) => ({ id: p.id, usuario: { nome: p.nome } }))
+      const professoresPorId = new Map(professoresData.map((p) => [p.id, p]))
+      setHorarios(
+        bundle.horarios.map((h) => ({
+          ...h,
+          professor: professoresPorId.get(h.professor_id),
+          disciplina: bundle.disciplinas[h.disciplina_id],
+          turma: bundle.turmas[h.turma_id],
+          turno: bundle.turnos[h.turno_id],
+        }))
+      )
       setProfessores(professoresData)
-      setDisciplinas(disciplinasData)
-      setTurmas(turmasData)
-      setTurnos(turnosData)
-      setPeriodos(periodosData)
-      setProfDiscLinks(linksData.map((l: any) => ({ professor_id: l.professor_id, disciplina_id: l.disciplina_id })))
-      setTurmaDiscLinks(turmaLinksData.map((l: any) => ({ turma_id: l.turma_id, disciplina_id: l.disciplina_id })))
+      setDisciplinas(Object.values(bundle.disciplinas))
+      setTurmas(Object.values(bundle.turmas))
+      setTurnos(Object.values(bundle.turnos))
+      setPeriodos(Object.values(bundle.periodos_aula))
+      setProfDiscLinks(bundle.professor_disciplinas)
+      setTurmaDiscLinks(bundle.turma_disciplinas)
     } catch (error) {
       toast({ title: 'Erro', description: 'Erro ao carregar dados', variant: 'destructive' })
     } finally {
@@ -172,13 +172,11 @@ export default function ProfessoresPage() {
 
       // Persist disponibilidades
       const professorId = created.id
-      for (const d of formData.disponibilidades) {
-        await apiClient.post('/professor-disponibilidades/', {
-          professor_id: professorId,
-          dia_semana: d.dia_semana,
-          hora_inicio: d.hora_inicio,
-          hora_fim: d.hora_fim,
-        })
+      if (formData.disponibilidades.length > 0) {
+        await apiClient.put(
+          `/professor-disponibilidades/por-professor/${professorId}`,
+          formData.disponibilidades.map((d) => ({ dia_semana: d.dia_semana, hora_inicio: d.hora_inicio, hora_fim: d.hora_fim }))
+        )
       }
       toast({
         title: 'Sucesso',
@@ -239,21 +237,13 @@ export default function ProfessoresPage() {
     if (!editing) return
     setIsSaving(true)
     try {
-      // apagar todas disponibilidades existentes e recriar simples
-      const existentes = await apiClient.get<any[]>(`/professor-disponibilidades/por-professor/${editing.id}`)
-      for (const d of existentes) {
-        await apiClient.delete(`/professor-disponibilidades/${d.id}`)
-      }
-      for (const r of editDispRows) {
-        if (r.hora_inicio && r.hora_fim) {
-          await apiClient.post('/professor-disponibilidades/', {
-            professor_id: editing.id,
-            dia_semana: r.dia_semana,
-            hora_inicio: r.hora_inicio,
-            hora_fim: r.hora_fim,
-          })
-        }
-      }
+      // substitui o conjunto inteiro em uma única transação no servidor
+      await apiClient.put(
+        `/professor-disponibilidades/por-professor/${editing.id}`,
+        editDispRows
+          .filter((r) => r.hora_inicio && r.hora_fim)
+          .map((r) => ({ dia_semana: r.dia_semana, hora_inicio: r.hora_inicio, hora_fim: r.hora_fim }))
+      )
       toast({ title: 'Sucesso', description: 'Disponibilidade atualizada' })
       setIsDispOpen(false)
       setEditing(null)
@@ -2,6 +2,10 @@ import type { NextApiRequest, NextApiResponse } from 'next'
 
 const TARGET = process.env.API_REWRITE_TARGET || 'http://api:8000'
 
+export const config = {
+  api: { responseLimit: false },
+}
+
 export default async function handler(req: NextApiRequest, res: NextApiResponse) {
   try {
     const path = (req.query.path as string[] || []).join('/')
@@ -25,10 +29,29 @@ export default async function handler(req: NextApiRequest, res: NextApiResponse)
       redirect: 'follow',
     })
 
+    // Server-Sent Events (/eventos): repassa os blocos conforme chegam
+    if ((upstream.headers.get('content-type') || '').startsWith('text/event-stream') && upstream.body) {
+      res.writeHead(upstream.status, {
+        'Content-Type': 'text/event-stream',
+        'Cache-Control': 'no-cache',
+        Connection: 'keep-alive',
+      })
+      const reader = upstream.body.getReader()
+      req.on('close', () => { reader.cancel().catch(() => {}) })
+      while (true) {
+        const { done, value } = await reader.read()
+        if (done) break
+        res.write(value)
+      }
+      res.end()
+      return
+    }
+
     const text = await upstream.text()
     res.status(upstream.status)
+    // fetch já descomprime o corpo (gzip/br da API); o Next comprime de novo para o navegador
     upstream.headers.forEach((value, key) => {
-      if (!['set-cookie', 'transfer-encoding'].includes(key)) {
+      if (!['set-cookie', 'transfer-encoding', 'content-encoding', 'content-length'].includes(key)) {
         res.setHeader(key, value)
       }
     })
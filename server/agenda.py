@@ -0,0 +1,217 @@
+"""Agenda por data de uma turma, professor ou espaço.
+
+Combina, para o dia pedido:
+
+- aulas efetivas (grade semanal + exceções e ausências, de grade_efetiva.py);
+- períodos do turno da turma, com os períodos específicos da turma
+  substituindo os gerais de mesmo número (intervalos e aulas vagas);
+- reservas de espaço não canceladas (do espaço ou feitas pelo professor);
+- bloqueios semanais e ausências datadas do professor.
+
+Cada fonte gera uma lista de faixas já ordenada por hora de início e as listas
+são intercaladas com `heapq.merge`; uma varredura única marca os itens que se
+sobrepõem (`conflito`). O resultado é memoizado por (entidade, semana): a
+semana inteira é montada de uma vez e reaproveitada enquanto as tabelas de
+origem não mudam.
+"""
+import heapq
+from collections import defaultdict
+from datetime import date, time, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from cache import CacheVersionado
+from database import models
+import grade_efetiva
+
+TABELAS_AGENDA = grade_efetiva.TABELAS_GRADE + (
+    "periodos_aula", "reservas_espaco", "professor_bloqueios",
+    "professores", "turmas", "espacos_escola",
+)
+# Itens que ocupam a entidade (entram na verificação de conflitos)
+TIPOS_OCUPANTES = {"aula", "reserva", "bloqueio"}
+
+_cache_agenda = CacheVersionado(max_itens=512)
+
+
+def _item(tipo: str, hora_inicio, hora_fim, **campos) -> dict:
+    return {"tipo": tipo, "hora_inicio": hora_inicio, "hora_fim": hora_fim, "conflito": False, **campos}
+
+
+def _inicio(item: dict):
+    return item["hora_inicio"]
+
+
+def _intercalar(*fontes: List[dict]) -> List[dict]:
+    """Intercala listas ordenadas por hora de início e marca sobreposições entre itens ocupantes."""
+    linha = list(heapq.merge(*fontes, key=_inicio))
+    aberto: Optional[dict] = None  # ocupante com o maior fim até aqui
+    for item in linha:
+        if item["tipo"] not in TIPOS_OCUPANTES or item.get("status") == "cancelada":
+            continue
+        if aberto is not None and item["hora_inicio"] < aberto["hora_fim"]:
+            item["conflito"] = aberto["conflito"] = True
+        if aberto is None or item["hora_fim"] > aberto["hora_fim"]:
+            aberto = item
+    return linha
+
+
+def _aula(h: dict, numero_aula: Optional[int] = None) -> dict:
+    return _item(
+        "aula", h["hora_inicio"], h["hora_fim"],
+        horario_id=h["horario_id"], status=h["status"], numero_aula=numero_aula,
+        professor_id=h["professor_id"], professor_original_id=h["professor_original_id"],
+        disciplina_id=h["disciplina_id"], turma_id=h["turma_id"], sala=h["sala"],
+        excecao_id=h["excecao_id"], ausencia_id=h["ausencia_id"],
+    )
+
+
+def _reservas(db: Session, segunda: date, **filtro) -> Dict[date, List[dict]]:
+    R = models.ReservaEspaco
+    query = db.query(
+        R.id, R.espaco_id, R.data_reserva, R.hora_inicio, R.hora_fim, R.finalidade, R.status,
+    ).filter(
+        R.data_reserva >= segunda,
+        R.data_reserva <= segunda + timedelta(days=6),
+        R.status != models.StatusReservaEnum.CANCELADA,
+    )
+    for coluna, valor in filtro.items():
+        query = query.filter(getattr(R, coluna) == valor)
+    por_dia = defaultdict(list)
+    for r in query.order_by(R.data_reserva, R.hora_inicio):
+        por_dia[r.data_reserva].append(_item(
+            "reserva", r.hora_inicio, r.hora_fim,
+            reserva_id=r.id, espaco_id=r.espaco_id, descricao=r.finalidade, status=r.status.value,
+        ))
+    return por_dia
+
+
+def _periodos_turma(db: Session, turma) -> List[models.PeriodoAula]:
+    """Períodos do turno da turma; os da própria turma substituem os gerais de mesmo número."""
+    P = models.PeriodoAula
+    por_numero = {}
+    for p in db.query(P).filter(
+        P.turno_id == turma.turno_id,
+        P.ativo == True,
+        (P.turma_id == None) | (P.turma_id == turma.id),
+    ).order_by(P.turma_id.isnot(None)):
+        por_numero[p.numero_aula] = p
+    return sorted(por_numero.values(), key=lambda p: p.hora_inicio)
+
+
+def _semana_turma(db: Session, turma, segunda: date) -> Dict[date, List[dict]]:
+    periodos = _periodos_turma(db, turma)
+    aulas_periodo = {(p.hora_inicio, p.hora_fim): p.numero_aula for p in periodos if p.tipo == models.TipoPeriodoEnum.AULA}
+    semana = grade_efetiva.semana_efetiva(db, segunda)
+    resultado = {}
+    for data, horarios in semana.items():
+        aulas = [
+            _aula(h, aulas_periodo.get((h["hora_inicio"], h["hora_fim"])))
+            for h in horarios if h["turma_id"] == turma.id
+        ]
+        ocupados = {(a["hora_inicio"], a["hora_fim"]) for a in aulas if a["status"] != "cancelada"}
+        grade = []
+        # Dias sem nenhuma aula na grade (ex.: fim de semana) não listam períodos
+        if aulas:
+            for p in periodos:
+                if p.tipo == models.TipoPeriodoEnum.AULA:
+                    if (p.hora_inicio, p.hora_fim) not in ocupados:
+                        grade.append(_item("vago", p.hora_inicio, p.hora_fim, periodo_id=p.id, numero_aula=p.numero_aula))
+                else:
+                    grade.append(_item(
+                        "intervalo", p.hora_inicio, p.hora_fim,
+                        periodo_id=p.id, descricao=p.descricao or p.tipo.value.capitalize(),
+                    ))
+        resultado[data] = _intercalar(aulas, grade)
+    return resultado
+
+
+def _semana_professor(db: Session, professor, segunda: date) -> Dict[date, List[dict]]:
+    semana = grade_efetiva.semana_efetiva(db, segunda)
+    reservas = _reservas(db, segunda, solicitante_id=professor.usuario_id)
+
+    B = models.ProfessorBloqueio
+    bloqueios = defaultdict(list)
+    for b in db.query(B.id, B.dia_semana, B.hora_inicio, B.hora_fim, B.motivo).filter(
+        B.professor_id == professor.id
+    ).order_by(B.hora_inicio):
+        bloqueios[b.dia_semana.value].append(_item(
+            "bloqueio", b.hora_inicio, b.hora_fim, bloqueio_id=b.id, descricao=b.motivo,
+        ))
+
+    A = models.ProfessorAusencia
+    ausencias = defaultdict(list)
+    for a in db.query(A.id, A.data, A.hora_inicio, A.hora_fim, A.motivo).filter(
+        A.professor_id == professor.id, A.data >= segunda, A.data <= segunda + timedelta(days=6),
+    ):
+        ausencias[a.data].append(_item(
+            "ausencia", a.hora_inicio or time.min, a.hora_fim or time.max,
+            ausencia_id=a.id, descricao=a.motivo,
+        ))
+
+    resultado = {}
+    for data, horarios in semana.items():
+        aulas = []
+        for h in horarios:
+            if professor.id not in (h["professor_id"], h["professor_original_id"]):
+                continue
+            aula = _aula(h)
+            # Aula repassada a um substituto não ocupa o professor original
+            if h["professor_id"] != professor.id:
+                aula["tipo"] = "aula_substituida"
+            aulas.append(aula)
+        dia = grade_efetiva.DIAS[data.weekday()]
+        resultado[data] = _intercalar(
+            aulas, bloqueios.get(dia, []), reservas.get(data, []), sorted(ausencias.get(data, []), key=_inicio),
+        )
+    return resultado
+
+
+def _semana_espaco(db: Session, espaco, segunda: date) -> Dict[date, List[dict]]:
+    semana = grade_efetiva.semana_efetiva(db, segunda)
+    reservas = _reservas(db, segunda, espaco_id=espaco.id)
+    # Aulas alocadas ao espaço ou, sem alocação, com Horario.sala (texto
+    # livre) igual ao código ou ao nome do espaço
+    nomes = {n.strip().lower() for n in (espaco.codigo, espaco.nome) if n}
+    resultado = {}
+    for data, horarios in semana.items():
+        aulas = [
+            _aula(h) for h in horarios
+            if h["espaco_id"] == espaco.id
+            or (h["espaco_id"] is None and h["sala"] and h["sala"].strip().lower() in nomes)
+        ]
+        resultado[data] = _intercalar(aulas, reservas.get(data, []))
+    return resultado
+
+
+ENTIDADES = {
+    "turma": (models.Turma, _semana_turma),
+    "professor": (models.Professor, _semana_professor),
+    "espaco": (models.EspacoEscola, _semana_espaco),
+}
+
+
+def agenda_semana(db: Session, entidade: str, entidade_id: int, data: date) -> Optional[Dict[date, List[dict]]]:
+    """Agenda da semana de `data` para a entidade, por dia; None se a entidade não existir."""
+    modelo, montar = ENTIDADES[entidade]
+    segunda = grade_efetiva.inicio_semana(data)
+
+    def calcular():
+        obj = db.query(modelo).filter(modelo.id == entidade_id).first()
+        return None if obj is None else montar(db, obj, segunda)
+
+    return _cache_agenda.obter((entidade, entidade_id, segunda), TABELAS_AGENDA, calcular)
+
+
+def agenda_dia(db: Session, entidade: str, entidade_id: int, data: date) -> Optional[dict]:
+    semana = agenda_semana(db, entidade, entidade_id, data)
+    if semana is None:
+        return None
+    return {
+        "data": data,
+        "dia_semana": grade_efetiva.DIAS[data.weekday()],
+        "entidade": entidade,
+        "entidade_id": entidade_id,
+        "itens": semana[data],
+    }
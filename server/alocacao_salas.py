@@ -0,0 +1,298 @@
+"""Alocação de salas (espaços da escola) aos horários da grade.
+
+Cada horário precisa de um espaço ativo, que não exige aprovação, com
+`capacidade` para a turma (`Turma.quantidade_alunos`; sem um dos dois
+valores, qualquer espaço serve). O espaço também precisa estar livre na
+faixa. Ocupam um espaço:
+
+- outros horários já alocados a ele, fora do conjunto sendo otimizado;
+- reservas não canceladas das próximas `ALOCACAO_SEMANAS_RESERVAS` semanas,
+  projetadas no dia da semana (uma reserva numa terça bloqueia a sala para a
+  aula semanal de terça na mesma faixa).
+
+Os horários são agrupados em janelas (dia, início, fim) e processados em
+ordem de horário. Em cada janela a atribuição horário -> espaço livre é um
+emparelhamento bipartido de custo mínimo (método húngaro). O custo é a
+folga de lugares (capacidade - alunos), com bônus para manter o espaço atual
+e para a turma continuar no espaço da aula anterior do dia. Colunas
+"sem sala" de custo alto garantem solução mesmo quando faltam espaços. A
+ocupação é um inteiro por espaço com um bit por minuto da semana (como em
+substitutos.py); testar se um espaço está livre é um AND.
+
+Mover um horário reotimiza só a janela dele (`realocar_horario`), com o
+resto da grade fixo.
+"""
+import time as relogio
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from config import ALOCACAO_SEMANAS_RESERVAS
+from database import models
+from slots import DIAS, ORDEM_DIA
+from substitutos import faixa
+
+BONUS_MANTER = 1000           # manter o espaço atual do horário
+BONUS_CONTINUIDADE = 10       # turma no mesmo espaço da aula anterior do dia
+CUSTO_FOLGA_DESCONHECIDA = 30  # capacidade ou quantidade de alunos não informada
+CUSTO_SEM_SALA = 1_000_000
+CUSTO_INVIAVEL = 1_000_000_000
+
+
+class _Aula:
+    __slots__ = ("id", "turma_id", "dia", "hora_inicio", "hora_fim", "espaco_id", "alunos", "mascara")
+
+    def __init__(self, id, turma_id, dia, hora_inicio, hora_fim, espaco_id, alunos):
+        self.id = id
+        self.turma_id = turma_id
+        self.dia = dia
+        self.hora_inicio = hora_inicio
+        self.hora_fim = hora_fim
+        self.espaco_id = espaco_id
+        self.alunos = alunos
+        self.mascara = faixa(dia, hora_inicio, hora_fim)
+
+    @property
+    def janela(self):
+        return (ORDEM_DIA[self.dia], self.hora_inicio, self.hora_fim)
+
+
+class _Espaco:
+    __slots__ = ("id", "rotulo", "capacidade")
+
+    def __init__(self, id, rotulo, capacidade):
+        self.id = id
+        self.rotulo = rotulo
+        self.capacidade = capacidade
+
+
+class DadosAlocacao:
+    """Horários, espaços alocáveis e a ocupação dos espaços por reservas."""
+
+    def __init__(self, aulas: Dict[int, _Aula], espacos: Dict[int, _Espaco], reservas: Dict[int, int]):
+        self.aulas = aulas
+        self.espacos = espacos
+        self.reservas = reservas
+
+
+def carregar(db: Session, hoje: Optional[date] = None) -> DadosAlocacao:
+    hoje = hoje or date.today()
+    E = models.EspacoEscola
+    espacos = {
+        e.id: _Espaco(e.id, e.codigo or e.nome, e.capacidade)
+        for e in db.query(E.id, E.codigo, E.nome, E.capacidade).filter(
+            E.ativo == True, E.requer_aprovacao != True,
+        )
+    }
+
+    H = models.Horario
+    aulas = {
+        h.id: _Aula(h.id, h.turma_id, h.dia_semana.value, h.hora_inicio, h.hora_fim, h.espaco_id, h.quantidade_alunos)
+        for h in db.query(
+            H.id, H.turma_id, H.dia_semana, H.hora_inicio, H.hora_fim, H.espaco_id,
+            models.Turma.quantidade_alunos,
+        ).outerjoin(models.Turma, models.Turma.id == H.turma_id)
+    }
+
+    R = models.ReservaEspaco
+    reservas: Dict[int, int] = defaultdict(int)
+    for espaco_id, data, inicio, fim in db.query(R.espaco_id, R.data_reserva, R.hora_inicio, R.hora_fim).filter(
+        R.data_reserva >= hoje,
+        R.data_reserva < hoje + timedelta(weeks=ALOCACAO_SEMANAS_RESERVAS),
+        R.status != models.StatusReservaEnum.CANCELADA,
+    ):
+        if espaco_id in espacos:
+            reservas[espaco_id] |= faixa(DIAS[data.weekday()], inicio, fim)
+    return DadosAlocacao(aulas, espacos, dict(reservas))
+
+
+def _atribuicao_minima(custos: List[List[int]]) -> List[int]:
+    """Método húngaro (n linhas <= m colunas): coluna escolhida para cada linha."""
+    n, m = len(custos), len(custos[0])
+    u = [0] * (n + 1)
+    v = [0] * (m + 1)
+    dono = [0] * (m + 1)      # linha (1-based) emparelhada a cada coluna
+    anterior = [0] * (m + 1)
+    for i in range(1, n + 1):
+        dono[0] = i
+        j0 = 0
+        minimo = [CUSTO_INVIAVEL * 2] * (m + 1)
+        usada = [False] * (m + 1)
+        while True:
+            usada[j0] = True
+            i0 = dono[j0]
+            linha = custos[i0 - 1]
+            ui0 = u[i0]
+            delta, j1 = CUSTO_INVIAVEL * 2, 0
+            for j in range(1, m + 1):
+                if usada[j]:
+                    continue
+                atual = linha[j - 1] - ui0 - v[j]
+                if atual < minimo[j]:
+                    minimo[j] = atual
+                    anterior[j] = j0
+                if minimo[j] < delta:
+                    delta, j1 = minimo[j], j
+            for j in range(m + 1):
+                if usada[j]:
+                    u[dono[j]] += delta
+                    v[j] -= delta
+                else:
+                    minimo[j] -= delta
+            j0 = j1
+            if dono[j0] == 0:
+                break
+        while j0:
+            j1 = anterior[j0]
+            dono[j0] = dono[j1]
+            j0 = j1
+    escolha = [0] * n
+    for j in range(1, m + 1):
+        if dono[j]:
+            escolha[dono[j] - 1] = j - 1
+    return escolha
+
+
+def _custo(aula: _Aula, espaco: _Espaco, manter_atuais: bool, anterior: Optional[int]) -> int:
+    if espaco.capacidade is None or aula.alunos is None:
+        custo = CUSTO_FOLGA_DESCONHECIDA
+    elif espaco.capacidade < aula.alunos:
+        return CUSTO_INVIAVEL
+    else:
+        custo = espaco.capacidade - aula.alunos
+    if manter_atuais and espaco.id == aula.espaco_id:
+        custo -= BONUS_MANTER
+    if espaco.id == anterior:
+        custo -= BONUS_CONTINUIDADE
+    return custo
+
+
+def resolver(dados: DadosAlocacao, alvo: Iterable[int], manter_atuais: bool = True) -> Dict[int, Optional[int]]:
+    """Espaço escolhido (ou None) para cada horário de `alvo`; os demais ficam fixos."""
+    alvo = [dados.aulas[i] for i in alvo]
+    ids_alvo = {a.id for a in alvo}
+    ocupado = defaultdict(int, dados.reservas)
+    for a in dados.aulas.values():
+        if a.id not in ids_alvo and a.espaco_id in dados.espacos:
+            ocupado[a.espaco_id] |= a.mascara
+
+    janelas = defaultdict(list)
+    for a in alvo:
+        janelas[a.janela].append(a)
+
+    espacos = list(dados.espacos.values())
+    ultimo: Dict[tuple, int] = {}  # (turma, dia) -> espaço da aula anterior
+    resultado: Dict[int, Optional[int]] = {}
+    for chave in sorted(janelas):
+        aulas = janelas[chave]
+        mascara = aulas[0].mascara
+        livres = [e for e in espacos if not ocupado[e.id] & mascara]
+        custos = [
+            [_custo(a, e, manter_atuais, ultimo.get((a.turma_id, a.dia))) for e in livres]
+            for a in aulas
+        ]
+        # Só entram espaços viáveis para alguma aula da janela
+        colunas = [j for j in range(len(livres)) if any(linha[j] < CUSTO_INVIAVEL for linha in custos)]
+        matriz = [[linha[j] for j in colunas] + [CUSTO_SEM_SALA] * len(aulas) for linha in custos]
+        for a, j in zip(aulas, _atribuicao_minima(matriz)):
+            if j >= len(colunas):
+                resultado[a.id] = None
+                continue
+            espaco = livres[colunas[j]]
+            resultado[a.id] = espaco.id
+            ocupado[espaco.id] |= mascara
+            ultimo[(a.turma_id, a.dia)] = espaco.id
+    return resultado
+
+
+def _alteracoes(dados: DadosAlocacao, resultado: Dict[int, Optional[int]]) -> List[dict]:
+    return [
+        {"horario_id": hid, "espaco_anterior_id": dados.aulas[hid].espaco_id, "espaco_id": eid}
+        for hid, eid in resultado.items()
+        if dados.aulas[hid].espaco_id != eid
+    ]
+
+
+def _aplicar(db: Session, dados: DadosAlocacao, alteracoes: List[dict]) -> None:
+    H = models.Horario
+    # Libera antes todos os espaços que mudam: trocas entre horários não
+    # passam por um estado intermediário que viole a restrição de sobreposição
+    liberar = [
+        {"id": a["horario_id"], "espaco_id": None, "sala": None}
+        for a in alteracoes if a["espaco_anterior_id"] is not None
+    ]
+    if liberar:
+        db.execute(update(H), liberar)
+    novos = [
+        {"id": a["horario_id"], "espaco_id": a["espaco_id"], "sala": dados.espacos[a["espaco_id"]].rotulo}
+        for a in alteracoes if a["espaco_id"] is not None
+    ]
+    if novos:
+        db.execute(update(H), novos)
+    db.commit()
+
+
+def _relatorio(dados: DadosAlocacao, resultado: Dict[int, Optional[int]], alteracoes: List[dict],
+               aplicado: bool, inicio: float) -> dict:
+    return {
+        "horarios": len(resultado),
+        "alocados": sum(1 for e in resultado.values() if e is not None),
+        "sem_sala": sorted(h for h, e in resultado.items() if e is None),
+        "espacos_disponiveis": len(dados.espacos),
+        "janelas": len({dados.aulas[h].janela for h in resultado}),
+        "aplicado": aplicado,
+        "tempo_ms": round((relogio.perf_counter() - inicio) * 1000, 1),
+        "alteracoes": alteracoes,
+    }
+
+
+def alocar_salas(
+    db: Session,
+    turno_id: Optional[int] = None,
+    dia_semana=None,
+    manter_atuais: bool = True,
+    aplicar: bool = True,
+) -> dict:
+    """
+    Aloca espaços a todos os horários (ou aos do turno/dia). Com
+    `manter_atuais`, horários já alocados só trocam de espaço quando o atual
+    deixou de ser viável; sem ele, a grade é refeita do zero.
+    """
+    inicio = relogio.perf_counter()
+    dados = carregar(db)
+    alvo = list(dados.aulas)
+    if turno_id is not None or dia_semana is not None:
+        H = models.Horario
+        query = db.query(H.id)
+        if turno_id is not None:
+            query = query.filter(H.turno_id == turno_id)
+        if dia_semana is not None:
+            query = query.filter(H.dia_semana == models.DiaSemanaEnum(getattr(dia_semana, "value", dia_semana)))
+        alvo = [hid for (hid,) in query]
+    resultado = resolver(dados, alvo, manter_atuais=manter_atuais)
+    alteracoes = _alteracoes(dados, resultado)
+    if aplicar and alteracoes:
+        _aplicar(db, dados, alteracoes)
+    return _relatorio(dados, resultado, alteracoes, aplicar, inicio)
+
+
+def realocar_horario(db: Session, horario_id: int, aplicar: bool = True) -> Optional[dict]:
+    """
+    Reotimiza só a janela (dia, início, fim) do horário, com o resto da grade
+    fixo: o horário mantém o espaço se ainda for viável; senão recebe outro,
+    podendo trocar com horários da mesma janela. None se o horário não existir.
+    """
+    inicio = relogio.perf_counter()
+    dados = carregar(db)
+    aula = dados.aulas.get(horario_id)
+    if aula is None:
+        return None
+    alvo = [a.id for a in dados.aulas.values() if a.janela == aula.janela]
+    resultado = resolver(dados, alvo, manter_atuais=True)
+    alteracoes = _alteracoes(dados, resultado)
+    if aplicar and alteracoes:
+        _aplicar(db, dados, alteracoes)
+    return _relatorio(dados, resultado, alteracoes, aplicar, inicio)
@@ -0,0 +1,199 @@
+"""Análises de qualidade da grade de horários calculadas de forma vetorizada.
+
+Todos os horários do escopo (um turno ou a escola inteira) são carregados uma
+única vez em um DataFrame; janelas, carga por professor e distribuição semanal
+saem de agrupamentos sobre esse quadro, sem laços por professor ou turma. A
+cobertura do currículo vem de `cobertura_curriculo`, em cache.
+"""
+import time as _time
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy.orm import Session
+
+from database import models
+from cache import CacheVersionado
+import crud_new as crud
+
+DIAS = [d.value for d in models.DiaSemanaEnum]
+ORDEM_DIA = {d: i for i, d in enumerate(models.DiaSemanaEnum)}
+DIAS_LETIVOS = 5
+
+COLUNAS_HORARIO = [
+    "id", "professor_id", "disciplina_id", "turma_id", "turno_id",
+    "dia_semana", "hora_inicio", "hora_fim",
+]
+
+
+def _minutos(serie: pd.Series) -> np.ndarray:
+    return np.fromiter((t.hour * 60 + t.minute for t in serie), dtype=np.int32, count=len(serie))
+
+
+def carregar_horarios(db: Session, turno_id: Optional[int] = None) -> pd.DataFrame:
+    """Carrega os horários do escopo com dia, minutos e índice de slot já numéricos."""
+    query = db.query(*[getattr(models.Horario, c) for c in COLUNAS_HORARIO])
+    periodos = db.query(models.PeriodoAula.turno_id, models.PeriodoAula.hora_inicio).filter(
+        models.PeriodoAula.turma_id == None,
+        models.PeriodoAula.tipo == models.TipoPeriodoEnum.AULA,
+        models.PeriodoAula.ativo == True,
+    )
+    if turno_id is not None:
+        query = query.filter(models.Horario.turno_id == turno_id)
+        periodos = periodos.filter(models.PeriodoAula.turno_id == turno_id)
+
+    df = pd.DataFrame(query.all(), columns=COLUNAS_HORARIO)
+    df["dia"] = df["dia_semana"].map(ORDEM_DIA).astype(np.int8)
+    df["inicio"] = _minutos(df["hora_inicio"])
+    df["fim"] = _minutos(df["hora_fim"])
+    df["minutos"] = df["fim"] - df["inicio"]
+
+    # Slot = posição do início da aula entre os períodos de aula do turno,
+    # ignorando intervalos. Turnos sem períodos cadastrados usam os inícios dos
+    # próprios horários; aula que começa fora de um período fica com slot NaN.
+    per = pd.DataFrame(periodos.all(), columns=["turno_id", "hora_inicio"])
+    per = pd.DataFrame({"turno_id": per["turno_id"], "inicio": _minutos(per["hora_inicio"])})
+    sem_periodos = df.loc[~df["turno_id"].isin(per["turno_id"]), ["turno_id", "inicio"]]
+    inicios = pd.concat([per, sem_periodos]).drop_duplicates()
+    inicios["slot"] = inicios.groupby("turno_id")["inicio"].rank(method="dense").astype(np.int16) - 1
+    return df.merge(inicios, on=["turno_id", "inicio"], how="left")
+
+
+def _analise_professores(db: Session, df: pd.DataFrame) -> list:
+    por_dia = df.groupby(["professor_id", "dia"]).agg(aulas=("id", "size"))
+    # Slots só se comparam dentro do mesmo turno; aulas fora dos períodos não entram nas janelas
+    no_periodo = df[df["slot"].notna()]
+    por_turno_dia = no_periodo.groupby(["professor_id", "turno_id", "dia"]).agg(
+        primeiro=("slot", "min"), ultimo=("slot", "max"), aulas=("id", "size")
+    )
+    por_turno_dia["janelas"] = (
+        por_turno_dia["ultimo"] - por_turno_dia["primeiro"] + 1 - por_turno_dia["aulas"]
+    ).clip(lower=0)
+
+    resumo = df.groupby("professor_id").agg(aulas_semana=("id", "size"), minutos=("minutos", "sum"))
+    resumo["janelas"] = por_turno_dia.groupby(level="professor_id")["janelas"].sum()
+    resumo["janelas"] = resumo["janelas"].fillna(0).astype(int)
+    resumo["aulas_fora_dos_periodos"] = df["slot"].isna().groupby(df["professor_id"]).sum().astype(int)
+    resumo["dias_na_escola"] = por_dia.groupby(level="professor_id").size()
+    resumo["horas_semana"] = (resumo["minutos"] / 60).round(2)
+
+    professores = pd.DataFrame(
+        db.query(models.Professor.id, models.Usuario.nome, models.Professor.carga_horaria_semanal)
+        .join(models.Usuario, models.Usuario.id == models.Professor.usuario_id)
+        .filter(models.Professor.id.in_(resumo.index.tolist())).all(),
+        columns=["professor_id", "professor_nome", "carga_horaria_semanal"],
+    ).set_index("professor_id")
+    resumo = resumo.join(professores)
+    carga = resumo["carga_horaria_semanal"].replace(0, np.nan)
+    resumo["percentual_carga"] = (resumo["horas_semana"] / carga * 100).round(1)
+
+    aulas_por_dia = por_dia["aulas"].unstack(fill_value=0)
+    aulas_por_dia.columns = [DIAS[c] for c in aulas_por_dia.columns]
+    aulas_por_dia = aulas_por_dia.to_dict("index")
+
+    resumo = resumo.reset_index().replace({np.nan: None})
+    return [
+        {**r, "aulas_por_dia": aulas_por_dia.get(r["professor_id"], {})}
+        for r in resumo.drop(columns=["minutos"]).to_dict("records")
+    ]
+
+
+def _distribuicao_turmas(df: pd.DataFrame) -> list:
+    por_dia = df.groupby(["turma_id", "disciplina_id", "dia"]).size()
+    resumo = por_dia.groupby(level=["turma_id", "disciplina_id"]).agg(
+        aulas_semana="sum", dias_distintos="size", max_aulas_no_dia="max"
+    )
+    # Concentrada: ocupa menos dias do que poderia (ex.: 3 aulas em 2 dias)
+    resumo["concentrada"] = resumo["dias_distintos"] < np.minimum(resumo["aulas_semana"], DIAS_LETIVOS)
+
+    aulas_por_dia = por_dia.unstack(fill_value=0)
+    aulas_por_dia.columns = [DIAS[c] for c in aulas_por_dia.columns]
+    aulas_por_dia = aulas_por_dia.to_dict("index")
+    return [
+        {**r, "aulas_por_dia": aulas_por_dia[(r["turma_id"], r["disciplina_id"])]}
+        for r in resumo.reset_index().to_dict("records")
+    ]
+
+
+def analisar_grade(db: Session, turno_id: Optional[int] = None) -> dict:
+    inicio = _time.perf_counter()
+    df = carregar_horarios(db, turno_id)
+    if df.empty:
+        professores, distribuicao = [], []
+    else:
+        professores = _analise_professores(db, df)
+        distribuicao = _distribuicao_turmas(df)
+    return {
+        "turno_id": turno_id,
+        "total_horarios": len(df),
+        "professores": professores,
+        "distribuicao": distribuicao,
+        "cobertura": cobertura_curriculo(db, turno_id),
+        "tempo_ms": round((_time.perf_counter() - inicio) * 1000, 2),
+    }
+
+
+_cache_cobertura = CacheVersionado()
+TABELAS_COBERTURA = ("horarios", "turma_disciplinas", "disciplinas", "turmas")
+
+
+def linhas_cobertura(db: Session, turno_id: Optional[int] = None) -> list:
+    """(turma_id, disciplina_id, esperadas, agendadas) do escopo, em cache (base dos cenários)."""
+    return _cache_cobertura.obter(
+        ("linhas", turno_id), TABELAS_COBERTURA,
+        lambda: [tuple(l) for l in crud.get_cobertura_curriculo(db, turno_id=turno_id)],
+    )
+
+
+def montar_cobertura(db: Session, linhas) -> list:
+    """Cobertura por turma a partir das linhas (turma_id, disciplina_id, esperadas, agendadas)."""
+    turma_ids = {l[0] for l in linhas}
+    disciplina_ids = {l[1] for l in linhas}
+    turmas = {
+        t.id: t for t in db.query(models.Turma.id, models.Turma.nome, models.Turma.turno_id)
+        .filter(models.Turma.id.in_(turma_ids)).all()
+    }
+    nomes_disc = dict(
+        db.query(models.Disciplina.id, models.Disciplina.nome)
+        .filter(models.Disciplina.id.in_(disciplina_ids)).all()
+    )
+
+    por_turma: dict = {}
+    for turma_id, disciplina_id, esperadas, agendadas in sorted(linhas, key=lambda l: (l[0], l[1])):
+        turma = turmas.get(turma_id)
+        if turma is None:
+            continue  # turma removida referenciada por um cenário
+        item = por_turma.setdefault(turma_id, {
+            "turma_id": turma_id,
+            "turma_nome": turma.nome,
+            "turno_id": turma.turno_id,
+            "esperadas": 0,
+            "agendadas": 0,
+            "faltando": 0,
+            "excedentes": 0,
+            "disciplinas": [],
+        })
+        faltando = max(esperadas - agendadas, 0)
+        excedentes = max(agendadas - esperadas, 0)
+        item["esperadas"] += esperadas
+        item["agendadas"] += agendadas
+        item["faltando"] += faltando
+        item["excedentes"] += excedentes
+        item["disciplinas"].append({
+            "disciplina_id": disciplina_id,
+            "disciplina_nome": nomes_disc.get(disciplina_id, ""),
+            "esperadas": esperadas,
+            "agendadas": agendadas,
+            "faltando": faltando,
+            "excedentes": excedentes,
+        })
+    for item in por_turma.values():
+        item["completa"] = item["faltando"] == 0 and item["excedentes"] == 0
+    return list(por_turma.values())
+
+
+def cobertura_curriculo(db: Session, turno_id: Optional[int] = None) -> list:
+    """Cobertura do currículo por turma, em cache até a próxima escrita nas tabelas de origem."""
+    return _cache_cobertura.obter(
+        ("escopo", turno_id), TABELAS_COBERTURA, lambda: montar_cobertura(db, linhas_cobertura(db, turno_id))
+    )
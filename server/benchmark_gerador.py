@@ -0,0 +1,99 @@
+"""Benchmark do gerador de grade: qualidade da solução por tempo e por workers.
+
+Monta um turno sintético (turmas, disciplinas, professores aptos e
+bloqueios aleatórios, semente fixa) direto em `gerador_grade.Problema`, sem
+banco, e roda `gerador_grade.gerar` com 1, 2, 4 e 8 workers pelo mesmo
+tempo. Para cada execução mostra a melhor penalidade em frações do tempo,
+os componentes finais, reinícios e movimentos avaliados. Também confere que
+a penalidade mantida incrementalmente bate com a recalculada.
+
+Uso:
+    python benchmark_gerador.py [--turmas 24] [--segundos 20] [--workers 1,2,4,8]
+"""
+import argparse
+import os
+import random
+import sys
+from datetime import time
+from typing import List
+
+import gerador_grade
+
+FRACOES = (0.1, 0.25, 0.5, 1.0)
+
+
+def problema_sintetico(n_turmas: int, semente: int = 7) -> gerador_grade.Problema:
+    rng = random.Random(semente)
+    periodos = [(i, time(7 + i), time(8 + i)) for i in range(6)]
+    # 28 aulas por turma em 30 células: 12 disciplinas com 1 a 4 aulas
+    cargas = [4, 4, 3, 3, 3, 2, 2, 2, 2, 1, 1, 1]
+    n_disciplinas = len(cargas)
+    # Professores suficientes para ~20 aulas cada; parte deles apta a uma segunda disciplina
+    aptos = {d: [] for d in range(n_disciplinas)}
+    n_professores = 0
+    for d, carga in enumerate(cargas):
+        for _ in range(max(1, -(-n_turmas * carga // 20))):
+            aptos[d].append(n_professores)
+            n_professores += 1
+    for p in rng.sample(range(n_professores), n_professores // 3):
+        d = rng.randrange(n_disciplinas)
+        if p not in aptos[d]:
+            aptos[d].append(p)
+
+    celulas = 5 * len(periodos)
+    bloqueado = []
+    for _ in range(n_professores):
+        mascara = 0
+        for c in rng.sample(range(celulas), rng.randrange(0, 6)):
+            mascara |= 1 << c
+        bloqueado.append(mascara)
+
+    grupos = [
+        (t, d, cargas[d], list(aptos[d]))
+        for t in range(n_turmas) for d in range(n_disciplinas)
+    ]
+    return gerador_grade.Problema(
+        turno_id=0, dias=gerador_grade.DIAS_LETIVOS, periodos=periodos,
+        turmas=list(range(n_turmas)), grupos=grupos,
+        professores=list(range(n_professores)), bloqueado=bloqueado,
+    )
+
+
+def _penalidade_em(historico: List[dict], segundos: float):
+    atual = None
+    for ponto in historico:
+        if ponto["segundos"] > segundos:
+            break
+        atual = ponto["penalidade"]
+    return atual
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turmas", type=int, default=24)
+    parser.add_argument("--segundos", type=float, default=20)
+    parser.add_argument("--workers", default="1,2,4,8")
+    parser.add_argument("--semente", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    problema = problema_sintetico(args.turmas)
+    print(
+        f"Turmas: {args.turmas}  aulas: {len(problema.aulas)}  professores: {len(problema.professores)}  "
+        f"células: {problema.celulas}  tempo: {args.segundos:.0f} s  núcleos: {os.cpu_count()}"
+    )
+    cabecalho = "  ".join(f"{f * args.segundos:>7.1f}s" for f in FRACOES)
+    print(f"{'workers':>7}  {cabecalho}  {'reinícios':>9}  {'movimentos':>11}  componentes finais")
+    consistente = True
+    for workers in (int(w) for w in args.workers.split(",")):
+        r = gerador_grade.gerar(problema, args.segundos, workers=workers, semente=args.semente)
+        consistente &= r["penalidade"] == r["estado"].penalidade_total()
+        # Penalidade 0 é um resultado; "-" só quando ainda não havia solução no instante
+        penalidades = (_penalidade_em(r["historico"], f * args.segundos) for f in FRACOES)
+        pontos = "  ".join(f"{'-' if valor is None else valor:>8}" for valor in penalidades)
+        print(f"{workers:>7}  {pontos}  {r['reinicios']:>9}  {r['movimentos']:>11}  {r['componentes']}")
+    print(f"penalidade incremental = recalculada: {'sim' if consistente else 'NÃO'}")
+    return 0 if consistente else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
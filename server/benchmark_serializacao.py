@@ -0,0 +1,122 @@
+"""Benchmark da serialização de horários: caminho padrão x serializacao.py.
+
+Cria um banco SQLite temporário com N horários (padrão 10 000), compara o
+tempo de montar o JSON de `GET /horarios/` pelos dois caminhos e confere que
+as saídas são iguais.
+
+Uso:
+    python benchmark_serializacao.py [--horarios 10000] [--repeticoes 3]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time as _time
+from datetime import time
+from typing import List
+
+
+def _preparar_banco(n_horarios: int) -> str:
+    fd, caminho = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    os.environ["DATABASE_URL"] = f"sqlite:///{caminho}"
+    return caminho
+
+
+def _popular(db, models, n_horarios: int) -> None:
+    from sqlalchemy import insert
+
+    rnd = random.Random(42)
+    db.execute(insert(models.Turno), [
+        {"id": 1, "nome": "Integral", "hora_inicio": time(7), "hora_fim": time(17), "ativo": True},
+    ])
+    db.execute(insert(models.PeriodoAula), [
+        {"turno_id": 1, "numero_aula": i + 1, "hora_inicio": time(7 + i), "hora_fim": time(8 + i),
+         "tipo": models.TipoPeriodoEnum.AULA, "ativo": True}
+        for i in range(8)
+    ])
+    db.execute(insert(models.Usuario), [
+        {"id": i, "nome": f"Professor {i}", "username": f"prof{i}", "email": f"prof{i}@escola.com.br",
+         "senha_hash": "x", "role": models.UserRole.PROFESSOR, "ativo": True}
+        for i in range(1, 61)
+    ])
+    db.execute(insert(models.Professor), [
+        {"id": i, "usuario_id": i, "carga_horaria_semanal": 40} for i in range(1, 61)
+    ])
+    db.execute(insert(models.Disciplina), [
+        {"id": i, "nome": f"Disciplina {i}", "codigo": f"D{i}", "carga_horaria_semanal": 4, "ativa": True}
+        for i in range(1, 31)
+    ])
+    db.execute(insert(models.Turma), [
+        {"id": i, "nome": f"Turma {i}", "ano": f"{1 + i % 3}°", "turno_id": 1, "curso": "Ensino Médio", "ativa": True}
+        for i in range(1, 41)
+    ])
+    db.execute(insert(models.TurmaDisciplina), [
+        {"turma_id": t, "disciplina_id": d} for t in range(1, 41) for d in rnd.sample(range(1, 31), 12)
+    ])
+    dias = [d for d in models.DiaSemanaEnum][:5]
+    db.execute(insert(models.Horario), [
+        {"professor_id": rnd.randint(1, 60), "disciplina_id": rnd.randint(1, 30),
+         "turma_id": rnd.randint(1, 40), "turno_id": 1, "dia_semana": rnd.choice(dias),
+         "hora_inicio": time(7 + (i % 8)), "hora_fim": time(8 + (i % 8)), "sala": f"S{i % 25}"}
+        for i in range(n_horarios)
+    ])
+    db.commit()
+
+
+def _caminho_padrao(db, models, schemas) -> bytes:
+    # O que o FastAPI faz com response_model=List[schemas.Horario]: carrega os
+    # objetos ORM, valida com from_attributes, serializa em modo JSON e codifica.
+    from pydantic import TypeAdapter
+
+    adaptador = TypeAdapter(List[schemas.Horario])
+    objetos = db.query(models.Horario).all()
+    validados = adaptador.validate_python(objetos, from_attributes=True)
+    return json.dumps(adaptador.dump_python(validados, mode="json"), ensure_ascii=False).encode("utf-8")
+
+
+def _medir(funcao, repeticoes: int, limpar) -> tuple:
+    tempos = []
+    resultado = None
+    for _ in range(repeticoes):
+        limpar()
+        inicio = _time.perf_counter()
+        resultado = funcao()
+        tempos.append((_time.perf_counter() - inicio) * 1000)
+    return min(tempos), resultado
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--horarios", type=int, default=10_000)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    caminho = _preparar_banco(args.horarios)
+    try:
+        from database import models, schemas
+        from database.database import SessionLocal, engine
+        import serializacao
+
+        models.Base.metadata.create_all(bind=engine)
+        db = SessionLocal()
+        _popular(db, models, args.horarios)
+
+        t_padrao, json_padrao = _medir(lambda: _caminho_padrao(db, models, schemas), args.repeticoes, db.expunge_all)
+        t_rapido, json_rapido = _medir(lambda: serializacao.horarios_json(db), args.repeticoes, db.expunge_all)
+        db.close()
+
+        iguais = json.loads(json_padrao) == json.loads(json_rapido)
+        print(f"Horários: {args.horarios}  (melhor de {args.repeticoes})")
+        print(f"  caminho padrão (ORM + from_attributes + json): {t_padrao:9.1f} ms  {len(json_padrao) / 1e6:6.1f} MB")
+        print(f"  serializacao.horarios_json:                    {t_rapido:9.1f} ms  {len(json_rapido) / 1e6:6.1f} MB")
+        print(f"  ganho: {t_padrao / t_rapido:.1f}x  saídas idênticas: {'sim' if iguais else 'NÃO'}")
+        return 0 if iguais else 1
+    finally:
+        os.remove(caminho)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+"""Cache em memória com invalidação por versão de tabela.
+
+Cada tabela tem um contador de versão incrementado sempre que uma sessão
+confirma (commit) alterações nela, seja por objetos do ORM (flush) ou por
+comandos em lote (insert/update/delete do ORM). Entradas do cache guardam as
+versões das tabelas de que dependem e são recalculadas quando alguma muda.
+
+O cache é por processo: com vários workers, cada um invalida o seu ao
+escrever e o TTL limita quanto tempo um worker pode servir dados de outro.
+"""
+import threading
+import time
+from collections import OrderedDict
+from itertools import chain
+from typing import Callable, Dict, Hashable, Iterable, Tuple
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from config import CACHE_TTL_SEGUNDOS
+
+_lock = threading.Lock()
+_versoes: Dict[str, int] = {}
+
+_CHAVE_SESSAO = "tabelas_alteradas"
+
+
+def versao(*tabelas: str) -> Tuple[int, ...]:
+    with _lock:
+        return tuple(_versoes.get(t, 0) for t in tabelas)
+
+
+def invalidar(*tabelas: str) -> None:
+    with _lock:
+        for t in tabelas:
+            _versoes[t] = _versoes.get(t, 0) + 1
+
+
+def _marcar(session: Session, tabelas: Iterable[str]) -> None:
+    session.info.setdefault(_CHAVE_SESSAO, set()).update(tabelas)
+
+
+@event.listens_for(Session, "after_flush")
+def _registrar_flush(session, flush_context):
+    # Em after_flush as coleções new/dirty/deleted ainda refletem o que foi gravado
+    _marcar(session, {
+        tabela.name
+        for obj in chain(session.new, session.dirty, session.deleted)
+        for tabela in inspect(obj).mapper.tables
+    })
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _registrar_em_lote(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        _marcar(orm_execute_state.session, {orm_execute_state.statement.table.name})
+
+
+@event.listens_for(Session, "after_commit")
+def _publicar(session):
+    tabelas = session.info.pop(_CHAVE_SESSAO, None)
+    if tabelas:
+        invalidar(*tabelas)
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar(session):
+    session.info.pop(_CHAVE_SESSAO, None)
+
+
+class CacheVersionado:
+    """Memoiza resultados por chave enquanto as tabelas de origem não mudam (e o TTL não expira)."""
+
+    def __init__(self, ttl: float = CACHE_TTL_SEGUNDOS, max_itens: int = 256):
+        self.ttl = ttl
+        self.max_itens = max_itens
+        self._itens: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obter(self, chave: Hashable, tabelas: Iterable[str], calcular: Callable):
+        tabelas = tuple(tabelas)
+        # A versão é lida antes do cálculo: se houver escrita no meio, a
+        # próxima leitura já enxerga versão nova e recalcula.
+        atual = versao(*tabelas)
+        agora = time.monotonic()
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is not None and item[0] == atual and item[1] > agora:
+                self._itens.move_to_end(chave)
+                return item[2]
+        valor = calcular()
+        with self._lock:
+            self._itens[chave] = (atual, agora + self.ttl, valor)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+        return valor
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._itens.clear()
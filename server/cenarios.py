@@ -0,0 +1,368 @@
+"""Cenários: simulações sobre a grade atual que guardam só as diferenças.
+
+Um cenário é uma lista de alterações (cenario_alteracoes) sobre os horários
+atuais. O horário só é copiado quando o cenário mexe nele (copy-on-write):
+cada inserção, alteração ou remoção vira uma linha com o resultado completo,
+e o resto da grade não é duplicado. Um cenário custa o número de alterações.
+
+As leituras sobrepõem as alterações a estruturas da grade atual que ficam em
+cache até a próxima escrita em horários e são compartilhadas por todos os
+cenários:
+
+- grade: as linhas do escopo (versoes_grade.grade_atual) sem as ocultas pelo
+  cenário (alteradas ou removidas), mais as do cenário;
+- conflitos: o modelo de ocupação de movimentos.py avalia cada aula do
+  cenário contra a grade atual, excluindo as ocultas; entre aulas do cenário
+  a comparação é direta, por dia. A grade atual já é livre de sobreposições
+  (restricoes.py), então só as aulas do cenário são verificadas;
+- cobertura: as contagens (turma, disciplina) da grade atual
+  (analises.linhas_cobertura) ajustadas em -1/+1 por alteração.
+
+Aplicar um cenário reescreve na grade só as linhas alteradas, numa transação
+(versoes_grade.reescrever), depois de conferir que nenhuma delas mudou na
+grade desde que o cenário a copiou: pelo updated_at e por uma assinatura do
+conteúdo, já que o updated_at do SQLite não distingue duas escritas no mesmo
+segundo. Exceções datadas de horários que o cenário mudou de dia da semana
+são descartadas e listadas no resultado.
+"""
+import hashlib
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import delete, insert
+from sqlalchemy.orm import Session
+
+import analises
+import crud_new as crud
+import movimentos
+import versoes_grade
+from cache import CacheVersionado
+from database import models
+from slots import calcular_slot
+from substitutos import faixa
+
+INSERIR = "inserir"
+ATUALIZAR = "atualizar"
+REMOVER = "remover"
+
+CAMPOS = (
+    "professor_id", "disciplina_id", "turma_id", "turno_id", "dia_semana",
+    "hora_inicio", "hora_fim", "sala", "espaco_id", "observacoes",
+)
+
+CONFLITO_ESPACO = "conflito_espaco"
+
+_cache_base = CacheVersionado(max_itens=16)
+
+
+class CenarioDesatualizado(ValueError):
+    """Horários alterados pelo cenário mudaram (ou sumiram) na grade atual."""
+
+
+class CenarioComConflitos(ValueError):
+    """O cenário tem aulas em conflito e não pode ser aplicado."""
+
+
+class Sobreposicao:
+    """Alterações de um cenário: ids da grade atual que ele oculta e as linhas que ele põe no lugar."""
+
+    def __init__(self, db: Session, alteracoes: List[models.CenarioAlteracao]):
+        self.alteracoes = alteracoes
+        self.ocultos = {a.horario_id for a in alteracoes if a.horario_id is not None}
+        self.linhas = [linha(db, a) for a in alteracoes if a.operacao != REMOVER]
+
+
+def _base(db: Session, turno_id: Optional[int]) -> List[dict]:
+    """Linhas da grade atual do escopo, compartilhadas entre cenários (não alterar)."""
+    return _cache_base.obter(
+        ("base", turno_id), ("horarios",),
+        lambda: versoes_grade.horarios(versoes_grade.grade_atual(db, turno_id)),
+    )
+
+
+def linha(db: Session, alteracao: models.CenarioAlteracao) -> dict:
+    """Horário resultante da alteração, no formato de schemas.HorarioCenario."""
+    resultado = {c: getattr(alteracao, c) for c in CAMPOS}
+    novo = alteracao.horario_id is None
+    resultado["id"] = -alteracao.id if novo else alteracao.horario_id
+    resultado["slot"] = calcular_slot(
+        db, alteracao.turno_id, alteracao.dia_semana, alteracao.hora_inicio, alteracao.hora_fim
+    )
+    resultado["origem"] = "novo" if novo else "alterado"
+    return resultado
+
+
+def alteracoes(db: Session, cenario_id: int) -> List[models.CenarioAlteracao]:
+    A = models.CenarioAlteracao
+    return db.query(A).filter(A.cenario_id == cenario_id).order_by(A.id).all()
+
+
+def sobreposicao(db: Session, cenario_id: int) -> Sobreposicao:
+    return Sobreposicao(db, alteracoes(db, cenario_id))
+
+
+def assinatura(valores: dict) -> str:
+    """Resumo do conteúdo de um horário (CAMPOS), para detectar mudanças na grade atual."""
+    partes = []
+    for c in CAMPOS:
+        valor = valores[c]
+        partes.append("" if valor is None else str(getattr(valor, "value", valor)))
+    return hashlib.sha1("\x1f".join(partes).encode("utf-8")).hexdigest()
+
+
+def _marca(h: models.Horario) -> dict:
+    return {"base_atualizado_em": h.updated_at, "base_assinatura": assinatura({c: getattr(h, c) for c in CAMPOS})}
+
+
+def _no_escopo(l: dict, turno_id: Optional[int]) -> bool:
+    return turno_id is None or l["turno_id"] == turno_id
+
+
+# Leituras
+
+def horarios(db: Session, cenario_id: int, turno_id: Optional[int] = None,
+             turma_id: Optional[int] = None, professor_id: Optional[int] = None) -> List[dict]:
+    """Grade do cenário: a atual com as alterações por cima, em ordem de id (novos no fim)."""
+    sob = sobreposicao(db, cenario_id)
+
+    def filtro(l: dict) -> bool:
+        return (turma_id is None or l["turma_id"] == turma_id) and (
+            professor_id is None or l["professor_id"] == professor_id
+        )
+
+    resultado = [l for l in _base(db, turno_id) if l["id"] not in sob.ocultos and filtro(l)]
+    resultado += [l for l in sob.linhas if _no_escopo(l, turno_id) and filtro(l)]
+    resultado.sort(key=lambda l: (l["id"] < 0, abs(l["id"])))
+    return resultado
+
+
+def conflitos(db: Session, cenario_id: int, turno_id: Optional[int] = None,
+              sob: Optional[Sobreposicao] = None) -> List[dict]:
+    """Aulas do cenário que conflitam com a grade atual, entre si, ou com bloqueios e disponibilidade."""
+    sob = sob or sobreposicao(db, cenario_id)
+    modelo = movimentos.modelo_grade(db)
+    aulas = [(l, faixa(l["dia_semana"], l["hora_inicio"], l["hora_fim"])) for l in sob.linhas]
+    por_dia: Dict[str, list] = defaultdict(list)
+    for l, mascara in aulas:
+        por_dia[l["dia_semana"]].append((l, mascara))
+
+    resultado = []
+    for l, mascara in aulas:
+        if not _no_escopo(l, turno_id):
+            continue
+        dia = l["dia_semana"]
+        motivos, ids = modelo.avaliar(l["professor_id"], l["turma_id"], dia, mascara, sob.ocultos)
+        if l["espaco_id"] is not None:
+            espaco = modelo.espacos.ocupantes(l["espaco_id"], dia, mascara, sob.ocultos)
+            if espaco:
+                motivos.append(CONFLITO_ESPACO)
+                ids.extend(a.id for a in espaco if a.id not in ids)
+        for outra, outra_mascara in por_dia[dia]:
+            if outra is l or not outra_mascara & mascara:
+                continue
+            for motivo, campo in (
+                (movimentos.CONFLITO_PROFESSOR, "professor_id"),
+                (movimentos.CONFLITO_TURMA, "turma_id"),
+                (CONFLITO_ESPACO, "espaco_id"),
+            ):
+                if outra[campo] is not None and outra[campo] == l[campo]:
+                    if motivo not in motivos:
+                        motivos.append(motivo)
+                    if outra["id"] not in ids:
+                        ids.append(outra["id"])
+        if motivos:
+            resultado.append({
+                "horario_id": l["id"],
+                "dia_semana": dia,
+                "hora_inicio": l["hora_inicio"],
+                "hora_fim": l["hora_fim"],
+                "motivos": motivos,
+                "conflitos": ids,
+            })
+    return resultado
+
+
+def cobertura(db: Session, cenario_id: int, turno_id: Optional[int] = None) -> list:
+    """Cobertura do currículo com as contagens da grade atual ajustadas pelas alterações."""
+    H = models.Horario
+    sob = sobreposicao(db, cenario_id)
+    contagens = {(t, d): [esperadas, agendadas] for t, d, esperadas, agendadas in analises.linhas_cobertura(db, turno_id)}
+    tocados = set()
+
+    def somar(turma_id: int, disciplina_id: int, turno: int, delta: int) -> None:
+        if turno_id is not None and turno != turno_id:
+            return
+        chave = (turma_id, disciplina_id)
+        contagens.setdefault(chave, [0, 0])[1] += delta
+        tocados.add(chave)
+
+    if sob.ocultos:
+        for t, d, turno in db.query(H.turma_id, H.disciplina_id, H.turno_id).filter(H.id.in_(sob.ocultos)):
+            somar(t, d, turno, -1)
+    for l in sob.linhas:
+        somar(l["turma_id"], l["disciplina_id"], l["turno_id"], 1)
+
+    # Como na consulta da grade atual, pares sem carga prevista só aparecem com aulas
+    for chave in tocados:
+        if contagens[chave] == [0, 0]:
+            del contagens[chave]
+    return analises.montar_cobertura(db, [(t, d, e, a) for (t, d), (e, a) in contagens.items()])
+
+
+# Escritas
+
+def _alteracao(db: Session, cenario_id: int, horario_id: int) -> Optional[models.CenarioAlteracao]:
+    """Alteração do horário no cenário (ids negativos são inserções do próprio cenário)."""
+    A = models.CenarioAlteracao
+    if horario_id < 0:
+        return db.query(A).filter(A.cenario_id == cenario_id, A.id == -horario_id).first()
+    return db.query(A).filter(A.cenario_id == cenario_id, A.horario_id == horario_id).first()
+
+
+def resultado(db: Session, cenario_id: int, horario_id: int) -> Optional[dict]:
+    """Horário como está no cenário, ou None se não existe (ou foi removido) nele."""
+    alteracao = _alteracao(db, cenario_id, horario_id)
+    if alteracao is not None:
+        return None if alteracao.operacao == REMOVER else linha(db, alteracao)
+    if horario_id < 0:
+        return None
+    h = crud.get_horario(db, horario_id)
+    if h is None:
+        return None
+    atual = {c: getattr(h, c) for c in CAMPOS}
+    atual.update(id=h.id, slot=h.slot, dia_semana=h.dia_semana.value, origem="atual")
+    return atual
+
+
+def _gravar(db: Session, alteracao: models.CenarioAlteracao, valores: dict) -> dict:
+    for campo, valor in valores.items():
+        setattr(alteracao, campo, valor)
+    db.add(alteracao)
+    db.commit()
+    db.refresh(alteracao)
+    return linha(db, alteracao)
+
+
+def inserir(db: Session, cenario_id: int, valores: dict) -> dict:
+    return _gravar(db, models.CenarioAlteracao(cenario_id=cenario_id, operacao=INSERIR), valores)
+
+
+def atualizar(db: Session, cenario_id: int, horario_id: int, valores: dict) -> dict:
+    """Grava `valores` (horário completo) como a versão do horário no cenário."""
+    alteracao = _alteracao(db, cenario_id, horario_id)
+    if alteracao is None:
+        # Primeira alteração do horário no cenário: guarda a marca da grade atual
+        h = crud.get_horario(db, horario_id)
+        alteracao = models.CenarioAlteracao(cenario_id=cenario_id, horario_id=horario_id, **_marca(h))
+    if alteracao.horario_id is not None:
+        alteracao.operacao = ATUALIZAR
+    return _gravar(db, alteracao, valores)
+
+
+def remover(db: Session, cenario_id: int, horario_id: int) -> None:
+    alteracao = _alteracao(db, cenario_id, horario_id)
+    if alteracao is not None and alteracao.horario_id is None:
+        db.delete(alteracao)  # inserção do próprio cenário: basta esquecê-la
+        db.commit()
+        return
+    if alteracao is None:
+        h = crud.get_horario(db, horario_id)
+        alteracao = models.CenarioAlteracao(cenario_id=cenario_id, horario_id=horario_id, **_marca(h))
+    _gravar(db, alteracao, {"operacao": REMOVER, **{c: None for c in CAMPOS}})
+
+
+def descartar(db: Session, cenario_id: int, horario_id: int) -> bool:
+    """Desfaz a alteração do horário no cenário (volta a valer a grade atual)."""
+    alteracao = _alteracao(db, cenario_id, horario_id)
+    if alteracao is None:
+        return False
+    db.delete(alteracao)
+    db.commit()
+    return True
+
+
+def _desatualizadas(db: Session, lista: List[models.CenarioAlteracao], bloquear: bool = False) -> set:
+    """Ids da grade atual que mudaram ou sumiram depois de entrarem no cenário."""
+    H = models.Horario
+    ids = [a.horario_id for a in lista if a.horario_id is not None]
+    if not ids:
+        return set()
+    query = db.query(H.id, H.updated_at, *[getattr(H, c) for c in CAMPOS]).filter(H.id.in_(ids))
+    if bloquear:
+        query = query.with_for_update()
+    atuais = {
+        r.id: (r.updated_at, assinatura({c: getattr(r, c) for c in CAMPOS})) for r in query.all()
+    }
+
+    def mudou(a: models.CenarioAlteracao) -> bool:
+        if a.horario_id not in atuais:
+            return True
+        atualizado_em, conteudo = atuais[a.horario_id]
+        # Alterações gravadas antes da assinatura só têm o updated_at
+        return atualizado_em != a.base_atualizado_em or (
+            a.base_assinatura is not None and conteudo != a.base_assinatura
+        )
+
+    return {a.horario_id for a in lista if a.horario_id is not None and mudou(a)}
+
+
+def listar_alteracoes(db: Session, cenario_id: int) -> List[dict]:
+    lista = alteracoes(db, cenario_id)
+    desatualizadas = _desatualizadas(db, lista)
+    return [
+        {
+            "horario_id": a.horario_id if a.horario_id is not None else -a.id,
+            "operacao": a.operacao,
+            "desatualizada": a.horario_id in desatualizadas,
+            "horario": None if a.operacao == REMOVER else linha(db, a),
+        }
+        for a in lista
+    ]
+
+
+def aplicar(db: Session, cenario: models.Cenario) -> dict:
+    """Leva as alterações do cenário para a grade atual, numa transação, e esvazia o cenário."""
+    H, A = models.Horario, models.CenarioAlteracao
+    sob = sobreposicao(db, cenario.id)
+    desatualizadas = _desatualizadas(db, sob.alteracoes, bloquear=True)
+    if desatualizadas:
+        raise CenarioDesatualizado(
+            "Horários alterados na grade depois de entrarem no cenário: "
+            + ", ".join(map(str, sorted(desatualizadas)))
+        )
+    problemas = conflitos(db, cenario.id, sob=sob)
+    if problemas:
+        raise CenarioComConflitos(
+            "O cenário tem horários em conflito: " + ", ".join(str(p["horario_id"]) for p in problemas)
+        )
+
+    agora = datetime.now(timezone.utc)
+    criados = dict(db.query(H.id, H.created_at).filter(H.id.in_(sob.ocultos))) if sob.ocultos else {}
+    reescritas, novas = [], []
+    for l in sob.linhas:
+        valores = {c: l[c] for c in CAMPOS}
+        valores["dia_semana"] = models.DiaSemanaEnum(l["dia_semana"])
+        valores["slot"] = l["slot"]
+        if l["origem"] == "novo":
+            novas.append(valores)
+        else:
+            valores.update(id=l["id"], created_at=criados[l["id"]], updated_at=agora)
+            reescritas.append(valores)
+    removidos = [a.horario_id for a in sob.alteracoes if a.operacao == REMOVER]
+
+    excecoes, descartadas = versoes_grade.reescrever(db, removidos, [l["id"] for l in reescritas], reescritas)
+    if novas:
+        with crud._sem_sobreposicao(db):
+            db.execute(insert(H), novas)
+    db.execute(delete(A).where(A.cenario_id == cenario.id))
+    cenario.aplicado_em = agora
+    crud._commit_sem_sobreposicao(db)
+    return {
+        "cenario_id": cenario.id,
+        "inseridos": len(novas),
+        "atualizados": len(reescritas),
+        "removidos": len(removidos),
+        "excecoes_preservadas": excecoes,
+        "excecoes_descartadas": descartadas,
+    }
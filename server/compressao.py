@@ -0,0 +1,258 @@
+"""Compressão das respostas (brotli/gzip) e métricas de tamanho por rota.
+
+`CompressaoMiddleware` escolhe a codificação pelo `Accept-Encoding` do cliente
+(respeitando os pesos `q`; em empate prefere brotli, se o pacote `brotli`
+estiver instalado, e depois gzip) e comprime respostas de tipos textuais
+(JSON, texto, CSV, XML) a partir de `COMPRESSAO_TAMANHO_MINIMO` bytes.
+Respostas já codificadas, binárias (xlsx, pdf) e o stream de eventos
+(`text/event-stream`) passam sem alteração. Um ETag forte vira fraco (`W/`)
+quando o corpo é comprimido, como faz o nginx.
+
+Cada resposta é contabilizada em `metricas`, por método e rota (o caminho
+declarado, ex.: `/turmas/{turma_id}`): bytes antes e depois da compressão.
+Os contadores são do processo (cada worker do uvicorn tem os seus) e ficam
+expostos em `GET /metricas/payload`.
+"""
+import gzip
+import zlib
+from typing import Dict, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from config import (
+    COMPRESSAO_NIVEL_BROTLI,
+    COMPRESSAO_NIVEL_GZIP,
+    COMPRESSAO_TAMANHO_MINIMO,
+)
+
+try:
+    import brotli
+except ImportError:  # opcional: sem o pacote, só gzip
+    brotli = None
+
+TIPOS_COMPRIMIVEIS = (
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "text/",
+)
+TIPOS_NAO_COMPRIMIVEIS = ("text/event-stream",)
+STATUS_SEM_CORPO = {204, 304}
+
+
+def codificacoes_disponiveis() -> tuple:
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def escolher_codificacao(accept_encoding: str) -> Optional[str]:
+    """Codificação a usar para o cabeçalho Accept-Encoding; None = sem compressão."""
+    pesos: Dict[str, float] = {}
+    for parte in accept_encoding.split(","):
+        nome, _, parametros = parte.strip().partition(";")
+        nome = nome.strip().lower()
+        if not nome:
+            continue
+        q = 1.0
+        for parametro in parametros.split(";"):
+            chave, _, valor = parametro.strip().partition("=")
+            if chave.strip().lower() == "q":
+                try:
+                    q = float(valor)
+                except ValueError:
+                    q = 0.0
+        pesos[nome] = q
+
+    melhor, melhor_q = None, 0.0
+    for codificacao in codificacoes_disponiveis():
+        q = pesos.get(codificacao, pesos.get("*", 0.0))
+        if q > melhor_q:
+            melhor, melhor_q = codificacao, q
+    return melhor
+
+
+def _comprimivel(content_type: str) -> bool:
+    tipo = content_type.split(";", 1)[0].strip().lower()
+    if tipo in TIPOS_NAO_COMPRIMIVEIS:
+        return False
+    return tipo.startswith(TIPOS_COMPRIMIVEIS) or tipo.endswith("+json") or tipo.endswith("+xml")
+
+
+class _Compressor:
+    """Compressão incremental com a mesma interface para gzip e brotli."""
+
+    def __init__(self, codificacao: str, nivel_gzip: int, nivel_brotli: int):
+        if codificacao == "br":
+            self._br = brotli.Compressor(quality=nivel_brotli)
+            self._gz = None
+        else:
+            self._br = None
+            self._gz = zlib.compressobj(nivel_gzip, zlib.DEFLATED, 31)
+
+    def comprimir(self, dados: bytes, fim: bool) -> bytes:
+        if self._br is not None:
+            saida = self._br.process(dados)
+            return saida + (self._br.finish() if fim else self._br.flush())
+        saida = self._gz.compress(dados)
+        return saida + self._gz.flush(zlib.Z_FINISH if fim else zlib.Z_SYNC_FLUSH)
+
+
+def comprimir(dados: bytes, codificacao: str, nivel_gzip: int = COMPRESSAO_NIVEL_GZIP,
+              nivel_brotli: int = COMPRESSAO_NIVEL_BROTLI) -> bytes:
+    if codificacao == "br":
+        return brotli.compress(dados, quality=nivel_brotli)
+    return gzip.compress(dados, compresslevel=nivel_gzip, mtime=0)
+
+
+class MetricasPayload:
+    """Tamanho das respostas por rota: total, maior e média, antes e depois da compressão."""
+
+    def __init__(self):
+        self._rotas: Dict[str, dict] = {}
+
+    def registrar(self, rota: str, bytes_originais: int, bytes_enviados: int, codificacao: Optional[str]) -> None:
+        m = self._rotas.get(rota)
+        if m is None:
+            m = self._rotas[rota] = {
+                "requisicoes": 0, "comprimidas": 0,
+                "bytes_originais": 0, "bytes_enviados": 0, "maior_original": 0,
+            }
+        m["requisicoes"] += 1
+        m["bytes_originais"] += bytes_originais
+        m["bytes_enviados"] += bytes_enviados
+        m["maior_original"] = max(m["maior_original"], bytes_originais)
+        if codificacao:
+            m["comprimidas"] += 1
+
+    def resumo(self) -> list:
+        linhas = []
+        for rota, m in self._rotas.items():
+            linhas.append({
+                "rota": rota,
+                **m,
+                "media_original": m["bytes_originais"] // m["requisicoes"],
+                "media_enviada": m["bytes_enviados"] // m["requisicoes"],
+                "razao_compressao": round(m["bytes_enviados"] / m["bytes_originais"], 3) if m["bytes_originais"] else 1.0,
+            })
+        return sorted(linhas, key=lambda l: l["bytes_enviados"], reverse=True)
+
+    def limpar(self) -> None:
+        self._rotas.clear()
+
+
+metricas = MetricasPayload()
+
+_rotas_por_endpoint: Dict[int, Dict[object, str]] = {}
+
+
+def _rota(scope) -> str:
+    """Caminho declarado da rota atendida (após o roteamento) ou o caminho bruto."""
+    router = scope.get("router")
+    endpoint = scope.get("endpoint")
+    caminho = None
+    if router is not None and endpoint is not None:
+        mapa = _rotas_por_endpoint.get(id(router))
+        if mapa is None:
+            mapa = _rotas_por_endpoint[id(router)] = {}
+            for r in router.routes:
+                if getattr(r, "endpoint", None) is not None:
+                    mapa.setdefault(r.endpoint, r.path)
+        caminho = mapa.get(endpoint)
+    if caminho is None:
+        caminho = "(sem rota)" if endpoint is None else scope["path"]
+    return f"{scope['method']} {caminho}"
+
+
+class CompressaoMiddleware:
+    def __init__(self, app, tamanho_minimo: int = COMPRESSAO_TAMANHO_MINIMO,
+                 nivel_gzip: int = COMPRESSAO_NIVEL_GZIP, nivel_brotli: int = COMPRESSAO_NIVEL_BROTLI):
+        self.app = app
+        self.tamanho_minimo = tamanho_minimo
+        self.nivel_gzip = nivel_gzip
+        self.nivel_brotli = nivel_brotli
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        codificacao = escolher_codificacao(Headers(scope=scope).get("accept-encoding", ""))
+        resposta = _Resposta(self, scope, send, codificacao)
+        await self.app(scope, receive, resposta.enviar)
+
+
+class _Resposta:
+    """Estado de uma resposta passando pelo middleware."""
+
+    def __init__(self, middleware: CompressaoMiddleware, scope, send, codificacao: Optional[str]):
+        self.middleware = middleware
+        self.scope = scope
+        self.send = send
+        self.codificacao = codificacao
+        self.inicio = None
+        self.modo = None  # None (aguardando corpo), "direto" ou "fluxo"
+        self.compressor: Optional[_Compressor] = None
+        self.bytes_originais = 0
+        self.bytes_enviados = 0
+
+    async def enviar(self, message) -> None:
+        tipo = message["type"]
+        if tipo == "http.response.start":
+            self.inicio = message
+            return
+        if tipo != "http.response.body":
+            await self.send(message)
+            return
+
+        corpo = message.get("body", b"")
+        mais = message.get("more_body", False)
+        self.bytes_originais += len(corpo)
+
+        if self.modo is None:
+            await self._primeiro_corpo(corpo, mais)
+        elif self.modo == "fluxo":
+            saida = self.compressor.comprimir(corpo, fim=not mais)
+            self.bytes_enviados += len(saida)
+            await self.send({"type": "http.response.body", "body": saida, "more_body": mais})
+        else:
+            self.bytes_enviados += len(corpo)
+            await self.send(message)
+
+        if not mais:
+            metricas.registrar(
+                _rota(self.scope), self.bytes_originais, self.bytes_enviados,
+                self.codificacao if self.modo != "direto" else None,
+            )
+
+    async def _primeiro_corpo(self, corpo: bytes, mais: bool) -> None:
+        headers = MutableHeaders(raw=self.inicio["headers"])
+        comprimivel = (
+            self.scope["method"] != "HEAD"
+            and self.inicio["status"] not in STATUS_SEM_CORPO
+            and "content-encoding" not in headers
+            and _comprimivel(headers.get("content-type", ""))
+        )
+        if comprimivel:
+            headers.add_vary_header("Accept-Encoding")
+        if not comprimivel or self.codificacao is None or (not mais and len(corpo) < self.middleware.tamanho_minimo):
+            self.modo = "direto"
+            self.bytes_enviados += len(corpo)
+            await self.send(self.inicio)
+            await self.send({"type": "http.response.body", "body": corpo, "more_body": mais})
+            return
+
+        headers["Content-Encoding"] = self.codificacao
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            headers["ETag"] = f"W/{etag}"
+        if mais:
+            # Corpo em partes (StreamingResponse): comprime cada parte com flush
+            self.modo = "fluxo"
+            self.compressor = _Compressor(self.codificacao, self.middleware.nivel_gzip, self.middleware.nivel_brotli)
+            del headers["Content-Length"]
+            saida = self.compressor.comprimir(corpo, fim=False)
+        else:
+            self.modo = "inteiro"
+            saida = comprimir(corpo, self.codificacao, self.middleware.nivel_gzip, self.middleware.nivel_brotli)
+            headers["Content-Length"] = str(len(saida))
+        self.bytes_enviados += len(saida)
+        await self.send(self.inicio)
+        await self.send({"type": "http.response.body", "body": saida, "more_body": mais})
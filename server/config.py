@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -36,6 +37,53 @@ DEFAULT_ADMIN_USERNAME = os.getenv("DEFAULT_ADMIN_USERNAME", "admin")
 DEFAULT_ADMIN_PASSWORD = os.getenv("DEFAULT_ADMIN_PASSWORD", "admin123")
 DEFAULT_ADMIN_EMAIL = os.getenv("DEFAULT_ADMIN_EMAIL", "admin@example.com")
 
+# Janela padrão (em dias, relativa a hoje) das listagens de reservas quando o
+# cliente não informa data_inicio/data_fim; permite poda de partições no Postgres.
+RESERVAS_JANELA_DIAS_PASSADO = int(os.getenv("RESERVAS_JANELA_DIAS_PASSADO", "180"))
+RESERVAS_JANELA_DIAS_FUTURO = int(os.getenv("RESERVAS_JANELA_DIAS_FUTURO", "365"))
+
+# Validade máxima (segundos) das entradas de cache em memória; escritas no
+# próprio processo invalidam antes disso.
+CACHE_TTL_SEGUNDOS = float(os.getenv("CACHE_TTL_SEGUNDOS", "300"))
+DASHBOARD_CACHE_TTL_SEGUNDOS = float(os.getenv("DASHBOARD_CACHE_TTL_SEGUNDOS", "30"))
+
+# Canal do LISTEN/NOTIFY usado pelo feed de alterações (/eventos)
+EVENTOS_CANAL = os.getenv("EVENTOS_CANAL", "professores_eventos")
+EVENTOS_HEARTBEAT_SEGUNDOS = float(os.getenv("EVENTOS_HEARTBEAT_SEGUNDOS", "15"))
+
+# Compressão das respostas (brotli quando o pacote estiver instalado, senão gzip)
+COMPRESSAO_ATIVA = _as_bool(os.getenv("COMPRESSAO_ATIVA"), default=True)
+COMPRESSAO_TAMANHO_MINIMO = int(os.getenv("COMPRESSAO_TAMANHO_MINIMO", "1024"))
+COMPRESSAO_NIVEL_GZIP = int(os.getenv("COMPRESSAO_NIVEL_GZIP", "6"))
+COMPRESSAO_NIVEL_BROTLI = int(os.getenv("COMPRESSAO_NIVEL_BROTLI", "5"))
+
+# Alocação de salas: semanas à frente (a partir de hoje) cujas reservas de
+# espaço bloqueiam a sala para a aula semanal no mesmo dia e faixa
+ALOCACAO_SEMANAS_RESERVAS = int(os.getenv("ALOCACAO_SEMANAS_RESERVAS", "8"))
+
+# Gerador de grade: processos da busca paralela (0 = um por núcleo) e tempo máximo
+GERADOR_WORKERS = int(os.getenv("GERADOR_WORKERS", "0"))
+GERADOR_TEMPO_MAXIMO_SEGUNDOS = float(os.getenv("GERADOR_TEMPO_MAXIMO_SEGUNDOS", "600"))
+
+# Otimizador de janelas dos professores: tempo máximo de uma execução
+JANELAS_TEMPO_MAXIMO_SEGUNDOS = float(os.getenv("JANELAS_TEMPO_MAXIMO_SEGUNDOS", "300"))
+
+
+# Tarefas em segundo plano: threads por processo (0 = não executa tarefas
+# neste processo), intervalo de consulta da fila, tentativas, espera base
+# entre tentativas (dobra a cada uma) e prazo sem sinal de vida após o qual
+# uma tarefa em execução volta para a fila; tarefas encerradas são apagadas
+# depois de TAREFAS_RETENCAO_DIAS
+TAREFAS_WORKERS = int(os.getenv("TAREFAS_WORKERS", "2"))
+TAREFAS_INTERVALO_SEGUNDOS = float(os.getenv("TAREFAS_INTERVALO_SEGUNDOS", "1"))
+TAREFAS_MAX_TENTATIVAS = int(os.getenv("TAREFAS_MAX_TENTATIVAS", "3"))
+TAREFAS_ESPERA_BASE_SEGUNDOS = float(os.getenv("TAREFAS_ESPERA_BASE_SEGUNDOS", "5"))
+TAREFAS_PRAZO_SEGUNDOS = float(os.getenv("TAREFAS_PRAZO_SEGUNDOS", "120"))
+TAREFAS_RETENCAO_DIAS = int(os.getenv("TAREFAS_RETENCAO_DIAS", "7"))
+# Arquivos gerados por tarefas (exportações); com a API em mais de uma
+# máquina, precisa ser um volume compartilhado
+TAREFAS_DIR_ARQUIVOS = os.getenv("TAREFAS_DIR_ARQUIVOS", os.path.join(tempfile.gettempdir(), "tarefas"))
+
 
 def validate_settings() -> None:
     if not DEBUG and SECRET_KEY == DEFAULT_SECRET_KEY:
@@ -1,9 +1,17 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, func
+from sqlalchemy import and_, or_, func, case, literal
+from sqlalchemy.exc import IntegrityError
 from database import models, schemas
 from typing import Optional, List
-from datetime import date, time
+import enum
+from contextlib import contextmanager
+from datetime import date, time, timedelta
 from passlib.context import CryptContext
+from restricoes import ConflitoSobreposicao, mensagem_violacao
+import slots
+import grade_efetiva
+
+from config import RESERVAS_JANELA_DIAS_PASSADO, RESERVAS_JANELA_DIAS_FUTURO
 
 # Configuração de hash de senha
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -266,6 +274,149 @@ def delete_professor_bloqueio(db: Session, bloqueio_id: int):
         return True
     return False
 
+# ProfessorAusencia CRUD operations
+def create_professor_ausencia(db: Session, ausencia: schemas.ProfessorAusenciaCreate):
+    db_ausencia = models.ProfessorAusencia(**ausencia.model_dump())
+    db.add(db_ausencia)
+    db.commit()
+    db.refresh(db_ausencia)
+    return db_ausencia
+
+def get_professor_ausencia(db: Session, ausencia_id: int):
+    return db.query(models.ProfessorAusencia).filter(models.ProfessorAusencia.id == ausencia_id).first()
+
+def get_professor_ausencias(
+    db: Session,
+    professor_id: Optional[int] = None,
+    data_inicio: Optional[date] = None,
+    data_fim: Optional[date] = None,
+):
+    query = db.query(models.ProfessorAusencia)
+    if professor_id is not None:
+        query = query.filter(models.ProfessorAusencia.professor_id == professor_id)
+    if data_inicio is not None:
+        query = query.filter(models.ProfessorAusencia.data >= data_inicio)
+    if data_fim is not None:
+        query = query.filter(models.ProfessorAusencia.data <= data_fim)
+    return query.order_by(models.ProfessorAusencia.data, models.ProfessorAusencia.hora_inicio).all()
+
+def update_professor_ausencia(db: Session, ausencia_id: int, ausencia: schemas.ProfessorAusenciaUpdate):
+    db_a = get_professor_ausencia(db, ausencia_id)
+    if db_a:
+        for field, value in ausencia.model_dump(exclude_unset=True).items():
+            setattr(db_a, field, value)
+        db.commit()
+        db.refresh(db_a)
+    return db_a
+
+def delete_professor_ausencia(db: Session, ausencia_id: int):
+    db_a = get_professor_ausencia(db, ausencia_id)
+    if db_a:
+        db.delete(db_a)
+        db.commit()
+        return True
+    return False
+
+# HorarioExcecao CRUD operations
+def create_horario_excecao(db: Session, excecao: schemas.HorarioExcecaoCreate):
+    db_excecao = models.HorarioExcecao(**excecao.model_dump())
+    db.add(db_excecao)
+    db.commit()
+    db.refresh(db_excecao)
+    return db_excecao
+
+def get_horario_excecao(db: Session, excecao_id: int):
+    return db.query(models.HorarioExcecao).filter(models.HorarioExcecao.id == excecao_id).first()
+
+def get_horario_excecao_data(db: Session, horario_id: int, data: date):
+    return db.query(models.HorarioExcecao).filter(
+        models.HorarioExcecao.horario_id == horario_id,
+        models.HorarioExcecao.data == data,
+    ).first()
+
+def get_horario_excecoes(
+    db: Session,
+    horario_id: Optional[int] = None,
+    data_inicio: Optional[date] = None,
+    data_fim: Optional[date] = None,
+):
+    query = db.query(models.HorarioExcecao)
+    if horario_id is not None:
+        query = query.filter(models.HorarioExcecao.horario_id == horario_id)
+    if data_inicio is not None:
+        query = query.filter(models.HorarioExcecao.data >= data_inicio)
+    if data_fim is not None:
+        query = query.filter(models.HorarioExcecao.data <= data_fim)
+    return query.order_by(models.HorarioExcecao.data, models.HorarioExcecao.horario_id).all()
+
+def update_horario_excecao(db: Session, excecao_id: int, excecao: schemas.HorarioExcecaoUpdate):
+    db_e = get_horario_excecao(db, excecao_id)
+    if db_e:
+        for field, value in excecao.model_dump(exclude_unset=True).items():
+            setattr(db_e, field, value)
+        db.commit()
+        db.refresh(db_e)
+    return db_e
+
+def delete_horario_excecao(db: Session, excecao_id: int):
+    db_e = get_horario_excecao(db, excecao_id)
+    if db_e:
+        db.delete(db_e)
+        db.commit()
+        return True
+    return False
+
+def _substituir_por_professor(db: Session, model, professor_id: int, itens: list, campos: tuple):
+    """Substitui o conjunto de linhas do professor por `itens` em uma única transação.
+
+    Faz a diferença de conjuntos pelos `campos`: linhas iguais são mantidas (com
+    o mesmo id), as ausentes são removidas e as novas inseridas. Itens repetidos
+    na entrada contam uma vez.
+    """
+    def _chave(valores):
+        # Enums de models e schemas são classes distintas: compara pelo valor
+        return tuple(v.value if isinstance(v, enum.Enum) else v for v in valores)
+
+    atuais = db.query(model).filter(model.professor_id == professor_id).all()
+    existentes = {}
+    remover = []
+    for linha in atuais:
+        chave = _chave(getattr(linha, c) for c in campos)
+        if chave in existentes:
+            remover.append(linha)
+        else:
+            existentes[chave] = linha
+    desejados = {}
+    for item in itens:
+        dados = item.model_dump()
+        desejados.setdefault(_chave(dados[c] for c in campos), dados)
+
+    remover += [linha for chave, linha in existentes.items() if chave not in desejados]
+    novos = [
+        {**dados, "professor_id": professor_id}
+        for chave, dados in desejados.items() if chave not in existentes
+    ]
+    try:
+        for linha in remover:
+            db.delete(linha)
+        db.add_all([model(**dados) for dados in novos])
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return (
+        db.query(model)
+        .filter(model.professor_id == professor_id)
+        .order_by(ordem_dia_semana(model.dia_semana), model.hora_inicio)
+        .all()
+    )
+
+def substituir_professor_bloqueios(db: Session, professor_id: int, itens: List[schemas.ProfessorBloqueioItem]):
+    return _substituir_por_professor(
+        db, models.ProfessorBloqueio, professor_id, itens,
+        ("dia_semana", "hora_inicio", "hora_fim", "categoria", "motivo"),
+    )
+
 # ProfessorDisponibilidade CRUD operations
 def create_professor_disponibilidade(db: Session, disp: schemas.ProfessorDisponibilidadeCreate):
     db_d = models.ProfessorDisponibilidade(**disp.model_dump())
@@ -298,12 +449,80 @@ def delete_professor_disponibilidade(db: Session, disp_id: int):
         return True
     return False
 
+def substituir_professor_disponibilidades(db: Session, professor_id: int, itens: List[schemas.ProfessorDisponibilidadeItem]):
+    return _substituir_por_professor(
+        db, models.ProfessorDisponibilidade, professor_id, itens,
+        ("dia_semana", "hora_inicio", "hora_fim", "categoria", "observacoes"),
+    )
+
+@contextmanager
+def _sem_sobreposicao(db: Session):
+    """Traduz violações das restrições de sobreposição em ConflitoSobreposicao (desfazendo a transação)."""
+    try:
+        yield
+    except IntegrityError as e:
+        db.rollback()
+        mensagem = mensagem_violacao(e)
+        if mensagem:
+            raise ConflitoSobreposicao(mensagem) from e
+        raise
+
+def _commit_sem_sobreposicao(db: Session):
+    """Commit que traduz violações das restrições de sobreposição em ConflitoSobreposicao."""
+    with _sem_sobreposicao(db):
+        db.commit()
+
 # Horário CRUD operations
 def get_horario(db: Session, horario_id: int):
     return db.query(models.Horario).filter(models.Horario.id == horario_id).first()
 
-def get_horarios(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.Horario).offset(skip).limit(limit).all()
+def predicados_horarios(
+    turma_id: Optional[int] = None,
+    professor_id: Optional[int] = None,
+    turno_id: Optional[int] = None,
+    dia_semana=None,
+    disciplina_id: Optional[int] = None,
+    sala: Optional[str] = None,
+    hora_de: Optional[time] = None,
+    hora_ate: Optional[time] = None,
+    espaco_id: Optional[int] = None,
+) -> list:
+    """
+    Filtros combináveis da listagem de horários. Cada combinação é atendida por
+    um dos índices ix_horarios_* (coluna de igualdade + dia + hora de início);
+    a janela [hora_de, hora_ate) seleciona os horários que a intersectam.
+    """
+    H = models.Horario
+    predicados = [
+        coluna == valor
+        for coluna, valor in (
+            (H.turma_id, turma_id),
+            (H.professor_id, professor_id),
+            (H.turno_id, turno_id),
+            (H.disciplina_id, disciplina_id),
+            (H.sala, sala),
+            (H.espaco_id, espaco_id),
+        )
+        if valor is not None
+    ]
+    if dia_semana is not None:
+        valor = dia_semana.value if isinstance(dia_semana, enum.Enum) else dia_semana
+        predicados.append(H.dia_semana == models.DiaSemanaEnum(valor))
+    if hora_de is not None:
+        predicados.append(H.hora_fim > hora_de)
+    if hora_ate is not None:
+        predicados.append(H.hora_inicio < hora_ate)
+    return predicados
+
+def get_horarios(db: Session, skip: int = 0, limit: int = 100, **filtros):
+    return (
+        db.query(models.Horario)
+        .filter(*predicados_horarios(**filtros))
+        .order_by(models.Horario.id)
+        .offset(skip)
+        .limit(limit)
+        .all()
+    )
 
 def get_horarios_professor(db: Session, professor_id: int):
     return db.query(models.Horario).filter(models.Horario.professor_id == professor_id).all()
@@ -321,6 +540,17 @@ def verificar_conflito_horario(
     hora_fim: time,
     horario_id: Optional[int] = None,
 ):
+    sobreposicao = or_(
+        and_(models.Horario.hora_inicio <= hora_inicio, models.Horario.hora_fim > hora_inicio),
+        and_(models.Horario.hora_inicio < hora_fim, models.Horario.hora_fim >= hora_fim),
+        and_(models.Horario.hora_inicio >= hora_inicio, models.Horario.hora_fim <= hora_fim),
+    )
+    # Na grade do turno, conflito é igualdade de slot; só horários fora da
+    # grade precisam da comparação de faixas.
+    slot = slots.calcular_slot(db, turno_id, dia_semana, hora_inicio, hora_fim)
+    if slot is not None:
+        sobreposicao = or_(models.Horario.slot == slot, and_(models.Horario.slot == None, sobreposicao))
+
     query = db.query(models.Horario).filter(
         models.Horario.turno_id == turno_id,
         models.Horario.dia_semana == dia_semana,
@@ -328,11 +558,7 @@ def verificar_conflito_horario(
             models.Horario.professor_id == professor_id,
             models.Horario.turma_id == turma_id,
         ),
-        or_(
-            and_(models.Horario.hora_inicio <= hora_inicio, models.Horario.hora_fim > hora_inicio),
-            and_(models.Horario.hora_inicio < hora_fim, models.Horario.hora_fim >= hora_fim),
-            and_(models.Horario.hora_inicio >= hora_inicio, models.Horario.hora_fim <= hora_fim),
-        ),
+        sobreposicao,
     )
 
     if horario_id:
@@ -379,10 +605,21 @@ def verificar_disponibilidade_professor(
         )
     ).first() is not None
 
+def _sincronizar_sala(db: Session, db_horario: models.Horario):
+    """Com espaço alocado, `sala` passa a ser o rótulo do espaço (código ou nome)."""
+    if db_horario.espaco_id is not None:
+        espaco = get_espaco(db, db_horario.espaco_id)
+        if espaco is not None:
+            db_horario.sala = espaco.codigo or espaco.nome
+
 def create_horario(db: Session, horario: schemas.HorarioCreate):
     db_horario = models.Horario(**horario.model_dump())
+    _sincronizar_sala(db, db_horario)
+    db_horario.slot = slots.calcular_slot(
+        db, db_horario.turno_id, db_horario.dia_semana, db_horario.hora_inicio, db_horario.hora_fim
+    )
     db.add(db_horario)
-    db.commit()
+    _commit_sem_sobreposicao(db)
     db.refresh(db_horario)
     return db_horario
 
@@ -392,7 +629,11 @@ def update_horario(db: Session, horario_id: int, horario: schemas.HorarioUpdate)
         update_data = horario.model_dump(exclude_unset=True)
         for field, value in update_data.items():
             setattr(db_horario, field, value)
-        db.commit()
+        _sincronizar_sala(db, db_horario)
+        db_horario.slot = slots.calcular_slot(
+            db, db_horario.turno_id, db_horario.dia_semana, db_horario.hora_inicio, db_horario.hora_fim
+        )
+        _commit_sem_sobreposicao(db)
         db.refresh(db_horario)
     return db_horario
 
@@ -404,6 +645,217 @@ def delete_horario(db: Session, horario_id: int):
         return True
     return False
 
+# Pacote de dados do editor de horários
+def _tabela(query, chave: str = "id"):
+    """Converte linhas de colunas nomeadas em dict {id: registro}, com enums pelo valor."""
+    tabela = {}
+    for row in query:
+        registro = {k: (v.value if isinstance(v, enum.Enum) else v) for k, v in row._asdict().items()}
+        tabela[registro[chave]] = registro
+    return tabela
+
+def _linhas(query):
+    return [
+        {k: (v.value if isinstance(v, enum.Enum) else v) for k, v in row._asdict().items()}
+        for row in query
+    ]
+
+def get_editor_bundle(db: Session, turno_id: Optional[int] = None):
+    """Entidades usadas pelo editor de horários, normalizadas e indexadas por id.
+
+    Executa uma consulta por tabela (oito no total), lendo apenas colunas, sem
+    carregar relacionamentos aninhados.
+    """
+    H = models.Horario
+    horarios = db.query(
+        H.id, H.professor_id, H.disciplina_id, H.turma_id, H.turno_id,
+        H.dia_semana, H.hora_inicio, H.hora_fim, H.slot, H.sala, H.observacoes,
+    )
+    turmas = db.query(
+        models.Turma.id, models.Turma.nome, models.Turma.ano, models.Turma.turno_id, models.Turma.curso,
+        models.Turma.ativa,
+    )
+    periodos = db.query(
+        models.PeriodoAula.id, models.PeriodoAula.turno_id, models.PeriodoAula.turma_id,
+        models.PeriodoAula.numero_aula, models.PeriodoAula.hora_inicio, models.PeriodoAula.hora_fim,
+        models.PeriodoAula.tipo, models.PeriodoAula.descricao, models.PeriodoAula.ativo,
+    )
+    turma_disciplinas = db.query(
+        models.TurmaDisciplina.turma_id, models.TurmaDisciplina.disciplina_id,
+        models.TurmaDisciplina.carga_horaria_semanal,
+    )
+    if turno_id is not None:
+        horarios = horarios.filter(H.turno_id == turno_id)
+        turmas = turmas.filter(models.Turma.turno_id == turno_id)
+        periodos = periodos.filter(models.PeriodoAula.turno_id == turno_id)
+        turma_disciplinas = turma_disciplinas.join(
+            models.Turma, models.Turma.id == models.TurmaDisciplina.turma_id
+        ).filter(models.Turma.turno_id == turno_id)
+
+    professores = db.query(
+        models.Professor.id, models.Professor.usuario_id, models.Usuario.nome,
+        models.Professor.departamento, models.Professor.carga_horaria_semanal,
+    ).join(models.Usuario, models.Usuario.id == models.Professor.usuario_id)
+    disciplinas = db.query(
+        models.Disciplina.id, models.Disciplina.nome, models.Disciplina.codigo,
+        models.Disciplina.carga_horaria_semanal, models.Disciplina.ativa,
+    )
+    turnos = db.query(
+        models.Turno.id, models.Turno.nome, models.Turno.hora_inicio, models.Turno.hora_fim,
+        models.Turno.ativo,
+    )
+    professor_disciplinas = db.query(
+        models.ProfessorDisciplina.professor_id, models.ProfessorDisciplina.disciplina_id,
+        models.ProfessorDisciplina.carga_horaria,
+    )
+
+    return {
+        "turno_id": turno_id,
+        "horarios": _linhas(horarios.order_by(H.id)),
+        "professores": _tabela(professores),
+        "disciplinas": _tabela(disciplinas),
+        "turmas": _tabela(turmas),
+        "turnos": _tabela(turnos),
+        "periodos_aula": _tabela(periodos.order_by(models.PeriodoAula.turno_id, models.PeriodoAula.numero_aula)),
+        "professor_disciplinas": _linhas(professor_disciplinas),
+        "turma_disciplinas": _linhas(turma_disciplinas),
+    }
+
+# Exportações (consultas por colunas, lidas em lotes com yield_per)
+# dia_semana é gravado como texto (native_enum=False), por isso o CASE compara os valores
+ORDEM_DIA_SEMANA = {dia.value: i for i, dia in enumerate(models.DiaSemanaEnum)}
+
+def ordem_dia_semana(coluna):
+    return case(ORDEM_DIA_SEMANA, value=coluna)
+
+def query_horarios_exportacao(
+    db: Session,
+    turma_id: Optional[int] = None,
+    professor_id: Optional[int] = None,
+    turno_id: Optional[int] = None,
+):
+    query = db.query(
+        models.Horario.id,
+        models.Turno.nome,
+        models.Turma.nome,
+        models.Horario.dia_semana,
+        models.Horario.hora_inicio,
+        models.Horario.hora_fim,
+        models.Disciplina.nome,
+        models.Usuario.nome,
+        models.Horario.sala,
+        models.Horario.observacoes,
+    ).join(models.Turno, models.Turno.id == models.Horario.turno_id
+    ).join(models.Turma, models.Turma.id == models.Horario.turma_id
+    ).join(models.Disciplina, models.Disciplina.id == models.Horario.disciplina_id
+    ).join(models.Professor, models.Professor.id == models.Horario.professor_id
+    ).join(models.Usuario, models.Usuario.id == models.Professor.usuario_id)
+    if turma_id is not None:
+        query = query.filter(models.Horario.turma_id == turma_id)
+    if professor_id is not None:
+        query = query.filter(models.Horario.professor_id == professor_id)
+    if turno_id is not None:
+        query = query.filter(models.Horario.turno_id == turno_id)
+    return query.order_by(
+        models.Turno.nome,
+        models.Turma.nome,
+        ordem_dia_semana(models.Horario.dia_semana),
+        models.Horario.hora_inicio,
+    )
+
+def query_reservas_exportacao(
+    db: Session,
+    data_inicio: Optional[date] = None,
+    data_fim: Optional[date] = None,
+    espaco_id: Optional[int] = None,
+):
+    data_inicio, data_fim = janela_reservas(data_inicio, data_fim)
+    query = db.query(
+        models.ReservaEspaco.id,
+        models.ReservaEspaco.data_reserva,
+        models.ReservaEspaco.hora_inicio,
+        models.ReservaEspaco.hora_fim,
+        models.EspacoEscola.nome,
+        models.Usuario.nome,
+        models.ReservaEspaco.finalidade,
+        models.ReservaEspaco.status,
+        models.ReservaEspaco.observacoes,
+    ).join(models.EspacoEscola, models.EspacoEscola.id == models.ReservaEspaco.espaco_id
+    ).join(models.Usuario, models.Usuario.id == models.ReservaEspaco.solicitante_id
+    ).filter(
+        models.ReservaEspaco.data_reserva >= data_inicio,
+        models.ReservaEspaco.data_reserva <= data_fim,
+    )
+    if espaco_id is not None:
+        query = query.filter(models.ReservaEspaco.espaco_id == espaco_id)
+    return query.order_by(models.ReservaEspaco.data_reserva, models.ReservaEspaco.hora_inicio)
+
+# Dashboard
+def get_contagens_dashboard(db: Session):
+    """Todas as contagens do dashboard em um único SELECT de subconsultas escalares."""
+    def contar(model, *filtros):
+        return db.query(func.count(model.id)).filter(*filtros).scalar_subquery()
+
+    return db.query(
+        contar(models.Professor).label("professores"),
+        contar(models.Disciplina, models.Disciplina.ativa == True).label("disciplinas"),
+        contar(models.Turma, models.Turma.ativa == True).label("turmas"),
+        contar(models.Turno, models.Turno.ativo == True).label("turnos"),
+        contar(models.EspacoEscola, models.EspacoEscola.ativo == True).label("espacos"),
+        contar(models.Usuario).label("usuarios"),
+        contar(models.Horario).label("horarios"),
+        contar(
+            models.ReservaEspaco,
+            models.ReservaEspaco.status == models.StatusReservaEnum.PENDENTE,
+            models.ReservaEspaco.data_reserva >= date.today(),
+        ).label("reservas_pendentes"),
+    ).one()
+
+# Cobertura do currículo (aulas agendadas x carga semanal prevista)
+def get_cobertura_curriculo(db: Session, turno_id: Optional[int] = None):
+    """Retorna (turma_id, disciplina_id, esperadas, agendadas) com dois GROUP BY.
+
+    O primeiro parte dos vínculos turma-disciplina (carga da turma ou, na
+    falta, a da disciplina); o segundo traz aulas agendadas de disciplinas sem
+    vínculo com a turma, que contam como excedentes.
+    """
+    agendadas = db.query(
+        models.Horario.turma_id.label("turma_id"),
+        models.Horario.disciplina_id.label("disciplina_id"),
+        func.count(models.Horario.id).label("agendadas"),
+    )
+    if turno_id is not None:
+        agendadas = agendadas.filter(models.Horario.turno_id == turno_id)
+    agendadas = agendadas.group_by(models.Horario.turma_id, models.Horario.disciplina_id).subquery()
+
+    vinculadas = db.query(
+        models.TurmaDisciplina.turma_id,
+        models.TurmaDisciplina.disciplina_id,
+        func.coalesce(
+            models.TurmaDisciplina.carga_horaria_semanal, models.Disciplina.carga_horaria_semanal, 0
+        ),
+        func.coalesce(agendadas.c.agendadas, 0),
+    ).join(models.Disciplina, models.Disciplina.id == models.TurmaDisciplina.disciplina_id
+    ).join(models.Turma, models.Turma.id == models.TurmaDisciplina.turma_id
+    ).outerjoin(agendadas, and_(
+        agendadas.c.turma_id == models.TurmaDisciplina.turma_id,
+        agendadas.c.disciplina_id == models.TurmaDisciplina.disciplina_id,
+    ))
+    if turno_id is not None:
+        vinculadas = vinculadas.filter(models.Turma.turno_id == turno_id)
+
+    sem_vinculo = db.query(
+        agendadas.c.turma_id,
+        agendadas.c.disciplina_id,
+        literal(0),
+        agendadas.c.agendadas,
+    ).outerjoin(models.TurmaDisciplina, and_(
+        models.TurmaDisciplina.turma_id == agendadas.c.turma_id,
+        models.TurmaDisciplina.disciplina_id == agendadas.c.disciplina_id,
+    )).filter(models.TurmaDisciplina.id == None)
+
+    return vinculadas.all() + sem_vinculo.all()
+
 # EspacoEscola CRUD operations
 def get_espaco(db: Session, espaco_id: int):
     return db.query(models.EspacoEscola).filter(models.EspacoEscola.id == espaco_id).first()
@@ -435,12 +887,47 @@ def update_espaco(db: Session, espaco_id: int, espaco: schemas.EspacoEscolaUpdat
 def get_reserva(db: Session, reserva_id: int):
     return db.query(models.ReservaEspaco).filter(models.ReservaEspaco.id == reserva_id).first()
 
-def get_reservas(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.ReservaEspaco).offset(skip).limit(limit).all()
+def janela_reservas(data_inicio: Optional[date] = None, data_fim: Optional[date] = None):
+    """Completa o intervalo de datas das listagens de reservas com a janela padrão.
+
+    Toda consulta de reservas é limitada por data_reserva para que o Postgres
+    consiga descartar partições mensais fora do intervalo.
+    """
+    hoje = date.today()
+    if data_inicio is None:
+        data_inicio = hoje - timedelta(days=RESERVAS_JANELA_DIAS_PASSADO)
+    if data_fim is None:
+        data_fim = hoje + timedelta(days=RESERVAS_JANELA_DIAS_FUTURO)
+    return data_inicio, data_fim
+
+def get_reservas(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    data_inicio: Optional[date] = None,
+    data_fim: Optional[date] = None,
+):
+    data_inicio, data_fim = janela_reservas(data_inicio, data_fim)
+    return db.query(models.ReservaEspaco).filter(
+        models.ReservaEspaco.data_reserva >= data_inicio,
+        models.ReservaEspaco.data_reserva <= data_fim,
+    ).order_by(
+        models.ReservaEspaco.data_reserva, models.ReservaEspaco.hora_inicio
+    ).offset(skip).limit(limit).all()
 
-def get_reservas_usuario(db: Session, usuario_id: int):
+def get_reservas_usuario(
+    db: Session,
+    usuario_id: int,
+    data_inicio: Optional[date] = None,
+    data_fim: Optional[date] = None,
+):
+    data_inicio, data_fim = janela_reservas(data_inicio, data_fim)
     return db.query(models.ReservaEspaco).filter(
-        models.ReservaEspaco.solicitante_id == usuario_id
+        models.ReservaEspaco.solicitante_id == usuario_id,
+        models.ReservaEspaco.data_reserva >= data_inicio,
+        models.ReservaEspaco.data_reserva <= data_fim,
+    ).order_by(
+        models.ReservaEspaco.data_reserva, models.ReservaEspaco.hora_inicio
     ).all()
 
 def get_reservas_espaco_data(db: Session, espaco_id: int, data_reserva: date):
@@ -456,7 +943,7 @@ def create_reserva(db: Session, reserva: schemas.ReservaEspacoCreate, solicitant
     reserva_data = reserva.model_dump()
     db_reserva = models.ReservaEspaco(**reserva_data, solicitante_id=solicitante_id)
     db.add(db_reserva)
-    db.commit()
+    _commit_sem_sobreposicao(db)
     db.refresh(db_reserva)
     return db_reserva
 
@@ -467,7 +954,7 @@ def update_reserva_status(db: Session, reserva_id: int, status: schemas.StatusRe
         if aprovador_id:
             db_reserva.aprovado_por = aprovador_id
             db_reserva.data_aprovacao = func.now()
-        db.commit()
+        _commit_sem_sobreposicao(db)
         db.refresh(db_reserva)
     return db_reserva
 
@@ -501,6 +988,31 @@ def verificar_conflito_reserva(db: Session, espaco_id: int, data_reserva: date,
     
     return query.first() is not None
 
+def verificar_conflito_espaco(db: Session, espaco_id: int, dia_semana, hora_inicio: time,
+                              hora_fim: time, horario_id: Optional[int] = None):
+    """Verifica se outro horário da grade já ocupa o espaço na faixa"""
+    valor = dia_semana.value if isinstance(dia_semana, enum.Enum) else dia_semana
+    query = db.query(models.Horario.id).filter(
+        models.Horario.espaco_id == espaco_id,
+        models.Horario.dia_semana == models.DiaSemanaEnum(valor),
+        models.Horario.hora_inicio < hora_fim,
+        models.Horario.hora_fim > hora_inicio,
+    )
+    if horario_id:
+        query = query.filter(models.Horario.id != horario_id)
+    return query.first() is not None
+
+def verificar_aula_no_espaco(db: Session, espaco_id: int, data_reserva: date,
+                             hora_inicio: time, hora_fim: time):
+    """Verifica se há aula no espaço na data (grade efetiva: exceções já aplicadas)"""
+    return any(
+        item["espaco_id"] == espaco_id
+        and item["status"] != "cancelada"
+        and item["hora_inicio"] < hora_fim
+        and item["hora_fim"] > hora_inicio
+        for item in grade_efetiva.semana_efetiva(db, data_reserva)[data_reserva]
+    )
+
 # ================================
 # FUNÇÕES DE DELETE ADICIONAIS
 # ================================
@@ -1,5 +1,5 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean, Enum, Time, Date, UniqueConstraint
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, BigInteger, Integer, Float, String, DateTime, ForeignKey, Text, Boolean, Enum, Time, Date, JSON, LargeBinary, UniqueConstraint, Index
+from sqlalchemy.orm import deferred, relationship
 from sqlalchemy.sql import func
 import enum
 from database.database import Base
@@ -31,6 +31,13 @@ class StatusReservaEnum(enum.Enum):
     REJEITADA = "rejeitada"
     CANCELADA = "cancelada"
 
+class StatusTarefaEnum(enum.Enum):
+    PENDENTE = "pendente"
+    EXECUTANDO = "executando"
+    CONCLUIDA = "concluida"
+    FALHOU = "falhou"
+    CANCELADA = "cancelada"
+
 class TipoPeriodoEnum(enum.Enum):
     AULA = "AULA"
     INTERVALO = "INTERVALO"
@@ -122,6 +129,7 @@ class Turma(Base):
     ano = Column(String(10), nullable=False)   # 1°, 2°, 3°
     turno_id = Column(Integer, ForeignKey("turnos.id"), nullable=False)
     curso = Column(String(100))  # Ex: Ensino Médio, Técnico em Informática
+    quantidade_alunos = Column(Integer)  # usada na alocação de salas (capacidade)
     ativa = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -154,6 +162,8 @@ class TurmaDisciplina(Base):
     id = Column(Integer, primary_key=True, index=True)
     turma_id = Column(Integer, ForeignKey("turmas.id"), nullable=False)
     disciplina_id = Column(Integer, ForeignKey("disciplinas.id"), nullable=False)
+    # Aulas semanais desta disciplina na turma; nulo usa Disciplina.carga_horaria_semanal
+    carga_horaria_semanal = Column(Integer, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     turma = relationship("Turma", back_populates="turma_disciplinas")
@@ -222,6 +232,49 @@ class ProfessorDisponibilidade(Base):
 
     professor = relationship("Professor")
 
+class ProfessorAusencia(Base):
+    """Ausência datada do professor (dia inteiro ou faixa), sobreposta à grade semanal."""
+    __tablename__ = "professor_ausencias"
+
+    id = Column(Integer, primary_key=True, index=True)
+    professor_id = Column(Integer, ForeignKey("professores.id"), nullable=False)
+    data = Column(Date, nullable=False, index=True)
+    # Sem faixa: o dia inteiro
+    hora_inicio = Column(Time)
+    hora_fim = Column(Time)
+    motivo = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_professor_ausencias_professor_data", "professor_id", "data"),
+    )
+
+    professor = relationship("Professor")
+
+class HorarioExcecao(Base):
+    """Alteração pontual de um horário da grade em uma data (cancelamento, substituto, sala ou hora)."""
+    __tablename__ = "horario_excecoes"
+
+    id = Column(Integer, primary_key=True, index=True)
+    horario_id = Column(Integer, ForeignKey("horarios.id", ondelete="CASCADE"), nullable=False)
+    data = Column(Date, nullable=False, index=True)
+    cancelado = Column(Boolean, default=False, nullable=False)
+    # Campos nulos mantêm o valor do horário
+    professor_id = Column(Integer, ForeignKey("professores.id"))
+    sala = Column(String(50))
+    hora_inicio = Column(Time)
+    hora_fim = Column(Time)
+    observacoes = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    __table_args__ = (
+        UniqueConstraint("horario_id", "data", name="uq_horario_excecao_data"),
+    )
+
+    horario = relationship("Horario", back_populates="excecoes")
+    professor = relationship("Professor")
+
 class Horario(Base):
     __tablename__ = "horarios"
 
@@ -243,16 +296,44 @@ class Horario(Base):
     )
     hora_inicio = Column(Time, nullable=False)
     hora_fim = Column(Time, nullable=False)
+    # dia * 32 + índice da aula quando o horário coincide com um período geral do turno (ver slots.py)
+    slot = Column(Integer, nullable=True)
     sala = Column(String(50))
+    # Espaço alocado (ver alocacao_salas.py); quando presente, `sala` é o rótulo dele
+    espaco_id = Column(Integer, ForeignKey("espacos_escola.id"), nullable=True)
     observacoes = Column(Text)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+    __table_args__ = (
+        Index(
+            "ux_horarios_professor_slot", "professor_id", "turno_id", "slot", unique=True,
+            postgresql_where=slot.isnot(None), sqlite_where=slot.isnot(None),
+        ),
+        Index(
+            "ux_horarios_turma_slot", "turma_id", "turno_id", "slot", unique=True,
+            postgresql_where=slot.isnot(None), sqlite_where=slot.isnot(None),
+        ),
+        # Filtros da listagem (crud_new.predicados_horarios)
+        Index("ix_horarios_turma_dia", "turma_id", "dia_semana", "hora_inicio"),
+        Index("ix_horarios_professor_dia", "professor_id", "dia_semana", "hora_inicio"),
+        Index("ix_horarios_turno_dia", "turno_id", "dia_semana", "hora_inicio"),
+        Index("ix_horarios_disciplina_dia", "disciplina_id", "dia_semana", "hora_inicio"),
+        Index("ix_horarios_sala_dia", "sala", "dia_semana", "hora_inicio"),
+        Index("ix_horarios_espaco_dia", "espaco_id", "dia_semana", "hora_inicio"),
+        Index("ix_horarios_dia_inicio", "dia_semana", "hora_inicio"),
+        # Versões e cenários reescrevem horários pelo id original: no SQLite,
+        # sem AUTOINCREMENT, o id de um horário apagado seria reaproveitado
+        {"sqlite_autoincrement": True},
+    )
+
     # Relacionamentos
     professor = relationship("Professor", back_populates="horarios")
     disciplina = relationship("Disciplina", back_populates="horarios")
     turma = relationship("Turma", back_populates="horarios")
     turno = relationship("Turno", back_populates="horarios")
+    espaco = relationship("EspacoEscola", back_populates="horarios")
+    excecoes = relationship("HorarioExcecao", back_populates="horario", cascade="all, delete-orphan")
 
 class EspacoEscola(Base):
     __tablename__ = "espacos_escola"
@@ -269,6 +350,7 @@ class EspacoEscola(Base):
 
     # Relacionamentos
     reservas = relationship("ReservaEspaco", back_populates="espaco")
+    horarios = relationship("Horario", back_populates="espaco")
 
 class ReservaEspaco(Base):
     __tablename__ = "reservas_espaco"
@@ -276,7 +358,7 @@ class ReservaEspaco(Base):
     id = Column(Integer, primary_key=True, index=True)
     espaco_id = Column(Integer, ForeignKey("espacos_escola.id"), nullable=False)
     solicitante_id = Column(Integer, ForeignKey("usuarios.id"), nullable=False)
-    data_reserva = Column(Date, nullable=False)
+    data_reserva = Column(Date, nullable=False, index=True)
     hora_inicio = Column(Time, nullable=False)
     hora_fim = Column(Time, nullable=False)
     finalidade = Column(String(200), nullable=False)
@@ -301,3 +383,135 @@ class ReservaEspaco(Base):
     espaco = relationship("EspacoEscola", back_populates="reservas")
     solicitante = relationship("Usuario", back_populates="reservas", foreign_keys=[solicitante_id])
     aprovador = relationship("Usuario", foreign_keys=[aprovado_por])
+
+    # No Postgres a tabela pode ser convertida em particionada por mês de
+    # data_reserva (ver manutencao_reservas.py); a PK física passa a ser
+    # (id, data_reserva), mas o ORM continua identificando as linhas por id.
+    __table_args__ = (
+        Index("ix_reservas_espaco_espaco_data", "espaco_id", "data_reserva"),
+        Index("ix_reservas_espaco_solicitante_data", "solicitante_id", "data_reserva"),
+    )
+
+class RegistroAlteracao(Base):
+    """Log de alterações usado pelo /sync; o id é o token de sincronização (ver sincronizacao.py)."""
+    __tablename__ = "registro_alteracoes"
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    tabela = Column(String(50), nullable=False)
+    registro_id = Column(Integer)  # nulo em operações em lote sem ids conhecidos
+    operacao = Column(String(12), nullable=False)  # insert, update, delete ou recarregar
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+class Tarefa(Base):
+    """Operação demorada executada em segundo plano pelos workers (ver tarefas.py)."""
+    __tablename__ = "tarefas"
+
+    id = Column(Integer, primary_key=True, index=True)
+    tipo = Column(String(60), nullable=False)
+    status = Column(
+        Enum(
+            StatusTarefaEnum,
+            values_callable=lambda enum_cls: [e.value for e in enum_cls],
+            validate_strings=True,
+            native_enum=False,
+            name="statustarefaenum",
+        ),
+        nullable=False,
+        default=StatusTarefaEnum.PENDENTE,
+    )
+    parametros = Column(JSON)
+    resultado = Column(JSON)
+    erro = Column(Text)
+    progresso = Column(Float, nullable=False, default=0.0)  # 0 a 1
+    mensagem = Column(String(200))
+    tentativas = Column(Integer, nullable=False, default=0)
+    max_tentativas = Column(Integer, nullable=False, default=3)
+    # Não é reservada antes disso (espera entre tentativas)
+    executar_apos = Column(DateTime(timezone=True), nullable=False)
+    cancelamento_solicitado = Column(Boolean, nullable=False, default=False)
+    # host:pid/thread do worker que a executa e último sinal de vida dele
+    trabalhador = Column(String(100))
+    atualizado_em = Column(DateTime(timezone=True))
+    arquivo_nome = Column(String(255))  # arquivo gerado (exportações), em tarefa_arquivos
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    iniciado_em = Column(DateTime(timezone=True))
+    concluido_em = Column(DateTime(timezone=True))
+
+    __table_args__ = (
+        Index("ix_tarefas_status_executar_apos", "status", "executar_apos"),
+    )
+
+class TarefaArquivo(Base):
+    """
+    Arquivo de entrada (planilha importada) ou de saída (exportação) de uma
+    tarefa. A entrada fica em `conteudo`; a saída é gravada em disco
+    (TAREFAS_DIR_ARQUIVOS) e aqui fica só o `caminho`.
+    """
+    __tablename__ = "tarefa_arquivos"
+
+    id = Column(Integer, primary_key=True, index=True)
+    tarefa_id = Column(Integer, ForeignKey("tarefas.id", ondelete="CASCADE"), nullable=False)
+    papel = Column(String(10), nullable=False)  # entrada ou saida
+    nome = Column(String(255))
+    media_type = Column(String(100))
+    conteudo = Column(LargeBinary)
+    caminho = Column(String(500))
+
+    __table_args__ = (
+        UniqueConstraint("tarefa_id", "papel", name="uq_tarefa_arquivo_papel"),
+    )
+
+class VersaoGrade(Base):
+    """Foto nomeada dos horários de um turno (ou de todos), codificada por colunas (ver versoes_grade.py)."""
+    __tablename__ = "versoes_grade"
+
+    id = Column(Integer, primary_key=True, index=True)
+    nome = Column(String(100), nullable=False, unique=True)
+    descricao = Column(Text)
+    turno_id = Column(Integer, ForeignKey("turnos.id", ondelete="CASCADE"), nullable=True)  # nulo: todos os turnos
+    quantidade = Column(Integer, nullable=False)
+    formato = Column(Integer, nullable=False, default=1)
+    tamanho_bytes = Column(Integer, nullable=False)
+    dados = deferred(Column(LargeBinary, nullable=False))
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class Cenario(Base):
+    """Simulação sobre a grade atual: guarda só as alterações (ver cenarios.py)."""
+    __tablename__ = "cenarios"
+
+    id = Column(Integer, primary_key=True, index=True)
+    nome = Column(String(100), nullable=False, unique=True)
+    descricao = Column(Text)
+    aplicado_em = Column(DateTime(timezone=True))
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+class CenarioAlteracao(Base):
+    """Horário inserido, alterado ou removido no cenário, com a linha completa resultante."""
+    __tablename__ = "cenario_alteracoes"
+
+    id = Column(Integer, primary_key=True, index=True)
+    cenario_id = Column(Integer, ForeignKey("cenarios.id", ondelete="CASCADE"), nullable=False)
+    # Horário da grade atual (sem FK: se ele sumir, a alteração fica desatualizada); nulo em inserções
+    horario_id = Column(Integer, nullable=True)
+    operacao = Column(String(10), nullable=False)  # inserir, atualizar ou remover
+    professor_id = Column(Integer)
+    disciplina_id = Column(Integer)
+    turma_id = Column(Integer)
+    turno_id = Column(Integer)
+    dia_semana = Column(String(10))
+    hora_inicio = Column(Time)
+    hora_fim = Column(Time)
+    sala = Column(String(50))
+    espaco_id = Column(Integer)
+    observacoes = Column(Text)
+    # Marca do horário quando o cenário o alterou pela primeira vez: updated_at
+    # (resolução de segundos no SQLite) e assinatura do conteúdo (cenarios.assinatura)
+    base_atualizado_em = Column(DateTime(timezone=True))
+    base_assinatura = Column(String(40))
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        UniqueConstraint("cenario_id", "horario_id", name="uq_cenario_alteracao_horario"),
+        Index("ix_cenario_alteracoes_cenario", "cenario_id"),
+    )
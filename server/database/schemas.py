@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from datetime import datetime, date, time
 from enum import Enum
 
@@ -31,6 +31,13 @@ class StatusReservaEnum(str, Enum):
     REJEITADA = "rejeitada"
     CANCELADA = "cancelada"
 
+class StatusTarefaEnum(str, Enum):
+    PENDENTE = "pendente"
+    EXECUTANDO = "executando"
+    CONCLUIDA = "concluida"
+    FALHOU = "falhou"
+    CANCELADA = "cancelada"
+
 class TipoPeriodoEnum(str, Enum):
     AULA = "AULA"
     INTERVALO = "INTERVALO"
@@ -212,6 +219,7 @@ class TurmaBase(BaseModel):
     ano: str
     turno_id: int
     curso: Optional[str] = None
+    quantidade_alunos: Optional[int] = None
     ativa: bool = True
 
 class TurmaCreate(TurmaBase):
@@ -222,6 +230,7 @@ class TurmaUpdate(BaseModel):
     ano: Optional[str] = None
     turno_id: Optional[int] = None
     curso: Optional[str] = None
+    quantidade_alunos: Optional[int] = None
     ativa: Optional[bool] = None
 
 class Turma(TurmaBase):
@@ -254,6 +263,7 @@ class ProfessorDisciplina(ProfessorDisciplinaBase):
 class TurmaDisciplinaBase(BaseModel):
     turma_id: int
     disciplina_id: int
+    carga_horaria_semanal: Optional[int] = None
 
 class TurmaDisciplinaCreate(TurmaDisciplinaBase):
     pass
@@ -286,6 +296,14 @@ class ProfessorBloqueioUpdate(BaseModel):
     categoria: Optional[str] = None
     motivo: Optional[str] = None
 
+class ProfessorBloqueioItem(BaseModel):
+    """Bloqueio sem professor_id, usado na substituição do conjunto de um professor."""
+    dia_semana: DiaSemanaEnum
+    hora_inicio: time
+    hora_fim: time
+    categoria: Optional[str] = None
+    motivo: Optional[str] = None
+
 class ProfessorBloqueio(ProfessorBloqueioBase):
     id: int
     created_at: datetime
@@ -296,6 +314,60 @@ class ProfessorBloqueio(ProfessorBloqueioBase):
     class Config:
         from_attributes = True
 
+# ProfessorAusencia schemas
+class ProfessorAusenciaBase(BaseModel):
+    professor_id: int
+    data: date
+    hora_inicio: Optional[time] = None
+    hora_fim: Optional[time] = None
+    motivo: Optional[str] = None
+
+class ProfessorAusenciaCreate(ProfessorAusenciaBase):
+    pass
+
+class ProfessorAusenciaUpdate(BaseModel):
+    data: Optional[date] = None
+    hora_inicio: Optional[time] = None
+    hora_fim: Optional[time] = None
+    motivo: Optional[str] = None
+
+class ProfessorAusencia(ProfessorAusenciaBase):
+    id: int
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+# HorarioExcecao schemas
+class HorarioExcecaoBase(BaseModel):
+    horario_id: int
+    data: date
+    cancelado: bool = False
+    professor_id: Optional[int] = None
+    sala: Optional[str] = None
+    hora_inicio: Optional[time] = None
+    hora_fim: Optional[time] = None
+    observacoes: Optional[str] = None
+
+class HorarioExcecaoCreate(HorarioExcecaoBase):
+    pass
+
+class HorarioExcecaoUpdate(BaseModel):
+    cancelado: Optional[bool] = None
+    professor_id: Optional[int] = None
+    sala: Optional[str] = None
+    hora_inicio: Optional[time] = None
+    hora_fim: Optional[time] = None
+    observacoes: Optional[str] = None
+
+class HorarioExcecao(HorarioExcecaoBase):
+    id: int
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
 # ProfessorDisponibilidade schemas
 class ProfessorDisponibilidadeBase(BaseModel):
     professor_id: int
@@ -315,6 +387,14 @@ class ProfessorDisponibilidadeUpdate(BaseModel):
     categoria: Optional[str] = None
     observacoes: Optional[str] = None
 
+class ProfessorDisponibilidadeItem(BaseModel):
+    """Disponibilidade sem professor_id, usada na substituição do conjunto de um professor."""
+    dia_semana: DiaSemanaEnum
+    hora_inicio: time
+    hora_fim: time
+    categoria: Optional[str] = None
+    observacoes: Optional[str] = None
+
 class ProfessorDisponibilidade(ProfessorDisponibilidadeBase):
     id: int
     created_at: datetime
@@ -332,6 +412,7 @@ class HorarioBase(BaseModel):
     hora_inicio: time
     hora_fim: time
     sala: Optional[str] = None
+    espaco_id: Optional[int] = None
     observacoes: Optional[str] = None
 
 class HorarioCreate(HorarioBase):
@@ -346,10 +427,12 @@ class HorarioUpdate(BaseModel):
     hora_inicio: Optional[time] = None
     hora_fim: Optional[time] = None
     sala: Optional[str] = None
+    espaco_id: Optional[int] = None
     observacoes: Optional[str] = None
 
 class Horario(HorarioBase):
     id: int
+    slot: Optional[int] = None
     created_at: datetime
     updated_at: Optional[datetime] = None
     professor: ProfessorSemHorarios
@@ -422,6 +505,300 @@ class ReservaEspaco(ReservaEspacoBase):
     class Config:
         from_attributes = True
 
+# Importação de planilhas
+class ImportacaoErro(BaseModel):
+    linha: Optional[int] = None  # Linha da planilha (1 = cabeçalho)
+    coluna: Optional[str] = None
+    erro: str
+
+class ImportacaoRelatorio(BaseModel):
+    dry_run: bool
+    linhas: int
+    erros: List[ImportacaoErro] = []
+    criados: Dict[str, List[str]] = {}
+    atualizados: Dict[str, List[str]] = {}
+    removidos: Dict[str, List[str]] = {}
+
+# Análises da grade
+class AnaliseProfessor(BaseModel):
+    professor_id: int
+    professor_nome: Optional[str] = None
+    aulas_por_dia: Dict[str, int] = {}
+    aulas_semana: int
+    horas_semana: float
+    carga_horaria_semanal: Optional[int] = None
+    percentual_carga: Optional[float] = None
+    janelas: int  # Períodos livres entre a primeira e a última aula do dia (por turno), somados na semana
+    aulas_fora_dos_periodos: int = 0  # Aulas que não começam em um período de aula do turno
+    dias_na_escola: int
+
+class AnaliseDistribuicao(BaseModel):
+    turma_id: int
+    disciplina_id: int
+    aulas_por_dia: Dict[str, int] = {}
+    aulas_semana: int
+    dias_distintos: int
+    max_aulas_no_dia: int
+    concentrada: bool
+
+# Cobertura do currículo
+class CoberturaDisciplina(BaseModel):
+    disciplina_id: int
+    disciplina_nome: str
+    esperadas: int
+    agendadas: int
+    faltando: int
+    excedentes: int
+
+class CoberturaTurma(BaseModel):
+    turma_id: int
+    turma_nome: str
+    turno_id: int
+    esperadas: int
+    agendadas: int
+    faltando: int
+    excedentes: int
+    completa: bool
+    disciplinas: List[CoberturaDisciplina] = []
+
+class AnaliseGrade(BaseModel):
+    turno_id: Optional[int] = None
+    total_horarios: int
+    professores: List[AnaliseProfessor] = []
+    distribuicao: List[AnaliseDistribuicao] = []
+    cobertura: List[CoberturaTurma] = []  # Mesma estrutura de /analises/cobertura
+    tempo_ms: float
+
+# Dashboard
+class DashboardContagens(BaseModel):
+    professores: int
+    disciplinas: int
+    turmas: int
+    turnos: int
+    espacos: int
+    usuarios: int
+    horarios: int
+    reservas_pendentes: int
+
+class DashboardResumo(BaseModel):
+    contagens: DashboardContagens
+
+# Sincronização incremental
+class SyncTabela(BaseModel):
+    upserts: List[Dict[str, Any]] = []
+    removidos: List[int] = []
+
+class SyncResposta(BaseModel):
+    token: int
+    tem_mais: bool
+    recarregar: List[str] = []
+    alteracoes: Dict[str, SyncTabela] = {}
+
+class StatusAulaEnum(str, Enum):
+    NORMAL = "normal"
+    ALTERADA = "alterada"
+    SUBSTITUIDA = "substituida"
+    SEM_PROFESSOR = "sem_professor"
+    CANCELADA = "cancelada"
+
+class HorarioEfetivo(BaseModel):
+    data: date
+    dia_semana: DiaSemanaEnum
+    horario_id: int
+    hora_inicio: time
+    hora_fim: time
+    professor_id: int
+    professor_original_id: int
+    disciplina_id: int
+    turma_id: int
+    turno_id: int
+    sala: Optional[str] = None
+    espaco_id: Optional[int] = None
+    status: StatusAulaEnum
+    excecao_id: Optional[int] = None
+    ausencia_id: Optional[int] = None
+    observacoes: Optional[str] = None
+
+class AlocacaoSalaAlteracao(BaseModel):
+    horario_id: int
+    espaco_anterior_id: Optional[int] = None
+    espaco_id: Optional[int] = None
+
+class AlocacaoSalas(BaseModel):
+    horarios: int
+    alocados: int
+    sem_sala: List[int] = []
+    espacos_disponiveis: int
+    janelas: int
+    aplicado: bool
+    tempo_ms: float
+    alteracoes: List[AlocacaoSalaAlteracao] = []
+
+class TrocaMovimento(BaseModel):
+    tipo: str  # simples ou kempe
+    para_destino: List[int]  # horários que vão da célula atual para a de destino
+    para_origem: List[int]   # horários que vão da célula de destino para a atual
+
+class CelulaMovimento(BaseModel):
+    dia_semana: DiaSemanaEnum
+    numero_aula: int
+    slot: int
+    hora_inicio: time
+    hora_fim: time
+    atual: bool
+    valido: bool
+    motivos: List[str] = []  # conflito_professor, conflito_turma, bloqueio_professor, professor_indisponivel
+    conflitos: List[int] = []
+    espaco_ocupado: bool = False
+    troca: Optional[TrocaMovimento] = None
+
+class MovimentosHorario(BaseModel):
+    horario_id: int
+    turno_id: int
+    slot: Optional[int] = None
+    celulas: List[CelulaMovimento] = []
+
+class AulaGerada(BaseModel):
+    turma_id: int
+    disciplina_id: int
+    professor_id: int
+    dia_semana: DiaSemanaEnum
+    numero_aula: int
+    hora_inicio: time
+    hora_fim: time
+
+class PontoGeracao(BaseModel):
+    segundos: float
+    penalidade: int
+
+class GrupoSemProfessor(BaseModel):
+    turma_id: int
+    disciplina_id: int
+    aulas: int
+
+class IndicadoresJanelas(BaseModel):
+    penalidade: int
+    janelas_professores: int
+    dias_professores: int  # soma, por professor, dos dias em que ele vem à escola
+    janelas_turmas: int
+    excesso_disciplina_dia: int
+
+class ProfessorJanelas(BaseModel):
+    professor_id: int
+    janelas_antes: int
+    janelas_depois: int
+    dias_antes: int
+    dias_depois: int
+
+class HorarioOtimizado(BaseModel):
+    horario_id: int
+    professor_id: int
+    turma_id: int
+    dia_semana_anterior: DiaSemanaEnum
+    hora_inicio_anterior: time
+    dia_semana: DiaSemanaEnum
+    hora_inicio: time
+    hora_fim: time
+    slot: int
+
+class ExcecaoDescartada(BaseModel):
+    id: int
+    horario_id: int
+    data: date  # o horário mudou de dia da semana ou deixou de existir
+
+class OtimizacaoJanelas(BaseModel):
+    turno_id: int
+    tempo_segundos: float
+    movimentos: int
+    movimentos_aceitos: int
+    movimentos_por_segundo: int
+    horarios_fixos: int  # fora da grade de períodos do turno: não se movem
+    antes: IndicadoresJanelas
+    depois: IndicadoresJanelas
+    professores: List[ProfessorJanelas] = []
+    alterados: List[HorarioOtimizado] = []
+    aplicado: bool
+    excecoes_descartadas: List[ExcecaoDescartada] = []
+
+class GeracaoGrade(BaseModel):
+    turno_id: int
+    penalidade: int
+    componentes: Dict[str, int]
+    workers: int
+    tempo_segundos: float
+    reinicios: int
+    movimentos: int
+    historico: List[PontoGeracao] = []
+    turmas: List[int] = []  # Turmas geradas (as que `aplicar` substitui)
+    sem_professor: List[GrupoSemProfessor] = []
+    aulas: List[AulaGerada] = []
+    aplicado: bool
+    motivo_nao_aplicado: Optional[str] = None
+    excecoes_preservadas: int = 0  # passadas aos horários novos de mesma turma, disciplina e dia
+    excecoes_descartadas: List[ExcecaoDescartada] = []
+
+class AgendaItem(BaseModel):
+    tipo: str  # aula, aula_substituida, vago, intervalo, reserva, bloqueio, ausencia
+    hora_inicio: time
+    hora_fim: time
+    conflito: bool = False
+    status: Optional[str] = None
+    descricao: Optional[str] = None
+    numero_aula: Optional[int] = None
+    horario_id: Optional[int] = None
+    professor_id: Optional[int] = None
+    professor_original_id: Optional[int] = None
+    disciplina_id: Optional[int] = None
+    turma_id: Optional[int] = None
+    sala: Optional[str] = None
+    excecao_id: Optional[int] = None
+    ausencia_id: Optional[int] = None
+    reserva_id: Optional[int] = None
+    espaco_id: Optional[int] = None
+    periodo_id: Optional[int] = None
+    bloqueio_id: Optional[int] = None
+
+class Agenda(BaseModel):
+    data: date
+    dia_semana: DiaSemanaEnum
+    entidade: str
+    entidade_id: int
+    itens: List[AgendaItem] = []
+
+class SubstitutoCandidato(BaseModel):
+    professor_id: int
+    nome: str
+    horas_semana: float
+    carga_horaria_semanal: Optional[int] = None
+    percentual_carga: Optional[float] = None
+    aulas_no_dia: int
+
+class SubstitutosHorario(BaseModel):
+    horario_id: int
+    professor_id: int
+    disciplina_id: int
+    turma_id: int
+    dia_semana: DiaSemanaEnum
+    hora_inicio: time
+    hora_fim: time
+    candidatos: List[SubstitutoCandidato] = []
+
+class MetricaPayloadRota(BaseModel):
+    rota: str
+    requisicoes: int
+    comprimidas: int
+    bytes_originais: int
+    bytes_enviados: int
+    maior_original: int
+    media_original: int
+    media_enviada: int
+    razao_compressao: float
+
+class MetricasPayload(BaseModel):
+    codificacoes: List[str]
+    tamanho_minimo: int
+    rotas: List[MetricaPayloadRota] = []
+
 # Update forward references
 Professor.model_rebuild()
 Horario.model_rebuild()
@@ -444,3 +821,116 @@ class Token(BaseModel):
 
 class TokenData(BaseModel):
     email: Optional[str] = None
+
+# Tarefas em segundo plano
+class Tarefa(BaseModel):
+    id: int
+    tipo: str
+    status: StatusTarefaEnum
+    parametros: Optional[Dict[str, Any]] = None
+    resultado: Optional[Any] = None
+    erro: Optional[str] = None
+    progresso: float
+    mensagem: Optional[str] = None
+    tentativas: int
+    max_tentativas: int
+    executar_apos: datetime
+    cancelamento_solicitado: bool
+    arquivo_nome: Optional[str] = None
+    created_at: datetime
+    iniciado_em: Optional[datetime] = None
+    concluido_em: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+# Versões da grade
+class VersaoGradeCreate(BaseModel):
+    nome: str
+    descricao: Optional[str] = None
+    turno_id: Optional[int] = None  # sem turno: a grade inteira
+
+class VersaoGrade(BaseModel):
+    id: int
+    nome: str
+    descricao: Optional[str] = None
+    turno_id: Optional[int] = None
+    quantidade: int
+    tamanho_bytes: int
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class HorarioVersao(BaseModel):
+    id: int
+    professor_id: int
+    disciplina_id: int
+    turma_id: int
+    turno_id: int
+    dia_semana: DiaSemanaEnum
+    hora_inicio: time
+    hora_fim: time
+    slot: Optional[int] = None
+    sala: Optional[str] = None
+    espaco_id: Optional[int] = None
+    observacoes: Optional[str] = None
+
+class AlteracaoVersao(BaseModel):
+    id: int
+    campos: Dict[str, List[Any]]  # campo: [valor na base, valor no alvo]
+
+class DiferencaGrade(BaseModel):
+    base_id: Optional[int] = None  # versão; nulo = grade atual
+    alvo_id: Optional[int] = None
+    adicionados: List[HorarioVersao] = []
+    removidos: List[HorarioVersao] = []
+    alterados: List[AlteracaoVersao] = []
+    inalterados: int
+
+class RestauracaoVersao(BaseModel):
+    versao_id: int
+    diferenca: DiferencaGrade  # da grade anterior para a restaurada
+    excecoes_preservadas: int
+    excecoes_descartadas: List[ExcecaoDescartada] = []
+
+# Cenários
+class CenarioCreate(BaseModel):
+    nome: str
+    descricao: Optional[str] = None
+
+class Cenario(BaseModel):
+    id: int
+    nome: str
+    descricao: Optional[str] = None
+    alteracoes: int = 0
+    aplicado_em: Optional[datetime] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class HorarioCenario(HorarioVersao):
+    origem: str = "atual"  # atual, alterado ou novo (id negativo até o cenário ser aplicado)
+
+class AlteracaoCenario(BaseModel):
+    horario_id: int  # id na grade atual ou, em inserções, o id negativo do cenário
+    operacao: str  # inserir, atualizar ou remover
+    desatualizada: bool = False  # o horário mudou (ou sumiu) na grade atual depois da alteração
+    horario: Optional[HorarioCenario] = None  # linha resultante; nula em remoções
+
+class ConflitoCenario(BaseModel):
+    horario_id: int
+    dia_semana: DiaSemanaEnum
+    hora_inicio: time
+    hora_fim: time
+    motivos: List[str]  # conflito_professor, conflito_turma, conflito_espaco, bloqueio_professor, professor_indisponivel
+    conflitos: List[int] = []  # horários em conflito (da grade atual ou do cenário)
+
+class AplicacaoCenario(BaseModel):
+    cenario_id: int
+    inseridos: int
+    atualizados: int
+    removidos: int
+    excecoes_preservadas: int
+    excecoes_descartadas: List[ExcecaoDescartada] = []  # horários que o cenário mudou de dia da semana
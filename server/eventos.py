@@ -0,0 +1,259 @@
+"""Feed de alterações de horários, reservas e períodos em tempo real.
+
+Alterações gravadas por qualquer sessão são coletadas nos eventos da Session
+(como em cache.py) e, no commit, publicadas como deltas pequenos:
+`{"tabela", "op", "id", "dados"}`. No Postgres a publicação é um
+`pg_notify` emitido dentro da própria transação (só é entregue se o commit
+acontecer) e cada processo mantém uma thread em `LISTEN` que repassa as
+notificações aos clientes conectados; assim todos os workers do uvicorn veem
+as escritas de todos. Em outros bancos (SQLite em desenvolvimento) a entrega é
+direta, dentro do processo.
+
+Operações em lote sem ids conhecidos (ex.: `query.delete()` com filtro) geram
+`op = "recarregar"` para a tabela, sinalizando que o cliente deve buscar de novo.
+"""
+import asyncio
+import enum
+import json
+import logging
+import select
+import threading
+from typing import List, Optional, Set
+
+from sqlalchemy import event, inspect, text
+from sqlalchemy.orm import Session
+
+from config import EVENTOS_CANAL
+
+logger = logging.getLogger(__name__)
+
+# Colunas enviadas em cada delta, por tabela acompanhada
+COLUNAS_EVENTOS = {
+    "horarios": (
+        "id", "professor_id", "disciplina_id", "turma_id", "turno_id",
+        "dia_semana", "hora_inicio", "hora_fim", "slot", "sala",
+    ),
+    "reservas_espaco": (
+        "id", "espaco_id", "solicitante_id", "data_reserva",
+        "hora_inicio", "hora_fim", "status",
+    ),
+    "periodos_aula": (
+        "id", "turno_id", "turma_id", "numero_aula", "hora_inicio", "hora_fim", "tipo", "ativo",
+    ),
+}
+
+# Limite do payload do NOTIFY é 8000 bytes; deixa margem
+MAX_PAYLOAD_NOTIFY = 7000
+TAMANHO_FILA_CLIENTE = 1000
+
+_CHAVE_SESSAO = "eventos_pendentes"
+
+
+def _valor(v):
+    if isinstance(v, enum.Enum):
+        return v.value
+    return v
+
+
+def _dados(obj, tabela: str) -> dict:
+    return {c: _valor(getattr(obj, c)) for c in COLUNAS_EVENTOS[tabela]}
+
+
+def _serializar(eventos: List[dict]) -> str:
+    return json.dumps(eventos, default=str, ensure_ascii=False, separators=(",", ":"))
+
+
+def _pendentes(session: Session) -> list:
+    return session.info.setdefault(_CHAVE_SESSAO, [])
+
+
+@event.listens_for(Session, "after_flush")
+def _coletar_flush(session, flush_context):
+    pendentes = None
+    for op, objetos in (("insert", session.new), ("update", session.dirty), ("delete", session.deleted)):
+        for obj in objetos:
+            tabela = inspect(obj).mapper.local_table.name
+            if tabela not in COLUNAS_EVENTOS:
+                continue
+            if op == "update" and not session.is_modified(obj, include_collections=False):
+                continue
+            if pendentes is None:
+                pendentes = _pendentes(session)
+            dados = {"id": obj.id} if op == "delete" else _dados(obj, tabela)
+            pendentes.append({"tabela": tabela, "op": op, "id": obj.id, "dados": dados})
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _coletar_em_lote(orm_execute_state):
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    tabela = orm_execute_state.statement.table.name
+    if tabela not in COLUNAS_EVENTOS:
+        return
+    pendentes = _pendentes(orm_execute_state.session)
+    parametros = orm_execute_state.parameters
+    # update(Model) com lista de dicts por chave primária: ids conhecidos
+    if orm_execute_state.is_update and isinstance(parametros, list) and all("id" in p for p in parametros):
+        for p in parametros:
+            pendentes.append({"tabela": tabela, "op": "update", "id": p["id"], "dados": {k: _valor(v) for k, v in p.items()}})
+    else:
+        pendentes.append({"tabela": tabela, "op": "recarregar", "id": None, "dados": None})
+
+
+def _usa_notify(session: Session) -> bool:
+    return session.get_bind().dialect.name == "postgresql"
+
+
+@event.listens_for(Session, "before_commit")
+def _notificar(session):
+    # O commit faz o flush final depois deste evento; antecipá-lo garante que
+    # tudo já passou por after_flush antes de montar as notificações.
+    session.flush()
+    pendentes = session.info.get(_CHAVE_SESSAO)
+    if not pendentes or not _usa_notify(session):
+        return
+    for lote in _lotes(pendentes):
+        session.execute(text("SELECT pg_notify(:canal, :payload)"), {"canal": EVENTOS_CANAL, "payload": lote})
+    # Entregues via LISTEN (inclusive para este processo)
+    session.info.pop(_CHAVE_SESSAO, None)
+
+
+@event.listens_for(Session, "after_commit")
+def _publicar_local(session):
+    pendentes = session.info.pop(_CHAVE_SESSAO, None)
+    if pendentes:
+        difusor.publicar(pendentes)
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar(session):
+    session.info.pop(_CHAVE_SESSAO, None)
+
+
+def _lotes(eventos: List[dict]):
+    lote: List[dict] = []
+    tamanho = 2
+    for ev in eventos:
+        tam_ev = len(_serializar([ev]).encode("utf-8"))
+        if tam_ev > MAX_PAYLOAD_NOTIFY:
+            ev = {"tabela": ev["tabela"], "op": "recarregar", "id": None, "dados": None}
+            tam_ev = len(_serializar([ev]).encode("utf-8"))
+        if lote and tamanho + tam_ev > MAX_PAYLOAD_NOTIFY:
+            yield _serializar(lote)
+            lote, tamanho = [], 2
+        lote.append(ev)
+        tamanho += tam_ev
+    if lote:
+        yield _serializar(lote)
+
+
+class _Assinatura:
+    def __init__(self, loop: asyncio.AbstractEventLoop, tabelas: Optional[Set[str]]):
+        self.loop = loop
+        self.tabelas = tabelas
+        self.fila: asyncio.Queue = asyncio.Queue(maxsize=TAMANHO_FILA_CLIENTE)
+
+    def _entregar(self, evento: dict) -> None:
+        try:
+            self.fila.put_nowait(evento)
+        except asyncio.QueueFull:
+            # Cliente lento: descarta o acumulado e pede recarga completa
+            while not self.fila.empty():
+                self.fila.get_nowait()
+            self.fila.put_nowait({"tabela": evento["tabela"], "op": "recarregar", "id": None, "dados": None})
+
+
+class Difusor:
+    """Repassa eventos (de qualquer thread) às filas asyncio dos clientes conectados."""
+
+    def __init__(self):
+        self._assinaturas: Set[_Assinatura] = set()
+        self._lock = threading.Lock()
+
+    def assinar(self, loop: asyncio.AbstractEventLoop, tabelas: Optional[Set[str]] = None) -> _Assinatura:
+        assinatura = _Assinatura(loop, tabelas)
+        with self._lock:
+            self._assinaturas.add(assinatura)
+        return assinatura
+
+    def cancelar(self, assinatura: _Assinatura) -> None:
+        with self._lock:
+            self._assinaturas.discard(assinatura)
+
+    def publicar(self, eventos: List[dict]) -> None:
+        with self._lock:
+            assinaturas = list(self._assinaturas)
+        for assinatura in assinaturas:
+            for ev in eventos:
+                if assinatura.tabelas is None or ev["tabela"] in assinatura.tabelas:
+                    assinatura.loop.call_soon_threadsafe(assinatura._entregar, ev)
+
+    @property
+    def conectados(self) -> int:
+        with self._lock:
+            return len(self._assinaturas)
+
+
+difusor = Difusor()
+
+
+class _Ouvinte(threading.Thread):
+    """Thread com conexão dedicada em LISTEN no canal de eventos (somente Postgres)."""
+
+    def __init__(self, engine):
+        super().__init__(name="eventos-listen", daemon=True)
+        self.engine = engine
+        self._parar = threading.Event()
+
+    def parar(self) -> None:
+        self._parar.set()
+
+    def run(self) -> None:
+        espera = 1.0
+        while not self._parar.is_set():
+            try:
+                self._escutar()
+                espera = 1.0
+            except Exception:
+                logger.exception("Conexão de LISTEN perdida; reconectando em %.0fs", espera)
+                self._parar.wait(espera)
+                espera = min(espera * 2, 30.0)
+
+    def _escutar(self) -> None:
+        bruta = self.engine.raw_connection()
+        try:
+            conn = bruta.dbapi_connection
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute(f'LISTEN "{EVENTOS_CANAL}"')
+            while not self._parar.is_set():
+                if select.select([conn], [], [], 5.0) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    notificacao = conn.notifies.pop(0)
+                    try:
+                        difusor.publicar(json.loads(notificacao.payload))
+                    except ValueError:
+                        logger.warning("Notificação de evento inválida: %r", notificacao.payload[:200])
+        finally:
+            bruta.invalidate()
+
+
+_ouvinte: Optional[_Ouvinte] = None
+
+
+def iniciar(engine) -> None:
+    """Inicia a thread de LISTEN deste processo (no Postgres)."""
+    global _ouvinte
+    if engine.dialect.name != "postgresql" or _ouvinte is not None:
+        return
+    _ouvinte = _Ouvinte(engine)
+    _ouvinte.start()
+
+
+def parar() -> None:
+    global _ouvinte
+    if _ouvinte is not None:
+        _ouvinte.parar()
+        _ouvinte = None
@@ -0,0 +1,729 @@
+"""Geração da grade de um turno por busca local com reinícios em paralelo.
+
+O problema sai dos dados do domínio: as turmas ativas do turno que têm
+currículo, as aulas semanais de cada `TurmaDisciplina` (ou
+`Disciplina.carga_horaria_semanal`), os professores aptos de cada disciplina
+(`ProfessorDisciplina`), as aulas da grade geral do turno (`PeriodoAula`, ver
+slots.py) de segunda a sexta e, por professor, as células indisponíveis:
+bloqueios, disponibilidade declarada (mesma regra das rotas) e aulas já
+marcadas fora dessas turmas (outros turnos, turmas inativas ou sem
+currículo). Ao aplicar, só os horários dessas turmas são substituídos.
+
+Cada turma/disciplina (grupo) tem um único professor. Uma solução nunca tem
+conflito de professor ou turma nem aula em célula indisponível; a
+penalidade soma aulas não alocadas (peso alto), janelas das turmas, janelas
+dos professores e aulas da mesma disciplina além de
+`MAX_AULAS_DISCIPLINA_DIA` no dia. A ocupação é guardada em máscaras de
+bits por (turma, dia) e (professor, dia), e cada movimento atualiza a
+penalidade só pelos dias afetados.
+
+Um reinício constrói uma solução gulosa aleatória (ou destrói parte da
+melhor solução conhecida e a reconstrói) e aplica busca local (mover,
+trocar aulas da turma, trocar o professor do grupo, inserir aulas
+pendentes com ejeção) até estagnar. Em `gerar`, `workers` processos de um
+`ProcessPoolExecutor` fazem reinícios independentes até o prazo,
+compartilhando a melhor solução e sua penalidade por um `Manager`; o
+processo principal só acompanha, repassando o andamento a `progresso` e,
+se ele levantar (tarefa cancelada), sinalizando a parada por um `Event`.
+`benchmark_gerador.py` compara a qualidade por tempo com 1, 2, 4 e 8
+workers.
+"""
+import multiprocessing
+import os
+import random
+import threading
+import time as relogio
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
+from contextlib import nullcontext
+from multiprocessing import Manager
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, insert, or_, select
+from sqlalchemy.orm import Session
+
+from config import GERADOR_WORKERS
+import crud_new as crud
+from database import models
+from slots import DIAS, ORDEM_DIA, SLOTS_POR_DIA, grade_turno
+from substitutos import DIA_INTEIRO, MINUTOS_DIA, faixa
+
+DIAS_LETIVOS = DIAS[:5]
+
+PESO_NAO_ALOCADA = 1000
+PESO_JANELA_TURMA = 10
+PESO_JANELA_PROFESSOR = 3
+PESO_EXCESSO_DIA = 20
+MAX_AULAS_DISCIPLINA_DIA = 2
+
+LIMITE_ESTAGNACAO = 20000   # movimentos sem melhora que encerram um reinício
+PROB_PARTIR_DO_MELHOR = 0.5
+FRACAO_RUINA = 0.2          # parte das aulas retirada da melhor solução ao reiniciar dela
+INTERVALO_PUBLICACAO = 0.25  # segundos entre publicações da melhor solução durante a busca
+INTERVALO_ACOMPANHAMENTO = 0.5  # segundos entre avisos de progresso do processo principal
+
+
+class Problema:
+    """Dados do turno em listas simples (enviados aos processos por pickle)."""
+
+    def __init__(self, turno_id: int, dias: List[str], periodos: List[tuple], turmas: List[int],
+                 grupos: List[tuple], professores: List[int], bloqueado: List[int]):
+        self.turno_id = turno_id
+        self.dias = dias
+        self.periodos = periodos        # (índice da aula no turno, hora_inicio, hora_fim)
+        self.turmas = turmas            # turma_id
+        self.grupos = grupos            # (índice da turma, disciplina_id, aulas, [índices de professor])
+        self.professores = professores  # professor_id
+        self.bloqueado = bloqueado      # por professor: bit d * len(periodos) + i = célula indisponível
+        self.aulas = [g for g, grupo in enumerate(grupos) for _ in range(grupo[2])]
+
+    @property
+    def celulas(self) -> int:
+        return len(self.dias) * len(self.periodos)
+
+
+def _janelas(mascara: int) -> int:
+    """Células vazias entre a primeira e a última ocupada."""
+    if not mascara:
+        return 0
+    return mascara.bit_length() - (mascara & -mascara).bit_length() + 1 - mascara.bit_count()
+
+
+def _excesso(qtd: int) -> int:
+    return qtd - MAX_AULAS_DISCIPLINA_DIA if qtd > MAX_AULAS_DISCIPLINA_DIA else 0
+
+
+class Estado:
+    """Solução em construção: célula de cada aula e professor de cada grupo."""
+
+    def __init__(self, problema: Problema):
+        self.p = problema
+        self.np = len(problema.periodos)
+        nd = len(problema.dias)
+        self.turma_grupo = [g[0] for g in problema.grupos]
+        self.celula = [-1] * len(problema.aulas)
+        self.professor = [-1] * len(problema.grupos)
+        self.turma = [[0] * nd for _ in problema.turmas]
+        self.docente = [[0] * nd for _ in problema.professores]
+        self.qtd = [[0] * nd for _ in problema.grupos]
+        self.aulas_grupo: List[List[int]] = [[] for _ in problema.grupos]
+        for a, g in enumerate(problema.aulas):
+            self.aulas_grupo[g].append(a)
+        self.carga = [0] * len(problema.professores)
+        self.penalidade = PESO_NAO_ALOCADA * len(problema.aulas)
+
+    # -- operações elementares (mantêm a penalidade) ----------------------
+
+    def pode(self, a: int, c: int) -> bool:
+        g = self.p.aulas[a]
+        prof = self.professor[g]
+        if prof < 0 or self.p.bloqueado[prof] >> c & 1:
+            return False
+        d, i = divmod(c, self.np)
+        b = 1 << i
+        return not (self.turma[self.turma_grupo[g]][d] & b or self.docente[prof][d] & b)
+
+    def colocar(self, a: int, c: int) -> None:
+        g = self.p.aulas[a]
+        t, prof = self.turma_grupo[g], self.professor[g]
+        d, i = divmod(c, self.np)
+        b = 1 << i
+        mt, mp, q = self.turma[t][d], self.docente[prof][d], self.qtd[g][d]
+        self.penalidade += (
+            PESO_JANELA_TURMA * (_janelas(mt | b) - _janelas(mt))
+            + PESO_JANELA_PROFESSOR * (_janelas(mp | b) - _janelas(mp))
+            + PESO_EXCESSO_DIA * (_excesso(q + 1) - _excesso(q))
+            - PESO_NAO_ALOCADA
+        )
+        self.turma[t][d] = mt | b
+        self.docente[prof][d] = mp | b
+        self.qtd[g][d] = q + 1
+        self.celula[a] = c
+
+    def retirar(self, a: int) -> int:
+        c = self.celula[a]
+        g = self.p.aulas[a]
+        t, prof = self.turma_grupo[g], self.professor[g]
+        d, i = divmod(c, self.np)
+        b = 1 << i
+        mt, mp, q = self.turma[t][d], self.docente[prof][d], self.qtd[g][d]
+        self.penalidade += (
+            PESO_JANELA_TURMA * (_janelas(mt & ~b) - _janelas(mt))
+            + PESO_JANELA_PROFESSOR * (_janelas(mp & ~b) - _janelas(mp))
+            + PESO_EXCESSO_DIA * (_excesso(q - 1) - _excesso(q))
+            + PESO_NAO_ALOCADA
+        )
+        self.turma[t][d] = mt & ~b
+        self.docente[prof][d] = mp & ~b
+        self.qtd[g][d] = q - 1
+        self.celula[a] = -1
+        return c
+
+    def definir_professor(self, g: int, prof: int) -> None:
+        """Troca o professor de um grupo sem aulas alocadas."""
+        if self.professor[g] >= 0:
+            self.carga[self.professor[g]] -= self.p.grupos[g][2]
+        self.professor[g] = prof
+        self.carga[prof] += self.p.grupos[g][2]
+
+    # -- construção --------------------------------------------------------
+
+    def _melhor_celula(self, a: int, rng: random.Random) -> int:
+        melhor, melhor_delta = -1, None
+        celulas = list(range(self.p.celulas))
+        rng.shuffle(celulas)
+        for c in celulas:
+            if not self.pode(a, c):
+                continue
+            antes = self.penalidade
+            self.colocar(a, c)
+            delta = self.penalidade - antes
+            self.retirar(a)
+            if melhor_delta is None or delta < melhor_delta:
+                melhor, melhor_delta = c, delta
+        return melhor
+
+    def construir(self, rng: random.Random, base: Optional[dict] = None) -> None:
+        grupos = list(range(len(self.p.grupos)))
+        if base is not None:
+            for g, prof in enumerate(base["professores"]):
+                if prof >= 0:
+                    self.definir_professor(g, prof)
+            aulas = list(range(len(self.p.aulas)))
+            manter = set(rng.sample(aulas, int(len(aulas) * (1 - FRACAO_RUINA))))
+            for a in aulas:
+                c = base["celulas"][a]
+                if a in manter and c >= 0 and self.pode(a, c):
+                    self.colocar(a, c)
+        else:
+            rng.shuffle(grupos)
+            grupos.sort(key=lambda g: len(self.p.grupos[g][3]))
+            for g in grupos:
+                candidatos = self.p.grupos[g][3]
+                if candidatos:
+                    self.definir_professor(g, min(candidatos, key=lambda p: (self.carga[p], rng.random())))
+
+        # Aulas mais restritas primeiro: grupos com menos professores aptos e mais aulas
+        pendentes = [a for a in range(len(self.p.aulas)) if self.celula[a] < 0 and self.professor[self.p.aulas[a]] >= 0]
+        rng.shuffle(pendentes)
+        pendentes.sort(key=lambda a: (len(self.p.grupos[self.p.aulas[a]][3]), -self.p.grupos[self.p.aulas[a]][2]))
+        for a in pendentes:
+            c = self._melhor_celula(a, rng)
+            if c >= 0:
+                self.colocar(a, c)
+
+    # -- busca local -------------------------------------------------------
+
+    def _mover(self, rng: random.Random) -> bool:
+        a = rng.randrange(len(self.celula))
+        origem = self.celula[a]
+        if origem < 0:
+            return False
+        destino = rng.randrange(self.p.celulas)
+        antes = self.penalidade
+        self.retirar(a)
+        if destino != origem and self.pode(a, destino):
+            self.colocar(a, destino)
+            if self.penalidade <= antes:
+                return True
+            self.retirar(a)
+        self.colocar(a, origem)
+        return False
+
+    def _trocar(self, rng: random.Random) -> bool:
+        """Troca as células de duas aulas da mesma turma."""
+        a = rng.randrange(len(self.celula))
+        if self.celula[a] < 0:
+            return False
+        t = self.turma_grupo[self.p.aulas[a]]
+        b = rng.randrange(len(self.celula))
+        if b == a or self.celula[b] < 0 or self.turma_grupo[self.p.aulas[b]] != t:
+            return False
+        if self.p.aulas[a] == self.p.aulas[b]:
+            return False
+        antes = self.penalidade
+        ca, cb = self.retirar(a), self.retirar(b)
+        if self.pode(a, cb):
+            self.colocar(a, cb)
+            if self.pode(b, ca):
+                self.colocar(b, ca)
+                if self.penalidade <= antes:
+                    return True
+                self.retirar(b)
+            self.retirar(a)
+        self.colocar(a, ca)
+        self.colocar(b, cb)
+        return False
+
+    def _trocar_professor(self, rng: random.Random) -> bool:
+        g = rng.randrange(len(self.professor))
+        candidatos = self.p.grupos[g][3]
+        if len(candidatos) < 2:
+            return False
+        novo, atual = rng.choice(candidatos), self.professor[g]
+        if novo == atual:
+            return False
+        antes = self.penalidade
+        aulas = [(a, self.retirar(a)) for a in self.aulas_grupo[g] if self.celula[a] >= 0]
+        self.definir_professor(g, novo)
+        colocadas = []
+        for a, c in aulas:
+            if not self.pode(a, c):
+                break
+            self.colocar(a, c)
+            colocadas.append(a)
+        else:
+            if self.penalidade <= antes:
+                return True
+        for a in colocadas:
+            self.retirar(a)
+        self.definir_professor(g, atual)
+        for a, c in aulas:
+            self.colocar(a, c)
+        return False
+
+    def _inserir(self, rng: random.Random, pendentes: List[int]) -> bool:
+        """Aloca uma aula pendente, ejetando se preciso a aula que ocupa a célula."""
+        a = rng.choice(pendentes)
+        g = self.p.aulas[a]
+        prof = self.professor[g]
+        if prof < 0:
+            return False
+        c = self._melhor_celula(a, rng)
+        if c >= 0:
+            self.colocar(a, c)
+            return True
+        # Ejeção: célula disponível ao professor, ocupada pela turma ou por ele
+        c = rng.randrange(self.p.celulas)
+        if self.p.bloqueado[prof] >> c & 1:
+            return False
+        ocupantes = [
+            b for b in range(len(self.celula))
+            if self.celula[b] == c and (
+                self.turma_grupo[self.p.aulas[b]] == self.turma_grupo[g]
+                or self.professor[self.p.aulas[b]] == prof
+            )
+        ]
+        antes = self.penalidade
+        for b in ocupantes:
+            self.retirar(b)
+        if not self.pode(a, c):
+            for b in ocupantes:
+                self.colocar(b, c)
+            return False
+        self.colocar(a, c)
+        realocadas = []
+        for b in ocupantes:
+            nova = self._melhor_celula(b, rng)
+            if nova >= 0:
+                self.colocar(b, nova)
+                realocadas.append(b)
+        if self.penalidade < antes:
+            return True
+        for b in realocadas:
+            self.retirar(b)
+        self.retirar(a)
+        for b in ocupantes:
+            self.colocar(b, c)
+        return False
+
+    def busca_local(self, rng: random.Random, prazo: float, publicar: Optional[Callable[["Estado"], None]] = None,
+                    parada=None) -> int:
+        """
+        Melhora a solução até estagnar, até o prazo ou até `parada` (Event) ser
+        sinalizada; retorna os movimentos avaliados. `publicar` recebe o estado
+        a cada melhora (no máximo a cada `INTERVALO_PUBLICACAO` segundos).
+        """
+        if not self.celula:
+            return 0
+        movimentos = sem_melhora = 0
+        melhor = self.penalidade
+        ultima_publicacao = relogio.time()
+        while sem_melhora < LIMITE_ESTAGNACAO:
+            if movimentos % 256 == 0 and (relogio.time() >= prazo or parada is not None and parada.is_set()):
+                break
+            movimentos += 1
+            sorteio = rng.random()
+            pendentes = [a for a, c in enumerate(self.celula) if c < 0] if sorteio < 0.3 and self.penalidade >= PESO_NAO_ALOCADA else None
+            if pendentes:
+                self._inserir(rng, pendentes)
+            elif sorteio < 0.6:
+                self._mover(rng)
+            elif sorteio < 0.9:
+                self._trocar(rng)
+            else:
+                self._trocar_professor(rng)
+            if self.penalidade < melhor:
+                melhor = self.penalidade
+                sem_melhora = 0
+                if publicar is not None and relogio.time() - ultima_publicacao >= INTERVALO_PUBLICACAO:
+                    publicar(self)
+                    ultima_publicacao = relogio.time()
+            else:
+                sem_melhora += 1
+        return movimentos
+
+    # -- resultado ---------------------------------------------------------
+
+    def exportar(self) -> dict:
+        return {"celulas": list(self.celula), "professores": list(self.professor)}
+
+    def componentes(self) -> Dict[str, int]:
+        return {
+            "nao_alocadas": sum(1 for c in self.celula if c < 0),
+            "janelas_turma": sum(_janelas(m) for dias in self.turma for m in dias),
+            "janelas_professor": sum(_janelas(m) for dias in self.docente for m in dias),
+            "excesso_diario": sum(_excesso(q) for dias in self.qtd for q in dias),
+        }
+
+    def penalidade_total(self) -> int:
+        """Penalidade recalculada do zero (conferência da atualização incremental)."""
+        c = self.componentes()
+        return (
+            PESO_NAO_ALOCADA * c["nao_alocadas"] + PESO_JANELA_TURMA * c["janelas_turma"]
+            + PESO_JANELA_PROFESSOR * c["janelas_professor"] + PESO_EXCESSO_DIA * c["excesso_diario"]
+        )
+
+
+class _Compartilhado:
+    """Melhor solução conhecida quando há um único worker (sem Manager)."""
+
+    def __init__(self):
+        self.penalidade = None
+        self.solucao = None
+
+
+# Event de parada dos processos do pool, recebido na inicialização de cada um
+_parada_processo = None
+
+
+def _iniciar_processo(parada) -> None:
+    global _parada_processo
+    _parada_processo = parada
+
+
+def _trabalhador(problema: Problema, inicio: float, prazo: float, semente: int, compartilhado, trava,
+                 parada=None) -> dict:
+    parada = parada if parada is not None else _parada_processo
+    rng = random.Random(semente)
+    historico: List[Tuple[float, int]] = []
+    melhor = {"penalidade": None, "solucao": None}
+
+    def publicar(estado: Estado) -> None:
+        if melhor["penalidade"] is not None and estado.penalidade >= melhor["penalidade"]:
+            return
+        melhor["penalidade"], melhor["solucao"] = estado.penalidade, estado.exportar()
+        with trava:
+            if compartilhado.penalidade is None or estado.penalidade < compartilhado.penalidade:
+                compartilhado.penalidade = estado.penalidade
+                compartilhado.solucao = melhor["solucao"]
+                historico.append((round(relogio.time() - inicio, 3), estado.penalidade))
+
+    reinicios = movimentos = 0
+    while reinicios == 0 or relogio.time() < prazo and not parada.is_set():
+        base = None
+        if reinicios and rng.random() < PROB_PARTIR_DO_MELHOR:
+            base = compartilhado.solucao
+        estado = Estado(problema)
+        estado.construir(rng, base)
+        publicar(estado)
+        movimentos += estado.busca_local(rng, prazo, publicar, parada)
+        publicar(estado)
+        reinicios += 1
+    return {**melhor, "historico": historico, "reinicios": reinicios, "movimentos": movimentos}
+
+
+def _reconstruir(problema: Problema, solucao: dict) -> Estado:
+    estado = Estado(problema)
+    for g, prof in enumerate(solucao["professores"]):
+        if prof >= 0:
+            estado.definir_professor(g, prof)
+    for a, c in enumerate(solucao["celulas"]):
+        if c >= 0:
+            estado.colocar(a, c)
+    return estado
+
+
+def _acompanhar(futuros: list, compartilhado, parada, inicio: float, tempo_segundos: float,
+                progresso: Optional[Callable[[float, str], None]]) -> List[dict]:
+    """Espera os trabalhadores avisando o andamento; se `progresso` levantar, para a busca e repassa."""
+    pendentes = set(futuros)
+    while pendentes:
+        _, pendentes = wait(pendentes, timeout=INTERVALO_ACOMPANHAMENTO)
+        if progresso is None or not pendentes:
+            continue
+        penalidade = compartilhado.penalidade
+        try:
+            progresso(
+                min((relogio.time() - inicio) / tempo_segundos, 1.0),
+                None if penalidade is None else f"Melhor penalidade: {penalidade}",
+            )
+        except BaseException:
+            parada.set()
+            wait(pendentes)
+            raise
+    return [f.result() for f in futuros]
+
+
+def gerar(problema: Problema, tempo_segundos: float, workers: int = 1, semente: Optional[int] = None,
+          progresso: Optional[Callable[[float, str], None]] = None) -> dict:
+    """Melhor solução encontrada por `workers` processos até o prazo (ou até `progresso` levantar)."""
+    inicio = relogio.time()
+    prazo = inicio + tempo_segundos
+    semente = random.randrange(2 ** 31) if semente is None else semente
+    if workers <= 1:
+        # Uma thread faz a busca para o chamador poder acompanhar (e interromper)
+        parada, compartilhado = threading.Event(), _Compartilhado()
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            futuros = [executor.submit(
+                _trabalhador, problema, inicio, prazo, semente, compartilhado, nullcontext(), parada,
+            )]
+            resultados = _acompanhar(futuros, compartilhado, parada, inicio, tempo_segundos, progresso)
+    else:
+        parada = multiprocessing.Event()
+        with Manager() as gerente:
+            compartilhado = gerente.Namespace(penalidade=None, solucao=None)
+            trava = gerente.Lock()
+            with ProcessPoolExecutor(
+                max_workers=workers, initializer=_iniciar_processo, initargs=(parada,),
+            ) as executor:
+                futuros = [
+                    executor.submit(_trabalhador, problema, inicio, prazo, semente + i, compartilhado, trava)
+                    for i in range(workers)
+                ]
+                resultados = _acompanhar(futuros, compartilhado, parada, inicio, tempo_segundos, progresso)
+
+    resultados = [r for r in resultados if r["solucao"] is not None]
+    melhor = min(resultados, key=lambda r: r["penalidade"])
+    estado = _reconstruir(problema, melhor["solucao"])
+    # Evolução da melhor penalidade global ao longo do tempo
+    historico, atual = [], None
+    for segundos, penalidade in sorted(p for r in resultados for p in r["historico"]):
+        if atual is None or penalidade < atual:
+            atual = penalidade
+            historico.append({"segundos": segundos, "penalidade": penalidade})
+    return {
+        "penalidade": estado.penalidade,
+        "componentes": estado.componentes(),
+        "estado": estado,
+        "workers": workers,
+        "tempo_segundos": round(relogio.time() - inicio, 3),
+        "reinicios": sum(r["reinicios"] for r in resultados),
+        "movimentos": sum(r["movimentos"] for r in resultados),
+        "historico": historico,
+    }
+
+
+def workers_padrao() -> int:
+    return GERADOR_WORKERS or os.cpu_count() or 1
+
+
+# -- integração com o banco ----------------------------------------------------
+
+def montar_problema(db: Session, turno_id: int) -> Problema:
+    grade = sorted(grade_turno(db, turno_id).items(), key=lambda item: item[1])
+    periodos = [(indice, inicio, fim) for (inicio, fim), indice in grade]
+    dias = DIAS_LETIVOS
+
+    ativas = [
+        t for (t,) in db.query(models.Turma.id).filter(
+            models.Turma.turno_id == turno_id, models.Turma.ativa == True,
+        ).order_by(models.Turma.id)
+    ]
+
+    aptos: Dict[int, List[int]] = {}
+    for pid, disciplina_id in db.query(models.ProfessorDisciplina.professor_id, models.ProfessorDisciplina.disciplina_id).join(
+        models.Professor, models.Professor.id == models.ProfessorDisciplina.professor_id,
+    ).join(models.Usuario, models.Usuario.id == models.Professor.usuario_id).filter(
+        models.Usuario.ativo == True,
+    ).distinct().order_by(models.ProfessorDisciplina.professor_id):
+        aptos.setdefault(disciplina_id, []).append(pid)
+
+    TD = models.TurmaDisciplina
+    linhas = db.query(
+        TD.turma_id, TD.disciplina_id,
+        func.coalesce(TD.carga_horaria_semanal, models.Disciplina.carga_horaria_semanal),
+    ).join(models.Disciplina, models.Disciplina.id == TD.disciplina_id).filter(
+        TD.turma_id.in_(ativas),
+    ).order_by(TD.turma_id, TD.disciplina_id).all()
+
+    # Só entram (e só serão substituídas) as turmas com aulas a distribuir
+    turmas = sorted({t for t, _, aulas in linhas if aulas})
+    indice_turma = {t: i for i, t in enumerate(turmas)}
+    professores = sorted({pid for _, d, _ in linhas for pid in aptos.get(d, ())})
+    indice_professor = {p: i for i, p in enumerate(professores)}
+    grupos = [
+        (indice_turma[t], d, aulas, [indice_professor[p] for p in aptos.get(d, ())])
+        for t, d, aulas in linhas if aulas
+    ]
+
+    bloqueado = celulas_bloqueadas(db, turno_id, professores, dias, periodos, turmas=turmas)
+    return Problema(turno_id, dias, periodos, turmas, grupos, professores, bloqueado)
+
+
+def celulas_bloqueadas(db: Session, turno_id: int, professores: List[int], dias: List[str],
+                       periodos: List[tuple], turmas: Optional[List[int]] = None) -> List[int]:
+    """
+    Por professor, máscara das células (bit d * len(periodos) + i) em que ele
+    não pode dar aula no turno: aulas em outros turnos, bloqueios e
+    disponibilidade declarada. Com `turmas`, as aulas do turno que não são
+    dessas turmas também bloqueiam.
+    """
+    # Células indisponíveis por professor, em minutos da semana (ver substitutos.py)
+    ocupado = {p: 0 for p in professores}
+    H = models.Horario
+    fora = H.turno_id != turno_id
+    if turmas is not None:
+        fora = or_(fora, H.turno_id == None, H.turma_id.notin_(turmas))
+    for pid, dia, inicio, fim in db.query(H.professor_id, H.dia_semana, H.hora_inicio, H.hora_fim).filter(
+        fora, H.professor_id.in_(professores),
+    ):
+        ocupado[pid] |= faixa(dia, inicio, fim)
+    B = models.ProfessorBloqueio
+    for pid, dia, inicio, fim in db.query(B.professor_id, B.dia_semana, B.hora_inicio, B.hora_fim).filter(
+        B.professor_id.in_(professores),
+    ):
+        ocupado[pid] |= faixa(dia, inicio, fim)
+    disponivel = {p: 0 for p in professores}
+    declarados = {p: 0 for p in professores}
+    D = models.ProfessorDisponibilidade
+    for pid, dia, inicio, fim in db.query(D.professor_id, D.dia_semana, D.hora_inicio, D.hora_fim).filter(
+        D.professor_id.in_(professores),
+    ):
+        disponivel[pid] |= faixa(dia, inicio, fim)
+        declarados[pid] |= DIA_INTEIRO << (ORDEM_DIA[dia.value] * MINUTOS_DIA)
+    semana = (1 << (MINUTOS_DIA * len(DIAS))) - 1
+
+    celulas = [faixa(dia, inicio, fim) for dia in dias for _, inicio, fim in periodos]
+    bloqueado = []
+    for p in professores:
+        livre = disponivel[p] | (semana & ~declarados[p])
+        mascara = 0
+        for c, minutos in enumerate(celulas):
+            if ocupado[p] & minutos or not livre & minutos:
+                mascara |= 1 << c
+        bloqueado.append(mascara)
+    return bloqueado
+
+
+def aulas_geradas(problema: Problema, estado: Estado) -> List[dict]:
+    aulas = []
+    for a, c in enumerate(estado.celula):
+        if c < 0:
+            continue
+        g = problema.aulas[a]
+        t, disciplina_id, _, _ = problema.grupos[g]
+        d, i = divmod(c, len(problema.periodos))
+        indice, inicio, fim = problema.periodos[i]
+        aulas.append({
+            "turma_id": problema.turmas[t],
+            "disciplina_id": disciplina_id,
+            "professor_id": problema.professores[estado.professor[g]],
+            "dia_semana": problema.dias[d],
+            "numero_aula": indice + 1,
+            "hora_inicio": inicio,
+            "hora_fim": fim,
+            "slot": ORDEM_DIA[problema.dias[d]] * SLOTS_POR_DIA + indice,
+        })
+    aulas.sort(key=lambda x: (x["turma_id"], ORDEM_DIA[x["dia_semana"]], x["numero_aula"]))
+    return aulas
+
+
+def sem_professor(problema: Problema) -> List[dict]:
+    return [
+        {"turma_id": problema.turmas[t], "disciplina_id": d, "aulas": n}
+        for t, d, n, candidatos in problema.grupos if not candidatos
+    ]
+
+
+def _chave_excecoes(h: models.Horario) -> Tuple[int, int, str]:
+    return h.turma_id, h.disciplina_id, getattr(h.dia_semana, "value", h.dia_semana)
+
+
+def aplicar(db: Session, problema: Problema, aulas: List[dict]) -> Tuple[int, List[dict]]:
+    """
+    Substitui os horários das turmas do problema pelos gerados, em uma
+    transação. As exceções datadas dos horários substituídos passam para o
+    horário novo de mesma turma, disciplina e dia da semana (o k-ésimo antigo
+    do dia, por hora de início, vai para o k-ésimo novo); as que ficam sem
+    correspondente são apagadas. Retorna quantas exceções foram mantidas e as
+    descartadas (id, horario_id, data).
+    """
+    H, E = models.Horario, models.HorarioExcecao
+    antigos = [
+        (h, _chave_excecoes(h))
+        for h in db.query(H).filter(
+            H.turno_id == problema.turno_id, H.turma_id.in_(problema.turmas),
+        ).order_by(H.hora_inicio, H.id)
+    ]
+    excecoes: Dict[int, List[dict]] = {}
+    if antigos:
+        for e in db.execute(select(E.__table__).where(E.horario_id.in_([h.id for h, _ in antigos]))):
+            excecoes.setdefault(e.horario_id, []).append(dict(e._mapping))
+    ids_antigos = [h.id for h, _ in antigos]
+    for h, _ in antigos:
+        db.delete(h)
+    # As remoções vão antes das inserções para não colidir nas restrições de sobreposição
+    db.flush()
+    novos = [
+        models.Horario(
+            professor_id=a["professor_id"], disciplina_id=a["disciplina_id"], turma_id=a["turma_id"],
+            turno_id=problema.turno_id, dia_semana=models.DiaSemanaEnum(a["dia_semana"]),
+            hora_inicio=a["hora_inicio"], hora_fim=a["hora_fim"], slot=a["slot"],
+        )
+        for a in aulas
+    ]
+    db.add_all(novos)
+    with crud._sem_sobreposicao(db):
+        db.flush()
+
+    destinos: Dict[Tuple[int, int, str], List[int]] = {}
+    for h in sorted(novos, key=lambda h: h.hora_inicio):
+        destinos.setdefault(_chave_excecoes(h), []).append(h.id)
+    usados: Dict[Tuple[int, int, str], int] = {}
+    preservadas, descartadas = [], []
+    for horario_id, (_, chave) in zip(ids_antigos, antigos):
+        k = usados.get(chave, 0)
+        usados[chave] = k + 1
+        candidatos = destinos.get(chave, [])
+        for e in excecoes.get(horario_id, []):
+            if k < len(candidatos):
+                preservadas.append({**e, "horario_id": candidatos[k]})
+            else:
+                descartadas.append({"id": e["id"], "horario_id": horario_id, "data": e["data"]})
+    if preservadas:
+        db.execute(insert(E), preservadas)
+    crud._commit_sem_sobreposicao(db)
+    return len(preservadas), descartadas
+
+
+def gerar_turno(db: Session, turno_id: int, tempo_segundos: float, workers: Optional[int] = None,
+                aplicar_resultado: bool = False, semente: Optional[int] = None,
+                aceitar_incompleta: bool = False, progresso: Optional[Callable[[float, str], None]] = None) -> dict:
+    """
+    Gera a grade do turno; com `aplicar_resultado`, grava-a, a menos que
+    sobrem aulas não alocadas e `aceitar_incompleta` seja falso (nesse caso
+    o relatório vem com `aplicado=False` e o motivo). `progresso` é
+    repassado a `gerar` (ver tarefas.Contexto.progresso).
+    """
+    problema = montar_problema(db, turno_id)
+    workers = workers or workers_padrao()
+    resultado = gerar(problema, tempo_segundos, workers=workers, semente=semente, progresso=progresso)
+    aulas = aulas_geradas(problema, resultado.pop("estado"))
+    motivo = None
+    preservadas, descartadas = 0, []
+    nao_alocadas = resultado["componentes"]["nao_alocadas"]
+    if aplicar_resultado and nao_alocadas and not aceitar_incompleta:
+        motivo = f"{nao_alocadas} aula(s) não alocada(s); use aceitar_incompleta=true para aplicar assim mesmo"
+    elif aplicar_resultado:
+        preservadas, descartadas = aplicar(db, problema, aulas)
+    return {
+        "turno_id": turno_id,
+        **resultado,
+        "turmas": problema.turmas,
+        "sem_professor": sem_professor(problema),
+        "aulas": aulas,
+        "aplicado": aplicar_resultado and motivo is None,
+        "motivo_nao_aplicado": motivo,
+        "excecoes_preservadas": preservadas,
+        "excecoes_descartadas": descartadas,
+    }
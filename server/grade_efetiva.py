@@ -0,0 +1,159 @@
+"""Grade efetiva por data: grade semanal + exceções e ausências datadas.
+
+A grade semanal (`Horario`) vale para toda semana; sobre ela se aplicam, data a
+data:
+
+- `HorarioExcecao` (uma por horário e data): cancela a aula ou troca
+  professor (substituto), sala ou faixa de horário;
+- `ProfessorAusencia`: aulas do professor efetivo que intersectam a ausência
+  (dia inteiro, sem faixa) ficam `sem_professor`.
+
+A semana é materializada sob demanda com três consultas por colunas (grade,
+exceções e ausências da semana) e uma passada em memória com buscas por
+dicionário; o resultado, por dia e em ordem de horário, fica em cache por
+semana até alguma das tabelas de origem mudar. Visões diárias e de intervalos
+apenas recortam as semanas já materializadas.
+"""
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from cache import CacheVersionado
+from database import models
+
+TABELAS_GRADE = ("horarios", "horario_excecoes", "professor_ausencias")
+DIAS = [d.value for d in models.DiaSemanaEnum]  # segunda..domingo, como date.weekday()
+
+_cache_semanas = CacheVersionado(max_itens=16)
+
+
+def inicio_semana(data: date) -> date:
+    return data - timedelta(days=data.weekday())
+
+
+def _intersecta(inicio, fim, ausencia) -> bool:
+    if ausencia.hora_inicio is None or ausencia.hora_fim is None:
+        return True
+    return ausencia.hora_inicio < fim and ausencia.hora_fim > inicio
+
+
+def _materializar_semana(db: Session, segunda: date) -> Dict[date, List[dict]]:
+    domingo = segunda + timedelta(days=6)
+    H = models.Horario
+    grade = db.query(
+        H.id, H.professor_id, H.disciplina_id, H.turma_id, H.turno_id,
+        H.dia_semana, H.hora_inicio, H.hora_fim, H.sala, H.espaco_id, H.observacoes,
+    ).all()
+
+    E = models.HorarioExcecao
+    excecoes = {
+        (e.horario_id, e.data): e
+        for e in db.query(
+            E.id, E.horario_id, E.data, E.cancelado, E.professor_id, E.sala,
+            E.hora_inicio, E.hora_fim, E.observacoes,
+        ).filter(E.data >= segunda, E.data <= domingo)
+    }
+
+    A = models.ProfessorAusencia
+    ausencias = defaultdict(list)
+    for a in db.query(A.id, A.professor_id, A.data, A.hora_inicio, A.hora_fim).filter(
+        A.data >= segunda, A.data <= domingo
+    ):
+        ausencias[(a.professor_id, a.data)].append(a)
+
+    dias = {dia: segunda + timedelta(days=i) for i, dia in enumerate(DIAS)}
+    semana: Dict[date, List[dict]] = {d: [] for d in dias.values()}
+    for h in grade:
+        data = dias[h.dia_semana.value]
+        item = {
+            "data": data,
+            "dia_semana": h.dia_semana.value,
+            "horario_id": h.id,
+            "hora_inicio": h.hora_inicio,
+            "hora_fim": h.hora_fim,
+            "professor_id": h.professor_id,
+            "professor_original_id": h.professor_id,
+            "disciplina_id": h.disciplina_id,
+            "turma_id": h.turma_id,
+            "turno_id": h.turno_id,
+            "sala": h.sala,
+            "espaco_id": h.espaco_id,
+            "status": "normal",
+            "excecao_id": None,
+            "ausencia_id": None,
+            "observacoes": h.observacoes,
+        }
+        excecao = excecoes.get((h.id, data))
+        if excecao is not None:
+            item["excecao_id"] = excecao.id
+            if excecao.cancelado:
+                item["status"] = "cancelada"
+            else:
+                item["status"] = "alterada"
+                if excecao.professor_id is not None and excecao.professor_id != h.professor_id:
+                    item["professor_id"] = excecao.professor_id
+                    item["status"] = "substituida"
+                for campo in ("sala", "hora_inicio", "hora_fim"):
+                    valor = getattr(excecao, campo)
+                    if valor is not None:
+                        item[campo] = valor
+                if excecao.sala is not None:
+                    # Sala trocada na data: o espaço alocado na grade não vale
+                    item["espaco_id"] = None
+            if excecao.observacoes:
+                item["observacoes"] = excecao.observacoes
+
+        if item["status"] != "cancelada":
+            for ausencia in ausencias.get((item["professor_id"], data), ()):
+                if _intersecta(item["hora_inicio"], item["hora_fim"], ausencia):
+                    item["status"] = "sem_professor"
+                    item["ausencia_id"] = ausencia.id
+                    break
+        semana[data].append(item)
+
+    for itens in semana.values():
+        itens.sort(key=lambda i: (i["hora_inicio"], i["turma_id"], i["horario_id"]))
+    return semana
+
+
+def semana_efetiva(db: Session, data: date) -> Dict[date, List[dict]]:
+    """Grade efetiva da semana que contém `data` (segunda a domingo), por dia."""
+    segunda = inicio_semana(data)
+    return _cache_semanas.obter(segunda, TABELAS_GRADE, lambda: _materializar_semana(db, segunda))
+
+
+def grade_efetiva(
+    db: Session,
+    data_inicio: date,
+    data_fim: date,
+    turma_id: Optional[int] = None,
+    professor_id: Optional[int] = None,
+    turno_id: Optional[int] = None,
+    incluir_canceladas: bool = True,
+) -> List[dict]:
+    """
+    Aulas efetivas entre as datas (inclusive), em ordem de data e hora. Com
+    `professor_id`, inclui as aulas em que ele é o professor efetivo ou o
+    original (substituído ou ausente).
+    """
+    resultado = []
+    segunda = inicio_semana(data_inicio)
+    while segunda <= data_fim:
+        semana = semana_efetiva(db, segunda)
+        for data in sorted(semana):
+            if data < data_inicio or data > data_fim:
+                continue
+            for item in semana[data]:
+                if turma_id is not None and item["turma_id"] != turma_id:
+                    continue
+                if turno_id is not None and item["turno_id"] != turno_id:
+                    continue
+                if professor_id is not None and professor_id not in (item["professor_id"], item["professor_original_id"]):
+                    continue
+                if not incluir_canceladas and item["status"] == "cancelada":
+                    continue
+                resultado.append(item)
+        segunda += timedelta(days=7)
+    return resultado
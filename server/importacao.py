@@ -0,0 +1,343 @@
+"""Importação em massa de currículo e vínculos professor-disciplina a partir de planilhas.
+
+As planilhas (CSV ou XLSX) são carregadas em DataFrames e validadas por inteiro
+com operações vetorizadas; a gravação usa inserts/updates em lote e um único
+commit. Com dry_run=True nada é gravado e o relatório descreve o que mudaria.
+
+Colunas do currículo: turma, ano, turno, disciplina, carga_horaria_semanal
+(opcionais: curso, codigo). Uma linha por disciplina de cada turma.
+
+Colunas de professor-disciplina: professor (username ou email), disciplina
+(opcional: carga_horaria).
+
+Em tarefas de segundo plano, `progresso(fracao, mensagem)` é chamado após a
+validação e antes da primeira gravação; é ali que um cancelamento é atendido
+(depois disso a importação vai até o commit).
+"""
+import io
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+from sqlalchemy import insert, update
+from sqlalchemy.orm import Session
+
+from database import models, schemas
+
+COLUNAS_CURRICULO = ["turma", "ano", "turno", "disciplina", "carga_horaria_semanal"]
+COLUNAS_PROFESSOR_DISCIPLINA = ["professor", "disciplina"]
+
+
+class PlanilhaInvalida(ValueError):
+    """Arquivo ilegível ou sem as colunas obrigatórias."""
+
+
+def ler_planilha(conteudo: bytes, nome_arquivo: str) -> pd.DataFrame:
+    nome = (nome_arquivo or "").lower()
+    try:
+        if nome.endswith(".xlsx") or nome.endswith(".xls"):
+            df = pd.read_excel(io.BytesIO(conteudo), dtype=str)
+        else:
+            # sep=None detecta "," ou ";" (planilhas exportadas pelo Excel em pt-BR)
+            df = pd.read_csv(io.BytesIO(conteudo), dtype=str, sep=None, engine="python", encoding="utf-8-sig")
+    except Exception as e:
+        raise PlanilhaInvalida(f"Não foi possível ler a planilha: {e}") from e
+    df.columns = [str(c).strip().lower() for c in df.columns]
+    for coluna in df.columns:
+        df[coluna] = df[coluna].str.strip()
+    return df.replace({"": None})
+
+
+def _exigir_colunas(df: pd.DataFrame, obrigatorias: List[str]) -> None:
+    faltando = [c for c in obrigatorias if c not in df.columns]
+    if faltando:
+        raise PlanilhaInvalida(f"Colunas obrigatórias ausentes: {', '.join(faltando)}")
+
+
+def _erros_de_mascara(mascara: pd.Series, mensagem: str, coluna: Optional[str] = None) -> List[schemas.ImportacaoErro]:
+    # Linha da planilha: índice 0 corresponde à linha 2 (a 1 é o cabeçalho)
+    return [
+        schemas.ImportacaoErro(linha=int(i) + 2, coluna=coluna, erro=mensagem)
+        for i in mascara[mascara].index
+    ]
+
+
+def _validar_obrigatorias(df: pd.DataFrame, colunas: List[str]) -> List[schemas.ImportacaoErro]:
+    erros = []
+    for coluna in colunas:
+        erros += _erros_de_mascara(df[coluna].isna(), "Valor obrigatório", coluna)
+    return erros
+
+
+def _validar_inteiro_positivo(df: pd.DataFrame, coluna: str) -> List[schemas.ImportacaoErro]:
+    numeros = pd.to_numeric(df[coluna], errors="coerce")
+    invalido = df[coluna].notna() & (numeros.isna() | (numeros <= 0) | (numeros % 1 != 0))
+    df[coluna] = numeros.where(~invalido).astype("Int64")
+    return _erros_de_mascara(invalido, "Deve ser um inteiro positivo", coluna)
+
+
+def _avisar(progresso: Optional[Callable[[float, str], None]], fracao: float, mensagem: str) -> None:
+    if progresso is not None:
+        progresso(fracao, mensagem)
+
+
+def _relatorio(dry_run: bool, df: pd.DataFrame, erros: List[schemas.ImportacaoErro]) -> schemas.ImportacaoRelatorio:
+    return schemas.ImportacaoRelatorio(dry_run=dry_run, linhas=len(df), erros=erros)
+
+
+def importar_curriculo(
+    db: Session,
+    df: pd.DataFrame,
+    dry_run: bool = True,
+    remover_ausentes: bool = False,
+    progresso: Optional[Callable[[float, str], None]] = None,
+) -> schemas.ImportacaoRelatorio:
+    """Cria/atualiza disciplinas, turmas e vínculos turma-disciplina com carga semanal.
+
+    Com remover_ausentes=True, vínculos de turmas presentes na planilha que não
+    aparecem nela são removidos (útil ao carregar um novo ano letivo).
+    """
+    _exigir_colunas(df, COLUNAS_CURRICULO)
+    df = df.copy()
+    for opcional in ("curso", "codigo"):
+        if opcional not in df.columns:
+            df[opcional] = None
+
+    erros = _validar_obrigatorias(df, COLUNAS_CURRICULO)
+    erros += _validar_inteiro_positivo(df, "carga_horaria_semanal")
+
+    turnos = pd.DataFrame(db.query(models.Turno.id, models.Turno.nome).all(), columns=["turno_id", "turno_nome"])
+    turnos["turno_chave"] = turnos["turno_nome"].str.lower()
+    # Nomes que só diferem em maiúsculas não identificam um turno
+    ambiguos = turnos.loc[turnos.duplicated("turno_chave", keep=False), "turno_chave"].unique()
+    turnos = turnos.drop_duplicates("turno_chave")
+    df["turno_chave"] = df["turno"].str.lower()
+    df = df.merge(turnos[["turno_chave", "turno_id"]], on="turno_chave", how="left").set_axis(df.index)
+    ambiguo = df["turno_chave"].isin(ambiguos)
+    df.loc[ambiguo, "turno_id"] = None
+    erros += _erros_de_mascara(ambiguo, "Turno ambíguo: mais de um turno com este nome", "turno")
+    erros += _erros_de_mascara(df["turno"].notna() & df["turno_id"].isna() & ~ambiguo, "Turno não encontrado", "turno")
+
+    duplicadas = df.duplicated(["turma", "disciplina"], keep=False) & df["turma"].notna() & df["disciplina"].notna()
+    erros += _erros_de_mascara(duplicadas, "Disciplina repetida para a mesma turma", "disciplina")
+
+    por_turma = df.groupby("turma")[["turno_chave", "ano", "curso"]].nunique()
+    turmas_inconsistentes = por_turma[(por_turma > 1).any(axis=1)].index
+    erros += _erros_de_mascara(
+        df["turma"].isin(turmas_inconsistentes), "Turno, ano ou curso divergente entre linhas da turma", "turma"
+    )
+
+    codigos = df.dropna(subset=["codigo"]).groupby("codigo")["disciplina"].nunique()
+    codigos_conflitantes = codigos[codigos > 1].index
+    erros += _erros_de_mascara(df["codigo"].isin(codigos_conflitantes), "Código usado por disciplinas diferentes", "codigo")
+
+    relatorio = _relatorio(dry_run, df, sorted(erros, key=lambda e: (e.linha or 0)))
+    if erros:
+        return relatorio
+    _avisar(progresso, 0.3, f"{len(df)} linhas validadas")
+
+    # Disciplinas
+    existentes_disc = pd.DataFrame(
+        db.query(models.Disciplina.id, models.Disciplina.nome, models.Disciplina.codigo).all(),
+        columns=["disciplina_id", "disciplina", "codigo_atual"],
+    ).drop_duplicates("disciplina")
+    disc = df.groupby("disciplina", as_index=False).agg(
+        codigo=("codigo", "first"), carga=("carga_horaria_semanal", "max")
+    ).merge(existentes_disc, on="disciplina", how="left")
+    novas_disc = disc[disc["disciplina_id"].isna()]
+    codigo_alterado = disc[
+        disc["disciplina_id"].notna() & disc["codigo"].notna() & (disc["codigo"] != disc["codigo_atual"])
+    ]
+    relatorio.criados["disciplinas"] = novas_disc["disciplina"].tolist()
+    relatorio.atualizados["disciplinas"] = codigo_alterado["disciplina"].tolist()
+
+    # Turmas
+    existentes_turma = pd.DataFrame(
+        db.query(models.Turma.id, models.Turma.nome).all(), columns=["turma_id", "turma"]
+    ).drop_duplicates("turma")
+    turmas = df.groupby("turma", as_index=False).agg(
+        ano=("ano", "first"), curso=("curso", "first"), turno_id=("turno_id", "first")
+    ).merge(existentes_turma, on="turma", how="left")
+    novas_turmas = turmas[turmas["turma_id"].isna()]
+    relatorio.criados["turmas"] = novas_turmas["turma"].tolist()
+
+    if not dry_run:
+        _avisar(progresso, 0.5, "Gravando disciplinas, turmas e vínculos")
+        if len(novas_disc):
+            db.execute(insert(models.Disciplina), [
+                {"nome": r.disciplina, "codigo": r.codigo, "carga_horaria_semanal": int(r.carga), "ativa": True}
+                for r in novas_disc.itertuples()
+            ])
+        if len(codigo_alterado):
+            db.execute(update(models.Disciplina), [
+                {"id": int(r.disciplina_id), "codigo": r.codigo} for r in codigo_alterado.itertuples()
+            ])
+        if len(novas_turmas):
+            db.execute(insert(models.Turma), [
+                {"nome": r.turma, "ano": r.ano, "curso": r.curso, "turno_id": int(r.turno_id), "ativa": True}
+                for r in novas_turmas.itertuples()
+            ])
+        db.flush()
+
+    ids_disc = dict(db.query(models.Disciplina.nome, models.Disciplina.id).filter(
+        models.Disciplina.nome.in_(disc["disciplina"].tolist())
+    ).all())
+    ids_turma = dict(db.query(models.Turma.nome, models.Turma.id).filter(
+        models.Turma.nome.in_(turmas["turma"].tolist())
+    ).all())
+
+    # Vínculos turma-disciplina (em dry-run, entidades novas ainda não têm id)
+    df["disciplina_id"] = df["disciplina"].map(ids_disc)
+    df["turma_id"] = df["turma"].map(ids_turma)
+    existentes_vinc = pd.DataFrame(
+        db.query(
+            models.TurmaDisciplina.id,
+            models.TurmaDisciplina.turma_id,
+            models.TurmaDisciplina.disciplina_id,
+            models.TurmaDisciplina.carga_horaria_semanal,
+            models.Disciplina.nome,
+        ).join(models.Disciplina, models.Disciplina.id == models.TurmaDisciplina.disciplina_id)
+        .filter(models.TurmaDisciplina.turma_id.in_(list(ids_turma.values()))).all(),
+        # nome da disciplina para os vínculos ausentes da planilha (só o banco o conhece)
+        columns=["vinculo_id", "turma_id", "disciplina_id", "carga_atual", "disciplina_vinculada"],
+    )
+    vinc = df.merge(existentes_vinc, on=["turma_id", "disciplina_id"], how="outer", indicator=True)
+    novos_vinc = vinc[vinc["_merge"] == "left_only"]
+    alterados_vinc = vinc[
+        (vinc["_merge"] == "both") & (vinc["carga_atual"].astype("Int64") != vinc["carga_horaria_semanal"]).fillna(True)
+    ]
+    ausentes_vinc = vinc[vinc["_merge"] == "right_only"] if remover_ausentes else vinc.iloc[0:0]
+
+    nomes_turma = {v: k for k, v in ids_turma.items()}
+    relatorio.criados["turma_disciplinas"] = (novos_vinc["turma"] + " / " + novos_vinc["disciplina"]).tolist()
+    relatorio.atualizados["turma_disciplinas"] = (
+        alterados_vinc["turma"] + " / " + alterados_vinc["disciplina"]
+        + " (" + alterados_vinc["carga_atual"].astype("Int64").astype(str) + " -> "
+        + alterados_vinc["carga_horaria_semanal"].astype(str) + ")"
+    ).tolist()
+    if remover_ausentes:
+        relatorio.removidos["turma_disciplinas"] = [
+            f"{nomes_turma.get(r.turma_id, r.turma_id)} / {r.disciplina_vinculada}"
+            for r in ausentes_vinc.itertuples()
+        ]
+
+    if dry_run:
+        return relatorio
+
+    if len(novos_vinc):
+        db.execute(insert(models.TurmaDisciplina), [
+            {"turma_id": int(r.turma_id), "disciplina_id": int(r.disciplina_id),
+             "carga_horaria_semanal": int(r.carga_horaria_semanal)}
+            for r in novos_vinc.itertuples()
+        ])
+    if len(alterados_vinc):
+        db.execute(update(models.TurmaDisciplina), [
+            {"id": int(r.vinculo_id), "carga_horaria_semanal": int(r.carga_horaria_semanal)}
+            for r in alterados_vinc.itertuples()
+        ])
+    if len(ausentes_vinc):
+        db.query(models.TurmaDisciplina).filter(
+            models.TurmaDisciplina.id.in_([int(i) for i in ausentes_vinc["vinculo_id"]])
+        ).delete(synchronize_session=False)
+    db.commit()
+    return relatorio
+
+
+def importar_professor_disciplinas(
+    db: Session,
+    df: pd.DataFrame,
+    dry_run: bool = True,
+    progresso: Optional[Callable[[float, str], None]] = None,
+) -> schemas.ImportacaoRelatorio:
+    """Cria/atualiza vínculos professor-disciplina; professor é identificado por username ou email."""
+    _exigir_colunas(df, COLUNAS_PROFESSOR_DISCIPLINA)
+    df = df.copy()
+    if "carga_horaria" not in df.columns:
+        df["carga_horaria"] = "1"
+    df["carga_horaria"] = df["carga_horaria"].fillna("1")
+
+    erros = _validar_obrigatorias(df, COLUNAS_PROFESSOR_DISCIPLINA)
+    erros += _validar_inteiro_positivo(df, "carga_horaria")
+
+    professores = pd.DataFrame(
+        db.query(models.Professor.id, models.Usuario.username, models.Usuario.email)
+        .join(models.Usuario, models.Usuario.id == models.Professor.usuario_id).all(),
+        columns=["professor_id", "username", "email"],
+    )
+    chaves = pd.concat([
+        professores[["professor_id", "username"]].rename(columns={"username": "chave"}),
+        professores[["professor_id", "email"]].rename(columns={"email": "chave"}),
+    ]).dropna()
+    chaves["chave"] = chaves["chave"].str.lower()
+    chaves = chaves.drop_duplicates("chave")
+    df["chave"] = df["professor"].str.lower()
+    df = df.merge(chaves, on="chave", how="left").set_axis(df.index)
+    erros += _erros_de_mascara(df["professor"].notna() & df["professor_id"].isna(), "Professor não encontrado", "professor")
+
+    disciplinas = pd.DataFrame(
+        db.query(models.Disciplina.id, models.Disciplina.nome, models.Disciplina.codigo).all(),
+        columns=["disciplina_id", "nome", "codigo"],
+    )
+    chaves_disc = pd.concat([
+        disciplinas[["disciplina_id", "nome"]].rename(columns={"nome": "chave_disc"}),
+        disciplinas[["disciplina_id", "codigo"]].rename(columns={"codigo": "chave_disc"}),
+    ]).dropna().drop_duplicates("chave_disc")
+    df = df.merge(chaves_disc, left_on="disciplina", right_on="chave_disc", how="left").set_axis(df.index)
+    erros += _erros_de_mascara(df["disciplina"].notna() & df["disciplina_id"].isna(), "Disciplina não encontrada", "disciplina")
+
+    duplicadas = df.duplicated(["professor_id", "disciplina_id"], keep=False) & df["professor_id"].notna() & df["disciplina_id"].notna()
+    erros += _erros_de_mascara(duplicadas, "Vínculo repetido na planilha", "disciplina")
+
+    relatorio = _relatorio(dry_run, df, sorted(erros, key=lambda e: (e.linha or 0)))
+    if erros:
+        return relatorio
+    _avisar(progresso, 0.3, f"{len(df)} linhas validadas")
+
+    existentes = pd.DataFrame(
+        db.query(
+            models.ProfessorDisciplina.id,
+            models.ProfessorDisciplina.professor_id,
+            models.ProfessorDisciplina.disciplina_id,
+            models.ProfessorDisciplina.carga_horaria,
+        ).all(),
+        columns=["vinculo_id", "professor_id", "disciplina_id", "carga_atual"],
+    ).drop_duplicates(["professor_id", "disciplina_id"])
+    df["professor_id"] = df["professor_id"].astype(int)
+    df["disciplina_id"] = df["disciplina_id"].astype(int)
+    vinc = df.merge(existentes, on=["professor_id", "disciplina_id"], how="left")
+    novos = vinc[vinc["vinculo_id"].isna()]
+    alterados = vinc[vinc["vinculo_id"].notna() & (vinc["carga_atual"] != vinc["carga_horaria"])]
+
+    relatorio.criados["professor_disciplinas"] = (novos["professor"] + " / " + novos["disciplina"]).tolist()
+    relatorio.atualizados["professor_disciplinas"] = (alterados["professor"] + " / " + alterados["disciplina"]).tolist()
+    if dry_run:
+        return relatorio
+
+    _avisar(progresso, 0.5, "Gravando vínculos")
+    if len(novos):
+        db.execute(insert(models.ProfessorDisciplina), [
+            {"professor_id": int(r.professor_id), "disciplina_id": int(r.disciplina_id), "carga_horaria": int(r.carga_horaria)}
+            for r in novos.itertuples()
+        ])
+    if len(alterados):
+        db.execute(update(models.ProfessorDisciplina), [
+            {"id": int(r.vinculo_id), "carga_horaria": int(r.carga_horaria)} for r in alterados.itertuples()
+        ])
+    db.commit()
+    return relatorio
+
+
+def curriculos_para_dataframe(curriculos: Dict[str, dict]) -> pd.DataFrame:
+    """Converte o dicionário CURRICULOS de seed_curriculo no formato de planilha do importador."""
+    linhas = []
+    for conf in curriculos.values():
+        turma = f"{conf['ano']} - {conf['curso']}"
+        for disciplina, carga in conf["disciplinas"].items():
+            linhas.append({
+                "turma": turma,
+                "ano": conf["ano"],
+                "curso": conf["curso"],
+                "turno": conf["turno"],
+                "disciplina": disciplina,
+                "carga_horaria_semanal": str(carga),
+            })
+    return pd.DataFrame(linhas)
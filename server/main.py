@@ -5,11 +5,16 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from database import models
 from database.database import engine
-from routes import auth, usuarios, professores, disciplinas, turmas, horarios, espacos, reservas, professor_disciplinas, turnos, periodos_aula, turma_disciplinas, professor_bloqueios, professor_disponibilidades
+import eventos
+import tarefas
+from compressao import CompressaoMiddleware
+from routes import auth, usuarios, professores, disciplinas, turmas, horarios, espacos, reservas, professor_disciplinas, turnos, periodos_aula, turma_disciplinas, professor_bloqueios, professor_disponibilidades, exportacoes, importacoes, analises, dashboard, eventos as eventos_routes, sincronizacao as sincronizacao_routes, metricas, professor_ausencias, horario_excecoes, agenda as agenda_routes, tarefas as tarefas_routes, versoes_grade as versoes_grade_routes, cenarios as cenarios_routes
 from seed_curriculo import run as seed_curriculo_run
+from migrate_db import run as migrate_db_run
 from config import (
     ALLOWED_ORIGINS,
     AUTO_CREATE_TABLES,
+    COMPRESSAO_ATIVA,
     CREATE_DEFAULT_ADMIN,
     DEFAULT_ADMIN_EMAIL,
     DEFAULT_ADMIN_PASSWORD,
@@ -68,6 +73,7 @@ def startup() -> None:
     validate_settings()
     if AUTO_CREATE_TABLES:
         models.Base.metadata.create_all(bind=engine)
+        migrate_db_run()
     if CREATE_DEFAULT_ADMIN:
         create_admin_user()
     # Populate baseline curriculum and periods every startup (idempotent)
@@ -75,6 +81,13 @@ def startup() -> None:
         seed_curriculo_run()
     except Exception as e:
         logger.exception("Erro ao executar seed_curriculo: %s", e)
+    eventos.iniciar(engine)
+    tarefas.iniciar()
+
+@app.on_event("shutdown")
+def shutdown() -> None:
+    tarefas.parar()
+    eventos.parar()
 
 # CORS middleware
 app.add_middleware(
@@ -85,6 +98,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compressão das respostas e métricas de tamanho por rota
+if COMPRESSAO_ATIVA:
+    app.add_middleware(CompressaoMiddleware)
+
 # Basic endpoints
 @app.get("/")
 def read_root():
@@ -109,3 +126,16 @@ app.include_router(professor_disciplinas.router)
 app.include_router(turma_disciplinas.router)
 app.include_router(professor_bloqueios.router)
 app.include_router(professor_disponibilidades.router)
+app.include_router(professor_ausencias.router)
+app.include_router(horario_excecoes.router)
+app.include_router(exportacoes.router)
+app.include_router(importacoes.router)
+app.include_router(analises.router)
+app.include_router(dashboard.router)
+app.include_router(eventos_routes.router)
+app.include_router(sincronizacao_routes.router)
+app.include_router(metricas.router)
+app.include_router(agenda_routes.router)
+app.include_router(tarefas_routes.router)
+app.include_router(versoes_grade_routes.router)
+app.include_router(cenarios_routes.router)
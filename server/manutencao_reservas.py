@@ -0,0 +1,354 @@
+"""Manutenção da tabela de reservas de espaço.
+
+Uso (a partir do diretório server/):
+
+    python manutencao_reservas.py particionar
+    python manutencao_reservas.py criar-particoes --meses 12
+    python manutencao_reservas.py arquivar --ate-ano 2024 --destino csv --saida arquivos/
+
+O particionamento mensal por data_reserva só existe no PostgreSQL; nos demais
+bancos o arquivamento apenas exporta e remove as linhas antigas.
+"""
+import argparse
+import gzip
+import io
+import os
+import re
+from datetime import date, datetime, timezone
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+import pandas as pd
+from sqlalchemy import Column, Date, DateTime, Integer, LargeBinary, MetaData, Table, select, text
+from sqlalchemy.engine import Connection
+
+from database.database import engine
+import restricoes
+
+TABELA = "reservas_espaco"
+TABELA_ARQUIVO = "reservas_espaco_arquivo"
+PARTICAO_PADRAO = "reservas_espaco_default"
+PADRAO_PARTICAO = re.compile(r"^reservas_espaco_p(\d{4})(\d{2})$")
+
+# Linhas lidas por vez ao arquivar
+LOTE_ARQUIVO = 10000
+COLUNAS_INTEIRAS = ("id", "espaco_id", "solicitante_id", "aprovado_por")
+COLUNAS_TEXTO = ("finalidade", "observacoes", "status")
+COLUNAS_INSTANTE = ("data_aprovacao", "created_at", "updated_at")
+
+# Arquivo comprimido: cada linha guarda as reservas de um mês (ou parte delas,
+# se o mês for arquivado mais de uma vez) como CSV com gzip
+ARQUIVO = Table(
+    TABELA_ARQUIVO, MetaData(),
+    Column("id", Integer, primary_key=True),
+    Column("mes", Date, nullable=False, index=True),
+    Column("linhas", Integer, nullable=False),
+    Column("dados", LargeBinary, nullable=False),
+    Column("arquivado_em", DateTime(timezone=True), nullable=False),
+)
+
+
+def _is_postgres(conn: Connection) -> bool:
+    return conn.dialect.name == "postgresql"
+
+
+def _inicio_mes(d: date) -> date:
+    return date(d.year, d.month, 1)
+
+
+def _proximo_mes(d: date) -> date:
+    return date(d.year + 1, 1, 1) if d.month == 12 else date(d.year, d.month + 1, 1)
+
+
+def _nome_particao(inicio: date) -> str:
+    return f"{TABELA}_p{inicio.year:04d}{inicio.month:02d}"
+
+
+def esta_particionada(conn: Connection) -> bool:
+    if not _is_postgres(conn):
+        return False
+    return conn.execute(
+        text(
+            "SELECT 1 FROM pg_partitioned_table pt "
+            "JOIN pg_class c ON c.oid = pt.partrelid "
+            "WHERE c.relname = :tabela"
+        ),
+        {"tabela": TABELA},
+    ).first() is not None
+
+
+def listar_particoes(conn: Connection) -> List[Tuple[str, date]]:
+    """Retorna (nome, primeiro dia do mês) das partições mensais existentes."""
+    nomes = conn.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = :tabela"
+        ),
+        {"tabela": TABELA},
+    ).scalars().all()
+    particoes = []
+    for nome in nomes:
+        m = PADRAO_PARTICAO.match(nome)
+        if m:
+            particoes.append((nome, date(int(m.group(1)), int(m.group(2)), 1)))
+    return sorted(particoes, key=lambda p: p[1])
+
+
+def _criar_particao(conn: Connection, inicio: date) -> bool:
+    nome = _nome_particao(inicio)
+    existe = conn.execute(text("SELECT to_regclass(:nome)"), {"nome": nome}).scalar()
+    if existe:
+        return False
+    conn.execute(
+        text(
+            f"CREATE TABLE {nome} PARTITION OF {TABELA} "
+            f"FOR VALUES FROM ('{inicio.isoformat()}') TO ('{_proximo_mes(inicio).isoformat()}')"
+        )
+    )
+    restricoes.criar_em_particao(conn, nome)
+    return True
+
+
+def criar_particoes_futuras(meses: int = 12, a_partir_de: Optional[date] = None) -> List[str]:
+    """Garante partições mensais do mês corrente (ou a_partir_de) até `meses` à frente."""
+    criadas = []
+    with engine.begin() as conn:
+        if not esta_particionada(conn):
+            print(f"Tabela {TABELA} não é particionada; execute 'particionar' primeiro.")
+            return criadas
+        inicio = _inicio_mes(a_partir_de or date.today())
+        for _ in range(meses + 1):
+            if _criar_particao(conn, inicio):
+                criadas.append(_nome_particao(inicio))
+            inicio = _proximo_mes(inicio)
+    for nome in criadas:
+        print(f"Partição criada: {nome}")
+    return criadas
+
+
+def particionar(meses_futuros: int = 12) -> bool:
+    """Converte reservas_espaco em tabela particionada por mês (RANGE em data_reserva).
+
+    Executa em uma única transação: renomeia a tabela atual, cria a tabela
+    particionada com as mesmas colunas, cria as partições necessárias para os
+    dados existentes e copia as linhas. A sequência de ids é preservada.
+
+    `LIKE` não copia a restrição de reservas sobrepostas, que o Postgres
+    também não aceita na tabela particionada: ela é criada em cada partição
+    (ver restricoes.py), inclusive na padrão.
+    """
+    with engine.begin() as conn:
+        if not _is_postgres(conn):
+            print("Particionamento disponível apenas no PostgreSQL.")
+            return False
+        if esta_particionada(conn):
+            print(f"Tabela {TABELA} já é particionada.")
+            return False
+
+        restricoes.preparar_postgres(conn)
+        legado = f"{TABELA}_legado"
+        conn.execute(text(f"ALTER TABLE {TABELA} RENAME TO {legado}"))
+        conn.execute(text(f"ALTER TABLE {legado} RENAME CONSTRAINT {TABELA}_pkey TO {legado}_pkey"))
+        for indice in conn.execute(
+            text("SELECT indexname FROM pg_indexes WHERE tablename = :t AND indexname LIKE 'ix_%'"),
+            {"t": legado},
+        ).scalars().all():
+            conn.execute(text(f"ALTER INDEX {indice} RENAME TO {indice}_legado"))
+        conn.execute(text(f"ALTER SEQUENCE IF EXISTS {TABELA}_id_seq OWNED BY NONE"))
+
+        conn.execute(
+            text(
+                f"CREATE TABLE {TABELA} (LIKE {legado} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+                f"PARTITION BY RANGE (data_reserva)"
+            )
+        )
+        conn.execute(text(f"ALTER TABLE {TABELA} ADD PRIMARY KEY (id, data_reserva)"))
+        conn.execute(text(f"ALTER SEQUENCE IF EXISTS {TABELA}_id_seq OWNED BY {TABELA}.id"))
+        conn.execute(text(f"ALTER TABLE {TABELA} ADD FOREIGN KEY (espaco_id) REFERENCES espacos_escola (id)"))
+        conn.execute(text(f"ALTER TABLE {TABELA} ADD FOREIGN KEY (solicitante_id) REFERENCES usuarios (id)"))
+        conn.execute(text(f"ALTER TABLE {TABELA} ADD FOREIGN KEY (aprovado_por) REFERENCES usuarios (id)"))
+        conn.execute(text(f"CREATE INDEX ix_{TABELA}_id ON {TABELA} (id)"))
+        conn.execute(text(f"CREATE INDEX ix_{TABELA}_data_reserva ON {TABELA} (data_reserva)"))
+        conn.execute(text(f"CREATE INDEX ix_{TABELA}_espaco_data ON {TABELA} (espaco_id, data_reserva)"))
+        conn.execute(text(f"CREATE INDEX ix_{TABELA}_solicitante_data ON {TABELA} (solicitante_id, data_reserva)"))
+        conn.execute(text(f"CREATE TABLE {PARTICAO_PADRAO} PARTITION OF {TABELA} DEFAULT"))
+        restricoes.criar_em_particao(conn, PARTICAO_PADRAO)
+
+        menor, maior = conn.execute(
+            text(f"SELECT min(data_reserva), max(data_reserva) FROM {legado}")
+        ).one()
+        hoje = date.today()
+        inicio = _inicio_mes(min(menor, hoje) if menor else hoje)
+        fim = _inicio_mes(max(maior, hoje) if maior else hoje)
+        for _ in range(meses_futuros):
+            fim = _proximo_mes(fim)
+        while inicio <= fim:
+            _criar_particao(conn, inicio)
+            inicio = _proximo_mes(inicio)
+
+        conn.execute(text(f"INSERT INTO {TABELA} SELECT * FROM {legado}"))
+        conn.execute(text(f"DROP TABLE {legado}"))
+    print(f"Tabela {TABELA} convertida para particionamento mensal.")
+    return True
+
+
+def _lotes(conn: Connection, limite: date) -> Iterator[pd.DataFrame]:
+    """Reservas anteriores a `limite`, em ordem de data, em DataFrames de até LOTE_ARQUIVO linhas."""
+    for lote in pd.read_sql(
+        text(f"SELECT * FROM {TABELA} WHERE data_reserva < :limite ORDER BY data_reserva, id"),
+        conn.execution_options(stream_results=True),
+        params={"limite": limite},
+        chunksize=LOTE_ARQUIVO,
+    ):
+        # Tipos fixos: um lote só com nulos numa coluna não muda o tipo dela
+        for coluna in lote.columns:
+            if coluna in COLUNAS_INTEIRAS:
+                lote[coluna] = lote[coluna].astype("Int64")
+            elif coluna in COLUNAS_TEXTO:
+                lote[coluna] = lote[coluna].astype("string")
+            elif coluna in COLUNAS_INSTANTE:
+                lote[coluna] = pd.to_datetime(lote[coluna], utc=True)
+        yield lote
+
+
+def _exportar_csv(lotes: Iterable[pd.DataFrame], caminho: str) -> int:
+    total = 0
+    with gzip.open(caminho, "wt", encoding="utf-8", newline="") as f:
+        for lote in lotes:
+            lote.to_csv(f, index=False, header=total == 0)
+            total += len(lote)
+    return total
+
+
+def _exportar_parquet(lotes: Iterable[pd.DataFrame], caminho: str) -> int:
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise RuntimeError("Exportação parquet requer o pacote pyarrow instalado.") from e
+    total = 0
+    escritor = None
+    try:
+        for lote in lotes:
+            tabela = pa.Table.from_pandas(lote, schema=escritor.schema if escritor else None, preserve_index=False)
+            if escritor is None:
+                escritor = pq.ParquetWriter(caminho, tabela.schema, compression="zstd")
+            escritor.write_table(tabela)
+            total += len(lote)
+    finally:
+        if escritor is not None:
+            escritor.close()
+    return total
+
+
+def _bloco(mes: date, partes: List[pd.DataFrame]) -> dict:
+    dados = io.BytesIO()
+    with gzip.GzipFile(fileobj=dados, mode="wb") as f:
+        f.write(pd.concat(partes).to_csv(index=False).encode("utf-8"))
+    return {"mes": mes, "linhas": sum(len(p) for p in partes), "dados": dados.getvalue(), "arquivado_em": datetime.now(timezone.utc)}
+
+
+def _arquivar_em_tabela(conn: Connection, lotes: Iterable[pd.DataFrame]) -> int:
+    """Um bloco por mês em reservas_espaco_arquivo: CSV comprimido com gzip (ver ler_arquivo)."""
+    ARQUIVO.create(conn, checkfirst=True)
+    total = 0
+    mes, partes = None, []
+    for lote in lotes:
+        meses = pd.to_datetime(lote["data_reserva"]).dt.to_period("M")
+        for periodo, parte in lote.groupby(meses, sort=False):
+            inicio = periodo.to_timestamp().date()
+            if mes is not None and inicio != mes:
+                conn.execute(ARQUIVO.insert(), _bloco(mes, partes))
+                partes = []
+            mes = inicio
+            partes.append(parte)
+        total += len(lote)
+    if partes:
+        conn.execute(ARQUIVO.insert(), _bloco(mes, partes))
+    return total
+
+
+def ler_arquivo(mes: date) -> pd.DataFrame:
+    """Reservas de um mês guardadas em reservas_espaco_arquivo."""
+    with engine.connect() as conn:
+        blocos = conn.execute(
+            select(ARQUIVO.c.dados).where(ARQUIVO.c.mes == _inicio_mes(mes)).order_by(ARQUIVO.c.id)
+        ).scalars().all()
+    partes = [pd.read_csv(io.BytesIO(dados), compression="gzip") for dados in blocos]
+    return pd.concat(partes, ignore_index=True) if partes else pd.DataFrame()
+
+
+def arquivar(ate_ano: int, destino: str = "csv", saida: str = ".") -> int:
+    """Move as reservas dos anos letivos até `ate_ano` (inclusive) para fora da tabela ativa.
+
+    destino:
+      - "csv": exporta para <saida>/reservas_ate_<ano>.csv.gz (gzip)
+      - "parquet": exporta para <saida>/reservas_ate_<ano>.parquet (zstd; requer pyarrow)
+      - "tabela": grava na tabela reservas_espaco_arquivo um bloco comprimido
+        (CSV com gzip) por mês; `ler_arquivo(mes)` os lê de volta
+
+    As linhas são lidas em lotes de LOTE_ARQUIVO e gravadas à medida que
+    chegam. Em tabelas particionadas, as partições inteiramente arquivadas são
+    desanexadas e removidas; o restante é apagado com DELETE.
+    """
+    if destino not in ("csv", "parquet", "tabela"):
+        raise ValueError(f"Destino inválido: {destino}")
+    limite = date(ate_ano + 1, 1, 1)
+    with engine.begin() as conn:
+        existentes = conn.execute(
+            text(f"SELECT count(*) FROM {TABELA} WHERE data_reserva < :limite"), {"limite": limite}
+        ).scalar()
+        if not existentes:
+            print(f"Nenhuma reserva anterior a {limite.isoformat()}.")
+            return 0
+
+        if destino == "tabela":
+            total = _arquivar_em_tabela(conn, _lotes(conn, limite))
+            print(f"Arquivadas {total} reservas em {TABELA_ARQUIVO}")
+        else:
+            os.makedirs(saida, exist_ok=True)
+            if destino == "csv":
+                caminho = os.path.join(saida, f"reservas_ate_{ate_ano}.csv.gz")
+                total = _exportar_csv(_lotes(conn, limite), caminho)
+            else:
+                caminho = os.path.join(saida, f"reservas_ate_{ate_ano}.parquet")
+                total = _exportar_parquet(_lotes(conn, limite), caminho)
+            print(f"Exportadas {total} reservas para {caminho}")
+
+        if esta_particionada(conn):
+            for nome, inicio in listar_particoes(conn):
+                if _proximo_mes(inicio) <= limite:
+                    conn.execute(text(f"ALTER TABLE {TABELA} DETACH PARTITION {nome}"))
+                    conn.execute(text(f"DROP TABLE {nome}"))
+                    print(f"Partição removida: {nome}")
+        conn.execute(text(f"DELETE FROM {TABELA} WHERE data_reserva < :limite"), {"limite": limite})
+    return total
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Manutenção da tabela de reservas de espaço")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p_part = sub.add_parser("particionar", help="Converte a tabela para particionamento mensal (PostgreSQL)")
+    p_part.add_argument("--meses", type=int, default=12, help="Partições futuras a criar")
+
+    p_criar = sub.add_parser("criar-particoes", help="Cria partições mensais futuras")
+    p_criar.add_argument("--meses", type=int, default=12)
+
+    p_arq = sub.add_parser("arquivar", help="Arquiva reservas de anos letivos anteriores")
+    p_arq.add_argument("--ate-ano", type=int, default=date.today().year - 1)
+    p_arq.add_argument("--destino", choices=["csv", "parquet", "tabela"], default="csv")
+    p_arq.add_argument("--saida", default=".")
+
+    args = parser.parse_args(argv)
+    if args.comando == "particionar":
+        particionar(meses_futuros=args.meses)
+    elif args.comando == "criar-particoes":
+        criar_particoes_futuras(meses=args.meses)
+    elif args.comando == "arquivar":
+        arquivar(args.ate_ano, destino=args.destino, saida=args.saida)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Ajustes incrementais de schema para bancos criados antes de novas colunas.
+
+create_all não altera tabelas existentes; este script adiciona as colunas
+novas (todas anuláveis) quando ainda não existem, torna anuláveis as colunas
+que deixaram de ser obrigatórias (só no PostgreSQL), preenche o slot dos horários
+(ver slots.py), cria os índices correspondentes e as restrições de não
+sobreposição (ver restricoes.py). É idempotente.
+"""
+from sqlalchemy import inspect, text
+
+from database import models
+from database.database import engine, SessionLocal
+import restricoes
+import slots
+
+# (tabela, coluna, tipo SQL)
+COLUNAS = [
+    ("turma_disciplinas", "carga_horaria_semanal", "INTEGER"),
+    ("horarios", "slot", "INTEGER"),
+    ("horarios", "espaco_id", "INTEGER REFERENCES espacos_escola(id)"),
+    ("turmas", "quantidade_alunos", "INTEGER"),
+    ("cenario_alteracoes", "base_assinatura", "VARCHAR(40)"),
+    ("tarefa_arquivos", "caminho", "VARCHAR(500)"),
+]
+
+# (tabela, coluna) que passaram a aceitar nulo
+ANULAVEIS = [
+    ("tarefa_arquivos", "conteudo"),
+]
+
+# Índices de tabelas existentes que create_all não cria
+INDICES = [
+    ("horarios", "ux_horarios_professor_slot"),
+    ("horarios", "ux_horarios_turma_slot"),
+    ("horarios", "ix_horarios_turma_dia"),
+    ("horarios", "ix_horarios_professor_dia"),
+    ("horarios", "ix_horarios_turno_dia"),
+    ("horarios", "ix_horarios_disciplina_dia"),
+    ("horarios", "ix_horarios_sala_dia"),
+    ("horarios", "ix_horarios_espaco_dia"),
+    ("horarios", "ix_horarios_dia_inicio"),
+]
+
+
+def run():
+    inspector = inspect(engine)
+    tabelas = set(inspector.get_table_names())
+    with engine.begin() as conn:
+        for tabela, coluna, tipo in COLUNAS:
+            if tabela not in tabelas:
+                continue
+            existentes = {c["name"] for c in inspector.get_columns(tabela)}
+            if coluna in existentes:
+                continue
+            print(f"Adicionando coluna {tabela}.{coluna}")
+            conn.execute(text(f"ALTER TABLE {tabela} ADD COLUMN {coluna} {tipo}"))
+        if engine.dialect.name == "postgresql":
+            for tabela, coluna in ANULAVEIS:
+                if tabela in tabelas:
+                    conn.execute(text(f"ALTER TABLE {tabela} ALTER COLUMN {coluna} DROP NOT NULL"))
+
+    if "horarios" not in tabelas:
+        return
+
+    db = SessionLocal()
+    try:
+        alterados = slots.recalcular_slots(db)
+        if alterados:
+            print(f"Slots recalculados em {alterados} horário(s)")
+    finally:
+        db.close()
+
+    for tabela, nome in INDICES:
+        indice = next(i for i in models.Base.metadata.tables[tabela].indexes if i.name == nome)
+        try:
+            indice.create(bind=engine, checkfirst=True)
+        except Exception as e:
+            print(f"Não foi possível criar o índice {nome}: {e}")
+
+    restricoes.aplicar(engine)
+
+
+if __name__ == "__main__":
+    run()
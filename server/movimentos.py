@@ -0,0 +1,231 @@
+"""Avaliação de movimentos e trocas de um horário na grade do turno.
+
+Para o editor (arrastar e soltar): dado um horário, diz para cada célula
+(dia, aula) da grade do turno se ele pode ir para lá e, se não puder, por
+quê, e qual troca tornaria o movimento legal.
+
+Tudo sai de um modelo de ocupação em memória, montado uma vez (em cache até
+horários, bloqueios ou disponibilidades mudarem): máscaras semanais por
+minuto (como em substitutos.py) por professor, turma e espaço, a lista de
+aulas de cada recurso por dia e as aulas de cada slot (ver slots.py). Uma
+célula custa alguns AND de inteiros; as aulas em conflito só são listadas
+quando a máscara acusa sobreposição.
+
+Trocas: quando a célula de destino está ocupada por aulas do mesmo turno,
+a cadeia de Kempe entre as duas células é o menor conjunto de aulas que
+precisa trocar de lado para que nenhum professor ou turma fique em
+conflito (partindo do horário, inclui toda aula da outra célula que
+compartilha professor ou turma com uma aula já na cadeia). Com uma aula de
+cada lado é a troca simples. A troca é legal se cada aula da cadeia cabe na
+nova célula fora da cadeia (professor, turma, bloqueios e disponibilidade).
+"""
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from cache import CacheVersionado
+from database import models
+from slots import DIAS, ORDEM_DIA, SLOTS_POR_DIA, grade_turno
+from substitutos import DIA_INTEIRO, MINUTOS_DIA, faixa
+
+TABELAS_MODELO = ("horarios", "professor_bloqueios", "professor_disponibilidades")
+
+# Motivos pelos quais o horário não pode ir para a célula
+CONFLITO_PROFESSOR = "conflito_professor"
+CONFLITO_TURMA = "conflito_turma"
+BLOQUEIO_PROFESSOR = "bloqueio_professor"
+PROFESSOR_INDISPONIVEL = "professor_indisponivel"
+
+_cache_modelo = CacheVersionado(max_itens=1)
+
+
+class _Aula:
+    __slots__ = ("id", "professor_id", "turma_id", "espaco_id", "turno_id", "dia", "slot", "mascara")
+
+    def __init__(self, id, professor_id, turma_id, espaco_id, turno_id, dia, slot, mascara):
+        self.id = id
+        self.professor_id = professor_id
+        self.turma_id = turma_id
+        self.espaco_id = espaco_id
+        self.turno_id = turno_id
+        self.dia = dia
+        self.slot = slot
+        self.mascara = mascara
+
+
+class _Recurso:
+    """Máscara de ocupação e aulas por dia de cada professor, turma ou espaço."""
+
+    def __init__(self):
+        self.mascaras: Dict[int, int] = defaultdict(int)
+        self.aulas: Dict[Tuple[int, str], List[_Aula]] = defaultdict(list)
+
+    def adicionar(self, chave: int, aula: _Aula) -> None:
+        self.mascaras[chave] |= aula.mascara
+        self.aulas[(chave, aula.dia)].append(aula)
+
+    def ocupantes(self, chave: int, dia: str, mascara: int, excluir: Set[int]) -> List[_Aula]:
+        if not self.mascaras.get(chave, 0) & mascara:
+            return []
+        return [a for a in self.aulas.get((chave, dia), ()) if a.mascara & mascara and a.id not in excluir]
+
+
+class ModeloGrade:
+    def __init__(self):
+        self.aulas: Dict[int, _Aula] = {}
+        self.professores = _Recurso()
+        self.turmas = _Recurso()
+        self.espacos = _Recurso()
+        self.por_slot: Dict[Tuple[int, int], List[_Aula]] = defaultdict(list)
+        self.bloqueios: Dict[int, int] = defaultdict(int)
+        self.disponivel: Dict[int, int] = {}  # professores sem entrada: semana inteira
+
+    def adicionar(self, aula: _Aula) -> None:
+        self.aulas[aula.id] = aula
+        self.professores.adicionar(aula.professor_id, aula)
+        self.turmas.adicionar(aula.turma_id, aula)
+        if aula.espaco_id is not None:
+            self.espacos.adicionar(aula.espaco_id, aula)
+        if aula.slot is not None:
+            self.por_slot[(aula.turno_id, aula.slot)].append(aula)
+
+    def avaliar(self, professor_id: int, turma_id: int, dia: str, mascara: int,
+                excluir: Set[int]) -> Tuple[List[str], List[int]]:
+        """Motivos que impedem uma aula do professor e da turma na faixa, e as aulas em conflito."""
+        motivos, conflitos = [], []
+        professor = self.professores.ocupantes(professor_id, dia, mascara, excluir)
+        if professor:
+            motivos.append(CONFLITO_PROFESSOR)
+        turma = self.turmas.ocupantes(turma_id, dia, mascara, excluir)
+        if turma:
+            motivos.append(CONFLITO_TURMA)
+        if self.bloqueios.get(professor_id, 0) & mascara:
+            motivos.append(BLOQUEIO_PROFESSOR)
+        disponivel = self.disponivel.get(professor_id)
+        if disponivel is not None and not disponivel & mascara:
+            motivos.append(PROFESSOR_INDISPONIVEL)
+        for a in professor + turma:
+            if a.id not in conflitos:
+                conflitos.append(a.id)
+        return motivos, conflitos
+
+    def cadeia_kempe(self, aula: _Aula, destino: int, mascara_destino: int) -> Optional[dict]:
+        """Troca legal entre a célula do horário e `destino` (slots do mesmo turno), ou None."""
+        origem = aula.slot
+        dia_origem, dia_destino = DIAS[origem // SLOTS_POR_DIA], DIAS[destino // SLOTS_POR_DIA]
+        celulas = {
+            origem: self.por_slot.get((aula.turno_id, origem), []),
+            destino: self.por_slot.get((aula.turno_id, destino), []),
+        }
+        lado = {aula.id: origem}
+        fila = [aula]
+        while fila:
+            x = fila.pop()
+            outro = destino if lado[x.id] == origem else origem
+            for y in celulas[outro]:
+                if y.id not in lado and (y.professor_id == x.professor_id or y.turma_id == x.turma_id):
+                    lado[y.id] = outro
+                    fila.append(y)
+        if len(lado) == 1:
+            return None  # destino livre de aulas do turno: o conflito vem de fora da grade
+
+        excluir = set(lado)
+        for aula_id, slot in lado.items():
+            x = self.aulas[aula_id]
+            dia, mascara = (dia_destino, mascara_destino) if slot == origem else (dia_origem, aula.mascara)
+            motivos, _ = self.avaliar(x.professor_id, x.turma_id, dia, mascara, excluir)
+            if motivos:
+                return None
+        para_destino = sorted(i for i, s in lado.items() if s == origem)
+        para_origem = sorted(i for i, s in lado.items() if s == destino)
+        return {
+            "tipo": "simples" if len(lado) == 2 else "kempe",
+            "para_destino": para_destino,
+            "para_origem": para_origem,
+        }
+
+
+def montar_modelo(db: Session) -> ModeloGrade:
+    modelo = ModeloGrade()
+    H = models.Horario
+    for h in db.query(
+        H.id, H.professor_id, H.turma_id, H.espaco_id, H.turno_id,
+        H.dia_semana, H.hora_inicio, H.hora_fim, H.slot,
+    ):
+        modelo.adicionar(_Aula(
+            h.id, h.professor_id, h.turma_id, h.espaco_id, h.turno_id, h.dia_semana.value, h.slot,
+            faixa(h.dia_semana, h.hora_inicio, h.hora_fim),
+        ))
+
+    B = models.ProfessorBloqueio
+    for pid, dia, inicio, fim in db.query(B.professor_id, B.dia_semana, B.hora_inicio, B.hora_fim):
+        modelo.bloqueios[pid] |= faixa(dia, inicio, fim)
+
+    # Mesma regra de crud_new.verificar_disponibilidade_professor: dias sem
+    # disponibilidade declarada contam como inteiramente disponíveis
+    declarados: Dict[int, int] = defaultdict(int)
+    disponivel: Dict[int, int] = defaultdict(int)
+    D = models.ProfessorDisponibilidade
+    for pid, dia, inicio, fim in db.query(D.professor_id, D.dia_semana, D.hora_inicio, D.hora_fim):
+        disponivel[pid] |= faixa(dia, inicio, fim)
+        declarados[pid] |= DIA_INTEIRO << (ORDEM_DIA[dia.value] * MINUTOS_DIA)
+    semana = (1 << (MINUTOS_DIA * len(DIAS))) - 1
+    for pid, mascara in disponivel.items():
+        modelo.disponivel[pid] = mascara | (semana & ~declarados[pid])
+    return modelo
+
+
+def modelo_grade(db: Session) -> ModeloGrade:
+    return _cache_modelo.obter("modelo", TABELAS_MODELO, lambda: montar_modelo(db))
+
+
+def _dias_turno(modelo: ModeloGrade, turno_id: int) -> List[str]:
+    """Segunda a sexta e os demais dias em que o turno já tem aulas."""
+    usados = {a.dia for a in modelo.aulas.values() if a.turno_id == turno_id}
+    return [d for i, d in enumerate(DIAS) if i < 5 or d in usados]
+
+
+def movimentos_horario(db: Session, horario_id: int) -> Optional[dict]:
+    """Validade, motivos e troca possível para cada célula da grade do turno do horário."""
+    modelo = modelo_grade(db)
+    aula = modelo.aulas.get(horario_id)
+    if aula is None:
+        return None
+    grade = sorted(grade_turno(db, aula.turno_id).items(), key=lambda item: item[1])
+    excluir = {aula.id}
+
+    celulas = []
+    for dia in _dias_turno(modelo, aula.turno_id):
+        for (inicio, fim), indice in grade:
+            slot = ORDEM_DIA[dia] * SLOTS_POR_DIA + indice
+            mascara = faixa(dia, inicio, fim)
+            atual = slot == aula.slot
+            motivos, conflitos = ([], []) if atual else modelo.avaliar(
+                aula.professor_id, aula.turma_id, dia, mascara, excluir,
+            )
+            troca = None
+            if motivos and aula.slot is not None and set(motivos) <= {CONFLITO_PROFESSOR, CONFLITO_TURMA}:
+                troca = modelo.cadeia_kempe(aula, slot, mascara)
+            celulas.append({
+                "dia_semana": dia,
+                "numero_aula": indice + 1,
+                "slot": slot,
+                "hora_inicio": inicio,
+                "hora_fim": fim,
+                "atual": atual,
+                "valido": not motivos,
+                "motivos": motivos,
+                "conflitos": conflitos,
+                "espaco_ocupado": bool(
+                    aula.espaco_id is not None and not atual
+                    and modelo.espacos.ocupantes(aula.espaco_id, dia, mascara, excluir)
+                ),
+                "troca": troca,
+            })
+    return {
+        "horario_id": aula.id,
+        "turno_id": aula.turno_id,
+        "slot": aula.slot,
+        "celulas": celulas,
+    }
@@ -0,0 +1,485 @@
+"""Redução de janelas e de dias de presença dos professores na grade de um turno.
+
+Pós-otimização sobre os horários já cadastrados: as aulas só mudam de
+célula (dia letivo × aula da grade geral do turno, ver slots.py); professor,
+turma, disciplina e espaço ficam. Horários fora da grade (slot nulo) não se
+movem e bloqueiam as células que tocam, como as aulas de outros turnos, os
+bloqueios e a disponibilidade dos professores (gerador_grade.celulas_bloqueadas).
+
+A ocupação é uma máscara de bits por (recurso, dia) para turmas, professores
+e espaços. O objetivo soma, com os pesos do gerador:
+
+- janelas dos professores (PESO_JANELA_PROFESSOR);
+- dias de presença dos professores (PESO_DIA_PROFESSOR; dias em que o
+  professor já vem por outro turno ou por um horário fixo não contam);
+- janelas das turmas (PESO_JANELA_TURMA), para que a busca não troque
+  janela de professor por janela de aluno;
+- aulas da mesma disciplina além de MAX_AULAS_DISCIPLINA_DIA no dia.
+
+Na busca, o objetivo é multiplicado pelo número de aulas + 1 e somado ao
+número de aulas fora da célula original: entre grades de mesma qualidade,
+vence a que mexe menos.
+
+Movimentos: levar uma aula a uma célula livre para a turma, o professor e o
+espaço, ou trocar as células de duas aulas da mesma turma (a grade da turma
+não muda, só a dos professores). Destinos ocupados ou bloqueados são
+descartados antes de qualquer cálculo, então nenhum movimento cria
+conflito. A variação do objetivo é incremental: só as máscaras dos dias
+tocados são reavaliadas, e o custo de cada máscara vem de uma tabela
+memoizada. Um movimento custa algumas operações de inteiros e consultas a
+dicionário, o que dá centenas de milhares de movimentos por segundo em
+Python puro.
+
+A aceitação é por recozimento simulado, com a temperatura caindo ao longo do
+tempo dado; a melhor grade vista é a devolvida.
+"""
+import math
+import random
+import time as relogio
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session
+
+import crud_new as crud
+import versoes_grade
+from database import models
+from gerador_grade import (
+    PESO_EXCESSO_DIA, PESO_JANELA_PROFESSOR, PESO_JANELA_TURMA,
+    _excesso, _janelas, celulas_bloqueadas,
+)
+from slots import DIAS, ORDEM_DIA, SLOTS_POR_DIA, grade_turno
+from substitutos import faixa
+
+PESO_DIA_PROFESSOR = 6
+
+TEMPERATURA_INICIAL = 4.0
+TEMPERATURA_FINAL = 0.05
+PROB_TROCA = 0.7          # fração dos movimentos que são trocas dentro da turma
+INTERVALO_RELOGIO = 1024  # movimentos entre consultas ao relógio
+
+
+class _Custos(dict):
+    """Custo de uma máscara de dia, calculado na primeira consulta."""
+
+    def __init__(self, funcao):
+        super().__init__()
+        self.funcao = funcao
+
+    def __missing__(self, mascara: int) -> int:
+        valor = self[mascara] = self.funcao(mascara)
+        return valor
+
+
+CUSTO_TURMA = _Custos(lambda m: PESO_JANELA_TURMA * _janelas(m))
+CUSTO_PROFESSOR = _Custos(lambda m: PESO_JANELA_PROFESSOR * _janelas(m))
+CUSTO_PROFESSOR_DIA = _Custos(lambda m: PESO_JANELA_PROFESSOR * _janelas(m) + (PESO_DIA_PROFESSOR if m else 0))
+
+
+class GradeTurno:
+    """Aulas do turno em índices (turma, professor, espaço, turma/disciplina) e células."""
+
+    def __init__(self, turno_id: int, dias: List[str], periodos: List[tuple]):
+        self.turno_id = turno_id
+        self.dias = dias
+        self.periodos = periodos   # (índice da aula no turno, hora_inicio, hora_fim)
+        self.horarios: List[int] = []
+        self.turma: List[int] = []
+        self.professor: List[int] = []
+        self.espaco: List[int] = []  # -1: sem espaço
+        self.grupo: List[int] = []
+        self.celula: List[int] = []
+        self.turmas: List[int] = []
+        self.professores: List[int] = []
+        self.espacos: List[int] = []
+        self.grupos: List[tuple] = []  # (turma_id, disciplina_id)
+        self.bloqueio_turma: List[int] = []
+        self.bloqueio_professor: List[int] = []
+        self.bloqueio_espaco: List[int] = []
+        self.presente: List[int] = []  # por professor: bit d = já vem no dia por outro motivo
+        self.fixos = 0
+
+    @property
+    def celulas(self) -> int:
+        return len(self.dias) * len(self.periodos)
+
+
+def carregar(db: Session, turno_id: int) -> GradeTurno:
+    grade = sorted(grade_turno(db, turno_id).items(), key=lambda item: item[1])
+    periodos = [(indice, inicio, fim) for (inicio, fim), indice in grade]
+    coluna = {indice: k for k, (indice, _, _) in enumerate(periodos)}
+
+    H = models.Horario
+    linhas = db.query(
+        H.id, H.professor_id, H.turma_id, H.disciplina_id, H.espaco_id,
+        H.dia_semana, H.hora_inicio, H.hora_fim, H.slot,
+    ).filter(H.turno_id == turno_id).order_by(H.id).all()
+    usados = {h.dia_semana.value for h in linhas}
+    dias = [d for i, d in enumerate(DIAS) if i < 5 or d in usados]
+    indice_dia = {d: k for k, d in enumerate(dias)}
+    g = GradeTurno(turno_id, dias, periodos)
+    n = len(periodos)
+
+    moveis, fixos = [], []
+    for h in linhas:
+        if h.slot is not None and h.slot % SLOTS_POR_DIA in coluna:
+            moveis.append(h)
+        else:
+            fixos.append(h)
+    g.fixos = len(fixos)
+
+    indices: Dict[str, Dict[int, int]] = {"turma": {}, "professor": {}, "espaco": {}, "grupo": {}}
+
+    def indice(tipo: str, chave) -> int:
+        return indices[tipo].setdefault(chave, len(indices[tipo]))
+
+    for h in moveis:
+        g.horarios.append(h.id)
+        g.turma.append(indice("turma", h.turma_id))
+        g.professor.append(indice("professor", h.professor_id))
+        g.espaco.append(indice("espaco", h.espaco_id) if h.espaco_id is not None else -1)
+        g.grupo.append(indice("grupo", (h.turma_id, h.disciplina_id)))
+        dia = DIAS[h.slot // SLOTS_POR_DIA]
+        g.celula.append(indice_dia[dia] * n + coluna[h.slot % SLOTS_POR_DIA])
+    g.turmas = list(indices["turma"])
+    g.professores = list(indices["professor"])
+    g.espacos = list(indices["espaco"])
+    g.grupos = list(indices["grupo"])
+
+    g.bloqueio_professor = celulas_bloqueadas(db, turno_id, g.professores, dias, periodos) if g.professores else []
+    g.bloqueio_turma = [0] * len(g.turmas)
+    g.bloqueio_espaco = [0] * len(g.espacos)
+    g.presente = [0] * len(g.professores)
+
+    # Horários que não se movem: os fixos do turno e os de outros turnos que
+    # compartilham turma ou espaço (os de professores já vêm em celulas_bloqueadas)
+    celulas = [faixa(dia, inicio, fim) for dia in dias for _, inicio, fim in periodos]
+    externos = db.query(
+        H.professor_id, H.turma_id, H.espaco_id, H.dia_semana, H.hora_inicio, H.hora_fim,
+    ).filter(H.turno_id != turno_id, or_(
+        H.professor_id.in_(g.professores), H.turma_id.in_(g.turmas), H.espaco_id.in_(g.espacos),
+    )).all() if moveis else []
+    for h in externos + fixos:
+        minutos = faixa(h.dia_semana, h.hora_inicio, h.hora_fim)
+        tocadas = sum(1 << c for c, m in enumerate(celulas) if m & minutos)
+        p = indices["professor"].get(h.professor_id)
+        if p is not None:
+            g.bloqueio_professor[p] |= tocadas
+            if h.dia_semana.value in indice_dia:
+                g.presente[p] |= 1 << indice_dia[h.dia_semana.value]
+        t = indices["turma"].get(h.turma_id)
+        if t is not None:
+            g.bloqueio_turma[t] |= tocadas
+        e = indices["espaco"].get(h.espaco_id)
+        if e is not None:
+            g.bloqueio_espaco[e] |= tocadas
+    return g
+
+
+class Busca:
+    """Estado da busca: célula de cada aula, máscaras por (recurso, dia) e o objetivo."""
+
+    def __init__(self, g: GradeTurno):
+        self.g = g
+        self.n = len(g.periodos)
+        nd = len(g.dias)
+        self.celula = list(g.celula)
+        self.ocup_turma = [[0] * nd for _ in g.turmas]
+        self.ocup_professor = [[0] * nd for _ in g.professores]
+        self.ocup_espaco = [[0] * nd for _ in g.espacos]
+        self.qtd = [[0] * nd for _ in g.grupos]
+        self.custo_professor = [
+            [CUSTO_PROFESSOR if presente >> d & 1 else CUSTO_PROFESSOR_DIA for d in range(nd)]
+            for presente in g.presente
+        ]
+        self.aulas_turma: List[List[int]] = [[] for _ in g.turmas]
+        for a, c in enumerate(self.celula):
+            self.aulas_turma[g.turma[a]].append(a)
+            self._ocupar(a, c)
+        self.escala = len(self.celula) + 1
+        # objetivo da busca: penalidade * escala + aulas alteradas
+        self.penalidade = self.indicadores()["penalidade"] * self.escala
+        self.movimentos = 0
+        self.aceitos = 0
+
+    def _ocupar(self, a: int, c: int) -> None:
+        d, i = divmod(c, self.n)
+        b = 1 << i
+        g = self.g
+        self.ocup_turma[g.turma[a]][d] |= b
+        self.ocup_professor[g.professor[a]][d] |= b
+        if g.espaco[a] >= 0:
+            self.ocup_espaco[g.espaco[a]][d] |= b
+        self.qtd[g.grupo[a]][d] += 1
+        self.celula[a] = c
+
+    def _liberar(self, a: int) -> None:
+        d, i = divmod(self.celula[a], self.n)
+        b = ~(1 << i)
+        g = self.g
+        self.ocup_turma[g.turma[a]][d] &= b
+        self.ocup_professor[g.professor[a]][d] &= b
+        if g.espaco[a] >= 0:
+            self.ocup_espaco[g.espaco[a]][d] &= b
+        self.qtd[g.grupo[a]][d] -= 1
+
+    # -- variação do objetivo ------------------------------------------------
+
+    def _delta_professor(self, p: int, d1: int, b1: int, d2: int, b2: int) -> int:
+        """Professor deixa a aula b1 do dia d1 e passa a ter a b2 do dia d2."""
+        ocup, custo = self.ocup_professor[p], self.custo_professor[p]
+        if d1 == d2:
+            m = ocup[d1]
+            return custo[d1][m & ~b1 | b2] - custo[d1][m]
+        m1, m2 = ocup[d1], ocup[d2]
+        return custo[d1][m1 & ~b1] - custo[d1][m1] + custo[d2][m2 | b2] - custo[d2][m2]
+
+    def _delta_grupo(self, k: int, d1: int, d2: int) -> int:
+        q1, q2 = self.qtd[k][d1], self.qtd[k][d2]
+        return PESO_EXCESSO_DIA * (_excesso(q1 - 1) - _excesso(q1) + _excesso(q2 + 1) - _excesso(q2))
+
+    def delta_mover(self, a: int, c: int) -> Optional[int]:
+        """Variação do objetivo ao levar a aula `a` para a célula `c`; None se ela não cabe lá."""
+        c1 = self.celula[a]
+        if c == c1:
+            return None
+        g = self.g
+        t, p, e = g.turma[a], g.professor[a], g.espaco[a]
+        d2, i2 = divmod(c, self.n)
+        b2 = 1 << i2
+        if (self.ocup_turma[t][d2] & b2 or self.ocup_professor[p][d2] & b2
+                or g.bloqueio_professor[p] >> c & 1 or g.bloqueio_turma[t] >> c & 1):
+            return None
+        if e >= 0 and (self.ocup_espaco[e][d2] & b2 or g.bloqueio_espaco[e] >> c & 1):
+            return None
+        d1, i1 = divmod(c1, self.n)
+        b1 = 1 << i1
+        ocup = self.ocup_turma[t]
+        if d1 == d2:
+            m = ocup[d1]
+            delta = CUSTO_TURMA[m & ~b1 | b2] - CUSTO_TURMA[m]
+        else:
+            m1, m2 = ocup[d1], ocup[d2]
+            delta = (CUSTO_TURMA[m1 & ~b1] - CUSTO_TURMA[m1] + CUSTO_TURMA[m2 | b2] - CUSTO_TURMA[m2]
+                     + self._delta_grupo(g.grupo[a], d1, d2))
+        o = g.celula[a]
+        return (delta + self._delta_professor(p, d1, b1, d2, b2)) * self.escala + (c != o) - (c1 != o)
+
+    def delta_trocar(self, a: int, b: int) -> Optional[int]:
+        """Variação do objetivo ao trocar as células de duas aulas da mesma turma; None se não der."""
+        g = self.g
+        pa, pb = g.professor[a], g.professor[b]
+        ka, kb = g.grupo[a], g.grupo[b]
+        if pa == pb and ka == kb:
+            return None  # troca sem efeito
+        c1, c2 = self.celula[a], self.celula[b]
+        d1, i1 = divmod(c1, self.n)
+        d2, i2 = divmod(c2, self.n)
+        b1, b2 = 1 << i1, 1 << i2
+        delta = 0
+        if pa != pb:
+            if (self.ocup_professor[pa][d2] & b2 or g.bloqueio_professor[pa] >> c2 & 1
+                    or self.ocup_professor[pb][d1] & b1 or g.bloqueio_professor[pb] >> c1 & 1):
+                return None
+            delta = self._delta_professor(pa, d1, b1, d2, b2) + self._delta_professor(pb, d2, b2, d1, b1)
+        ea, eb = g.espaco[a], g.espaco[b]
+        if ea != eb:
+            if ea >= 0 and (self.ocup_espaco[ea][d2] & b2 or g.bloqueio_espaco[ea] >> c2 & 1):
+                return None
+            if eb >= 0 and (self.ocup_espaco[eb][d1] & b1 or g.bloqueio_espaco[eb] >> c1 & 1):
+                return None
+        if ka != kb and d1 != d2:
+            delta += self._delta_grupo(ka, d1, d2) + self._delta_grupo(kb, d2, d1)
+        oa, ob = g.celula[a], g.celula[b]
+        return delta * self.escala + (c2 != oa) - (c1 != oa) + (c1 != ob) - (c2 != ob)
+
+    def mover(self, a: int, c: int, delta: int) -> None:
+        self._liberar(a)
+        self._ocupar(a, c)
+        self.penalidade += delta
+
+    def trocar(self, a: int, b: int, delta: int) -> None:
+        c1, c2 = self.celula[a], self.celula[b]
+        self._liberar(a)
+        self._liberar(b)
+        self._ocupar(a, c2)
+        self._ocupar(b, c1)
+        self.penalidade += delta
+
+    # -- busca -------------------------------------------------------------
+
+    def otimizar(self, tempo_segundos: float, rng: random.Random,
+                 progresso: Optional[Callable[[float, str], None]] = None) -> None:
+        """
+        Recozimento simulado até o prazo; termina na melhor grade vista.
+        `progresso` é avisado junto com a leitura do relógio; se levantar
+        (tarefa cancelada), a busca é abandonada.
+        """
+        total = len(self.celula)
+        if not total:
+            return
+        celulas = self.g.celulas
+        turma = self.g.turma
+        aulas_turma = self.aulas_turma
+        aleatorio, sorteio, exp = rng.random, rng.randrange, math.exp
+        melhor, melhor_celula = self.penalidade, list(self.celula)
+        inicio = relogio.perf_counter()
+        prazo = inicio + tempo_segundos
+        temperatura = TEMPERATURA_INICIAL * self.escala
+        razao = TEMPERATURA_FINAL / TEMPERATURA_INICIAL
+        movimentos = aceitos = 0
+        while True:
+            movimentos += 1
+            if not movimentos % INTERVALO_RELOGIO:
+                agora = relogio.perf_counter()
+                if agora >= prazo:
+                    break
+                if progresso is not None:
+                    progresso((agora - inicio) / tempo_segundos, f"Melhor penalidade: {melhor}")
+                temperatura = TEMPERATURA_INICIAL * self.escala * razao ** ((agora - inicio) / tempo_segundos)
+            a = sorteio(total)
+            if aleatorio() < PROB_TROCA:
+                colegas = aulas_turma[turma[a]]
+                b = colegas[sorteio(len(colegas))]
+                if b == a:
+                    continue
+                delta = self.delta_trocar(a, b)
+                if delta is None or delta > 0 and aleatorio() >= exp(-delta / temperatura):
+                    continue
+                self.trocar(a, b, delta)
+            else:
+                c = sorteio(celulas)
+                delta = self.delta_mover(a, c)
+                if delta is None or delta > 0 and aleatorio() >= exp(-delta / temperatura):
+                    continue
+                self.mover(a, c, delta)
+            aceitos += 1
+            if self.penalidade < melhor:
+                melhor, melhor_celula = self.penalidade, list(self.celula)
+        self.movimentos += movimentos
+        self.aceitos += aceitos
+        self.restaurar(melhor_celula)
+
+    def restaurar(self, celula: List[int]) -> None:
+        for a in range(len(self.celula)):
+            self._liberar(a)
+        for a, c in enumerate(celula):
+            self._ocupar(a, c)
+        self.penalidade = self.indicadores()["penalidade"] * self.escala + self.alteradas()
+
+    def alteradas(self) -> int:
+        return sum(1 for c, o in zip(self.celula, self.g.celula) if c != o)
+
+    # -- relatório -----------------------------------------------------------
+
+    def por_professor(self) -> List[tuple]:
+        """(janelas, dias de presença) de cada professor."""
+        return [
+            (
+                sum(_janelas(m) for m in ocup),
+                sum(1 for d, m in enumerate(ocup) if m or presente >> d & 1),
+            )
+            for ocup, presente in zip(self.ocup_professor, self.g.presente)
+        ]
+
+    def indicadores(self) -> dict:
+        penalidade = 0
+        for ocup, custo in zip(self.ocup_professor, self.custo_professor):
+            penalidade += sum(custo[d][m] for d, m in enumerate(ocup))
+        janelas_turmas = sum(_janelas(m) for ocup in self.ocup_turma for m in ocup)
+        excesso = sum(_excesso(q) for qtd in self.qtd for q in qtd)
+        penalidade += PESO_JANELA_TURMA * janelas_turmas + PESO_EXCESSO_DIA * excesso
+        professores = self.por_professor()
+        return {
+            "penalidade": penalidade,
+            "janelas_professores": sum(j for j, _ in professores),
+            "dias_professores": sum(d for _, d in professores),
+            "janelas_turmas": janelas_turmas,
+            "excesso_disciplina_dia": excesso,
+        }
+
+
+def _destino(g: GradeTurno, c: int) -> dict:
+    d, i = divmod(c, len(g.periodos))
+    indice, inicio, fim = g.periodos[i]
+    return {
+        "dia_semana": g.dias[d],
+        "hora_inicio": inicio,
+        "hora_fim": fim,
+        "slot": ORDEM_DIA[g.dias[d]] * SLOTS_POR_DIA + indice,
+    }
+
+
+def aplicar(db: Session, g: GradeTurno, alterados: List[dict]) -> List[dict]:
+    """
+    Grava as novas células numa transação (reescrevendo só os horários movidos,
+    com os mesmos ids). Exceções datadas de horários que mudaram de dia da
+    semana não valem mais e são apagadas; retorna as descartadas.
+    """
+    H = models.Horario
+    novos = {a["horario_id"]: a for a in alterados}
+    agora = datetime.now(timezone.utc)
+    linhas = []
+    for linha in db.execute(select(H.__table__).where(H.id.in_(novos))):
+        linha = dict(linha._mapping)
+        destino = novos[linha["id"]]
+        linha.update(
+            dia_semana=models.DiaSemanaEnum(destino["dia_semana"]), hora_inicio=destino["hora_inicio"],
+            hora_fim=destino["hora_fim"], slot=destino["slot"], updated_at=agora,
+        )
+        linhas.append(linha)
+    _, descartadas = versoes_grade.reescrever(db, [], list(novos), linhas)
+    crud._commit_sem_sobreposicao(db)
+    return descartadas
+
+
+def otimizar_turno(db: Session, turno_id: int, tempo_segundos: float, aplicar_resultado: bool = False,
+                   semente: Optional[int] = None, progresso: Optional[Callable[[float, str], None]] = None) -> dict:
+    g = carregar(db, turno_id)
+    busca = Busca(g)
+    antes = busca.indicadores()
+    professores_antes = busca.por_professor()
+    inicio = relogio.perf_counter()
+    busca.otimizar(tempo_segundos, random.Random(semente), progresso)
+    decorrido = relogio.perf_counter() - inicio
+    depois = busca.indicadores()
+
+    alterados = []
+    for a, (c0, c1) in enumerate(zip(g.celula, busca.celula)):
+        if c0 == c1:
+            continue
+        anterior = _destino(g, c0)
+        alterados.append({
+            "horario_id": g.horarios[a],
+            "professor_id": g.professores[g.professor[a]],
+            "turma_id": g.turmas[g.turma[a]],
+            "dia_semana_anterior": anterior["dia_semana"],
+            "hora_inicio_anterior": anterior["hora_inicio"],
+            **_destino(g, c1),
+        })
+    descartadas = []
+    if aplicar_resultado and alterados:
+        descartadas = aplicar(db, g, alterados)
+
+    return {
+        "turno_id": turno_id,
+        "tempo_segundos": round(decorrido, 3),
+        "movimentos": busca.movimentos,
+        "movimentos_aceitos": busca.aceitos,
+        "movimentos_por_segundo": int(busca.movimentos / decorrido) if decorrido > 0 else 0,
+        "horarios_fixos": g.fixos,
+        "antes": antes,
+        "depois": depois,
+        "professores": [
+            {
+                "professor_id": professor_id,
+                "janelas_antes": a[0], "janelas_depois": d[0],
+                "dias_antes": a[1], "dias_depois": d[1],
+            }
+            for professor_id, a, d in zip(g.professores, professores_antes, busca.por_professor())
+        ],
+        "alterados": alterados,
+        "aplicado": aplicar_resultado and bool(alterados),
+        "excecoes_descartadas": descartadas,
+    }
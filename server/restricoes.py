@@ -0,0 +1,205 @@
+"""Restrições de não sobreposição garantidas pelo banco.
+
+As rotas continuam verificando conflitos antes de gravar (para responder com
+a mensagem adequada no caso comum), mas duas requisições simultâneas podem
+passar pela verificação ao mesmo tempo. As restrições abaixo fecham essa
+janela: no Postgres são `EXCLUDE USING gist` sobre faixas de horário; no
+SQLite (desenvolvimento e testes) são gatilhos equivalentes, já que o SQLite
+serializa as escritas.
+
+A violação chega como IntegrityError com o nome da restrição, que
+`mensagem_violacao` traduz para a mesma mensagem das verificações prévias.
+
+Quando reservas_espaco é particionada (ver manutencao_reservas.py), o Postgres
+não aceita a restrição na tabela mãe, porque ela não compara data_reserva com
+`=`; ela é criada em cada partição, o que basta, já que reservas sobrepostas
+têm sempre a mesma data e caem na mesma partição.
+"""
+import re
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+
+class ConflitoSobreposicao(Exception):
+    """Gravação recusada pelo banco por sobrepor outro registro."""
+
+
+# nome da restrição -> (tabela, colunas de igualdade, filtro extra, mensagem)
+RESTRICOES = {
+    "horarios_professor_sem_sobreposicao": (
+        "horarios", ("professor_id", "dia_semana"), None,
+        "Conflito de horário para professor ou turma",
+    ),
+    "horarios_turma_sem_sobreposicao": (
+        "horarios", ("turma_id", "dia_semana"), None,
+        "Conflito de horário para professor ou turma",
+    ),
+    "horarios_espaco_sem_sobreposicao": (
+        "horarios", ("espaco_id", "dia_semana"), None,
+        "Espaço já ocupado nesse horário",
+    ),
+    "reservas_espaco_sem_sobreposicao": (
+        "reservas_espaco", ("espaco_id", "data_reserva"), "status <> 'cancelada'",
+        "Já existe uma reserva neste horário",
+    ),
+}
+
+RESTRICAO_RESERVAS = "reservas_espaco_sem_sobreposicao"
+PADRAO_RESTRICAO_PARTICAO = re.compile(r"reservas_espaco_(?:p\d{6}|default)_sem_sobreposicao")
+
+# Índices únicos por slot (ver slots.py): nome -> (texto do erro no SQLite, mensagem)
+INDICES_UNICOS = {
+    "ux_horarios_professor_slot": (
+        "horarios.professor_id, horarios.turno_id, horarios.slot",
+        "Conflito de horário para professor ou turma",
+    ),
+    "ux_horarios_turma_slot": (
+        "horarios.turma_id, horarios.turno_id, horarios.slot",
+        "Conflito de horário para professor ou turma",
+    ),
+}
+
+
+def mensagem_violacao(erro: IntegrityError) -> Optional[str]:
+    """Mensagem amigável se o erro vier de uma das restrições de sobreposição."""
+    orig = getattr(erro, "orig", None)
+    diag = getattr(orig, "diag", None)
+    nome = getattr(diag, "constraint_name", None)
+    if nome and PADRAO_RESTRICAO_PARTICAO.fullmatch(nome):
+        nome = RESTRICAO_RESERVAS
+    if nome in RESTRICOES:
+        return RESTRICOES[nome][3]
+    if nome in INDICES_UNICOS:
+        return INDICES_UNICOS[nome][1]
+    texto = str(orig)
+    for nome, (_, _, _, mensagem) in RESTRICOES.items():
+        if nome in texto:
+            return mensagem
+    if PADRAO_RESTRICAO_PARTICAO.search(texto):
+        return RESTRICOES[RESTRICAO_RESERVAS][3]
+    for nome, (colunas, mensagem) in INDICES_UNICOS.items():
+        if nome in texto or colunas in texto:
+            return mensagem
+    return None
+
+
+def nome_restricao_particao(particao: str) -> str:
+    return f"{particao}_sem_sobreposicao"
+
+
+def _faixa_postgres(tabela: str) -> str:
+    if tabela == "reservas_espaco":
+        return "tsrange(data_reserva + hora_inicio, data_reserva + hora_fim)"
+    return "timerange(hora_inicio, hora_fim)"
+
+
+def _exclusao_postgres(restricao: str, nome: str, tabela: str) -> str:
+    """DDL da restrição `restricao` (de RESTRICOES) com o nome `nome`, criada em `tabela`."""
+    base, iguais, filtro, _ = RESTRICOES[restricao]
+    colunas = ", ".join(f"{c} WITH =" for c in iguais)
+    where = f" WHERE ({filtro})" if filtro else ""
+    return (
+        f"ALTER TABLE {tabela} ADD CONSTRAINT {nome} EXCLUDE USING gist "
+        f"({colunas}, {_faixa_postgres(base)} WITH &&){where}"
+    )
+
+
+def _particoes_postgres(conn, tabela: str) -> Optional[List[str]]:
+    """Partições de `tabela`, ou None se ela não for particionada."""
+    particionada = conn.execute(text(
+        "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid "
+        "WHERE c.relname = :tabela"
+    ), {"tabela": tabela}).first()
+    if particionada is None:
+        return None
+    return conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = :tabela ORDER BY c.relname"
+    ), {"tabela": tabela}).scalars().all()
+
+
+def preparar_postgres(conn) -> None:
+    """Extensão e tipo de faixa usados pelas restrições."""
+    conn.execute(text("CREATE EXTENSION IF NOT EXISTS btree_gist"))
+    # Não existe tipo de faixa para `time` nativo no Postgres
+    conn.execute(text(
+        "DO $$ BEGIN CREATE TYPE timerange AS RANGE (subtype = time); "
+        "EXCEPTION WHEN duplicate_object THEN NULL; END $$"
+    ))
+
+
+def criar_em_particao(conn, particao: str) -> None:
+    """Cria a restrição de reservas sobrepostas numa partição de reservas_espaco."""
+    conn.execute(text(_exclusao_postgres(RESTRICAO_RESERVAS, nome_restricao_particao(particao), particao)))
+
+
+def _aplicar_postgres(conn) -> List[str]:
+    """Cria as restrições que faltam; retorna as falhas que deixam reservas sem proteção."""
+    preparar_postgres(conn)
+    existentes = {r[0] for r in conn.execute(text("SELECT conname FROM pg_constraint"))}
+    particoes = _particoes_postgres(conn, RESTRICOES[RESTRICAO_RESERVAS][0])
+    for nome, (tabela, _, _, _) in RESTRICOES.items():
+        if nome in existentes or (nome == RESTRICAO_RESERVAS and particoes is not None):
+            continue
+        # Dados antigos já sobrepostos impedem a criação; a restrição é
+        # criada quando os conflitos forem resolvidos e o script rodar de novo.
+        try:
+            with conn.begin_nested():
+                conn.execute(text(_exclusao_postgres(nome, nome, tabela)))
+            print(f"Restrição {nome} criada")
+        except SQLAlchemyError as e:
+            print(f"Não foi possível criar a restrição {nome}: {e.orig if hasattr(e, 'orig') else e}")
+
+    falhas = []
+    for particao in particoes or []:
+        nome = nome_restricao_particao(particao)
+        if nome in existentes:
+            continue
+        try:
+            with conn.begin_nested():
+                criar_em_particao(conn, particao)
+            print(f"Restrição {nome} criada")
+        except SQLAlchemyError as e:
+            falhas.append(f"{nome}: {e.orig if hasattr(e, 'orig') else e}")
+    return falhas
+
+
+def _aplicar_sqlite(conn) -> None:
+    for nome, (tabela, iguais, filtro, _) in RESTRICOES.items():
+        condicoes = [f"t.{c} = NEW.{c}" for c in iguais]
+        condicoes += ["t.hora_inicio < NEW.hora_fim", "NEW.hora_inicio < t.hora_fim"]
+        if filtro:
+            condicoes += [f"t.{filtro}", f"NEW.{filtro}"]
+        colunas = ", ".join(iguais + ("hora_inicio", "hora_fim") + (("status",) if filtro else ()))
+        for evento, extra in (("INSERT", ""), (f"UPDATE OF {colunas}", " AND t.id <> NEW.id")):
+            sufixo = "ins" if evento == "INSERT" else "upd"
+            conn.execute(text(
+                f"CREATE TRIGGER IF NOT EXISTS {nome}_{sufixo} BEFORE {evento} ON {tabela} "
+                f"WHEN EXISTS (SELECT 1 FROM {tabela} t WHERE {' AND '.join(condicoes)}{extra}) "
+                f"BEGIN SELECT RAISE(ABORT, '{nome}'); END"
+            ))
+
+
+def aplicar(engine) -> None:
+    """
+    Cria as restrições (Postgres) ou gatilhos (SQLite) se ainda não existirem.
+
+    Numa reservas_espaco particionada, uma partição sem a restrição deixaria
+    passar reservas sobrepostas: isso levanta RuntimeError (depois de gravar
+    as demais restrições) em vez de só avisar.
+    """
+    falhas = []
+    with engine.begin() as conn:
+        if engine.dialect.name == "postgresql":
+            falhas = _aplicar_postgres(conn)
+        elif engine.dialect.name == "sqlite":
+            _aplicar_sqlite(conn)
+    if falhas:
+        raise RuntimeError(
+            "Partições de reservas_espaco sem restrição de sobreposição "
+            "(resolva as reservas sobrepostas e rode de novo): " + "; ".join(falhas)
+        )
@@ -0,0 +1,45 @@
+from datetime import date
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+
+from database import schemas
+import agenda
+from utils import get_db
+
+router = APIRouter(tags=["Agenda"])
+
+NAO_ENCONTRADO = {
+    "turma": "Turma não encontrada",
+    "professor": "Professor não encontrado",
+    "espaco": "Espaço não encontrado",
+}
+
+
+@router.get("/agenda", response_model=schemas.Agenda)
+def read_agenda(
+    data: date,
+    turma_id: Optional[int] = None,
+    professor_id: Optional[int] = None,
+    espaco_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    O que acontece na data para uma turma, um professor ou um espaço (informe
+    exatamente um): aulas efetivas, intervalos e aulas vagas da turma,
+    reservas, bloqueios e ausências, em ordem de horário, com `conflito` nos
+    itens que se sobrepõem.
+    """
+    informados = [
+        (entidade, valor)
+        for entidade, valor in (("turma", turma_id), ("professor", professor_id), ("espaco", espaco_id))
+        if valor is not None
+    ]
+    if len(informados) != 1:
+        raise HTTPException(status_code=400, detail="Informe exatamente um entre turma_id, professor_id e espaco_id")
+    entidade, entidade_id = informados[0]
+    resultado = agenda.agenda_dia(db, entidade, entidade_id, data)
+    if resultado is None:
+        raise HTTPException(status_code=404, detail=NAO_ENCONTRADO[entidade])
+    return resultado
@@ -0,0 +1,52 @@
+from fastapi import APIRouter, HTTPException, Depends
+from sqlalchemy.orm import Session
+from typing import List, Optional
+
+from database import schemas
+import crud_new as crud
+from analises import analisar_grade, cobertura_curriculo
+from utils import get_db
+
+router = APIRouter(prefix="/analises", tags=["Análises"])
+
+@router.get("/grade", response_model=schemas.AnaliseGrade)
+def read_analise_grade(turno_id: Optional[int] = None, db: Session = Depends(get_db)):
+    """
+    Indicadores de qualidade da grade: janelas e carga por professor, distribuição
+    das disciplinas na semana e cobertura do currículo por turma.
+    Sem turno_id, analisa a escola inteira.
+    """
+    if turno_id is not None and not crud.get_turno(db, turno_id):
+        raise HTTPException(status_code=404, detail="Turno não encontrado")
+    return analisar_grade(db, turno_id=turno_id)
+
+@router.get("/cobertura", response_model=List[schemas.CoberturaTurma])
+def read_cobertura(turno_id: Optional[int] = None, apenas_pendentes: bool = False, db: Session = Depends(get_db)):
+    """
+    Aulas faltantes e excedentes por turma e disciplina em relação à carga semanal
+    prevista (vínculo turma-disciplina ou, na falta, a carga da disciplina).
+    """
+    turmas = cobertura_curriculo(db, turno_id=turno_id)
+    if apenas_pendentes:
+        turmas = [t for t in turmas if not t["completa"]]
+    return turmas
+
+@router.get("/cobertura/{turma_id}", response_model=schemas.CoberturaTurma)
+def read_cobertura_turma(turma_id: int, db: Session = Depends(get_db)):
+    turma = crud.get_turma(db, turma_id)
+    if not turma:
+        raise HTTPException(status_code=404, detail="Turma não encontrada")
+    for item in cobertura_curriculo(db, turno_id=turma.turno_id):
+        if item["turma_id"] == turma_id:
+            return item
+    return {
+        "turma_id": turma.id,
+        "turma_nome": turma.nome,
+        "turno_id": turma.turno_id,
+        "esperadas": 0,
+        "agendadas": 0,
+        "faltando": 0,
+        "excedentes": 0,
+        "completa": True,
+        "disciplinas": [],
+    }
@@ -0,0 +1,208 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from database import models, schemas
+import cenarios
+import crud_new as crud
+from restricoes import ConflitoSobreposicao
+from utils import get_db
+
+router = APIRouter(prefix="/cenarios", tags=["Cenários"])
+
+
+def _get_cenario(db: Session, cenario_id: int) -> models.Cenario:
+    cenario = db.get(models.Cenario, cenario_id)
+    if cenario is None:
+        raise HTTPException(status_code=404, detail="Cenário não encontrado")
+    return cenario
+
+
+def _resumo(cenario: models.Cenario, alteracoes: int) -> dict:
+    return {
+        "id": cenario.id,
+        "nome": cenario.nome,
+        "descricao": cenario.descricao,
+        "alteracoes": alteracoes,
+        "aplicado_em": cenario.aplicado_em,
+        "created_at": cenario.created_at,
+    }
+
+
+def _contagens(db: Session) -> dict:
+    A = models.CenarioAlteracao
+    return dict(db.query(A.cenario_id, func.count(A.id)).group_by(A.cenario_id).all())
+
+
+def _validar(db: Session, valores: dict) -> None:
+    """Mesmas verificações de cadastro de POST /horarios; conflitos ficam para /conflitos."""
+    if not crud.get_professor(db, valores["professor_id"]):
+        raise HTTPException(status_code=404, detail="Professor não encontrado")
+    if not crud.get_disciplina(db, valores["disciplina_id"]):
+        raise HTTPException(status_code=404, detail="Disciplina não encontrada")
+    if not crud.get_turma(db, valores["turma_id"]):
+        raise HTTPException(status_code=404, detail="Turma não encontrada")
+    if not crud.get_turno(db, valores["turno_id"]):
+        raise HTTPException(status_code=404, detail="Turno não encontrado")
+    if valores["hora_fim"] <= valores["hora_inicio"]:
+        raise HTTPException(status_code=400, detail="hora_fim deve ser posterior a hora_inicio")
+
+    prof_disc = db.query(models.ProfessorDisciplina).filter(
+        models.ProfessorDisciplina.professor_id == valores["professor_id"],
+        models.ProfessorDisciplina.disciplina_id == valores["disciplina_id"],
+    ).first()
+    if not prof_disc:
+        raise HTTPException(status_code=400, detail="Professor não vinculado à disciplina")
+
+    turma_disc = db.query(models.TurmaDisciplina).filter(
+        models.TurmaDisciplina.turma_id == valores["turma_id"],
+        models.TurmaDisciplina.disciplina_id == valores["disciplina_id"],
+    ).first()
+    if not turma_disc:
+        raise HTTPException(status_code=400, detail="Disciplina não vinculada à turma")
+
+
+def _valores(dados: dict) -> dict:
+    valores = {c: dados.get(c) for c in cenarios.CAMPOS}
+    if hasattr(valores["dia_semana"], "value"):
+        valores["dia_semana"] = valores["dia_semana"].value
+    return valores
+
+
+@router.post("/", response_model=schemas.Cenario)
+def create_cenario(dados: schemas.CenarioCreate, db: Session = Depends(get_db)):
+    """Cria um cenário vazio: até receber alterações, ele é a própria grade atual."""
+    if db.query(models.Cenario.id).filter(models.Cenario.nome == dados.nome).first():
+        raise HTTPException(status_code=400, detail="Já existe um cenário com este nome")
+    cenario = models.Cenario(nome=dados.nome, descricao=dados.descricao)
+    db.add(cenario)
+    db.commit()
+    db.refresh(cenario)
+    return _resumo(cenario, 0)
+
+
+@router.get("/", response_model=List[schemas.Cenario])
+def read_cenarios(db: Session = Depends(get_db)):
+    contagens = _contagens(db)
+    return [
+        _resumo(c, contagens.get(c.id, 0))
+        for c in db.query(models.Cenario).order_by(models.Cenario.id.desc()).all()
+    ]
+
+
+@router.get("/{cenario_id}", response_model=schemas.Cenario)
+def read_cenario(cenario_id: int, db: Session = Depends(get_db)):
+    cenario = _get_cenario(db, cenario_id)
+    A = models.CenarioAlteracao
+    return _resumo(cenario, db.query(func.count(A.id)).filter(A.cenario_id == cenario_id).scalar())
+
+
+@router.delete("/{cenario_id}", status_code=204)
+def delete_cenario(cenario_id: int, db: Session = Depends(get_db)):
+    cenario = _get_cenario(db, cenario_id)
+    db.query(models.CenarioAlteracao).filter(models.CenarioAlteracao.cenario_id == cenario_id).delete()
+    db.delete(cenario)
+    db.commit()
+    return None
+
+
+@router.get("/{cenario_id}/horarios", response_model=List[schemas.HorarioCenario])
+def read_horarios_cenario(
+    cenario_id: int,
+    turno_id: Optional[int] = None,
+    turma_id: Optional[int] = None,
+    professor_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Grade do cenário: horários atuais com as alterações do cenário por cima
+    (`origem` diz se a linha é a atual, alterada ou nova).
+    """
+    _get_cenario(db, cenario_id)
+    return cenarios.horarios(db, cenario_id, turno_id=turno_id, turma_id=turma_id, professor_id=professor_id)
+
+
+@router.post("/{cenario_id}/horarios", response_model=schemas.HorarioCenario)
+def create_horario_cenario(cenario_id: int, horario: schemas.HorarioCreate, db: Session = Depends(get_db)):
+    """Acrescenta um horário só ao cenário (id negativo até o cenário ser aplicado)."""
+    _get_cenario(db, cenario_id)
+    valores = _valores(horario.model_dump())
+    _validar(db, valores)
+    return cenarios.inserir(db, cenario_id, valores)
+
+
+@router.put("/{cenario_id}/horarios/{horario_id}", response_model=schemas.HorarioCenario)
+def update_horario_cenario(
+    cenario_id: int, horario_id: int, horario: schemas.HorarioUpdate, db: Session = Depends(get_db),
+):
+    """Altera um horário no cenário; o horário da grade atual só é copiado na primeira alteração."""
+    _get_cenario(db, cenario_id)
+    atual = cenarios.resultado(db, cenario_id, horario_id)
+    if atual is None:
+        raise HTTPException(status_code=404, detail="Horário não encontrado no cenário")
+    valores = _valores({**atual, **horario.model_dump(exclude_unset=True)})
+    _validar(db, valores)
+    return cenarios.atualizar(db, cenario_id, horario_id, valores)
+
+
+@router.delete("/{cenario_id}/horarios/{horario_id}", status_code=204)
+def delete_horario_cenario(cenario_id: int, horario_id: int, db: Session = Depends(get_db)):
+    _get_cenario(db, cenario_id)
+    if cenarios.resultado(db, cenario_id, horario_id) is None:
+        raise HTTPException(status_code=404, detail="Horário não encontrado no cenário")
+    cenarios.remover(db, cenario_id, horario_id)
+    return None
+
+
+@router.get("/{cenario_id}/alteracoes", response_model=List[schemas.AlteracaoCenario])
+def read_alteracoes_cenario(cenario_id: int, db: Session = Depends(get_db)):
+    """Horários inseridos, alterados e removidos pelo cenário; `desatualizada` marca os que mudaram na grade depois."""
+    _get_cenario(db, cenario_id)
+    return cenarios.listar_alteracoes(db, cenario_id)
+
+
+@router.delete("/{cenario_id}/alteracoes/{horario_id}", status_code=204)
+def descartar_alteracao_cenario(cenario_id: int, horario_id: int, db: Session = Depends(get_db)):
+    """Desfaz a alteração do horário no cenário (ele volta a ser o da grade atual)."""
+    _get_cenario(db, cenario_id)
+    if not cenarios.descartar(db, cenario_id, horario_id):
+        raise HTTPException(status_code=404, detail="Alteração não encontrada")
+    return None
+
+
+@router.get("/{cenario_id}/conflitos", response_model=List[schemas.ConflitoCenario])
+def read_conflitos_cenario(cenario_id: int, turno_id: Optional[int] = None, db: Session = Depends(get_db)):
+    """Horários do cenário em conflito com a grade atual, entre si ou com bloqueios e disponibilidade."""
+    _get_cenario(db, cenario_id)
+    return cenarios.conflitos(db, cenario_id, turno_id=turno_id)
+
+
+@router.get("/{cenario_id}/cobertura", response_model=List[schemas.CoberturaTurma])
+def read_cobertura_cenario(
+    cenario_id: int, turno_id: Optional[int] = None, apenas_pendentes: bool = False,
+    db: Session = Depends(get_db),
+):
+    """Cobertura do currículo (como em /analises/cobertura) na grade do cenário."""
+    _get_cenario(db, cenario_id)
+    turmas = cenarios.cobertura(db, cenario_id, turno_id=turno_id)
+    if apenas_pendentes:
+        turmas = [t for t in turmas if not t["completa"]]
+    return turmas
+
+
+@router.post("/{cenario_id}/aplicar", response_model=schemas.AplicacaoCenario)
+def aplicar_cenario(cenario_id: int, db: Session = Depends(get_db)):
+    """
+    Grava as alterações do cenário na grade atual, numa transação, e esvazia
+    o cenário. Recusa (409) se algum horário alterado mudou na grade depois de
+    entrar no cenário, e (400) se o cenário tiver conflitos.
+    """
+    cenario = _get_cenario(db, cenario_id)
+    try:
+        return cenarios.aplicar(db, cenario)
+    except cenarios.CenarioDesatualizado as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except (cenarios.CenarioComConflitos, ConflitoSobreposicao) as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+
+from database import schemas
+import crud_new as crud
+from cache import CacheVersionado
+from config import DASHBOARD_CACHE_TTL_SEGUNDOS
+from utils import get_db
+
+router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
+
+_cache = CacheVersionado(ttl=DASHBOARD_CACHE_TTL_SEGUNDOS, max_itens=1)
+TABELAS_DASHBOARD = (
+    "professores", "disciplinas", "turmas", "turnos", "espacos_escola",
+    "usuarios", "horarios", "reservas_espaco",
+)
+
+def _montar_resumo(db: Session) -> dict:
+    return {
+        "contagens": crud.get_contagens_dashboard(db)._asdict(),
+    }
+
+@router.get("/resumo", response_model=schemas.DashboardResumo)
+def read_resumo(db: Session = Depends(get_db)):
+    """Contagens do dashboard (um único SELECT), em cache por poucos segundos."""
+    return _cache.obter("resumo", TABELAS_DASHBOARD, lambda: _montar_resumo(db))
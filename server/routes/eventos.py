@@ -0,0 +1,57 @@
+import asyncio
+import json
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+
+import eventos
+from config import EVENTOS_HEARTBEAT_SEGUNDOS
+
+router = APIRouter(prefix="/eventos", tags=["Eventos"])
+
+
+def _formatar(evento: dict) -> str:
+    dados = json.dumps(evento, default=str, ensure_ascii=False, separators=(",", ":"))
+    return f"event: {evento['tabela']}\ndata: {dados}\n\n"
+
+
+@router.get("/")
+async def stream_eventos(request: Request, tabelas: Optional[str] = None):
+    """
+    Stream (Server-Sent Events) de alterações em horários, reservas e períodos.
+    Cada evento traz `tabela`, `op` (insert, update, delete ou recarregar), `id`
+    e as colunas alteradas em `dados`. `tabelas` filtra por nome (separadas por vírgula).
+    """
+    filtro = None
+    if tabelas:
+        filtro = {t.strip() for t in tabelas.split(",") if t.strip()}
+        invalidas = filtro - set(eventos.COLUNAS_EVENTOS)
+        if invalidas:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Tabelas inválidas: {', '.join(sorted(invalidas))}. "
+                       f"Valores válidos: {', '.join(eventos.COLUNAS_EVENTOS)}",
+            )
+
+    assinatura = eventos.difusor.assinar(asyncio.get_running_loop(), filtro)
+
+    async def gerar():
+        try:
+            yield "retry: 3000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    evento = await asyncio.wait_for(assinatura.fila.get(), timeout=EVENTOS_HEARTBEAT_SEGUNDOS)
+                except asyncio.TimeoutError:
+                    # Comentário SSE mantém a conexão viva através de proxies
+                    yield ": ping\n\n"
+                    continue
+                yield _formatar(evento)
+        finally:
+            eventos.difusor.cancelar(assinatura)
+
+    return StreamingResponse(
+        gerar(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,229 @@
+import csv
+import io
+import os
+import tempfile
+from datetime import date, time
+from enum import Enum
+from typing import Iterable, Iterator, Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+import crud_new as crud
+from database.database import SessionLocal
+import tarefas
+from routes.tarefas import aceita
+from utils import get_db
+
+router = APIRouter(prefix="/exportar", tags=["Exportações"])
+
+# Linhas lidas do banco por lote (cursor do lado do servidor no Postgres)
+LOTE_EXPORTACAO = 1000
+CHUNK_ARQUIVO = 64 * 1024
+
+CABECALHO_HORARIOS = [
+    "id", "turno", "turma", "dia_semana", "hora_inicio", "hora_fim",
+    "disciplina", "professor", "sala", "observacoes",
+]
+CABECALHO_RESERVAS = [
+    "id", "data_reserva", "hora_inicio", "hora_fim", "espaco",
+    "solicitante", "finalidade", "status", "observacoes",
+]
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+class FormatoExportacao(str, Enum):
+    CSV = "csv"
+    XLSX = "xlsx"
+
+
+def _valor(v):
+    if isinstance(v, Enum):
+        return v.value
+    if isinstance(v, time):
+        return v.strftime("%H:%M")
+    if isinstance(v, date):
+        return v.isoformat()
+    return v
+
+
+def _linhas(query_factory) -> Iterator[list]:
+    """Itera as linhas da consulta em lotes, com sessão própria.
+
+    A sessão é aberta dentro do gerador para continuar válida enquanto a
+    resposta é transmitida, independente do ciclo de vida das dependências.
+    """
+    db = SessionLocal()
+    try:
+        query = query_factory(db).execution_options(stream_results=True).yield_per(LOTE_EXPORTACAO)
+        for row in query:
+            yield [_valor(v) for v in row]
+    finally:
+        db.close()
+
+
+def _stream_csv(cabecalho: list, linhas: Iterable[list], separador: str) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=separador)
+    # BOM para que o Excel reconheça UTF-8
+    buffer.write("\ufeff")
+    writer.writerow(cabecalho)
+    for i, linha in enumerate(linhas, start=1):
+        writer.writerow(linha)
+        if i % LOTE_EXPORTACAO == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate(0)
+    yield buffer.getvalue().encode("utf-8")
+
+
+def _stream_xlsx(cabecalho: list, linhas: Iterable[list], titulo: str) -> Iterator[bytes]:
+    # openpyxl em modo write_only grava as linhas em disco conforme chegam;
+    # o arquivo final é transmitido em blocos e removido em seguida.
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title=titulo)
+    ws.append(cabecalho)
+    for linha in linhas:
+        ws.append(linha)
+
+    fd, caminho = tempfile.mkstemp(suffix=".xlsx")
+    os.close(fd)
+    try:
+        wb.save(caminho)
+        with open(caminho, "rb") as f:
+            while True:
+                bloco = f.read(CHUNK_ARQUIVO)
+                if not bloco:
+                    break
+                yield bloco
+    finally:
+        os.remove(caminho)
+
+
+def _validar_separador(separador: str) -> None:
+    if len(separador) != 1:
+        raise HTTPException(status_code=400, detail="Separador deve ter exatamente um caractere")
+
+
+def _corpo(nome: str, cabecalho: list, linhas: Iterable[list], formato: FormatoExportacao, separador: str):
+    if formato == FormatoExportacao.CSV:
+        return _stream_csv(cabecalho, linhas, separador)
+    return _stream_xlsx(cabecalho, linhas, nome)
+
+
+def _resposta(nome: str, cabecalho: list, linhas: Iterable[list], formato: FormatoExportacao, separador: str):
+    _validar_separador(separador)
+    corpo = _corpo(nome, cabecalho, linhas, formato, separador)
+    return StreamingResponse(
+        corpo,
+        media_type=MEDIA_TYPES[formato.value],
+        headers={"Content-Disposition": f'attachment; filename="{nome}.{formato.value}"'},
+    )
+
+
+@router.get("/horarios")
+def exportar_horarios(
+    formato: FormatoExportacao = FormatoExportacao.CSV,
+    turma_id: Optional[int] = None,
+    professor_id: Optional[int] = None,
+    turno_id: Optional[int] = None,
+    separador: str = ",",
+):
+    linhas = _linhas(
+        lambda db: crud.query_horarios_exportacao(
+            db, turma_id=turma_id, professor_id=professor_id, turno_id=turno_id
+        )
+    )
+    return _resposta("horarios", CABECALHO_HORARIOS, linhas, formato, separador)
+
+
+@router.get("/reservas")
+def exportar_reservas(
+    formato: FormatoExportacao = FormatoExportacao.CSV,
+    data_inicio: Optional[date] = None,
+    data_fim: Optional[date] = None,
+    espaco_id: Optional[int] = None,
+    separador: str = ",",
+):
+    linhas = _linhas(
+        lambda db: crud.query_reservas_exportacao(
+            db, data_inicio=data_inicio, data_fim=data_fim, espaco_id=espaco_id
+        )
+    )
+    return _resposta("reservas", CABECALHO_RESERVAS, linhas, formato, separador)
+
+
+def _exportar_em_tarefa(db: Session, contexto: tarefas.Contexto, nome: str, cabecalho: list, query_factory):
+    """Gera o arquivo no worker, com progresso por lote, gravando-o em disco à medida que sai (ver Contexto.salvar_arquivo)."""
+    formato = FormatoExportacao(contexto.parametros["formato"])
+    total = query_factory(db).order_by(None).count()
+    db.rollback()
+
+    def linhas():
+        for i, linha in enumerate(_linhas(query_factory), start=1):
+            if i % LOTE_EXPORTACAO == 0:
+                contexto.progresso(i / max(total, 1), f"{i} de {total} linhas")
+            yield linha
+
+    corpo = _corpo(nome, cabecalho, linhas(), formato, contexto.parametros["separador"])
+    tamanho = contexto.salvar_arquivo(db, f"{nome}.{formato.value}", MEDIA_TYPES[formato.value], corpo)
+    return {"linhas": total, "bytes": tamanho}
+
+
+@router.post("/horarios", status_code=202)
+def enfileirar_exportacao_horarios(
+    formato: FormatoExportacao = FormatoExportacao.CSV,
+    turma_id: Optional[int] = None,
+    professor_id: Optional[int] = None,
+    turno_id: Optional[int] = None,
+    separador: str = ",",
+    db: Session = Depends(get_db),
+):
+    """Mesma exportação de GET /exportar/horarios em segundo plano; o arquivo sai em GET /tarefas/{id}/arquivo."""
+    _validar_separador(separador)
+    return aceita(tarefas.enfileirar(db, "exportar.horarios", {
+        "formato": formato.value, "turma_id": turma_id, "professor_id": professor_id,
+        "turno_id": turno_id, "separador": separador,
+    }))
+
+
+@router.post("/reservas", status_code=202)
+def enfileirar_exportacao_reservas(
+    formato: FormatoExportacao = FormatoExportacao.CSV,
+    data_inicio: Optional[date] = None,
+    data_fim: Optional[date] = None,
+    espaco_id: Optional[int] = None,
+    separador: str = ",",
+    db: Session = Depends(get_db),
+):
+    """Mesma exportação de GET /exportar/reservas em segundo plano; o arquivo sai em GET /tarefas/{id}/arquivo."""
+    _validar_separador(separador)
+    return aceita(tarefas.enfileirar(db, "exportar.reservas", {
+        "formato": formato.value, "data_inicio": data_inicio, "data_fim": data_fim,
+        "espaco_id": espaco_id, "separador": separador,
+    }))
+
+
+@tarefas.tipo("exportar.horarios")
+def _executar_exportar_horarios(db: Session, contexto: tarefas.Contexto):
+    p = contexto.parametros
+    return _exportar_em_tarefa(db, contexto, "horarios", CABECALHO_HORARIOS, lambda s: crud.query_horarios_exportacao(
+        s, turma_id=p["turma_id"], professor_id=p["professor_id"], turno_id=p["turno_id"],
+    ))
+
+
+@tarefas.tipo("exportar.reservas")
+def _executar_exportar_reservas(db: Session, contexto: tarefas.Contexto):
+    p = contexto.parametros
+    data_inicio = date.fromisoformat(p["data_inicio"]) if p["data_inicio"] else None
+    data_fim = date.fromisoformat(p["data_fim"]) if p["data_fim"] else None
+    return _exportar_em_tarefa(db, contexto, "reservas", CABECALHO_RESERVAS, lambda s: crud.query_reservas_exportacao(
+        s, data_inicio=data_inicio, data_fim=data_fim, espaco_id=p["espaco_id"],
+    ))
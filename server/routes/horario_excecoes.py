@@ -0,0 +1,61 @@
+from datetime import date
+from typing import List, Optional
+
+from fastapi import APIRouter, HTTPException, Depends
+from sqlalchemy.orm import Session
+
+from database import schemas
+import crud_new as crud
+from utils import get_db
+
+router = APIRouter(prefix="/horario-excecoes", tags=["Horário-Exceções"])
+
+
+def _validar(db: Session, horario, data: date, dados: dict):
+    if crud.ORDEM_DIA_SEMANA[horario.dia_semana.value] != data.weekday():
+        raise HTTPException(status_code=400, detail="Data não corresponde ao dia da semana do horário")
+    professor_id = dados.get("professor_id")
+    if professor_id is not None and not crud.get_professor(db, professor_id):
+        raise HTTPException(status_code=404, detail="Professor substituto não encontrado")
+    hora_inicio = dados.get("hora_inicio") or horario.hora_inicio
+    hora_fim = dados.get("hora_fim") or horario.hora_fim
+    if hora_fim <= hora_inicio:
+        raise HTTPException(status_code=400, detail="Hora de fim deve ser posterior à hora de início")
+
+@router.post("/", response_model=schemas.HorarioExcecao)
+def create_horario_excecao(e: schemas.HorarioExcecaoCreate, db: Session = Depends(get_db)):
+    """Altera um horário da grade em uma data: cancela, troca o professor (substituto), a sala ou a faixa."""
+    horario = crud.get_horario(db, e.horario_id)
+    if not horario:
+        raise HTTPException(status_code=404, detail="Horário não encontrado")
+    _validar(db, horario, e.data, e.model_dump())
+    if crud.get_horario_excecao_data(db, e.horario_id, e.data):
+        raise HTTPException(status_code=400, detail="Já existe exceção para este horário nesta data")
+    return crud.create_horario_excecao(db, e)
+
+@router.get("/", response_model=List[schemas.HorarioExcecao])
+def list_horario_excecoes(
+    horario_id: Optional[int] = None,
+    data_inicio: Optional[date] = None,
+    data_fim: Optional[date] = None,
+    db: Session = Depends(get_db),
+):
+    return crud.get_horario_excecoes(db, horario_id=horario_id, data_inicio=data_inicio, data_fim=data_fim)
+
+@router.put("/{excecao_id}", response_model=schemas.HorarioExcecao)
+def update_horario_excecao(excecao_id: int, e: schemas.HorarioExcecaoUpdate, db: Session = Depends(get_db)):
+    atual = crud.get_horario_excecao(db, excecao_id)
+    if not atual:
+        raise HTTPException(status_code=404, detail="Exceção não encontrada")
+    dados = {
+        "professor_id": atual.professor_id, "hora_inicio": atual.hora_inicio, "hora_fim": atual.hora_fim,
+        **e.model_dump(exclude_unset=True),
+    }
+    _validar(db, atual.horario, atual.data, dados)
+    return crud.update_horario_excecao(db, excecao_id, e)
+
+@router.delete("/{excecao_id}", status_code=204)
+def delete_horario_excecao(excecao_id: int, db: Session = Depends(get_db)):
+    if not crud.delete_horario_excecao(db, excecao_id):
+        raise HTTPException(status_code=404, detail="Exceção não encontrada")
+    return None
@@ -1,13 +1,31 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+from datetime import date, time
+import hashlib
+import json
 
 from database import models, schemas
 import crud_new as crud
+from restricoes import ConflitoSobreposicao
+import slots
+import serializacao
+import substitutos
+import grade_efetiva
+import alocacao_salas
+import movimentos
+import gerador_grade
+import otimizador_janelas
+import tarefas
+from routes.tarefas import aceita
+from config import GERADOR_TEMPO_MAXIMO_SEGUNDOS, JANELAS_TEMPO_MAXIMO_SEGUNDOS
+from cache import CacheVersionado
 from database.database import SessionLocal
 
 router = APIRouter(prefix="/horarios", tags=["Horários"])
 
+MAX_DIAS_GRADE_EFETIVA = 92
+
 # Dependency to get database session
 def get_db():
     db = SessionLocal()
@@ -75,13 +93,301 @@ def create_horario(horario: schemas.HorarioCreate, db: Session = Depends(get_db)
         hora_fim=horario.hora_fim,
     ):
         raise HTTPException(status_code=400, detail="Conflito de horário para professor ou turma")
+
+    if horario.espaco_id is not None:
+        if not crud.get_espaco(db, horario.espaco_id):
+            raise HTTPException(status_code=404, detail="Espaço não encontrado")
+        if crud.verificar_conflito_espaco(
+            db, horario.espaco_id, horario.dia_semana, horario.hora_inicio, horario.hora_fim
+        ):
+            raise HTTPException(status_code=400, detail="Espaço já ocupado nesse horário")
     
-    return crud.create_horario(db=db, horario=horario)
+    try:
+        return crud.create_horario(db=db, horario=horario)
+    except ConflitoSobreposicao as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/", response_model=List[schemas.Horario])
-def read_horarios(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    horarios = crud.get_horarios(db, skip=skip, limit=limit)
-    return horarios
+def read_horarios(
+    skip: int = 0,
+    limit: int = 100,
+    turma_id: Optional[int] = None,
+    professor_id: Optional[int] = None,
+    turno_id: Optional[int] = None,
+    dia_semana: Optional[schemas.DiaSemanaEnum] = None,
+    disciplina_id: Optional[int] = None,
+    sala: Optional[str] = None,
+    hora_de: Optional[time] = None,
+    hora_ate: Optional[time] = None,
+    espaco_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Lista horários, opcionalmente filtrados (filtros combináveis, cada um
+    servido por índice). `hora_de`/`hora_ate` retornam os horários que
+    intersectam a janela.
+    """
+    if hora_de is not None and hora_ate is not None and hora_ate <= hora_de:
+        raise HTTPException(status_code=400, detail="hora_ate deve ser posterior a hora_de")
+    return serializacao.resposta_horarios(
+        db, skip=skip, limit=limit,
+        turma_id=turma_id, professor_id=professor_id, turno_id=turno_id,
+        dia_semana=dia_semana, disciplina_id=disciplina_id, sala=sala,
+        hora_de=hora_de, hora_ate=hora_ate, espaco_id=espaco_id,
+    )
+
+_cache_bundle = CacheVersionado(max_itens=32)
+TABELAS_BUNDLE = (
+    "horarios", "professores", "usuarios", "disciplinas", "turmas", "turnos",
+    "periodos_aula", "professor_disciplinas", "turma_disciplinas",
+)
+
+def _montar_bundle(db: Session, turno_id: Optional[int]):
+    corpo = json.dumps(
+        crud.get_editor_bundle(db, turno_id=turno_id),
+        default=str, ensure_ascii=False, separators=(",", ":"),
+    ).encode("utf-8")
+    # ETag derivado do conteúdo: igual entre workers e reinícios do servidor
+    return corpo, '"%s"' % hashlib.sha1(corpo).hexdigest()
+
+def _etag_confere(if_none_match: str, etag: str) -> bool:
+    """Comparação fraca do If-None-Match (RFC 9110): lista de entity-tags ou `*`."""
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*":
+            return True
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == etag:
+            return True
+    return False
+
+@router.get("/editor-bundle")
+def read_editor_bundle(request: Request, turno_id: Optional[int] = None, db: Session = Depends(get_db)):
+    """
+    Dados do editor de horários em uma única resposta: horários do escopo e as
+    tabelas referenciadas (professores, disciplinas, turmas, turnos, períodos e
+    vínculos), indexadas por id. Suporta revalidação com If-None-Match.
+    """
+    corpo, etag = _cache_bundle.obter(
+        ("turno", turno_id), TABELAS_BUNDLE, lambda: _montar_bundle(db, turno_id)
+    )
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if _etag_confere(request.headers.get("if-none-match", ""), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=corpo, media_type="application/json", headers=headers)
+
+@router.get("/ocupacao")
+def read_ocupacao(turno_id: Optional[int] = None, db: Session = Depends(get_db)):
+    """
+    Máscaras de ocupação por professor, turma e sala, por turno e dia: o bit i
+    indica a (i+1)-ª aula da grade do turno. Horários fora da grade não entram
+    nas máscaras e são contados em `sem_slot`.
+    """
+    ocupacao = slots.carregar_ocupacao(db, turno_id=turno_id)
+    return {
+        "slots_por_dia": slots.SLOTS_POR_DIA,
+        "sem_slot": ocupacao.sem_slot,
+        "professores": [
+            {"professor_id": p, "turno_id": t, "dias": slots.mascaras_por_dia(m)}
+            for (p, t), m in sorted(ocupacao.professores.items())
+        ],
+        "turmas": [
+            {"turma_id": tu, "turno_id": t, "dias": slots.mascaras_por_dia(m)}
+            for (tu, t), m in sorted(ocupacao.turmas.items())
+        ],
+        "salas": [
+            {"sala": sala, "turno_id": t, "dias": slots.mascaras_por_dia(m)}
+            for (sala, t), m in sorted(ocupacao.salas.items())
+        ],
+    }
+
+@router.get("/efetivos", response_model=List[schemas.HorarioEfetivo])
+def read_horarios_efetivos(
+    data_inicio: date,
+    data_fim: Optional[date] = None,
+    turma_id: Optional[int] = None,
+    professor_id: Optional[int] = None,
+    turno_id: Optional[int] = None,
+    incluir_canceladas: bool = True,
+    db: Session = Depends(get_db),
+):
+    """
+    Aulas que de fato acontecem entre as datas: a grade semanal com as exceções
+    datadas (cancelamento, substituto, sala, faixa) e as ausências de
+    professores aplicadas. Sem `data_fim`, apenas `data_inicio`.
+    """
+    data_fim = data_fim or data_inicio
+    if data_fim < data_inicio:
+        raise HTTPException(status_code=400, detail="data_fim deve ser igual ou posterior a data_inicio")
+    if (data_fim - data_inicio).days > MAX_DIAS_GRADE_EFETIVA:
+        raise HTTPException(status_code=400, detail=f"Intervalo máximo de {MAX_DIAS_GRADE_EFETIVA} dias")
+    return grade_efetiva.grade_efetiva(
+        db, data_inicio, data_fim,
+        turma_id=turma_id, professor_id=professor_id, turno_id=turno_id,
+        incluir_canceladas=incluir_canceladas,
+    )
+
+@router.get("/substitutos", response_model=List[schemas.SubstitutosHorario])
+def read_substitutos_dia(
+    professor_id: int,
+    dia_semana: schemas.DiaSemanaEnum,
+    limite: int = Query(10, ge=1, le=200),
+    db: Session = Depends(get_db),
+):
+    """
+    Para cada aula do professor ausente no dia, professores aptos a substituí-lo
+    (vinculados à disciplina, livres, disponíveis e dentro da carga semanal),
+    do menos para o mais carregado.
+    """
+    if not crud.get_professor(db, professor_id):
+        raise HTTPException(status_code=404, detail="Professor não encontrado")
+    return substitutos.substitutos_dia(db, professor_id, dia_semana, limite=limite)
+
+@router.get("/{horario_id}/substitutos", response_model=schemas.SubstitutosHorario)
+def read_substitutos_horario(
+    horario_id: int,
+    limite: int = Query(10, ge=1, le=200),
+    db: Session = Depends(get_db),
+):
+    """Professores aptos a substituir o professor do horário, do menos para o mais carregado."""
+    horario = crud.get_horario(db, horario_id)
+    if not horario:
+        raise HTTPException(status_code=404, detail="Horário não encontrado")
+    return substitutos.substitutos_horario(db, horario, limite=limite)
+
+@router.get("/{horario_id}/movimentos", response_model=schemas.MovimentosHorario)
+def read_movimentos_horario(horario_id: int, db: Session = Depends(get_db)):
+    """
+    Para cada célula (dia, aula) da grade do turno do horário: se ele pode ser
+    movido para lá, os motivos quando não pode (conflito de professor ou turma,
+    bloqueio, indisponibilidade), as aulas em conflito e a troca (simples ou
+    cadeia de Kempe) que tornaria o movimento legal.
+    """
+    resultado = movimentos.movimentos_horario(db, horario_id)
+    if resultado is None:
+        raise HTTPException(status_code=404, detail="Horário não encontrado")
+    return resultado
+
+@router.post("/gerar", response_model=schemas.GeracaoGrade)
+def gerar_grade(
+    turno_id: int,
+    tempo_segundos: float = Query(30, gt=0),
+    workers: Optional[int] = Query(None, ge=1, le=64),
+    aplicar: bool = False,
+    semente: Optional[int] = None,
+    aceitar_incompleta: bool = False,
+    em_segundo_plano: bool = False,
+    db: Session = Depends(get_db),
+):
+    """
+    Gera a grade do turno (turmas ativas, cargas de TurmaDisciplina,
+    professores aptos, períodos gerais e bloqueios) com busca local em
+    `workers` processos (padrão: um por núcleo) até `tempo_segundos`. Retorna
+    a melhor grade, sua penalidade e a evolução no tempo; com `aplicar=true`,
+    substitui os horários das turmas geradas (as demais turmas do turno ficam
+    como estão), desde que todas as aulas tenham sido alocadas ou
+    `aceitar_incompleta=true`. Exceções datadas dos horários substituídos
+    passam para o novo horário de mesma turma, disciplina e dia; as demais
+    são apagadas e vêm em `excecoes_descartadas`. Com `em_segundo_plano=true`
+    responde 202 com a tarefa (ver /tarefas), cujo resultado é o mesmo relatório.
+    """
+    if not crud.get_turno(db, turno_id):
+        raise HTTPException(status_code=404, detail="Turno não encontrado")
+    if tempo_segundos > GERADOR_TEMPO_MAXIMO_SEGUNDOS:
+        raise HTTPException(status_code=400, detail=f"Tempo máximo de {GERADOR_TEMPO_MAXIMO_SEGUNDOS:g} segundos")
+    if not slots.grade_turno(db, turno_id):
+        raise HTTPException(status_code=400, detail="Turno sem grade de períodos de aula")
+    if em_segundo_plano:
+        return aceita(tarefas.enfileirar(db, "horarios.gerar", {
+            "turno_id": turno_id, "tempo_segundos": tempo_segundos, "workers": workers,
+            "aplicar": aplicar, "semente": semente, "aceitar_incompleta": aceitar_incompleta,
+        }))
+    try:
+        return gerador_grade.gerar_turno(
+            db, turno_id, tempo_segundos, workers=workers, aplicar_resultado=aplicar, semente=semente,
+            aceitar_incompleta=aceitar_incompleta,
+        )
+    except ConflitoSobreposicao as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@tarefas.tipo("horarios.gerar", max_tentativas=1)
+def _executar_gerar_grade(db: Session, contexto: tarefas.Contexto):
+    p = contexto.parametros
+    return schemas.GeracaoGrade.model_validate(gerador_grade.gerar_turno(
+        db, p["turno_id"], p["tempo_segundos"], workers=p["workers"], aplicar_resultado=p["aplicar"],
+        semente=p["semente"], aceitar_incompleta=p.get("aceitar_incompleta", False),
+        progresso=contexto.progresso,
+    ))
+
+@router.post("/otimizar-janelas", response_model=schemas.OtimizacaoJanelas)
+def otimizar_janelas(
+    turno_id: int,
+    tempo_segundos: float = Query(10, gt=0),
+    aplicar: bool = False,
+    semente: Optional[int] = None,
+    em_segundo_plano: bool = False,
+    db: Session = Depends(get_db),
+):
+    """
+    Reorganiza os horários do turno (só trocando dias e aulas, nunca professor
+    ou turma e sem criar conflitos) para reduzir janelas e dias de presença dos
+    professores, por busca local até `tempo_segundos`. Retorna os indicadores
+    antes e depois, por professor, e os horários movidos; com `aplicar=true`,
+    grava as mudanças (exceções datadas de horários que mudaram de dia da
+    semana são apagadas e vêm em `excecoes_descartadas`). Com
+    `em_segundo_plano=true` responde 202 com a tarefa.
+    """
+    if not crud.get_turno(db, turno_id):
+        raise HTTPException(status_code=404, detail="Turno não encontrado")
+    if tempo_segundos > JANELAS_TEMPO_MAXIMO_SEGUNDOS:
+        raise HTTPException(status_code=400, detail=f"Tempo máximo de {JANELAS_TEMPO_MAXIMO_SEGUNDOS:g} segundos")
+    if not slots.grade_turno(db, turno_id):
+        raise HTTPException(status_code=400, detail="Turno sem grade de períodos de aula")
+    if em_segundo_plano:
+        return aceita(tarefas.enfileirar(db, "horarios.otimizar_janelas", {
+            "turno_id": turno_id, "tempo_segundos": tempo_segundos, "aplicar": aplicar, "semente": semente,
+        }))
+    try:
+        return otimizador_janelas.otimizar_turno(
+            db, turno_id, tempo_segundos, aplicar_resultado=aplicar, semente=semente,
+        )
+    except ConflitoSobreposicao as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@tarefas.tipo("horarios.otimizar_janelas", max_tentativas=1)
+def _executar_otimizar_janelas(db: Session, contexto: tarefas.Contexto):
+    p = contexto.parametros
+    return schemas.OtimizacaoJanelas.model_validate(otimizador_janelas.otimizar_turno(
+        db, p["turno_id"], p["tempo_segundos"], aplicar_resultado=p["aplicar"], semente=p["semente"],
+        progresso=contexto.progresso,
+    ))
+
+@router.post("/alocar-salas", response_model=schemas.AlocacaoSalas)
+def alocar_salas(
+    turno_id: Optional[int] = None,
+    dia_semana: Optional[schemas.DiaSemanaEnum] = None,
+    manter_atuais: bool = True,
+    aplicar: bool = True,
+    db: Session = Depends(get_db),
+):
+    """
+    Aloca espaços aos horários (todos ou os do turno/dia) respeitando a
+    capacidade e as reservas de espaço. Com `manter_atuais`, só troca o espaço
+    de horários cujo espaço atual deixou de ser viável; com `aplicar=false`,
+    apenas simula.
+    """
+    return alocacao_salas.alocar_salas(
+        db, turno_id=turno_id, dia_semana=dia_semana, manter_atuais=manter_atuais, aplicar=aplicar,
+    )
+
+@router.post("/{horario_id}/alocar-sala", response_model=schemas.AlocacaoSalas)
+def alocar_sala_horario(horario_id: int, aplicar: bool = True, db: Session = Depends(get_db)):
+    """Reotimiza os espaços da janela (dia e faixa) do horário, com o resto da grade fixo."""
+    resultado = alocacao_salas.realocar_horario(db, horario_id, aplicar=aplicar)
+    if resultado is None:
+        raise HTTPException(status_code=404, detail="Horário não encontrado")
+    return resultado
 
 @router.put("/{horario_id}", response_model=schemas.Horario)
 def update_horario(horario_id: int, horario: schemas.HorarioUpdate, db: Session = Depends(get_db)):
@@ -143,7 +449,28 @@ def update_horario(horario_id: int, horario: schemas.HorarioUpdate, db: Session
     ):
         raise HTTPException(status_code=400, detail="Conflito de horário para professor ou turma")
 
-    return crud.update_horario(db, horario_id=horario_id, horario=horario)
+    movido = (dia_semana, hora_inicio, hora_fim) != (atual.dia_semana, atual.hora_inicio, atual.hora_fim)
+    realocar = False
+    if "espaco_id" in horario.model_fields_set:
+        if horario.espaco_id is not None:
+            if not crud.get_espaco(db, horario.espaco_id):
+                raise HTTPException(status_code=404, detail="Espaço não encontrado")
+            if crud.verificar_conflito_espaco(db, horario.espaco_id, dia_semana, hora_inicio, hora_fim, horario_id=horario_id):
+                raise HTTPException(status_code=400, detail="Espaço já ocupado nesse horário")
+    elif movido and atual.espaco_id is not None:
+        # Horário alocado mudou de faixa: reotimiza a sala só na nova janela
+        realocar = True
+        if crud.verificar_conflito_espaco(db, atual.espaco_id, dia_semana, hora_inicio, hora_fim, horario_id=horario_id):
+            horario.espaco_id = None
+
+    try:
+        db_horario = crud.update_horario(db, horario_id=horario_id, horario=horario)
+    except ConflitoSobreposicao as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if realocar:
+        alocacao_salas.realocar_horario(db, horario_id)
+        db.refresh(db_horario)
+    return db_horario
 
 @router.delete("/{horario_id}", status_code=204)
 def delete_horario(horario_id: int, db: Session = Depends(get_db)):
@@ -0,0 +1,85 @@
+from fastapi import APIRouter, HTTPException, Depends, UploadFile, File
+from sqlalchemy.orm import Session
+
+from database import schemas
+from importacao import PlanilhaInvalida, ler_planilha, importar_curriculo, importar_professor_disciplinas
+import tarefas
+from routes.tarefas import aceita
+from utils import get_db
+
+router = APIRouter(prefix="/importar", tags=["Importações"])
+
+
+def _ler(arquivo: UploadFile):
+    conteudo = arquivo.file.read()
+    try:
+        return ler_planilha(conteudo, arquivo.filename)
+    except PlanilhaInvalida as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _enfileirar(db: Session, tipo: str, arquivo: UploadFile, parametros: dict):
+    entrada = (arquivo.filename, arquivo.content_type, arquivo.file.read())
+    return aceita(tarefas.enfileirar(db, tipo, parametros, entrada=entrada))
+
+
+def _planilha_da_tarefa(db: Session, contexto: tarefas.Contexto):
+    entrada = contexto.entrada(db)
+    return ler_planilha(entrada.conteudo, entrada.nome)
+
+
+@router.post("/curriculo", response_model=schemas.ImportacaoRelatorio)
+def importar_curriculo_planilha(
+    arquivo: UploadFile = File(...),
+    dry_run: bool = True,
+    remover_ausentes: bool = False,
+    em_segundo_plano: bool = False,
+    db: Session = Depends(get_db),
+):
+    """
+    Importa disciplinas, turmas e vínculos turma-disciplina (com carga semanal) de um CSV/XLSX.
+    Por padrão executa em dry-run e apenas retorna o relatório de diferenças.
+    Com em_segundo_plano=true responde 202 com a tarefa, cujo resultado é o relatório.
+    """
+    if em_segundo_plano:
+        return _enfileirar(db, "importar.curriculo", arquivo, {"dry_run": dry_run, "remover_ausentes": remover_ausentes})
+    df = _ler(arquivo)
+    try:
+        return importar_curriculo(db, df, dry_run=dry_run, remover_ausentes=remover_ausentes)
+    except PlanilhaInvalida as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/professor-disciplinas", response_model=schemas.ImportacaoRelatorio)
+def importar_professor_disciplinas_planilha(
+    arquivo: UploadFile = File(...),
+    dry_run: bool = True,
+    em_segundo_plano: bool = False,
+    db: Session = Depends(get_db),
+):
+    """
+    Importa vínculos professor-disciplina de um CSV/XLSX (professor por username ou email).
+    Por padrão executa em dry-run e apenas retorna o relatório de diferenças.
+    Com em_segundo_plano=true responde 202 com a tarefa, cujo resultado é o relatório.
+    """
+    if em_segundo_plano:
+        return _enfileirar(db, "importar.professor_disciplinas", arquivo, {"dry_run": dry_run})
+    df = _ler(arquivo)
+    try:
+        return importar_professor_disciplinas(db, df, dry_run=dry_run)
+    except PlanilhaInvalida as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@tarefas.tipo("importar.curriculo")
+def _executar_importar_curriculo(db: Session, contexto: tarefas.Contexto):
+    return importar_curriculo(
+        db, _planilha_da_tarefa(db, contexto), progresso=contexto.progresso, **contexto.parametros,
+    )
+
+
+@tarefas.tipo("importar.professor_disciplinas")
+def _executar_importar_professor_disciplinas(db: Session, contexto: tarefas.Contexto):
+    return importar_professor_disciplinas(
+        db, _planilha_da_tarefa(db, contexto), progresso=contexto.progresso, **contexto.parametros,
+    )
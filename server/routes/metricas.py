@@ -0,0 +1,21 @@
+from fastapi import APIRouter
+
+from database import schemas
+import compressao
+
+router = APIRouter(prefix="/metricas", tags=["Métricas"])
+
+
+@router.get("/payload", response_model=schemas.MetricasPayload)
+def read_metricas_payload():
+    """Tamanho das respostas por rota (antes e depois da compressão), neste processo."""
+    return {
+        "codificacoes": list(compressao.codificacoes_disponiveis()),
+        "tamanho_minimo": compressao.COMPRESSAO_TAMANHO_MINIMO,
+        "rotas": compressao.metricas.resumo(),
+    }
+
+
+@router.delete("/payload", status_code=204)
+def reset_metricas_payload():
+    compressao.metricas.limpar()
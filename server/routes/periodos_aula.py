@@ -4,6 +4,9 @@ from typing import List, Optional
 
 from database import models, schemas
 import crud_new as crud
+import slots
+import tarefas
+from routes.tarefas import aceita
 from utils import get_db
 
 router = APIRouter(
@@ -80,6 +83,7 @@ def create_periodo_aula(periodo_aula: schemas.PeriodoAulaCreate, db: Session = D
     db.add(db_periodo)
     db.commit()
     db.refresh(db_periodo)
+    slots.recalcular_slots(db, db_periodo.turno_id)
     
     return db_periodo
 
@@ -144,11 +148,15 @@ def update_periodo_aula(periodo_id: int, periodo: schemas.PeriodoAulaUpdate, db:
             )
     
     # Atualizar o objeto
+    turno_anterior = db_periodo.turno_id
     for key, value in update_data.items():
         setattr(db_periodo, key, value)
     
     db.commit()
     db.refresh(db_periodo)
+    slots.recalcular_slots(db, turno_anterior)
+    if db_periodo.turno_id != turno_anterior:
+        slots.recalcular_slots(db, db_periodo.turno_id)
     
     return db_periodo
 
@@ -158,8 +166,10 @@ def delete_periodo_aula(periodo_id: int, db: Session = Depends(get_db)):
     if db_periodo is None:
         raise HTTPException(status_code=404, detail="Período de aula não encontrado")
     
+    turno_id = db_periodo.turno_id
     db.delete(db_periodo)
     db.commit()
+    slots.recalcular_slots(db, turno_id)
     
     return None
 
@@ -174,11 +184,13 @@ def auto_gerar_periodos_aula(
     hora_almoco_inicio: Optional[str] = None,
     hora_almoco_fim: Optional[str] = None,
     turma_id: Optional[int] = None,
+    em_segundo_plano: bool = False,
     db: Session = Depends(get_db)
 ):
     """
     Gera automaticamente períodos de aula para um turno com base nos parâmetros fornecidos.
     Inclui intervalo e almoço se especificados.
+    Com em_segundo_plano=true responde 202 com a tarefa (ver /tarefas).
     """
     import datetime
     
@@ -192,6 +204,19 @@ def auto_gerar_periodos_aula(
         turma = db.query(models.Turma).filter(models.Turma.id == turma_id).first()
         if not turma:
             raise HTTPException(status_code=404, detail="Turma não encontrada")
+
+    if em_segundo_plano:
+        return aceita(tarefas.enfileirar(db, "periodos_aula.auto_gerar", {
+            "turno_id": turno_id,
+            "quantidade_aulas": quantidade_aulas,
+            "duracao_aula_minutos": duracao_aula_minutos,
+            "intervalo_minutos": intervalo_minutos,
+            "horario_intervalo": horario_intervalo,
+            "descricao_intervalo": descricao_intervalo,
+            "hora_almoco_inicio": hora_almoco_inicio,
+            "hora_almoco_fim": hora_almoco_fim,
+            "turma_id": turma_id,
+        }))
     
     # Calcular duração da aula
     duracao_aula = datetime.timedelta(minutes=duracao_aula_minutos)
@@ -280,6 +305,8 @@ def auto_gerar_periodos_aula(
     db.commit()
     for periodo in periodos_criados:
         db.refresh(periodo)
+    for turno in {p.turno_id for p in periodos_criados}:
+        slots.recalcular_slots(db, turno)
     
     return periodos_criados
 
@@ -288,11 +315,13 @@ def clonar_periodos_aula(
     turno_origem_id: int, 
     turno_destino_id: Optional[int] = None,
     turma_destino_id: Optional[int] = None,
+    em_segundo_plano: bool = False,
     db: Session = Depends(get_db)
 ):
     """
     Clona os períodos de aula de um turno para outro turno ou para uma turma específica.
     Se turno_destino_id não for fornecido, usa o mesmo turno de origem.
+    Com em_segundo_plano=true responde 202 com a tarefa (ver /tarefas).
     """
     # Verificar se o turno de origem existe
     turno_origem = db.query(models.Turno).filter(models.Turno.id == turno_origem_id).first()
@@ -312,6 +341,13 @@ def clonar_periodos_aula(
         turma_destino = db.query(models.Turma).filter(models.Turma.id == turma_destino_id).first()
         if not turma_destino:
             raise HTTPException(status_code=404, detail="Turma de destino não encontrada")
+
+    if em_segundo_plano:
+        return aceita(tarefas.enfileirar(db, "periodos_aula.clonar", {
+            "turno_origem_id": turno_origem_id,
+            "turno_destino_id": turno_destino_id,
+            "turma_destino_id": turma_destino_id,
+        }))
     
     # Obter períodos do turno de origem
     periodos_origem = db.query(models.PeriodoAula).filter(
@@ -357,9 +393,21 @@ def clonar_periodos_aula(
     db.commit()
     for periodo in periodos_clonados:
         db.refresh(periodo)
+    slots.recalcular_slots(db, turno_destino_id)
     
     return periodos_clonados
 
+# Poucas linhas em uma transação: sem pontos de progresso, não se cancelam depois de iniciadas
+@tarefas.tipo("periodos_aula.auto_gerar", cancelavel=False)
+def _executar_auto_gerar(db: Session, contexto: tarefas.Contexto):
+    periodos = auto_gerar_periodos_aula(db=db, **contexto.parametros)
+    return [schemas.PeriodoAula.model_validate(p) for p in periodos]
+
+@tarefas.tipo("periodos_aula.clonar", cancelavel=False)
+def _executar_clonar(db: Session, contexto: tarefas.Contexto):
+    periodos = clonar_periodos_aula(db=db, **contexto.parametros)
+    return [schemas.PeriodoAula.model_validate(p) for p in periodos]
+
 @router.post("/batch", response_model=List[schemas.PeriodoAula])
 def create_periodos_aula_batch(periodos_aula: List[schemas.PeriodoAulaCreate], db: Session = Depends(get_db)):
     """
@@ -452,5 +500,7 @@ def create_periodos_aula_batch(periodos_aula: List[schemas.PeriodoAulaCreate], d
     db.commit()
     for periodo in periodos_criados:
         db.refresh(periodo)
+    for turno in {p.turno_id for p in periodos_criados}:
+        slots.recalcular_slots(db, turno)
     
     return periodos_criados
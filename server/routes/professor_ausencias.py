@@ -0,0 +1,49 @@
+from datetime import date
+from typing import List, Optional
+
+from fastapi import APIRouter, HTTPException, Depends
+from sqlalchemy.orm import Session
+
+from database import schemas
+import crud_new as crud
+from utils import get_db
+
+router = APIRouter(prefix="/professor-ausencias", tags=["Professor-Ausências"])
+
+
+def _validar_faixa(hora_inicio, hora_fim):
+    if (hora_inicio is None) != (hora_fim is None):
+        raise HTTPException(status_code=400, detail="Informe hora de início e de fim, ou nenhuma (dia inteiro)")
+    if hora_inicio is not None and hora_fim <= hora_inicio:
+        raise HTTPException(status_code=400, detail="Hora de fim deve ser posterior à hora de início")
+
+@router.post("/", response_model=schemas.ProfessorAusencia)
+def create_professor_ausencia(a: schemas.ProfessorAusenciaCreate, db: Session = Depends(get_db)):
+    if not crud.get_professor(db, a.professor_id):
+        raise HTTPException(status_code=404, detail="Professor não encontrado")
+    _validar_faixa(a.hora_inicio, a.hora_fim)
+    return crud.create_professor_ausencia(db, a)
+
+@router.get("/", response_model=List[schemas.ProfessorAusencia])
+def list_professor_ausencias(
+    professor_id: Optional[int] = None,
+    data_inicio: Optional[date] = None,
+    data_fim: Optional[date] = None,
+    db: Session = Depends(get_db),
+):
+    return crud.get_professor_ausencias(db, professor_id=professor_id, data_inicio=data_inicio, data_fim=data_fim)
+
+@router.put("/{ausencia_id}", response_model=schemas.ProfessorAusencia)
+def update_professor_ausencia(ausencia_id: int, a: schemas.ProfessorAusenciaUpdate, db: Session = Depends(get_db)):
+    atual = crud.get_professor_ausencia(db, ausencia_id)
+    if not atual:
+        raise HTTPException(status_code=404, detail="Ausência não encontrada")
+    dados = a.model_dump(exclude_unset=True)
+    _validar_faixa(dados.get("hora_inicio", atual.hora_inicio), dados.get("hora_fim", atual.hora_fim))
+    return crud.update_professor_ausencia(db, ausencia_id, a)
+
+@router.delete("/{ausencia_id}", status_code=204)
+def delete_professor_ausencia(ausencia_id: int, db: Session = Depends(get_db)):
+    if not crud.delete_professor_ausencia(db, ausencia_id):
+        raise HTTPException(status_code=404, detail="Ausência não encontrada")
+    return None
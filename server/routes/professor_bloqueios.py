@@ -34,6 +34,17 @@ def list_bloqueios_por_professor(professor_id: int, db: Session = Depends(get_db
         raise HTTPException(status_code=404, detail="Professor não encontrado")
     return crud.get_professor_bloqueios_por_professor(db, professor_id)
 
+@router.put("/por-professor/{professor_id}", response_model=List[schemas.ProfessorBloqueio])
+def replace_bloqueios_por_professor(professor_id: int, itens: List[schemas.ProfessorBloqueioItem], db: Session = Depends(get_db)):
+    """Substitui todo o conjunto semanal de bloqueios do professor em uma transação e retorna o novo conjunto."""
+    professor = crud.get_professor(db, professor_id)
+    if not professor:
+        raise HTTPException(status_code=404, detail="Professor não encontrado")
+    for item in itens:
+        if item.hora_fim <= item.hora_inicio:
+            raise HTTPException(status_code=400, detail="Hora de fim deve ser posterior à hora de início")
+    return crud.substituir_professor_bloqueios(db, professor_id, itens)
+
 @router.put("/{bloqueio_id}", response_model=schemas.ProfessorBloqueio)
 def update_professor_bloqueio(bloqueio_id: int, b: schemas.ProfessorBloqueioUpdate, db: Session = Depends(get_db)):
     atual = crud.update_professor_bloqueio(db, bloqueio_id, b)
@@ -34,6 +34,17 @@ def list_disponibilidades_por_professor(professor_id: int, db: Session = Depends
         raise HTTPException(status_code=404, detail="Professor não encontrado")
     return crud.get_professor_disponibilidades_por_professor(db, professor_id)
 
+@router.put("/por-professor/{professor_id}", response_model=List[schemas.ProfessorDisponibilidade])
+def replace_disponibilidades_por_professor(professor_id: int, itens: List[schemas.ProfessorDisponibilidadeItem], db: Session = Depends(get_db)):
+    """Substitui todo o conjunto semanal de disponibilidades do professor em uma transação e retorna o novo conjunto."""
+    professor = crud.get_professor(db, professor_id)
+    if not professor:
+        raise HTTPException(status_code=404, detail="Professor não encontrado")
+    for item in itens:
+        if item.hora_fim <= item.hora_inicio:
+            raise HTTPException(status_code=400, detail="Hora de fim deve ser posterior à hora de início")
+    return crud.substituir_professor_disponibilidades(db, professor_id, itens)
+
 @router.put("/{disp_id}", response_model=schemas.ProfessorDisponibilidade)
 def update_professor_disponibilidade(disp_id: int, d: schemas.ProfessorDisponibilidadeUpdate, db: Session = Depends(get_db)):
     atual = crud.update_professor_disponibilidade(db, disp_id, d)
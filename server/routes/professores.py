@@ -4,6 +4,7 @@ from typing import List
 
 from database import models, schemas
 import crud_new as crud
+import serializacao
 from database.database import SessionLocal
 
 router = APIRouter(prefix="/professores", tags=["Professores"])
@@ -70,5 +71,4 @@ def read_disciplinas_professor(professor_id: int, db: Session = Depends(get_db))
 
 @router.get("/{professor_id}/horarios/", response_model=List[schemas.Horario])
 def read_horarios_professor(professor_id: int, db: Session = Depends(get_db)):
-    horarios = crud.get_horarios_professor(db, professor_id=professor_id)
-    return horarios
+    return serializacao.resposta_horarios(db, professor_id=professor_id)
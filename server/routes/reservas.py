@@ -1,9 +1,11 @@
 from fastapi import APIRouter, HTTPException, Depends
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+from datetime import date
 
 from database import models, schemas
 import crud_new as crud
+from restricoes import ConflitoSobreposicao
 from database.database import SessionLocal
 
 router = APIRouter(prefix="/reservas", tags=["Reservas de Espaço"])
@@ -31,17 +33,37 @@ def create_reserva(reserva: schemas.ReservaEspacoCreate, solicitante_id: int, db
     
     if conflito:
         raise HTTPException(status_code=400, detail="Já existe uma reserva neste horário")
+
+    if crud.verificar_aula_no_espaco(
+        db, reserva.espaco_id, reserva.data_reserva,
+        reserva.hora_inicio, reserva.hora_fim
+    ):
+        raise HTTPException(status_code=400, detail="Espaço ocupado por aula neste horário")
     
-    return crud.create_reserva(db=db, reserva=reserva, solicitante_id=solicitante_id)
+    try:
+        return crud.create_reserva(db=db, reserva=reserva, solicitante_id=solicitante_id)
+    except ConflitoSobreposicao as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/", response_model=List[schemas.ReservaEspaco])
-def read_reservas(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    reservas = crud.get_reservas(db, skip=skip, limit=limit)
+def read_reservas(
+    skip: int = 0,
+    limit: int = 100,
+    data_inicio: Optional[date] = None,
+    data_fim: Optional[date] = None,
+    db: Session = Depends(get_db),
+):
+    reservas = crud.get_reservas(db, skip=skip, limit=limit, data_inicio=data_inicio, data_fim=data_fim)
     return reservas
 
 @router.get("/usuarios/{usuario_id}/", response_model=List[schemas.ReservaEspaco])
-def read_reservas_usuario(usuario_id: int, db: Session = Depends(get_db)):
-    reservas = crud.get_reservas_usuario(db, usuario_id=usuario_id)
+def read_reservas_usuario(
+    usuario_id: int,
+    data_inicio: Optional[date] = None,
+    data_fim: Optional[date] = None,
+    db: Session = Depends(get_db),
+):
+    reservas = crud.get_reservas_usuario(db, usuario_id=usuario_id, data_inicio=data_inicio, data_fim=data_fim)
     return reservas
 
 @router.put("/{reserva_id}/status")
@@ -51,7 +73,10 @@ def update_reserva_status(
     aprovador_id: int, 
     db: Session = Depends(get_db)
 ):
-    db_reserva = crud.update_reserva_status(db, reserva_id=reserva_id, status=status, aprovador_id=aprovador_id)
+    try:
+        db_reserva = crud.update_reserva_status(db, reserva_id=reserva_id, status=status, aprovador_id=aprovador_id)
+    except ConflitoSobreposicao as e:
+        raise HTTPException(status_code=400, detail=str(e))
     if db_reserva is None:
         raise HTTPException(status_code=404, detail="Reserva não encontrada")
     return {"message": f"Reserva {status.value} com sucesso"}
@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from typing import Optional
+
+from database import schemas
+import sincronizacao
+from utils import get_db
+
+router = APIRouter(tags=["Sincronização"])
+
+
+@router.get("/sync", response_model=schemas.SyncResposta)
+def sync(
+    since: Optional[int] = None,
+    limite: int = Query(sincronizacao.LIMITE_PADRAO, ge=1, le=50000),
+    db: Session = Depends(get_db),
+):
+    """
+    Alterações em turnos, turmas, disciplinas, horários, períodos de aula e
+    reservas desde o token `since`: linhas atuais em `upserts` e ids removidos
+    em `removidos`, por tabela. Use o `token` devolvido na próxima chamada;
+    com `tem_mais` verdadeiro, chame de novo imediatamente. Tabelas em
+    `recarregar` devem ser buscadas por completo (primeira chamada, token
+    expirado ou operação em lote).
+    """
+    return sincronizacao.alteracoes_desde(db, since, limite=limite)
@@ -0,0 +1,100 @@
+import os
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi.responses import FileResponse, JSONResponse
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.orm import Session
+
+from database import models, schemas
+import seed_curriculo
+import tarefas
+from utils import get_db
+
+router = APIRouter(prefix="/tarefas", tags=["Tarefas"])
+
+
+def aceita(tarefa: models.Tarefa) -> JSONResponse:
+    """Resposta 202 das rotas que enfileiram trabalho, apontando para o acompanhamento."""
+    return JSONResponse(
+        status_code=202,
+        content=jsonable_encoder(schemas.Tarefa.model_validate(tarefa)),
+        headers={"Location": f"/tarefas/{tarefa.id}"},
+    )
+
+
+@tarefas.tipo("seed_curriculo", cancelavel=False)
+def _executar_seed(db: Session, contexto: tarefas.Contexto):
+    seed_curriculo.run()
+
+
+def _get_tarefa(db: Session, tarefa_id: int) -> models.Tarefa:
+    tarefa = db.get(models.Tarefa, tarefa_id)
+    if tarefa is None:
+        raise HTTPException(status_code=404, detail="Tarefa não encontrada")
+    return tarefa
+
+
+@router.get("/", response_model=List[schemas.Tarefa])
+def read_tarefas(
+    skip: int = 0,
+    limit: int = 100,
+    status: Optional[schemas.StatusTarefaEnum] = None,
+    tipo: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    T = models.Tarefa
+    query = db.query(T)
+    if status:
+        query = query.filter(T.status == models.StatusTarefaEnum(status.value))
+    if tipo:
+        query = query.filter(T.tipo == tipo)
+    return query.order_by(T.id.desc()).offset(skip).limit(limit).all()
+
+
+@router.post("/seed-curriculo", response_model=schemas.Tarefa, status_code=202)
+def enfileirar_seed_curriculo(db: Session = Depends(get_db)):
+    """Reaplica o seed do currículo (turnos, disciplinas, turmas e períodos) em segundo plano."""
+    return aceita(tarefas.enfileirar(db, "seed_curriculo"))
+
+
+@router.get("/{tarefa_id}", response_model=schemas.Tarefa)
+def read_tarefa(tarefa_id: int, db: Session = Depends(get_db)):
+    """Status, progresso (0 a 1), tentativas e, ao concluir, o resultado ou o erro da tarefa."""
+    return _get_tarefa(db, tarefa_id)
+
+
+@router.post("/{tarefa_id}/cancelar", response_model=schemas.Tarefa)
+def cancelar_tarefa(tarefa_id: int, db: Session = Depends(get_db)):
+    """
+    Cancela a tarefa pendente; em execução, o cancelamento é atendido no
+    próximo registro de progresso. Períodos de aula e seed do currículo não
+    registram progresso e, depois de iniciados, não podem ser cancelados (409).
+    """
+    tarefa = _get_tarefa(db, tarefa_id)
+    if tarefa.status not in (models.StatusTarefaEnum.PENDENTE, models.StatusTarefaEnum.EXECUTANDO):
+        raise HTTPException(status_code=400, detail="Tarefa já encerrada")
+    if tarefa.status == models.StatusTarefaEnum.EXECUTANDO and not tarefas.cancelavel_em_execucao(tarefa.tipo):
+        raise HTTPException(status_code=409, detail="Tarefa em execução não pode ser cancelada")
+    return tarefas.cancelar(db, tarefa)
+
+
+@router.get("/{tarefa_id}/arquivo")
+def baixar_arquivo_tarefa(tarefa_id: int, db: Session = Depends(get_db)):
+    """Arquivo gerado pela tarefa (exportações), transmitido do disco em blocos."""
+    _get_tarefa(db, tarefa_id)
+    arquivo = tarefas.arquivo(db, tarefa_id, "saida")
+    if arquivo is None:
+        raise HTTPException(status_code=404, detail="Tarefa sem arquivo gerado")
+    if arquivo.caminho:
+        if not os.path.exists(arquivo.caminho):
+            raise HTTPException(status_code=404, detail="Arquivo da tarefa não está mais disponível")
+        return FileResponse(
+            arquivo.caminho, media_type=arquivo.media_type or "application/octet-stream", filename=arquivo.nome,
+        )
+    # Arquivos gravados no banco por versões anteriores
+    return Response(
+        content=arquivo.conteudo,
+        media_type=arquivo.media_type or "application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="{arquivo.nome}"'},
+    )
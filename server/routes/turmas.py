@@ -4,6 +4,7 @@ from typing import List
 
 from database import models, schemas
 import crud_new as crud
+import serializacao
 from database.database import SessionLocal
 
 router = APIRouter(prefix="/turmas", tags=["Turmas"])
@@ -48,5 +49,4 @@ def delete_turma(turma_id: int, db: Session = Depends(get_db)):
 
 @router.get("/{turma_id}/horarios/", response_model=List[schemas.Horario])
 def read_horarios_turma(turma_id: int, db: Session = Depends(get_db)):
-    horarios = crud.get_horarios_turma(db, turma_id=turma_id)
-    return horarios
+    return serializacao.resposta_horarios(db, turma_id=turma_id)
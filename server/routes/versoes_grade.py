@@ -0,0 +1,84 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+
+from database import models, schemas
+import crud_new as crud
+from restricoes import ConflitoSobreposicao
+import versoes_grade
+from utils import get_db
+
+router = APIRouter(prefix="/versoes-grade", tags=["Versões da Grade"])
+
+
+def _get_versao(db: Session, versao_id: int) -> models.VersaoGrade:
+    versao = db.get(models.VersaoGrade, versao_id)
+    if versao is None:
+        raise HTTPException(status_code=404, detail="Versão não encontrada")
+    return versao
+
+
+@router.post("/", response_model=schemas.VersaoGrade)
+def create_versao_grade(dados: schemas.VersaoGradeCreate, db: Session = Depends(get_db)):
+    """Salva os horários atuais do turno (ou de todos, sem turno_id) como uma versão nomeada."""
+    if dados.turno_id is not None and not crud.get_turno(db, dados.turno_id):
+        raise HTTPException(status_code=404, detail="Turno não encontrado")
+    if db.query(models.VersaoGrade.id).filter(models.VersaoGrade.nome == dados.nome).first():
+        raise HTTPException(status_code=400, detail="Já existe uma versão com este nome")
+    return versoes_grade.criar_versao(db, dados.nome, dados.descricao, dados.turno_id)
+
+
+@router.get("/", response_model=List[schemas.VersaoGrade])
+def read_versoes_grade(turno_id: Optional[int] = None, db: Session = Depends(get_db)):
+    V = models.VersaoGrade
+    query = db.query(V)
+    if turno_id is not None:
+        query = query.filter(V.turno_id == turno_id)
+    return query.order_by(V.id.desc()).all()
+
+
+@router.get("/{versao_id}", response_model=schemas.VersaoGrade)
+def read_versao_grade(versao_id: int, db: Session = Depends(get_db)):
+    return _get_versao(db, versao_id)
+
+
+@router.get("/{versao_id}/horarios", response_model=List[schemas.HorarioVersao])
+def read_horarios_versao(versao_id: int, db: Session = Depends(get_db)):
+    return versoes_grade.horarios(versoes_grade.grade_versao(_get_versao(db, versao_id)))
+
+
+@router.get("/{versao_id}/diff", response_model=schemas.DiferencaGrade)
+def diff_versao_grade(versao_id: int, com: Optional[int] = None, db: Session = Depends(get_db)):
+    """
+    Diferença da versão para a versão `com` ou, sem ela, para a grade atual
+    do mesmo escopo: horários adicionados, removidos e alterados (por campo).
+    """
+    base = _get_versao(db, versao_id)
+    alvo = _get_versao(db, com) if com is not None else None
+    return versoes_grade.diferenca(db, base, alvo)
+
+
+@router.post("/{versao_id}/restaurar", response_model=schemas.RestauracaoVersao)
+def restaurar_versao_grade(versao_id: int, db: Session = Depends(get_db)):
+    """
+    Volta os horários do escopo da versão ao estado salvo, numa transação
+    (só as linhas diferentes são reescritas, com os ids originais; exceções
+    datadas dos horários alterados são mantidas se a data ainda cair no dia
+    da semana do horário, senão vêm em `excecoes_descartadas`). Retorna o
+    que mudou.
+    """
+    versao = _get_versao(db, versao_id)
+    try:
+        return versoes_grade.restaurar(db, versao)
+    except versoes_grade.VersaoIncompativel as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ConflitoSobreposicao as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.delete("/{versao_id}", status_code=204)
+def delete_versao_grade(versao_id: int, db: Session = Depends(get_db)):
+    db.delete(_get_versao(db, versao_id))
+    db.commit()
+    return None
@@ -4,6 +4,7 @@ from typing import Dict
 from database.database import SessionLocal
 from database import models, schemas
 import crud_new as crud
+import slots
 
 # -----------------------------
 # Dados do currículo por trilha
@@ -304,6 +305,7 @@ def run():
         # Aplicar períodos aos turnos
         upsert_periodos(turnos_cache["INTEGRAL"], integral_blocos)
         upsert_periodos(turnos_cache["VESPERTINO"], vespertino_blocos)
+        slots.recalcular_slots(db)
 
         print("==> Seed concluído com sucesso.")
     finally:
@@ -0,0 +1,112 @@
+"""Serialização rápida das listas grandes de horários.
+
+O caminho padrão (`response_model=List[schemas.Horario]`) carrega um objeto
+ORM por horário, valida cada um com `from_attributes` (incluindo professor,
+disciplina, turma e turno aninhados, repetidos em cada linha), e depois o
+FastAPI valida e codifica tudo de novo.
+
+Aqui os horários vêm como tuplas de colunas; cada professor, disciplina,
+turma e turno distinto é validado e convertido para JSON uma única vez e
+reutilizado em todas as linhas que o referenciam. A lista final é gravada em
+bytes pelo serializador do pydantic-core (`TypeAdapter.dump_json`) a partir de
+um TypedDict, sem validação. A saída é idêntica à do schema `Horario`
+(ver benchmark_serializacao.py).
+"""
+from datetime import datetime, time
+from typing import Any, Dict, Iterable, List, Optional
+
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+from sqlalchemy.orm import Session
+from typing_extensions import TypedDict
+
+from database import models, schemas
+import crud_new as crud
+
+
+class HorarioLinha(TypedDict):
+    # Mesma ordem de campos de schemas.Horario
+    professor_id: int
+    disciplina_id: int
+    turma_id: int
+    turno_id: int
+    dia_semana: str
+    hora_inicio: time
+    hora_fim: time
+    sala: Optional[str]
+    espaco_id: Optional[int]
+    observacoes: Optional[str]
+    id: int
+    slot: Optional[int]
+    created_at: datetime
+    updated_at: Optional[datetime]
+    professor: Dict[str, Any]
+    disciplina: Dict[str, Any]
+    turma: Dict[str, Any]
+    turno: Dict[str, Any]
+
+
+_adaptador_horarios = TypeAdapter(List[HorarioLinha])
+
+COLUNAS_HORARIO = [
+    "professor_id", "disciplina_id", "turma_id", "turno_id", "dia_semana",
+    "hora_inicio", "hora_fim", "sala", "espaco_id", "observacoes", "id", "slot",
+    "created_at", "updated_at",
+]
+
+
+def _aninhados(db: Session, modelo, schema: BaseModel, ids: Iterable[int]) -> Dict[int, dict]:
+    """Entidades referenciadas, cada uma validada e convertida para JSON uma vez."""
+    ids = set(ids)
+    if not ids:
+        return {}
+    return {
+        obj.id: schema.model_validate(obj).model_dump(mode="json")
+        for obj in db.query(modelo).filter(modelo.id.in_(ids)).all()
+    }
+
+
+def horarios_linhas(
+    db: Session,
+    skip: int = 0,
+    limit: Optional[int] = None,
+    **filtros,
+) -> List[HorarioLinha]:
+    """Horários no formato de schemas.Horario, montados a partir de tuplas de colunas."""
+    query = (
+        db.query(*[getattr(models.Horario, c) for c in COLUNAS_HORARIO])
+        .filter(*crud.predicados_horarios(**filtros))
+        .order_by(models.Horario.id)
+    )
+    if skip:
+        query = query.offset(skip)
+    if limit is not None:
+        query = query.limit(limit)
+    linhas = query.all()
+
+    professores = _aninhados(db, models.Professor, schemas.ProfessorSemHorarios, (l.professor_id for l in linhas))
+    disciplinas = _aninhados(db, models.Disciplina, schemas.Disciplina, (l.disciplina_id for l in linhas))
+    turmas = _aninhados(db, models.Turma, schemas.Turma, (l.turma_id for l in linhas))
+    turnos = _aninhados(db, models.Turno, schemas.Turno, (l.turno_id for l in linhas))
+
+    resultado = []
+    for l in linhas:
+        item = l._asdict()
+        item["dia_semana"] = l.dia_semana.value
+        item["professor"] = professores[l.professor_id]
+        item["disciplina"] = disciplinas[l.disciplina_id]
+        item["turma"] = turmas[l.turma_id]
+        item["turno"] = turnos[l.turno_id]
+        resultado.append(item)
+    return resultado
+
+
+def horarios_json(db: Session, skip: int = 0, limit: Optional[int] = None, **filtros) -> bytes:
+    return _adaptador_horarios.dump_json(horarios_linhas(db, skip=skip, limit=limit, **filtros))
+
+
+def resposta_horarios(db: Session, skip: int = 0, limit: Optional[int] = None, **filtros) -> Response:
+    return Response(
+        content=horarios_json(db, skip=skip, limit=limit, **filtros),
+        media_type="application/json",
+    )
@@ -0,0 +1,221 @@
+"""Sincronização incremental ("alterações desde") com log de alterações.
+
+Toda escrita em uma das TABELAS_SYNC grava, na mesma transação, uma linha em
+`registro_alteracoes` (tabela, id do registro, operação). O id dessa linha é o
+token monotônico devolvido pelo /sync. Exclusões ficam registradas como
+lápides (`delete`), então clientes e caches recebem também o que sumiu.
+
+Para que um token lido nunca "pule" uma transação ainda não confirmada com id
+menor, no Postgres as linhas do log são inseridas no fim da transação sob um
+advisory lock de transação: os ids passam a seguir a ordem de commit. No
+SQLite as escritas já são serializadas.
+
+Uso (poda do log):
+    python sincronizacao.py podar --dias 30
+"""
+import argparse
+import enum
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import delete, event, func, insert, inspect, select, text
+from sqlalchemy.orm import Session
+
+from database import models
+
+TABELAS_SYNC = {
+    "turnos": models.Turno,
+    "turmas": models.Turma,
+    "disciplinas": models.Disciplina,
+    "horarios": models.Horario,
+    "periodos_aula": models.PeriodoAula,
+    "reservas_espaco": models.ReservaEspaco,
+}
+
+LIMITE_PADRAO = 5000
+# Chave do pg_advisory_xact_lock que ordena as inserções no log
+CHAVE_LOCK_LOG = 730_001
+
+_CHAVE_SESSAO = "alteracoes_sync"
+
+
+def _pendentes(session: Session) -> Dict[tuple, str]:
+    return session.info.setdefault(_CHAVE_SESSAO, {})
+
+
+def _registrar(session: Session, tabela: str, registro_id: Optional[int], operacao: str) -> None:
+    pendentes = _pendentes(session)
+    chave = (tabela, registro_id)
+    anterior = pendentes.get(chave)
+    if anterior == "insert" and operacao == "update":
+        return
+    if anterior == "insert" and operacao == "delete":
+        # Criado e removido na mesma transação: ninguém chegou a ver
+        del pendentes[chave]
+        return
+    pendentes.pop(chave, None)  # reinsere no fim, preservando a ordem
+    pendentes[chave] = operacao
+
+
+@event.listens_for(Session, "after_flush")
+def _coletar_flush(session, flush_context):
+    for operacao, objetos in (("insert", session.new), ("update", session.dirty), ("delete", session.deleted)):
+        for obj in objetos:
+            tabela = inspect(obj).mapper.local_table.name
+            if tabela not in TABELAS_SYNC:
+                continue
+            if operacao == "update" and not session.is_modified(obj, include_collections=False):
+                continue
+            _registrar(session, tabela, obj.id, operacao)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _coletar_em_lote(orm_execute_state):
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    tabela = orm_execute_state.statement.table.name
+    if tabela not in TABELAS_SYNC:
+        return
+    session = orm_execute_state.session
+    parametros = orm_execute_state.parameters
+    statement = orm_execute_state.statement
+    if orm_execute_state.is_update and isinstance(parametros, list) and all("id" in p for p in parametros):
+        for p in parametros:
+            _registrar(session, tabela, p["id"], "update")
+    elif not orm_execute_state.is_insert and statement.whereclause is not None:
+        # update/delete com critério: os ids afetados são lidos antes da execução
+        modelo = TABELAS_SYNC[tabela]
+        operacao = "delete" if orm_execute_state.is_delete else "update"
+        ids = session.execute(select(modelo.id).where(statement.whereclause)).scalars().all()
+        for registro_id in ids:
+            _registrar(session, tabela, registro_id, operacao)
+    else:
+        _registrar(session, tabela, None, "recarregar")
+
+
+@event.listens_for(Session, "before_commit")
+def _gravar_log(session):
+    session.flush()
+    pendentes = session.info.pop(_CHAVE_SESSAO, None)
+    if not pendentes:
+        return
+    if session.get_bind().dialect.name == "postgresql":
+        session.execute(text("SELECT pg_advisory_xact_lock(:chave)"), {"chave": CHAVE_LOCK_LOG})
+    session.execute(
+        insert(models.RegistroAlteracao.__table__),
+        [
+            {"tabela": tabela, "registro_id": registro_id, "operacao": operacao}
+            for (tabela, registro_id), operacao in pendentes.items()
+        ],
+    )
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar(session):
+    session.info.pop(_CHAVE_SESSAO, None)
+
+
+def _linha(obj, colunas) -> dict:
+    dados = {}
+    for c in colunas:
+        v = getattr(obj, c)
+        dados[c] = v.value if isinstance(v, enum.Enum) else v
+    return dados
+
+
+def token_atual(db: Session) -> int:
+    return db.query(func.coalesce(func.max(models.RegistroAlteracao.id), 0)).scalar()
+
+
+def alteracoes_desde(db: Session, since: Optional[int], limite: int = LIMITE_PADRAO) -> dict:
+    """Linhas inseridas/alteradas e ids removidos desde o token `since`.
+
+    Sem `since` (ou com token anterior ao início do log retido) todas as tabelas
+    vêm em `recarregar`: o cliente faz a carga completa pelas rotas de listagem
+    e continua a partir do token devolvido.
+    """
+    R = models.RegistroAlteracao
+    primeiro = db.query(func.min(R.id)).scalar()
+    if since is None or (primeiro is not None and since < primeiro - 1):
+        return {
+            "token": token_atual(db),
+            "tem_mais": False,
+            "recarregar": sorted(TABELAS_SYNC),
+            "alteracoes": {},
+        }
+
+    registros = (
+        db.query(R.id, R.tabela, R.registro_id, R.operacao)
+        .filter(R.id > since)
+        .order_by(R.id)
+        .limit(limite + 1)
+        .all()
+    )
+    tem_mais = len(registros) > limite
+    registros = registros[:limite]
+    token = registros[-1].id if registros else since
+
+    ultima_operacao: Dict[str, Dict[int, str]] = {}
+    recarregar = set()
+    for _, tabela, registro_id, operacao in registros:
+        if operacao == "recarregar":
+            recarregar.add(tabela)
+        else:
+            ultima_operacao.setdefault(tabela, {})[registro_id] = operacao
+
+    alteracoes = {}
+    for tabela, operacoes in ultima_operacao.items():
+        if tabela in recarregar:
+            continue
+        modelo = TABELAS_SYNC[tabela]
+        colunas = [c.key for c in inspect(modelo).column_attrs]
+        vivos = [i for i, op in operacoes.items() if op != "delete"]
+        linhas = db.query(modelo).filter(modelo.id.in_(vivos)).all() if vivos else []
+        encontrados = {l.id for l in linhas}
+        # Alterado e depois removido além deste lote: também é remoção
+        removidos = sorted(i for i, op in operacoes.items() if op == "delete" or i not in encontrados)
+        alteracoes[tabela] = {
+            "upserts": [_linha(l, colunas) for l in linhas],
+            "removidos": removidos,
+        }
+
+    return {
+        "token": token,
+        "tem_mais": tem_mais,
+        "recarregar": sorted(recarregar),
+        "alteracoes": alteracoes,
+    }
+
+
+def podar(db: Session, dias: int) -> int:
+    """Remove entradas do log mais antigas que `dias`; clientes com token anterior recarregam tudo."""
+    limite = datetime.now(timezone.utc) - timedelta(days=dias)
+    R = models.RegistroAlteracao
+    # Mantém sempre a última entrada para o token atual continuar válido
+    ultimo = token_atual(db)
+    removidos = db.execute(
+        delete(R).where(R.created_at < limite, R.id < ultimo)
+    ).rowcount
+    db.commit()
+    return removidos
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    from database.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Manutenção do log de alterações do /sync")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    p_podar = sub.add_parser("podar", help="Remove entradas antigas do log")
+    p_podar.add_argument("--dias", type=int, default=30)
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        if args.comando == "podar":
+            print(f"{podar(db, args.dias)} entrada(s) removida(s)")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""Representação de horários por slot: (dia, índice da aula) em um inteiro.
+
+Um horário que coincide exatamente com um período de aula geral do turno
+(PeriodoAula do tipo AULA, sem turma específica) recebe
+`slot = dia * SLOTS_POR_DIA + (numero_aula - 1)`. Dentro de um turno, dois
+horários nesses slots conflitam se e somente se têm o mesmo slot, então a
+verificação vira igualdade de inteiros no banco e AND de bits em memória
+(`1 << slot` compõe a máscara semanal de ocupação).
+
+Horários fora da grade (períodos específicos de turma ou horários livres)
+ficam com slot nulo e continuam verificados por comparação de faixas. Turnos
+cujos períodos gerais se sobrepõem também não recebem slots.
+"""
+import enum
+from collections import defaultdict
+from datetime import time
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from cache import CacheVersionado
+from database import models
+
+SLOTS_POR_DIA = 32
+ORDEM_DIA = {d.value: i for i, d in enumerate(models.DiaSemanaEnum)}
+DIAS = [d.value for d in models.DiaSemanaEnum]
+
+_cache_grade = CacheVersionado(max_itens=64)
+
+
+def _valor_dia(dia_semana) -> str:
+    return dia_semana.value if isinstance(dia_semana, enum.Enum) else dia_semana
+
+
+def _montar_grade(db: Session, turno_id: int) -> Dict[Tuple[time, time], int]:
+    periodos = db.query(
+        models.PeriodoAula.numero_aula, models.PeriodoAula.hora_inicio, models.PeriodoAula.hora_fim,
+    ).filter(
+        models.PeriodoAula.turno_id == turno_id,
+        models.PeriodoAula.turma_id == None,
+        models.PeriodoAula.tipo == models.TipoPeriodoEnum.AULA,
+        models.PeriodoAula.ativo == True,
+    ).order_by(models.PeriodoAula.hora_inicio).all()
+
+    grade = {}
+    fim_anterior = None
+    for numero, inicio, fim in periodos:
+        if fim_anterior is not None and inicio < fim_anterior:
+            return {}
+        if not 1 <= numero <= SLOTS_POR_DIA or numero - 1 in grade.values():
+            return {}
+        grade[(inicio, fim)] = numero - 1
+        fim_anterior = fim
+    return grade
+
+
+def grade_turno(db: Session, turno_id: int) -> Dict[Tuple[time, time], int]:
+    """{(hora_inicio, hora_fim): índice da aula} dos períodos gerais do turno (em cache)."""
+    return _cache_grade.obter(turno_id, ("periodos_aula",), lambda: _montar_grade(db, turno_id))
+
+
+def calcular_slot(db: Session, turno_id: int, dia_semana, hora_inicio: time, hora_fim: time) -> Optional[int]:
+    indice = grade_turno(db, turno_id).get((hora_inicio, hora_fim))
+    if indice is None:
+        return None
+    return ORDEM_DIA[_valor_dia(dia_semana)] * SLOTS_POR_DIA + indice
+
+
+def dia_e_indice(slot: int) -> Tuple[str, int]:
+    return DIAS[slot // SLOTS_POR_DIA], slot % SLOTS_POR_DIA
+
+
+def bit(slot: int) -> int:
+    return 1 << slot
+
+
+def recalcular_slots(db: Session, turno_id: Optional[int] = None) -> int:
+    """Recalcula o slot dos horários (após mudanças nos períodos). Retorna quantos mudaram."""
+    query = db.query(
+        models.Horario.id, models.Horario.professor_id, models.Horario.turma_id,
+        models.Horario.turno_id, models.Horario.dia_semana,
+        models.Horario.hora_inicio, models.Horario.hora_fim, models.Horario.slot,
+    )
+    if turno_id is not None:
+        query = query.filter(models.Horario.turno_id == turno_id)
+    alterados = []
+    ocupados = set()
+    for h in query.order_by(models.Horario.id).all():
+        slot = calcular_slot(db, h.turno_id, h.dia_semana, h.hora_inicio, h.hora_fim)
+        if slot is not None:
+            chaves = {("p", h.professor_id, h.turno_id, slot), ("t", h.turma_id, h.turno_id, slot)}
+            # Conflitos gravados antes das restrições ficam fora da grade (slot
+            # nulo) para não violar os índices únicos
+            if chaves & ocupados:
+                slot = None
+            else:
+                ocupados |= chaves
+        if slot != h.slot:
+            alterados.append({"id": h.id, "slot": slot})
+    if alterados:
+        # Zera antes de gravar para não colidir nos índices únicos durante a troca
+        db.execute(update(models.Horario), [{"id": a["id"], "slot": None} for a in alterados])
+        db.execute(update(models.Horario), alterados)
+        db.commit()
+    return len(alterados)
+
+
+class Ocupacao:
+    """Máscaras semanais de ocupação (bit `slot`) por professor, turma e sala, por turno."""
+
+    def __init__(self):
+        self.professores: Dict[Tuple[int, int], int] = defaultdict(int)
+        self.turmas: Dict[Tuple[int, int], int] = defaultdict(int)
+        self.salas: Dict[Tuple[str, int], int] = defaultdict(int)
+        self.sem_slot = 0
+
+    def adicionar(self, professor_id: int, turma_id: int, sala: Optional[str], turno_id: int, slot: int) -> None:
+        b = bit(slot)
+        self.professores[(professor_id, turno_id)] |= b
+        self.turmas[(turma_id, turno_id)] |= b
+        if sala:
+            self.salas[(sala, turno_id)] |= b
+
+    def remover(self, professor_id: int, turma_id: int, sala: Optional[str], turno_id: int, slot: int) -> None:
+        b = ~bit(slot)
+        self.professores[(professor_id, turno_id)] &= b
+        self.turmas[(turma_id, turno_id)] &= b
+        if sala:
+            self.salas[(sala, turno_id)] &= b
+
+    def livre(self, professor_id: int, turma_id: int, turno_id: int, slot: int, sala: Optional[str] = None) -> bool:
+        b = bit(slot)
+        return not (
+            self.professores.get((professor_id, turno_id), 0) & b
+            or self.turmas.get((turma_id, turno_id), 0) & b
+            or (sala and self.salas.get((sala, turno_id), 0) & b)
+        )
+
+
+def carregar_ocupacao(db: Session, turno_id: Optional[int] = None) -> Ocupacao:
+    query = db.query(
+        models.Horario.professor_id, models.Horario.turma_id, models.Horario.sala,
+        models.Horario.turno_id, models.Horario.slot,
+    )
+    if turno_id is not None:
+        query = query.filter(models.Horario.turno_id == turno_id)
+    ocupacao = Ocupacao()
+    for professor_id, turma_id, sala, turno, slot in query:
+        if slot is None:
+            ocupacao.sem_slot += 1
+        else:
+            ocupacao.adicionar(professor_id, turma_id, sala, turno, slot)
+    return ocupacao
+
+
+def mascaras_por_dia(mascara: int) -> Dict[str, int]:
+    """Divide a máscara semanal em máscaras diárias (bit i = i-ésima aula)."""
+    limite = (1 << SLOTS_POR_DIA) - 1
+    return {
+        dia: (mascara >> (i * SLOTS_POR_DIA)) & limite
+        for i, dia in enumerate(DIAS)
+        if (mascara >> (i * SLOTS_POR_DIA)) & limite
+    }
@@ -0,0 +1,205 @@
+"""Busca de professores substitutos por mapas semanais de bits.
+
+Cada professor ativo ganha dois inteiros em que o bit `dia * 1440 + minuto`
+representa um minuto da semana:
+
+- `ocupado`: minutos em horários (de qualquer turno) ou bloqueios;
+- `disponivel`: minutos das disponibilidades declaradas; dias sem nenhuma
+  disponibilidade declarada contam como inteiramente disponíveis, como em
+  `crud_new.verificar_disponibilidade_professor`.
+
+Um professor cobre uma aula se está vinculado à disciplina, não tem bit
+ocupado na faixa da aula, tem algum bit disponível nela (mesma regra de
+sobreposição usada na criação de horários) e a aula cabe na sua
+`carga_horaria_semanal`. Os mapas são montados uma vez (em cache até alguma
+das tabelas de origem mudar); a busca é só AND de inteiros por candidato.
+A resolução em minutos, em vez dos slots de slots.py, cobre horários de
+turnos com grades diferentes e bloqueios fora da grade.
+"""
+import enum
+from collections import defaultdict
+from datetime import time
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy.orm import Session
+
+from cache import CacheVersionado
+from database import models
+from slots import DIAS, ORDEM_DIA
+
+MINUTOS_DIA = 24 * 60
+DIA_INTEIRO = (1 << MINUTOS_DIA) - 1
+
+TABELAS_MAPA = (
+    "professores", "usuarios", "horarios", "professor_disciplinas",
+    "professor_bloqueios", "professor_disponibilidades",
+)
+
+_cache_mapa = CacheVersionado(max_itens=1)
+
+
+def _valor_dia(dia_semana) -> str:
+    return dia_semana.value if isinstance(dia_semana, enum.Enum) else dia_semana
+
+
+def _minuto(hora: time, arredondar_para_cima: bool = False) -> int:
+    m = hora.hour * 60 + hora.minute
+    if arredondar_para_cima and (hora.second or hora.microsecond):
+        m += 1
+    return m
+
+
+def faixa(dia_semana, hora_inicio: time, hora_fim: time) -> int:
+    """Máscara dos minutos [hora_inicio, hora_fim) no dia, na semana."""
+    inicio = _minuto(hora_inicio)
+    fim = _minuto(hora_fim, arredondar_para_cima=True)
+    if fim <= inicio:
+        return 0
+    return ((1 << (fim - inicio)) - 1) << (ORDEM_DIA[_valor_dia(dia_semana)] * MINUTOS_DIA + inicio)
+
+
+class PerfilProfessor:
+    __slots__ = (
+        "professor_id", "nome", "carga_horaria_semanal", "minutos_semana",
+        "aulas_por_dia", "ocupado", "disponivel",
+    )
+
+    def __init__(self, professor_id: int, nome: str, carga_horaria_semanal: Optional[int]):
+        self.professor_id = professor_id
+        self.nome = nome
+        self.carga_horaria_semanal = carga_horaria_semanal
+        self.minutos_semana = 0
+        self.aulas_por_dia = [0] * len(DIAS)
+        self.ocupado = 0
+        self.disponivel = 0
+
+    def cabe(self, minutos: int) -> bool:
+        if not self.carga_horaria_semanal:
+            return True
+        return self.minutos_semana + minutos <= self.carga_horaria_semanal * 60
+
+    @property
+    def percentual_carga(self) -> Optional[float]:
+        if not self.carga_horaria_semanal:
+            return None
+        return round(self.minutos_semana / (self.carga_horaria_semanal * 60) * 100, 1)
+
+
+class MapaProfessores:
+    """Perfis de todos os professores ativos e o índice disciplina -> professores."""
+
+    def __init__(self, perfis: Dict[int, PerfilProfessor], por_disciplina: Dict[int, List[int]]):
+        self.perfis = perfis
+        self.por_disciplina = por_disciplina
+
+    def candidatos(
+        self,
+        disciplina_id: int,
+        dia_semana,
+        hora_inicio: time,
+        hora_fim: time,
+        excluir: Iterable[int] = (),
+        limite: Optional[int] = None,
+    ) -> List[dict]:
+        """Professores aptos para a aula, do menos para o mais carregado."""
+        necessario = faixa(dia_semana, hora_inicio, hora_fim)
+        minutos = bin(necessario).count("1")
+        dia = ORDEM_DIA[_valor_dia(dia_semana)]
+        excluir = set(excluir)
+        aptos = []
+        for pid in self.por_disciplina.get(disciplina_id, ()):
+            p = self.perfis[pid]
+            if pid in excluir or p.ocupado & necessario or not p.disponivel & necessario:
+                continue
+            if p.cabe(minutos):
+                aptos.append(p)
+        aptos.sort(key=lambda p: (
+            p.percentual_carga if p.percentual_carga is not None else 0.0,
+            p.aulas_por_dia[dia], p.minutos_semana, p.nome,
+        ))
+        if limite is not None:
+            aptos = aptos[:limite]
+        return [
+            {
+                "professor_id": p.professor_id,
+                "nome": p.nome,
+                "horas_semana": round(p.minutos_semana / 60, 2),
+                "carga_horaria_semanal": p.carga_horaria_semanal,
+                "percentual_carga": p.percentual_carga,
+                "aulas_no_dia": p.aulas_por_dia[dia],
+            }
+            for p in aptos
+        ]
+
+
+def montar_mapa(db: Session) -> MapaProfessores:
+    perfis = {
+        pid: PerfilProfessor(pid, nome, carga)
+        for pid, nome, carga in db.query(
+            models.Professor.id, models.Usuario.nome, models.Professor.carga_horaria_semanal,
+        ).join(models.Usuario, models.Usuario.id == models.Professor.usuario_id)
+        .filter(models.Usuario.ativo == True)
+    }
+
+    H = models.Horario
+    for pid, dia, inicio, fim in db.query(H.professor_id, H.dia_semana, H.hora_inicio, H.hora_fim):
+        p = perfis.get(pid)
+        if p is None:
+            continue
+        mascara = faixa(dia, inicio, fim)
+        p.ocupado |= mascara
+        p.minutos_semana += bin(mascara).count("1")
+        p.aulas_por_dia[ORDEM_DIA[_valor_dia(dia)]] += 1
+
+    B = models.ProfessorBloqueio
+    for pid, dia, inicio, fim in db.query(B.professor_id, B.dia_semana, B.hora_inicio, B.hora_fim):
+        if pid in perfis:
+            perfis[pid].ocupado |= faixa(dia, inicio, fim)
+
+    declarados = defaultdict(int)
+    D = models.ProfessorDisponibilidade
+    for pid, dia, inicio, fim in db.query(D.professor_id, D.dia_semana, D.hora_inicio, D.hora_fim):
+        if pid in perfis:
+            perfis[pid].disponivel |= faixa(dia, inicio, fim)
+            declarados[pid] |= DIA_INTEIRO << (ORDEM_DIA[_valor_dia(dia)] * MINUTOS_DIA)
+    semana = (1 << (MINUTOS_DIA * len(DIAS))) - 1
+    for pid, p in perfis.items():
+        p.disponivel |= semana & ~declarados[pid]
+
+    por_disciplina: Dict[int, List[int]] = defaultdict(list)
+    PD = models.ProfessorDisciplina
+    for pid, disciplina_id in db.query(PD.professor_id, PD.disciplina_id).distinct():
+        if pid in perfis:
+            por_disciplina[disciplina_id].append(pid)
+
+    return MapaProfessores(perfis, dict(por_disciplina))
+
+
+def mapa_professores(db: Session) -> MapaProfessores:
+    return _cache_mapa.obter("mapa", TABELAS_MAPA, lambda: montar_mapa(db))
+
+
+def substitutos_horario(db: Session, horario, limite: Optional[int] = None) -> dict:
+    mapa = mapa_professores(db)
+    return {
+        "horario_id": horario.id,
+        "professor_id": horario.professor_id,
+        "disciplina_id": horario.disciplina_id,
+        "turma_id": horario.turma_id,
+        "dia_semana": _valor_dia(horario.dia_semana),
+        "hora_inicio": horario.hora_inicio,
+        "hora_fim": horario.hora_fim,
+        "candidatos": mapa.candidatos(
+            horario.disciplina_id, horario.dia_semana, horario.hora_inicio, horario.hora_fim,
+            excluir=(horario.professor_id,), limite=limite,
+        ),
+    }
+
+
+def substitutos_dia(db: Session, professor_id: int, dia_semana, limite: Optional[int] = None) -> List[dict]:
+    """Candidatos para cada aula do professor ausente no dia, em ordem de horário."""
+    horarios = db.query(models.Horario).filter(
+        models.Horario.professor_id == professor_id,
+        models.Horario.dia_semana == models.DiaSemanaEnum(_valor_dia(dia_semana)),
+    ).order_by(models.Horario.hora_inicio).all()
+    return [substitutos_horario(db, h, limite=limite) for h in horarios]
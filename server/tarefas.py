@@ -0,0 +1,406 @@
+"""Fila de tarefas em segundo plano para operações demoradas.
+
+Clonar ou gerar períodos, importar planilhas, exportar grades, rodar o seed do
+currículo ou o gerador de grade podem passar do timeout do proxy quando feitos
+dentro da requisição. Com `em_segundo_plano=true` essas rotas apenas gravam uma
+linha em `tarefas` e respondem 202 com a tarefa; o andamento é acompanhado em
+`GET /tarefas/{id}` e o resultado (JSON ou arquivo) fica na própria tarefa.
+
+Cada processo da API mantém `TAREFAS_WORKERS` threads que reservam tarefas
+pendentes com `SELECT ... FOR UPDATE SKIP LOCKED` (no Postgres vários
+processos e máquinas dividem a fila sem se bloquear; em outros bancos o
+`UPDATE` condicional que marca a tarefa como em execução garante que só um
+worker a pegue). Os tipos de tarefa são registrados com `@tipo(nome)` junto
+das rotas que os enfileiram e recebem uma sessão própria e um `Contexto`
+(parâmetros, progresso, arquivos).
+
+Falhas de validação (HTTPException, ValueError, conflitos de sobreposição)
+encerram a tarefa; as demais voltam para a fila com espera crescente até
+`max_tentativas`. Uma thread de supervisão renova o sinal de vida das tarefas
+em execução no processo e devolve à fila as que ficaram sem sinal por
+`TAREFAS_PRAZO_SEGUNDOS` (processo que caiu). A entrega é pelo menos uma vez:
+uma tarefa interrompida depois de gravar seu trabalho pode ser repetida.
+
+O cancelamento de uma tarefa em execução é atendido no próximo
+`Contexto.progresso`. Tipos registrados com `cancelavel=False` (curtos, sem
+pontos de progresso) só podem ser cancelados enquanto pendentes.
+"""
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import select, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from config import (
+    TAREFAS_DIR_ARQUIVOS,
+    TAREFAS_ESPERA_BASE_SEGUNDOS,
+    TAREFAS_INTERVALO_SEGUNDOS,
+    TAREFAS_MAX_TENTATIVAS,
+    TAREFAS_PRAZO_SEGUNDOS,
+    TAREFAS_RETENCAO_DIAS,
+    TAREFAS_WORKERS,
+)
+from database import models
+from database.database import SessionLocal
+from restricoes import ConflitoSobreposicao
+
+logger = logging.getLogger(__name__)
+
+Status = models.StatusTarefaEnum
+T = models.Tarefa
+
+# Intervalo mínimo entre gravações de progresso de uma tarefa
+INTERVALO_PROGRESSO = 0.5
+# Erros que não melhoram com nova tentativa
+ERROS_DEFINITIVOS = (HTTPException, ValueError, ConflitoSobreposicao)
+
+_tipos: Dict[str, Tuple[Callable, Optional[int], bool]] = {}
+
+
+class TarefaCancelada(Exception):
+    """Cancelamento pedido enquanto a tarefa executava."""
+
+
+def _agora() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def tipo(nome: str, max_tentativas: Optional[int] = None, cancelavel: bool = True):
+    """Registra a função que executa as tarefas do tipo: `funcao(db, contexto) -> resultado`."""
+    def registrar(funcao: Callable) -> Callable:
+        _tipos[nome] = (funcao, max_tentativas, cancelavel)
+        return funcao
+    return registrar
+
+
+def enfileirar(
+    db: Session,
+    nome: str,
+    parametros: Optional[dict] = None,
+    entrada: Optional[Tuple[str, Optional[str], bytes]] = None,
+) -> models.Tarefa:
+    """Grava a tarefa (e o arquivo de entrada, se houver) e acorda os workers deste processo."""
+    if nome not in _tipos:
+        raise KeyError(nome)
+    agora = _agora()
+    tarefa = T(
+        tipo=nome,
+        status=Status.PENDENTE,
+        parametros=jsonable_encoder(parametros or {}),
+        progresso=0.0,
+        tentativas=0,
+        max_tentativas=_tipos[nome][1] or TAREFAS_MAX_TENTATIVAS,
+        executar_apos=agora,
+        cancelamento_solicitado=False,
+        created_at=agora,
+    )
+    db.add(tarefa)
+    db.flush()
+    if entrada is not None:
+        arquivo_nome, media_type, conteudo = entrada
+        db.add(models.TarefaArquivo(
+            tarefa_id=tarefa.id, papel="entrada", nome=arquivo_nome, media_type=media_type, conteudo=conteudo,
+        ))
+    db.commit()
+    db.refresh(tarefa)
+    _acordar.set()
+    return tarefa
+
+
+def cancelavel_em_execucao(nome: str) -> bool:
+    registro = _tipos.get(nome)
+    return registro is None or registro[2]
+
+
+def cancelar(db: Session, tarefa: models.Tarefa) -> models.Tarefa:
+    """Cancela a tarefa pendente; em execução, pede o cancelamento (atendido no próximo progresso)."""
+    agora = _agora()
+    db.execute(
+        update(T).where(T.id == tarefa.id, T.status == Status.PENDENTE)
+        .values(status=Status.CANCELADA, concluido_em=agora, erro="Cancelada")
+        .execution_options(synchronize_session=False)
+    )
+    db.execute(
+        update(T).where(T.id == tarefa.id, T.status == Status.EXECUTANDO)
+        .values(cancelamento_solicitado=True)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    db.refresh(tarefa)
+    return tarefa
+
+
+def arquivo(db: Session, tarefa_id: int, papel: str) -> Optional[models.TarefaArquivo]:
+    A = models.TarefaArquivo
+    return db.query(A).filter(A.tarefa_id == tarefa_id, A.papel == papel).first()
+
+
+class Contexto:
+    """O que a função da tarefa enxerga da fila: parâmetros, progresso e arquivos."""
+
+    def __init__(self, tarefa_id: int, parametros: dict, trabalhador: str):
+        self.tarefa_id = tarefa_id
+        self.parametros = parametros
+        self.trabalhador = trabalhador
+        self._ultimo_progresso = 0.0
+
+    def progresso(self, fracao: float, mensagem: Optional[str] = None) -> None:
+        """Grava o andamento (no máximo a cada INTERVALO_PROGRESSO) e interrompe se houve cancelamento."""
+        instante = time.monotonic()
+        if instante - self._ultimo_progresso < INTERVALO_PROGRESSO:
+            return
+        self._ultimo_progresso = instante
+        db = SessionLocal()
+        try:
+            db.execute(
+                update(T).where(T.id == self.tarefa_id, T.trabalhador == self.trabalhador)
+                .values(progresso=min(max(fracao, 0.0), 1.0), mensagem=(mensagem or "")[:200] or None, atualizado_em=_agora())
+                .execution_options(synchronize_session=False)
+            )
+            cancelada = db.execute(select(T.cancelamento_solicitado).where(T.id == self.tarefa_id)).scalar()
+            db.commit()
+        except OperationalError:
+            # Progresso é informativo: no SQLite a escrita espera leituras
+            # abertas (ex.: exportação em andamento) e pode desistir
+            db.rollback()
+            logger.debug("Progresso da tarefa %s não gravado", self.tarefa_id)
+            return
+        finally:
+            db.close()
+        if cancelada:
+            raise TarefaCancelada()
+
+    def entrada(self, db: Session) -> models.TarefaArquivo:
+        return arquivo(db, self.tarefa_id, "entrada")
+
+    def salvar_arquivo(self, db: Session, nome: str, media_type: str, blocos: Iterable[bytes]) -> int:
+        """
+        Grava o arquivo de saída bloco a bloco em TAREFAS_DIR_ARQUIVOS (o
+        conteúdo não passa inteiro pela memória nem pelo banco) e o registra
+        na tarefa; baixado em GET /tarefas/{id}/arquivo. Retorna o tamanho.
+        """
+        os.makedirs(TAREFAS_DIR_ARQUIVOS, exist_ok=True)
+        caminho = os.path.join(TAREFAS_DIR_ARQUIVOS, f"{self.tarefa_id}-{uuid.uuid4().hex}-{nome}")
+        tamanho = 0
+        try:
+            with open(caminho, "wb") as f:
+                for bloco in blocos:
+                    f.write(bloco)
+                    tamanho += len(bloco)
+            existente = arquivo(db, self.tarefa_id, "saida")
+            if existente is not None:
+                _remover_arquivo(existente.caminho)
+                db.delete(existente)
+                db.flush()
+            db.add(models.TarefaArquivo(
+                tarefa_id=self.tarefa_id, papel="saida", nome=nome, media_type=media_type, caminho=caminho,
+            ))
+            db.execute(
+                update(T).where(T.id == self.tarefa_id).values(arquivo_nome=nome)
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+        except BaseException:
+            # Cancelamento (TarefaCancelada) ou falha no meio da gravação
+            _remover_arquivo(caminho)
+            raise
+        return tamanho
+
+
+def _remover_arquivo(caminho: Optional[str]) -> None:
+    if caminho:
+        try:
+            os.remove(caminho)
+        except FileNotFoundError:
+            pass
+
+
+def reservar(db: Session, trabalhador: str) -> Optional[models.Tarefa]:
+    """Marca a próxima tarefa pendente como em execução por `trabalhador` e a retorna."""
+    while True:
+        agora = _agora()
+        tarefa_id = db.execute(
+            select(T.id)
+            .where(T.status == Status.PENDENTE, T.executar_apos <= agora)
+            .order_by(T.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        ).scalar()
+        if tarefa_id is None:
+            db.rollback()
+            return None
+        reservada = db.execute(
+            update(T).where(T.id == tarefa_id, T.status == Status.PENDENTE)
+            .values(
+                status=Status.EXECUTANDO, tentativas=T.tentativas + 1, trabalhador=trabalhador,
+                iniciado_em=agora, atualizado_em=agora, erro=None,
+            )
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+        if reservada:
+            return db.get(T, tarefa_id)
+
+
+def _encerrar(tarefa_id: int, dono: str, **valores) -> None:
+    """Grava o desfecho, desde que a tarefa ainda seja de `dono` (não expirou nem foi retomada)."""
+    db = SessionLocal()
+    try:
+        db.execute(
+            update(T).where(T.id == tarefa_id, T.status == Status.EXECUTANDO, T.trabalhador == dono)
+            .values(atualizado_em=_agora(), **valores)
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def _mensagem_erro(erro: Exception) -> str:
+    if isinstance(erro, HTTPException):
+        return str(erro.detail)
+    return str(erro) or type(erro).__name__
+
+
+def executar(tarefa: models.Tarefa, trabalhador: str, db: Session) -> None:
+    tarefa_id, nome, tentativas, max_tentativas = tarefa.id, tarefa.tipo, tarefa.tentativas, tarefa.max_tentativas
+    registro = _tipos.get(nome)
+    if registro is None:
+        _encerrar(tarefa_id, trabalhador, status=Status.FALHOU, concluido_em=_agora(),
+                  erro=f"Tipo de tarefa desconhecido: {nome}")
+        return
+    contexto = Contexto(tarefa_id, dict(tarefa.parametros or {}), trabalhador)
+    db.commit()
+    try:
+        resultado = registro[0](db, contexto)
+        db.commit()
+    except TarefaCancelada:
+        db.rollback()
+        _encerrar(tarefa_id, trabalhador, status=Status.CANCELADA, concluido_em=_agora(), erro="Cancelada")
+    except ERROS_DEFINITIVOS as e:
+        db.rollback()
+        _encerrar(tarefa_id, trabalhador, status=Status.FALHOU, concluido_em=_agora(), erro=_mensagem_erro(e))
+    except Exception as e:
+        db.rollback()
+        logger.exception("Tarefa %s (%s) falhou na tentativa %s", tarefa_id, nome, tentativas)
+        if tentativas >= max_tentativas:
+            _encerrar(tarefa_id, trabalhador, status=Status.FALHOU, concluido_em=_agora(), erro=_mensagem_erro(e))
+        else:
+            espera = TAREFAS_ESPERA_BASE_SEGUNDOS * 2 ** (tentativas - 1)
+            _encerrar(
+                tarefa_id, trabalhador, status=Status.PENDENTE, trabalhador=None, erro=_mensagem_erro(e),
+                executar_apos=_agora() + timedelta(seconds=espera),
+            )
+    else:
+        _encerrar(
+            tarefa_id, trabalhador, status=Status.CONCLUIDA, concluido_em=_agora(),
+            progresso=1.0, resultado=jsonable_encoder(resultado),
+        )
+
+
+def supervisionar(db: Session, em_execucao: List[int]) -> None:
+    """Renova o sinal de vida das tarefas deste processo, retoma as abandonadas e apaga as antigas."""
+    agora = _agora()
+    if em_execucao:
+        db.execute(
+            update(T).where(T.id.in_(em_execucao), T.status == Status.EXECUTANDO)
+            .values(atualizado_em=agora)
+            .execution_options(synchronize_session=False)
+        )
+    limite = agora - timedelta(seconds=TAREFAS_PRAZO_SEGUNDOS)
+    abandonadas = (T.status == Status.EXECUTANDO, T.atualizado_em < limite)
+    db.execute(
+        update(T).where(*abandonadas, T.tentativas >= T.max_tentativas)
+        .values(status=Status.FALHOU, concluido_em=agora, erro="Worker parou de responder")
+        .execution_options(synchronize_session=False)
+    )
+    db.execute(
+        update(T).where(*abandonadas)
+        .values(status=Status.PENDENTE, trabalhador=None, executar_apos=agora, erro="Worker parou de responder")
+        .execution_options(synchronize_session=False)
+    )
+    antigas = select(T.id).where(
+        T.status.in_([Status.CONCLUIDA, Status.FALHOU, Status.CANCELADA]),
+        T.concluido_em < agora - timedelta(days=TAREFAS_RETENCAO_DIAS),
+    )
+    A = models.TarefaArquivo
+    for caminho in db.execute(select(A.caminho).where(A.tarefa_id.in_(antigas), A.caminho.isnot(None))).scalars():
+        _remover_arquivo(caminho)
+    db.query(A).filter(A.tarefa_id.in_(antigas)).delete(synchronize_session=False)
+    db.query(T).filter(T.id.in_(antigas)).delete(synchronize_session=False)
+    db.commit()
+
+
+_acordar = threading.Event()
+_parar = threading.Event()
+_threads: List[threading.Thread] = []
+_em_execucao: Dict[str, int] = {}
+_lock = threading.Lock()
+
+
+def _trabalhar(trabalhador: str) -> None:
+    while not _parar.is_set():
+        db = SessionLocal()
+        try:
+            tarefa = reservar(db, trabalhador)
+            if tarefa is not None:
+                with _lock:
+                    _em_execucao[trabalhador] = tarefa.id
+                try:
+                    executar(tarefa, trabalhador, db)
+                finally:
+                    with _lock:
+                        _em_execucao.pop(trabalhador, None)
+                continue
+        except Exception:
+            logger.exception("Erro no worker de tarefas %s", trabalhador)
+        finally:
+            db.close()
+        _acordar.wait(TAREFAS_INTERVALO_SEGUNDOS)
+        _acordar.clear()
+
+
+def _supervisionar() -> None:
+    intervalo = min(TAREFAS_PRAZO_SEGUNDOS / 4, 15.0)
+    while not _parar.wait(intervalo):
+        db = SessionLocal()
+        try:
+            with _lock:
+                ids = list(_em_execucao.values())
+            supervisionar(db, ids)
+        except Exception:
+            logger.exception("Erro na supervisão das tarefas")
+            db.rollback()
+        finally:
+            db.close()
+
+
+def iniciar(workers: int = TAREFAS_WORKERS) -> None:
+    """Inicia as threads de workers e a de supervisão deste processo."""
+    if workers <= 0 or _threads:
+        return
+    _parar.clear()
+    prefixo = f"{socket.gethostname()}:{os.getpid()}"
+    for i in range(workers):
+        nome = f"{prefixo}/{i}"[-100:]
+        _threads.append(threading.Thread(target=_trabalhar, args=(nome,), name=f"tarefas-{i}", daemon=True))
+    _threads.append(threading.Thread(target=_supervisionar, name="tarefas-supervisor", daemon=True))
+    for thread in _threads:
+        thread.start()
+
+
+def parar(espera: float = 5.0) -> None:
+    _parar.set()
+    _acordar.set()
+    for thread in _threads:
+        thread.join(espera)
+    _threads.clear()
@@ -0,0 +1,308 @@
+"""Versões nomeadas da grade: foto compacta, diferença e restauração.
+
+Uma versão guarda os horários do escopo (um turno ou todos) em um único blob
+por colunas, não em linhas copiadas: um array numpy por campo, em ordem de
+id (dia como int8, horas em segundos, nulos como -1) e os textos (sala,
+observações) em dicionário (valores distintos + códigos), tudo em um
+`.npz` comprimido. Alguns milhares de horários ocupam poucos KB.
+
+A diferença entre duas grades (versões ou versão e grade atual) é um merge
+dos ids já ordenados, O(n), seguido de comparações vetorizadas campo a campo
+nas linhas presentes dos dois lados.
+
+A restauração aplica só a diferença, numa transação: um DELETE dos horários
+removidos ou alterados, um INSERT em lote das linhas da versão (com os ids
+originais) e a reinserção das exceções datadas dos horários alterados, que
+o DELETE levaria junto; as de horários que mudaram de dia da semana deixam de
+cair no dia da aula e são descartadas (e listadas no resultado). Conflitos
+com horários fora do escopo desfazem tudo.
+"""
+import io
+import json
+from datetime import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+import crud_new as crud
+from database import models
+from slots import DIAS, ORDEM_DIA, calcular_slot
+
+FORMATO = 1
+
+CAMPOS = (
+    "id", "professor_id", "disciplina_id", "turma_id", "turno_id",
+    "dia_semana", "hora_inicio", "hora_fim", "slot", "sala", "espaco_id", "observacoes",
+)
+CAMPOS_TEXTO = ("sala", "observacoes")
+CAMPOS_NULOS = ("slot", "espaco_id")
+NULO = -1
+
+# Campo -> tipo do array no blob
+TIPOS = {
+    "id": np.int32, "professor_id": np.int32, "disciplina_id": np.int32,
+    "turma_id": np.int32, "turno_id": np.int32, "dia_semana": np.int8,
+    "hora_inicio": np.int32, "hora_fim": np.int32, "slot": np.int32, "espaco_id": np.int32,
+}
+
+# Tabelas referenciadas pelos horários: (campo, modelo, rótulo)
+REFERENCIAS = (
+    ("professor_id", models.Professor, "professores"),
+    ("disciplina_id", models.Disciplina, "disciplinas"),
+    ("turma_id", models.Turma, "turmas"),
+    ("turno_id", models.Turno, "turnos"),
+    ("espaco_id", models.EspacoEscola, "espaços"),
+)
+
+Grade = Dict[str, np.ndarray]
+
+
+class VersaoIncompativel(ValueError):
+    """A versão referencia registros que não existem mais."""
+
+
+def _segundos(t: time) -> int:
+    return t.hour * 3600 + t.minute * 60 + t.second
+
+
+def _hora(segundos: int) -> time:
+    return time(segundos // 3600, segundos // 60 % 60, segundos % 60)
+
+
+def grade_atual(db: Session, turno_id: Optional[int] = None) -> Grade:
+    """Horários do escopo, por colunas, em ordem de id."""
+    H = models.Horario
+    query = db.query(*[getattr(H, c) for c in CAMPOS]).order_by(H.id)
+    if turno_id is not None:
+        query = query.filter(H.turno_id == turno_id)
+    linhas = query.all()
+    colunas = list(zip(*linhas)) if linhas else [()] * len(CAMPOS)
+    grade: Grade = {}
+    for campo, valores in zip(CAMPOS, colunas):
+        if campo == "dia_semana":
+            valores = [ORDEM_DIA[d.value] for d in valores]
+        elif campo in ("hora_inicio", "hora_fim"):
+            valores = [_segundos(t) for t in valores]
+        elif campo in CAMPOS_NULOS:
+            valores = [NULO if v is None else v for v in valores]
+        if campo in CAMPOS_TEXTO:
+            arr = np.empty(len(valores), dtype=object)
+            arr[:] = valores
+            grade[campo] = arr
+        else:
+            grade[campo] = np.array(valores, dtype=np.int64)
+    return grade
+
+
+def codificar(grade: Grade) -> bytes:
+    arrays = {}
+    for campo in CAMPOS:
+        if campo in CAMPOS_TEXTO:
+            valores = sorted({v for v in grade[campo] if v is not None})
+            codigo = {v: i for i, v in enumerate(valores)}
+            arrays[campo] = np.array([NULO if v is None else codigo[v] for v in grade[campo]], dtype=np.int32)
+            arrays[f"{campo}__valores"] = np.frombuffer(json.dumps(valores, ensure_ascii=False).encode("utf-8"), dtype=np.uint8)
+        else:
+            arrays[campo] = grade[campo].astype(TIPOS[campo])
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, **arrays)
+    return buffer.getvalue()
+
+
+def decodificar(dados: bytes) -> Grade:
+    with np.load(io.BytesIO(dados), allow_pickle=False) as arquivo:
+        grade: Grade = {}
+        for campo in CAMPOS:
+            if campo in CAMPOS_TEXTO:
+                valores = json.loads(arquivo[f"{campo}__valores"].tobytes().decode("utf-8"))
+                codigos = arquivo[campo]
+                arr = np.empty(len(codigos), dtype=object)
+                arr[:] = [None if c == NULO else valores[c] for c in codigos.tolist()]
+                grade[campo] = arr
+            else:
+                grade[campo] = arquivo[campo].astype(np.int64)
+    return grade
+
+
+def _linhas(grade: Grade, posicoes) -> List[dict]:
+    """Linhas (no formato de schemas.HorarioVersao) das posições indicadas."""
+    colunas = {c: grade[c][posicoes].tolist() for c in CAMPOS}
+    return [_converter({c: colunas[c][k] for c in CAMPOS}) for k in range(len(posicoes))]
+
+
+def horarios(grade: Grade) -> List[dict]:
+    return _linhas(grade, range(len(grade["id"])))
+
+
+def _converter(linha: dict) -> dict:
+    linha["dia_semana"] = DIAS[linha["dia_semana"]]
+    linha["hora_inicio"] = _hora(linha["hora_inicio"])
+    linha["hora_fim"] = _hora(linha["hora_fim"])
+    for campo in CAMPOS_NULOS:
+        if linha[campo] == NULO:
+            linha[campo] = None
+    return linha
+
+
+def _valor(campo: str, v):
+    if isinstance(v, np.generic):
+        v = v.item()
+    if campo == "dia_semana":
+        return DIAS[v]
+    if campo in ("hora_inicio", "hora_fim"):
+        return _hora(v)
+    if campo in CAMPOS_NULOS and v == NULO:
+        return None
+    return v
+
+
+def _emparelhar(base: Grade, alvo: Grade) -> Tuple[List[int], List[int], List[int], List[int]]:
+    """Merge dos ids ordenados: posições só na base, só no alvo e pares (base, alvo)."""
+    ids_base, ids_alvo = base["id"].tolist(), alvo["id"].tolist()
+    so_base, so_alvo, pares_base, pares_alvo = [], [], [], []
+    i = j = 0
+    while i < len(ids_base) and j < len(ids_alvo):
+        if ids_base[i] == ids_alvo[j]:
+            pares_base.append(i)
+            pares_alvo.append(j)
+            i += 1
+            j += 1
+        elif ids_base[i] < ids_alvo[j]:
+            so_base.append(i)
+            i += 1
+        else:
+            so_alvo.append(j)
+            j += 1
+    so_base.extend(range(i, len(ids_base)))
+    so_alvo.extend(range(j, len(ids_alvo)))
+    return so_base, so_alvo, pares_base, pares_alvo
+
+
+def comparar(base: Grade, alvo: Grade) -> dict:
+    """Horários adicionados, removidos e alterados (campo: [base, alvo]) de `base` para `alvo`."""
+    so_base, so_alvo, pares_base, pares_alvo = _emparelhar(base, alvo)
+    pb, pa = np.array(pares_base, dtype=np.int64), np.array(pares_alvo, dtype=np.int64)
+    alterados: Dict[int, dict] = {}
+    for campo in CAMPOS[1:]:
+        va, vb = base[campo][pb], alvo[campo][pa]
+        for k in np.nonzero(va != vb)[0].tolist():
+            horario_id = int(base["id"][pares_base[k]])
+            alterados.setdefault(horario_id, {})[campo] = [_valor(campo, va[k]), _valor(campo, vb[k])]
+    return {
+        "adicionados": _linhas(alvo, so_alvo),
+        "removidos": _linhas(base, so_base),
+        "alterados": [{"id": i, "campos": campos} for i, campos in sorted(alterados.items())],
+        "inalterados": len(pares_base) - len(alterados),
+    }
+
+
+def criar_versao(db: Session, nome: str, descricao: Optional[str] = None,
+                 turno_id: Optional[int] = None) -> models.VersaoGrade:
+    grade = grade_atual(db, turno_id)
+    dados = codificar(grade)
+    versao = models.VersaoGrade(
+        nome=nome, descricao=descricao, turno_id=turno_id, quantidade=len(grade["id"]),
+        formato=FORMATO, tamanho_bytes=len(dados), dados=dados,
+    )
+    db.add(versao)
+    db.commit()
+    db.refresh(versao)
+    return versao
+
+
+def grade_versao(versao: models.VersaoGrade) -> Grade:
+    return decodificar(versao.dados)
+
+
+def diferenca(db: Session, base: models.VersaoGrade, alvo: Optional[models.VersaoGrade] = None) -> dict:
+    """De `base` para `alvo` (outra versão ou, sem ela, a grade atual do escopo de `base`)."""
+    grade_alvo = grade_versao(alvo) if alvo is not None else grade_atual(db, base.turno_id)
+    return {
+        "base_id": base.id,
+        "alvo_id": alvo.id if alvo is not None else None,
+        **comparar(grade_versao(base), grade_alvo),
+    }
+
+
+def _referencias_ausentes(db: Session, linhas: List[dict]) -> List[str]:
+    ausentes = []
+    for campo, modelo, rotulo in REFERENCIAS:
+        ids = {l[campo] for l in linhas if l[campo] is not None}
+        if not ids:
+            continue
+        existentes = {i for (i,) in db.query(modelo.id).filter(modelo.id.in_(ids))}
+        faltando = sorted(ids - existentes)
+        if faltando:
+            ausentes.append(f"{rotulo} {', '.join(map(str, faltando))}")
+    return ausentes
+
+
+def restaurar(db: Session, versao: models.VersaoGrade) -> dict:
+    """Faz a grade do escopo voltar a ser a da versão, em uma transação."""
+    H = models.Horario
+    base = grade_atual(db, versao.turno_id)
+    alvo = grade_versao(versao)
+    resultado = {"base_id": None, "alvo_id": versao.id, **comparar(base, alvo)}
+
+    alterados = [a["id"] for a in resultado["alterados"]]
+    removidos = [l["id"] for l in resultado["removidos"]]
+    adicionados = [l["id"] for l in resultado["adicionados"]]
+    # Horários da versão que hoje estão em outro turno voltam para o escopo
+    if versao.turno_id is not None and adicionados:
+        fora = [i for (i,) in db.query(H.id).filter(H.id.in_(adicionados))]
+    else:
+        fora = []
+    reescritos = set(alterados) | set(adicionados)
+    linhas = [l for l in horarios(alvo) if l["id"] in reescritos]
+
+    ausentes = _referencias_ausentes(db, linhas)
+    if ausentes:
+        raise VersaoIncompativel(f"A versão referencia registros removidos: {'; '.join(ausentes)}")
+
+    for linha in linhas:
+        linha["dia_semana"] = models.DiaSemanaEnum(linha["dia_semana"])
+        if linha["slot"] is not None:
+            linha["slot"] = calcular_slot(db, linha["turno_id"], linha["dia_semana"], linha["hora_inicio"], linha["hora_fim"])
+
+    preservadas, descartadas = reescrever(db, removidos, alterados + fora, linhas)
+    crud._commit_sem_sobreposicao(db)
+    return {
+        "versao_id": versao.id,
+        "diferenca": resultado,
+        "excecoes_preservadas": preservadas,
+        "excecoes_descartadas": descartadas,
+    }
+
+
+def reescrever(db: Session, removidos: List[int], reescritos: List[int],
+               linhas: List[dict]) -> Tuple[int, List[dict]]:
+    """
+    Apaga os horários `removidos` e `reescritos` e insere `linhas` em lote
+    (as dos reescritos com o mesmo id), devolvendo aos reescritos as exceções
+    datadas que o DELETE levou, desde que a data ainda caia no dia da semana
+    da nova linha. Sem commit; uma sobreposição (as restrições valem já no
+    INSERT) desfaz a transação e vira ConflitoSobreposicao. Retorna quantas
+    exceções voltaram e as descartadas (id, horario_id, data).
+    """
+    H, E = models.Horario, models.HorarioExcecao
+    apagar = removidos + reescritos
+    excecoes = [
+        dict(e._mapping) for e in db.execute(select(E.__table__).where(E.horario_id.in_(reescritos)))
+    ] if reescritos else []
+    dia = {l["id"]: ORDEM_DIA[getattr(l["dia_semana"], "value", l["dia_semana"])] for l in linhas if l.get("id")}
+    preservadas = [e for e in excecoes if dia.get(e["horario_id"]) == e["data"].weekday()]
+    descartadas = [
+        {"id": e["id"], "horario_id": e["horario_id"], "data": e["data"]}
+        for e in excecoes if dia.get(e["horario_id"]) != e["data"].weekday()
+    ]
+    if apagar:
+        db.execute(delete(E).where(E.horario_id.in_(apagar)))
+        db.execute(delete(H).where(H.id.in_(apagar)))
+    if linhas:
+        with crud._sem_sobreposicao(db):
+            db.execute(insert(H), linhas)
+    if preservadas:
+        db.execute(insert(E), preservadas)
+    return len(preservadas), descartadas
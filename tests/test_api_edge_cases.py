@@ -186,3 +186,533 @@ def test_login_wrong_password_fails():
         timeout=10,
     )
     assert bad_login.status_code == 401
+
+
+def _link_entities(headers: dict, ids: dict) -> None:
+    vinculo = requests.post(
+        _url("/professor-disciplinas/"),
+        json={"professor_id": ids["professor_id"], "disciplina_id": ids["disciplina_id"]},
+        headers=headers,
+        timeout=10,
+    )
+    assert vinculo.status_code == 200, vinculo.text
+    vinculo = requests.post(
+        _url("/turma-disciplinas/"),
+        json={"turma_id": ids["turma_id"], "disciplina_id": ids["disciplina_id"]},
+        headers=headers,
+        timeout=10,
+    )
+    assert vinculo.status_code == 200, vinculo.text
+
+
+def test_horario_concurrent_conflicts_return_400():
+    from concurrent.futures import ThreadPoolExecutor
+
+    headers = _auth_headers()
+    ids = _create_school_entities(headers)
+    _link_entities(headers, ids)
+
+    payload = {
+        "professor_id": ids["professor_id"],
+        "disciplina_id": ids["disciplina_id"],
+        "turma_id": ids["turma_id"],
+        "turno_id": ids["turno_id"],
+        "dia_semana": "terca",
+        "hora_inicio": "08:00:00",
+        "hora_fim": "09:00:00",
+    }
+
+    def post(_):
+        return requests.post(_url("/horarios/"), json=payload, headers=headers, timeout=10).status_code
+
+    # Requisições simultâneas podem passar juntas pela verificação prévia;
+    # a restrição do banco precisa responder 400, nunca 500
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        status = sorted(pool.map(post, range(8)))
+    assert status == [200] + [400] * 7, status
+
+
+def test_horario_espaco_conflict_returns_400():
+    headers = _auth_headers()
+    ids = _create_school_entities(headers)
+    outros = _create_school_entities(headers)
+    _link_entities(headers, ids)
+    _link_entities(headers, outros)
+
+    suffix = uuid.uuid4().hex[:6]
+    espaco = requests.post(
+        _url("/espacos/"),
+        json={"nome": f"Sala-edge-{suffix}", "codigo": f"SALA-{suffix}", "capacidade": 40, "ativo": True},
+        headers=headers,
+        timeout=10,
+    )
+    assert espaco.status_code == 200, espaco.text
+
+    def payload(entidades: dict, inicio: str, fim: str) -> dict:
+        return {
+            "professor_id": entidades["professor_id"],
+            "disciplina_id": entidades["disciplina_id"],
+            "turma_id": entidades["turma_id"],
+            "turno_id": entidades["turno_id"],
+            "espaco_id": espaco.json()["id"],
+            "dia_semana": "quarta",
+            "hora_inicio": inicio,
+            "hora_fim": fim,
+        }
+
+    h1 = requests.post(_url("/horarios/"), json=payload(ids, "10:00:00", "11:00:00"), headers=headers, timeout=10)
+    assert h1.status_code == 200, h1.text
+
+    h2 = requests.post(_url("/horarios/"), json=payload(outros, "10:30:00", "11:30:00"), headers=headers, timeout=10)
+    assert h2.status_code == 400, h2.text
+    assert "Espaço" in h2.json()["detail"]
+
+    mover = requests.put(
+        _url(f"/horarios/{h1.json()['id']}"),
+        json={"dia_semana": "quinta"},
+        headers=headers,
+        timeout=10,
+    )
+    assert mover.status_code == 200, mover.text
+    h3 = requests.post(_url("/horarios/"), json=payload(outros, "10:30:00", "11:30:00"), headers=headers, timeout=10)
+    assert h3.status_code == 200, h3.text
+
+
+def _aguardar_tarefa(headers: dict, tarefa_id: int, prazo: float = 30) -> dict:
+    import time
+
+    limite = time.monotonic() + prazo
+    while True:
+        resp = requests.get(_url(f"/tarefas/{tarefa_id}"), headers=headers, timeout=10)
+        assert resp.status_code == 200, resp.text
+        tarefa = resp.json()
+        if tarefa["status"] in ("concluida", "falhou", "cancelada") or time.monotonic() > limite:
+            return tarefa
+        time.sleep(0.2)
+
+
+def test_exportacao_em_segundo_plano_gera_arquivo_para_download():
+    headers = _auth_headers()
+    ids = _create_school_entities(headers)
+    _link_entities(headers, ids)
+    horario = requests.post(_url("/horarios/"), json={
+        "professor_id": ids["professor_id"],
+        "disciplina_id": ids["disciplina_id"],
+        "turma_id": ids["turma_id"],
+        "turno_id": ids["turno_id"],
+        "dia_semana": "sexta",
+        "hora_inicio": "10:00:00",
+        "hora_fim": "11:00:00",
+    }, headers=headers, timeout=10)
+    assert horario.status_code == 200, horario.text
+
+    resp = requests.post(
+        _url("/exportar/horarios"), params={"turma_id": ids["turma_id"], "separador": ";"}, headers=headers, timeout=10,
+    )
+    assert resp.status_code == 202, resp.text
+    tarefa = _aguardar_tarefa(headers, resp.json()["id"])
+    assert tarefa["status"] == "concluida", tarefa
+
+    arquivo = requests.get(_url(f"/tarefas/{tarefa['id']}/arquivo"), headers=headers, timeout=10)
+    assert arquivo.status_code == 200, arquivo.text
+    assert arquivo.headers["content-type"].startswith("text/csv")
+    assert 'filename="horarios.csv"' in arquivo.headers["content-disposition"]
+    linhas = arquivo.content.decode("utf-8-sig").splitlines()
+    assert linhas[0].startswith("id;turno;turma")
+    assert len(linhas) == 2 and linhas[1].startswith(f"{horario.json()['id']};")
+    assert tarefa["resultado"] == {"linhas": 1, "bytes": len(arquivo.content)}
+
+
+def test_importar_curriculo_remover_ausentes_relata_nomes():
+    headers = _auth_headers()
+    ids = _create_school_entities(headers)
+    turno = requests.get(_url(f"/turnos/{ids['turno_id']}"), headers=headers, timeout=10).json()
+    suffix = uuid.uuid4().hex[:8]
+    turma, mat, fis = f"Imp-{suffix}", f"Mat-{suffix}", f"Fis-{suffix}"
+
+    def importar(disciplinas, **params):
+        linhas = ["turma,ano,turno,disciplina,carga_horaria_semanal"]
+        linhas += [f"{turma},1,{turno['nome']},{d},2" for d in disciplinas]
+        resp = requests.post(
+            _url("/importar/curriculo"),
+            params=params,
+            files={"arquivo": ("curriculo.csv", "\n".join(linhas).encode("utf-8"), "text/csv")},
+            headers=headers,
+            timeout=10,
+        )
+        assert resp.status_code == 200, resp.text
+        return resp.json()
+
+    importar([mat, fis], dry_run="false")
+    relatorio = importar([mat], dry_run="true", remover_ausentes="true")
+    assert relatorio["erros"] == []
+    # A disciplina removida não está na planilha: o nome vem do banco
+    assert relatorio["removidos"]["turma_disciplinas"] == [f"{turma} / {fis}"]
+
+
+def _substituir_conjunto(headers: dict, recurso: str, professor_id: int, itens: list):
+    return requests.put(_url(f"/{recurso}/por-professor/{professor_id}"), json=itens, headers=headers, timeout=10)
+
+
+def _chaves(linhas: list) -> set:
+    return {(l["dia_semana"], l["hora_inicio"], l["hora_fim"]) for l in linhas}
+
+
+def test_substituir_disponibilidades_e_bloqueios_do_professor():
+    headers = _auth_headers()
+    ids = _create_school_entities(headers)
+    professor_id = ids["professor_id"]
+    segunda = {"dia_semana": "segunda", "hora_inicio": "07:00:00", "hora_fim": "09:00:00"}
+    terca = {"dia_semana": "terca", "hora_inicio": "08:00:00", "hora_fim": "10:00:00"}
+    quarta = {"dia_semana": "quarta", "hora_inicio": "13:00:00", "hora_fim": "15:00:00"}
+
+    for recurso in ("professor-disponibilidades", "professor-bloqueios"):
+        resp = _substituir_conjunto(headers, recurso, professor_id, [segunda, terca, terca])
+        assert resp.status_code == 200, resp.text
+        primeiro = {(l["dia_semana"], l["hora_inicio"], l["hora_fim"]): l["id"] for l in resp.json()}
+        # Itens repetidos contam uma vez
+        assert len(resp.json()) == 2
+
+        # Segunda fica com o mesmo id; terça sai; quarta entra
+        resp = _substituir_conjunto(headers, recurso, professor_id, [quarta, segunda])
+        assert resp.status_code == 200, resp.text
+        segundo = {(l["dia_semana"], l["hora_inicio"], l["hora_fim"]): l["id"] for l in resp.json()}
+        assert [l["dia_semana"] for l in resp.json()] == ["segunda", "quarta"]
+        chave_segunda = ("segunda", "07:00:00", "09:00:00")
+        assert segundo[chave_segunda] == primeiro[chave_segunda]
+        assert segundo[("quarta", "13:00:00", "15:00:00")] not in primeiro.values()
+        assert primeiro[("terca", "08:00:00", "10:00:00")] not in segundo.values()
+
+        # Um item inválido recusa a substituição inteira
+        invalido = {"dia_semana": "sexta", "hora_inicio": "10:00:00", "hora_fim": "09:00:00"}
+        resp = _substituir_conjunto(headers, recurso, professor_id, [terca, invalido])
+        assert resp.status_code == 400, resp.text
+        atual = requests.get(_url(f"/{recurso}/por-professor/{professor_id}"), headers=headers, timeout=10)
+        assert atual.status_code == 200, atual.text
+        assert {l["id"] for l in atual.json()} == set(segundo.values())
+        assert _chaves(atual.json()) == {chave_segunda, ("quarta", "13:00:00", "15:00:00")}
+
+        resp = _substituir_conjunto(headers, recurso, professor_id, [])
+        assert resp.status_code == 200 and resp.json() == [], resp.text
+
+
+def _espaco(headers: dict, prefixo: str, capacidade: int) -> int:
+    suffix = uuid.uuid4().hex[:6]
+    resp = requests.post(_url("/espacos/"), json={
+        "nome": f"{prefixo}-{suffix}", "codigo": f"{prefixo[:3].upper()}-{suffix}", "capacidade": capacidade,
+        "ativo": True, "requer_aprovacao": False,
+    }, headers=headers, timeout=10)
+    assert resp.status_code == 200, resp.text
+    return resp.json()["id"]
+
+
+def _turma_com_alunos(headers: dict, alunos: int) -> dict:
+    ids = _create_school_entities(headers)
+    _link_entities(headers, ids)
+    resp = requests.put(_url(f"/turmas/{ids['turma_id']}"), json={"quantidade_alunos": alunos}, headers=headers, timeout=10)
+    assert resp.status_code == 200, resp.text
+    return ids
+
+
+def _horario_na_faixa(headers: dict, ids: dict, dia: str) -> int:
+    # Faixa que nenhum outro teste usa: a janela da alocação é (dia, início, fim)
+    resp = requests.post(_url("/horarios/"), json={
+        "professor_id": ids["professor_id"],
+        "disciplina_id": ids["disciplina_id"],
+        "turma_id": ids["turma_id"],
+        "turno_id": ids["turno_id"],
+        "dia_semana": dia,
+        "hora_inicio": "13:10:00",
+        "hora_fim": "14:00:00",
+    }, headers=headers, timeout=10)
+    assert resp.status_code == 200, resp.text
+    return resp.json()["id"]
+
+
+def _espacos_das_turmas(headers: dict, *turmas: dict) -> dict:
+    """horario_id -> espaco_id dos horários das turmas."""
+    espacos = {}
+    for ids in turmas:
+        resp = requests.get(_url("/horarios/"), params={"turma_id": ids["turma_id"]}, headers=headers, timeout=10)
+        assert resp.status_code == 200, resp.text
+        espacos.update({h["id"]: h["espaco_id"] for h in resp.json()})
+    return espacos
+
+
+def test_alocar_salas_capacidade_reservas_trocas_e_realocacao():
+    headers = _auth_headers()
+    grande, media, pequena = _espaco(headers, "Grande", 500), _espaco(headers, "Media", 320), _espaco(headers, "Pequena", 100)
+    a, b, c = _turma_com_alunos(headers, 480), _turma_com_alunos(headers, 300), _turma_com_alunos(headers, 80)
+    horario_a, horario_b = _horario_na_faixa(headers, a, "sabado"), _horario_na_faixa(headers, b, "sabado")
+    horario_a_sexta = _horario_na_faixa(headers, a, "sexta")
+
+    # Reserva numa sexta das próximas semanas ocupa a sala grande na aula semanal de sexta
+    hoje = dt.date.today()
+    sexta = hoje + dt.timedelta(days=(4 - hoje.weekday()) % 7 + 7)
+    reserva = requests.post(_url("/reservas"), params={"solicitante_id": 1}, json={
+        "espaco_id": grande, "data_reserva": sexta.isoformat(), "hora_inicio": "13:00:00", "hora_fim": "13:30:00",
+        "finalidade": "Evento",
+    }, headers=headers, timeout=10)
+    assert reserva.status_code == 200, reserva.text
+
+    def alocar(dia: str, **params) -> dict:
+        resp = requests.post(_url("/horarios/alocar-salas"), params={"dia_semana": dia, **params}, headers=headers, timeout=10)
+        assert resp.status_code == 200, resp.text
+        return resp.json()
+
+    # Capacidade: cada turma na menor sala que a comporta; a pequena não serve a nenhuma
+    alocar("sabado")
+    alocar("sexta")
+    espacos = _espacos_das_turmas(headers, a, b)
+    assert (espacos[horario_a], espacos[horario_b]) == (grande, media)
+    assert espacos[horario_a_sexta] not in (grande, media, pequena)
+
+    # As turmas invertem de tamanho: os dois horários trocam de sala sem violar a restrição do espaço
+    for ids, alunos in ((a, 300), (b, 480)):
+        resp = requests.put(_url(f"/turmas/{ids['turma_id']}"), json={"quantidade_alunos": alunos}, headers=headers, timeout=10)
+        assert resp.status_code == 200, resp.text
+    relatorio = alocar("sabado")
+    assert {(x["horario_id"], x["espaco_anterior_id"], x["espaco_id"]) for x in relatorio["alteracoes"]} == {
+        (horario_a, grande, media), (horario_b, media, grande),
+    }
+    espacos = _espacos_das_turmas(headers, a, b)
+    assert (espacos[horario_a], espacos[horario_b]) == (media, grande)
+
+    # Realocar um horário mexe só na janela dele
+    horario_c, horario_c_outro_dia = _horario_na_faixa(headers, c, "quinta"), _horario_na_faixa(headers, c, "quarta")
+    resp = requests.post(_url(f"/horarios/{horario_c}/alocar-sala"), headers=headers, timeout=10)
+    assert resp.status_code == 200, resp.text
+    relatorio = resp.json()
+    assert relatorio["horarios"] == 1 and relatorio["janelas"] == 1
+    assert relatorio["alteracoes"] == [{"horario_id": horario_c, "espaco_anterior_id": None, "espaco_id": pequena}]
+    espacos = _espacos_das_turmas(headers, a, b, c)
+    assert (espacos[horario_c], espacos[horario_c_outro_dia]) == (pequena, None)
+    assert (espacos[horario_a], espacos[horario_b]) == (media, grande)
+
+
+def _grade_editor(headers: dict) -> dict:
+    """Turno com três aulas (07h às 10h), duas turmas e três professores da mesma disciplina."""
+    ids = _create_school_entities(headers)
+    _link_entities(headers, ids)
+    for k in range(3):
+        resp = requests.post(_url("/periodos-aula/"), json={
+            "turno_id": ids["turno_id"], "numero_aula": k + 1, "tipo": "AULA", "ativo": True,
+            "hora_inicio": f"{7 + k:02d}:00:00", "hora_fim": f"{8 + k:02d}:00:00",
+        }, headers=headers, timeout=10)
+        assert resp.status_code in (200, 201), resp.text
+    outros = [_create_school_entities(headers) for _ in range(2)]
+    turma = requests.post(_url("/turmas/"), json={
+        "nome": f"T2-{uuid.uuid4().hex[:8]}", "ano": "1", "turno_id": ids["turno_id"], "ativa": True,
+    }, headers=headers, timeout=10)
+    assert turma.status_code == 200, turma.text
+    professores = [ids["professor_id"]] + [o["professor_id"] for o in outros]
+    turmas = [ids["turma_id"], turma.json()["id"]]
+    for caminho, payload in [
+        *(("/professor-disciplinas/", {"professor_id": p, "disciplina_id": ids["disciplina_id"]}) for p in professores[1:]),
+        ("/turma-disciplinas/", {"turma_id": turmas[1], "disciplina_id": ids["disciplina_id"]}),
+    ]:
+        vinculo = requests.post(_url(caminho), json=payload, headers=headers, timeout=10)
+        assert vinculo.status_code == 200, vinculo.text
+    return {**ids, "professores": professores, "turmas": turmas}
+
+
+def _aula_editor(headers: dict, grade: dict, professor: int, turma: int, dia: str, aula: int) -> int:
+    resp = requests.post(_url("/horarios/"), json={
+        "professor_id": grade["professores"][professor],
+        "disciplina_id": grade["disciplina_id"],
+        "turma_id": grade["turmas"][turma],
+        "turno_id": grade["turno_id"],
+        "dia_semana": dia,
+        "hora_inicio": f"{7 + aula:02d}:00:00",
+        "hora_fim": f"{8 + aula:02d}:00:00",
+    }, headers=headers, timeout=10)
+    assert resp.status_code == 200, resp.text
+    return resp.json()["id"]
+
+
+def _celula(headers: dict, horario_id: int, dia: str, numero_aula: int) -> dict:
+    resp = requests.get(_url(f"/horarios/{horario_id}/movimentos"), headers=headers, timeout=10)
+    assert resp.status_code == 200, resp.text
+    return next(c for c in resp.json()["celulas"] if c["dia_semana"] == dia and c["numero_aula"] == numero_aula)
+
+
+def test_movimentos_troca_simples_cadeia_de_kempe_e_bloqueio():
+    headers = _auth_headers()
+    grade = _grade_editor(headers)
+
+    # Segunda: a outra aula da turma ocupa o destino; basta trocar as duas
+    h1 = _aula_editor(headers, grade, 0, 0, "segunda", 0)
+    h2 = _aula_editor(headers, grade, 1, 0, "segunda", 1)
+    celula = _celula(headers, h1, "segunda", 2)
+    assert celula["valido"] is False
+    assert celula["motivos"] == ["conflito_turma"] and celula["conflitos"] == [h2]
+    assert celula["troca"] == {"tipo": "simples", "para_destino": [h1], "para_origem": [h2]}
+
+    # Terça: o professor da aula trocada já dá aula na origem para outra turma,
+    # que também precisa mudar de lado
+    k1 = _aula_editor(headers, grade, 0, 0, "terca", 0)
+    k2 = _aula_editor(headers, grade, 1, 0, "terca", 1)
+    k3 = _aula_editor(headers, grade, 1, 1, "terca", 0)
+    celula = _celula(headers, k1, "terca", 2)
+    assert celula["troca"] == {"tipo": "kempe", "para_destino": sorted([k1, k3]), "para_origem": [k2]}
+
+    # Quinta: a troca levaria o outro professor a um horário bloqueado
+    q1 = _aula_editor(headers, grade, 0, 0, "quinta", 0)
+    _aula_editor(headers, grade, 2, 0, "quinta", 1)
+    for professor_id, dia, inicio, fim in (
+        (grade["professores"][2], "quinta", "07:00:00", "08:00:00"),
+        (grade["professores"][0], "quarta", "08:00:00", "09:00:00"),
+    ):
+        resp = requests.post(_url("/professor-bloqueios/"), json={
+            "professor_id": professor_id, "dia_semana": dia, "hora_inicio": inicio, "hora_fim": fim,
+        }, headers=headers, timeout=10)
+        assert resp.status_code == 200, resp.text
+    celula = _celula(headers, q1, "quinta", 2)
+    assert celula["motivos"] == ["conflito_turma"] and celula["troca"] is None
+
+    # Bloqueio do próprio professor: célula livre, mas inválida e sem troca
+    celula = _celula(headers, h1, "quarta", 2)
+    assert celula["valido"] is False
+    assert celula["motivos"] == ["bloqueio_professor"] and celula["conflitos"] == [] and celula["troca"] is None
+    assert _celula(headers, h1, "quarta", 1)["valido"] is True
+
+
+def _substitutos(headers: dict, horario_id: int) -> list:
+    resp = requests.get(_url(f"/horarios/{horario_id}/substitutos"), headers=headers, timeout=10)
+    assert resp.status_code == 200, resp.text
+    return [c["professor_id"] for c in resp.json()["candidatos"]]
+
+
+def test_substitutos_ordenados_por_carga_e_limitados_pela_carga_semanal():
+    headers = _auth_headers()
+    grade = _grade_editor(headers)
+    p0, p1, p2 = grade["professores"]
+    aula = _aula_editor(headers, grade, 0, 0, "segunda", 0)
+    # p1 com duas horas na semana e p2 com uma (carga de 10h cada)
+    _aula_editor(headers, grade, 1, 1, "terca", 0)
+    _aula_editor(headers, grade, 1, 1, "terca", 1)
+    _aula_editor(headers, grade, 2, 1, "quarta", 0)
+
+    assert _substitutos(headers, aula) == [p2, p1]
+    resp = requests.get(_url("/horarios/substitutos"), params={"professor_id": p0, "dia_semana": "segunda"},
+                        headers=headers, timeout=10)
+    assert resp.status_code == 200, resp.text
+    assert [(s["horario_id"], [c["professor_id"] for c in s["candidatos"]]) for s in resp.json()] == [(aula, [p2, p1])]
+
+    # Com carga de 1h, p2 já está no limite e não pode assumir mais uma aula
+    resp = requests.put(_url(f"/professores/{p2}"), json={"carga_horaria_semanal": 1}, headers=headers, timeout=10)
+    assert resp.status_code == 200, resp.text
+    assert _substitutos(headers, aula) == [p1]
+
+    # Ocupado na mesma faixa (aula em outra turma) também fica de fora
+    _aula_editor(headers, grade, 1, 1, "segunda", 0)
+    assert _substitutos(headers, aula) == []
+
+
+def _registrar(headers: dict, caminho: str, payload: dict) -> int:
+    resp = requests.post(_url(caminho), json=payload, headers=headers, timeout=10)
+    assert resp.status_code == 200, resp.text
+    return resp.json()["id"]
+
+
+def _efetivos(headers: dict, **params) -> list:
+    resp = requests.get(_url("/horarios/efetivos"), params=params, headers=headers, timeout=10)
+    assert resp.status_code == 200, resp.text
+    return resp.json()
+
+
+def test_grade_efetiva_aplica_excecoes_e_ausencias_na_data():
+    headers = _auth_headers()
+    grade = _grade_editor(headers)
+    p0, p1, _ = grade["professores"]
+    turma = grade["turmas"][0]
+    cancelada = _aula_editor(headers, grade, 0, 0, "segunda", 0)
+    substituida = _aula_editor(headers, grade, 0, 0, "segunda", 1)
+    remarcada = _aula_editor(headers, grade, 0, 0, "terca", 0)
+    ausente = _aula_editor(headers, grade, 0, 0, "quarta", 0)
+
+    segunda, proxima = "2030-01-07", "2030-01-14"
+    _registrar(headers, "/horario-excecoes/", {"horario_id": cancelada, "data": segunda, "cancelado": True})
+    substituicao = _registrar(headers, "/horario-excecoes/", {
+        "horario_id": substituida, "data": segunda, "professor_id": p1, "sala": "Lab",
+    })
+    remarcacao = _registrar(headers, "/horario-excecoes/", {
+        "horario_id": remarcada, "data": "2030-01-08", "hora_inicio": "09:00:00", "hora_fim": "10:00:00",
+    })
+    ausencia = _registrar(headers, "/professor-ausencias/", {"professor_id": p0, "data": "2030-01-09"})
+    # Ausência parcial na segunda: a aula já repassada ao substituto não é afetada
+    _registrar(headers, "/professor-ausencias/", {
+        "professor_id": p0, "data": segunda, "hora_inicio": "07:30:00", "hora_fim": "08:30:00",
+    })
+
+    aulas = _efetivos(headers, data_inicio=segunda, data_fim=proxima, turma_id=turma)
+    resumo = [(a["data"], a["horario_id"], a["status"]) for a in aulas]
+    assert resumo == [
+        (segunda, cancelada, "cancelada"),
+        (segunda, substituida, "substituida"),
+        ("2030-01-08", remarcada, "alterada"),
+        ("2030-01-09", ausente, "sem_professor"),
+        (proxima, cancelada, "normal"),
+        (proxima, substituida, "normal"),
+    ]
+    trocada = aulas[1]
+    assert (trocada["professor_id"], trocada["professor_original_id"]) == (p1, p0)
+    assert (trocada["sala"], trocada["excecao_id"], trocada["ausencia_id"]) == ("Lab", substituicao, None)
+    assert (aulas[2]["hora_inicio"], aulas[2]["hora_fim"], aulas[2]["excecao_id"]) == ("09:00:00", "10:00:00", remarcacao)
+    assert aulas[3]["ausencia_id"] == ausencia
+
+    sem_canceladas = _efetivos(headers, data_inicio=segunda, turma_id=turma, incluir_canceladas=False)
+    assert [a["horario_id"] for a in sem_canceladas] == [substituida]
+    # O substituto vê a aula na sua grade; o original também, como substituído
+    assert [a["horario_id"] for a in _efetivos(headers, data_inicio=segunda, professor_id=p1)] == [substituida]
+    assert [a["horario_id"] for a in _efetivos(headers, data_inicio=segunda, professor_id=p0)] == [cancelada, substituida]
+
+
+def _agenda(headers: dict, data: str, **entidade) -> list:
+    resp = requests.get(_url("/agenda"), params={"data": data, **entidade}, headers=headers, timeout=10)
+    assert resp.status_code == 200, resp.text
+    return [(i["tipo"], i["hora_inicio"], i.get("horario_id") or i.get("reserva_id"), i["conflito"]) for i in resp.json()["itens"]]
+
+
+def test_agenda_marca_conflitos_da_turma_do_professor_e_do_espaco():
+    headers = _auth_headers()
+    grade = _grade_editor(headers)
+    a = _aula_editor(headers, grade, 0, 0, "segunda", 0)
+    b = _aula_editor(headers, grade, 0, 0, "segunda", 1)
+    c = _aula_editor(headers, grade, 0, 0, "segunda", 2)
+    suffix = uuid.uuid4().hex[:6]
+    espaco = requests.post(_url("/espacos/"), json={
+        "nome": f"Auditorio-{suffix}", "codigo": f"AUD-{suffix}", "capacidade": 100,
+        "ativo": True, "requer_aprovacao": False,
+    }, headers=headers, timeout=10)
+    assert espaco.status_code == 200, espaco.text
+    espaco_id = espaco.json()["id"]
+
+    data = "2030-02-04"  # segunda-feira
+    # Na data, b é adiantada para cima de a e c vai para o auditório, já reservado em parte da aula
+    _registrar(headers, "/horario-excecoes/", {"horario_id": b, "data": data, "hora_inicio": "07:30:00", "hora_fim": "08:30:00"})
+    _registrar(headers, "/horario-excecoes/", {"horario_id": c, "data": data, "sala": f"AUD-{suffix}"})
+    reserva = requests.post(_url("/reservas"), params={"solicitante_id": 1}, json={
+        "espaco_id": espaco_id, "data_reserva": data, "hora_inicio": "09:30:00", "hora_fim": "10:30:00",
+        "finalidade": "Palestra",
+    }, headers=headers, timeout=10)
+    assert reserva.status_code == 200, reserva.text
+    reserva_id = reserva.json()["id"]
+
+    assert _agenda(headers, data, turma_id=grade["turmas"][0]) == [
+        ("aula", "07:00:00", a, True),
+        ("aula", "07:30:00", b, True),
+        ("vago", "08:00:00", None, False),
+        ("aula", "09:00:00", c, False),
+    ]
+    assert _agenda(headers, data, professor_id=grade["professores"][0]) == [
+        ("aula", "07:00:00", a, True),
+        ("aula", "07:30:00", b, True),
+        ("aula", "09:00:00", c, False),
+    ]
+    assert _agenda(headers, data, espaco_id=espaco_id) == [
+        ("aula", "09:00:00", c, True),
+        ("reserva", "09:30:00", reserva_id, True),
+    ]
+    # Semana seguinte: sem exceções, nada se sobrepõe
+    assert [i[3] for i in _agenda(headers, "2030-02-11", turma_id=grade["turmas"][0])] == [False] * 3
@@ -0,0 +1,91 @@
+import os
+import sys
+import uuid
+from datetime import date, time
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+
+SERVER_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "server")
+# Banco PostgreSQL descartável: o teste recria todas as tabelas nele
+POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+
+sys.path.insert(0, SERVER_DIR)
+import restricoes  # noqa: E402
+
+
+def test_mensagem_violacao_reconhece_restricao_de_particao():
+    for nome in ("reservas_espaco_p202503_sem_sobreposicao", "reservas_espaco_default_sem_sobreposicao"):
+        erro = SimpleNamespace(orig=SimpleNamespace(diag=SimpleNamespace(constraint_name=nome)))
+        assert restricoes.mensagem_violacao(erro) == "Já existe uma reserva neste horário"
+        erro = SimpleNamespace(orig=f'conflicting key value violates exclusion constraint "{nome}"')
+        assert restricoes.mensagem_violacao(erro) == "Já existe uma reserva neste horário"
+
+
+@pytest.fixture
+def postgres():
+    if not POSTGRES_URL:
+        pytest.skip("TEST_POSTGRES_URL não definida")
+    os.environ["DATABASE_URL"] = POSTGRES_URL
+    from database import models
+    from database.database import engine
+    import manutencao_reservas
+
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+    restricoes.aplicar(engine)
+    yield SimpleNamespace(engine=engine, models=models, manutencao=manutencao_reservas)
+    models.Base.metadata.drop_all(bind=engine)
+
+
+def _reserva(conn, espaco_id: int, usuario_id: int, data: date, inicio: int, fim: int) -> None:
+    conn.execute(text(
+        "INSERT INTO reservas_espaco (espaco_id, solicitante_id, data_reserva, hora_inicio, hora_fim, finalidade, status) "
+        "VALUES (:espaco, :usuario, :data, :inicio, :fim, 'Aula', 'aprovada')"
+    ), {"espaco": espaco_id, "usuario": usuario_id, "data": data, "inicio": time(inicio), "fim": time(fim)})
+
+
+def test_particionar_mantem_restricao_de_reservas_sobrepostas(postgres):
+    engine, manutencao = postgres.engine, postgres.manutencao
+    suffix = uuid.uuid4().hex[:8]
+    with engine.begin() as conn:
+        usuario_id = conn.execute(text(
+            "INSERT INTO usuarios (nome, username, email, senha_hash, role, ativo) "
+            "VALUES (:n, :n, :e, 'x', 'DIRETOR', true) RETURNING id"
+        ), {"n": f"manut-{suffix}", "e": f"manut-{suffix}@example.com"}).scalar()
+        espaco_id = conn.execute(text(
+            "INSERT INTO espacos_escola (nome, ativo) VALUES (:n, true) RETURNING id"
+        ), {"n": f"Sala {suffix}"}).scalar()
+        _reserva(conn, espaco_id, usuario_id, date.today(), 8, 9)
+
+    assert manutencao.particionar(meses_futuros=2)
+    with engine.connect() as conn:
+        assert manutencao.esta_particionada(conn)
+        nomes = [nome for nome, _ in manutencao.listar_particoes(conn)] + [manutencao.PARTICAO_PADRAO]
+        existentes = set(conn.execute(text("SELECT conname FROM pg_constraint")).scalars())
+    assert {restricoes.nome_restricao_particao(n) for n in nomes} <= existentes
+    # Idempotente e sem tentar criar a restrição na tabela mãe
+    restricoes.aplicar(engine)
+
+    # Partição mensal (reserva copiada da tabela antiga) e partição padrão (data sem partição própria)
+    with engine.begin() as conn:
+        _reserva(conn, espaco_id, usuario_id, date(2999, 1, 4), 8, 9)
+    for data in (date.today(), date(2999, 1, 4)):
+        with pytest.raises(IntegrityError) as erro:
+            with engine.begin() as conn:
+                _reserva(conn, espaco_id, usuario_id, data, 8, 10)
+        assert restricoes.mensagem_violacao(erro.value) == "Já existe uma reserva neste horário"
+
+    # Partição sem a restrição e com reservas sobrepostas: aplicar falha em vez de só avisar
+    particao = manutencao._nome_particao(manutencao._proximo_mes(date.today()))
+    with engine.begin() as conn:
+        conn.execute(text(
+            f"ALTER TABLE {particao} DROP CONSTRAINT {restricoes.nome_restricao_particao(particao)}"
+        ))
+        data = manutencao._proximo_mes(date.today())
+        _reserva(conn, espaco_id, usuario_id, data, 8, 9)
+        _reserva(conn, espaco_id, usuario_id, data, 8, 10)
+    with pytest.raises(RuntimeError):
+        restricoes.aplicar(engine)
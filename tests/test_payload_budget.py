@@ -0,0 +1,136 @@
+import gzip
+import json
+import os
+import uuid
+
+import requests
+
+BASE_URL = os.getenv("API_BASE_URL", "http://localhost:8000")
+ADMIN_USER = os.getenv("API_ADMIN_USER", "admin")
+ADMIN_PASS = os.getenv("API_ADMIN_PASS", "admin123")
+
+# Orçamento por item de cada listagem, em bytes: (JSON sem compressão, gzip no fio).
+# Por item porque o banco do servidor de testes é compartilhado e cresce com os
+# outros testes; o conjunto semeado abaixo garante que todas tenham itens.
+ORCAMENTOS = {
+    "/turmas/": (3000, 250),
+    "/turnos/": (1500, 200),
+    "/horarios/": (3500, 200),
+    "/professores/": (10000, 600),
+    "/disciplinas/": (300, 50),
+    "/periodos-aula/": (400, 60),
+}
+FATOR_ORCAMENTO = float(os.getenv("API_PAYLOAD_FATOR_ORCAMENTO", "1"))
+
+
+def _url(path: str) -> str:
+    return f"{BASE_URL}{path}"
+
+
+def _auth_headers() -> dict:
+    resp = requests.post(
+        _url("/auth/login"),
+        json={"username": ADMIN_USER, "senha": ADMIN_PASS},
+        timeout=10,
+    )
+    assert resp.status_code == 200, resp.text
+    return {"Authorization": f"Bearer {resp.json()['access_token']}"}
+
+
+def _post(path: str, payload: dict, headers: dict) -> dict:
+    resp = requests.post(_url(path), json=payload, headers=headers, timeout=10)
+    assert resp.status_code in (200, 201), resp.text
+    return resp.json()
+
+
+def _semear(headers: dict) -> None:
+    """Turno com duas turmas, duas disciplinas, um professor e dez horários."""
+    suffix = uuid.uuid4().hex[:8]
+    turno = _post("/turnos/", {
+        "nome": f"Payload-{suffix}", "hora_inicio": "07:00:00", "hora_fim": "12:00:00",
+        "descricao": "Turno orçamento de payload", "ativo": True,
+    }, headers)
+    disciplinas = [
+        _post("/disciplinas/", {
+            "nome": f"Payload-{i}-{suffix}", "codigo": f"PAY{i}-{suffix}",
+            "carga_horaria_semanal": 5, "descricao": "Disciplina orçamento", "ativa": True,
+        }, headers)
+        for i in range(2)
+    ]
+    turmas = [
+        _post("/turmas/", {
+            "nome": f"P{i}-{suffix}", "ano": "1º", "turno_id": turno["id"],
+            "curso": "Ensino Médio", "ativa": True,
+        }, headers)
+        for i in range(2)
+    ]
+    professor = _post("/professores/", {
+        "departamento": "Payload", "especializacao": "Teste", "carga_horaria_semanal": 20,
+        "observacoes": "",
+        "usuario": {
+            "nome": f"Prof Payload {suffix}", "username": f"prof-payload-{suffix}",
+            "email": f"prof-payload-{suffix}@example.com", "telefone": "11988882222",
+            "role": "PROFESSOR", "senha": "senha123", "ativo": True,
+        },
+    }, headers)
+    for disciplina in disciplinas:
+        _post("/professor-disciplinas/", {"professor_id": professor["id"], "disciplina_id": disciplina["id"]}, headers)
+        for turma in turmas:
+            _post("/turma-disciplinas/", {"turma_id": turma["id"], "disciplina_id": disciplina["id"]}, headers)
+
+    for i, dia in enumerate(["segunda", "terca", "quarta", "quinta", "sexta"]):
+        for j, (inicio, fim) in enumerate((("07:00:00", "08:00:00"), ("08:00:00", "09:00:00"))):
+            _post("/horarios/", {
+                "professor_id": professor["id"], "disciplina_id": disciplinas[j]["id"],
+                "turma_id": turmas[(i + j) % 2]["id"], "turno_id": turno["id"],
+                "dia_semana": dia, "hora_inicio": inicio, "hora_fim": fim,
+                "sala": f"P{j}", "observacoes": "",
+            }, headers)
+
+
+def test_list_responses_within_byte_budget():
+    headers = _auth_headers()
+    _semear(headers)
+
+    excedidos = []
+    for path, (bruto_item, comprimido_item) in ORCAMENTOS.items():
+        resp = requests.get(_url(path), headers={**headers, "Accept-Encoding": "gzip"}, timeout=30, stream=True)
+        assert resp.status_code == 200, path
+        no_fio = resp.raw.read(decode_content=False)
+        codificacao = resp.headers.get("content-encoding")
+        corpo = gzip.decompress(no_fio) if codificacao == "gzip" else no_fio
+        itens = len(json.loads(corpo))
+        assert itens > 0, path
+        assert "Accept-Encoding" in resp.headers.get("vary", ""), path
+        if len(corpo) >= 1024:
+            assert codificacao == "gzip", f"{path} sem compressão ({len(corpo)} bytes)"
+
+        limite_bruto = int(itens * bruto_item * FATOR_ORCAMENTO)
+        limite_comprimido = int(itens * comprimido_item * FATOR_ORCAMENTO)
+        if len(corpo) > limite_bruto:
+            excedidos.append(f"{path}: {len(corpo)} bytes > {limite_bruto} ({itens} itens)")
+        if len(no_fio) > limite_comprimido:
+            excedidos.append(f"{path} (gzip): {len(no_fio)} bytes > {limite_comprimido} ({itens} itens)")
+
+    assert not excedidos, "Orçamento de payload excedido:\n" + "\n".join(excedidos)
+
+
+def test_payload_metrics_by_route():
+    headers = _auth_headers()
+    requests.get(_url("/turmas/"), headers={**headers, "Accept-Encoding": "gzip"}, timeout=30)
+
+    metricas = requests.get(_url("/metricas/payload"), headers=headers, timeout=10)
+    assert metricas.status_code == 200, metricas.text
+    dados = metricas.json()
+    assert "gzip" in dados["codificacoes"]
+    rotas = {m["rota"]: m for m in dados["rotas"]}
+    turmas = rotas["GET /turmas/"]
+    assert turmas["requisicoes"] >= 1
+    assert turmas["bytes_enviados"] <= turmas["bytes_originais"]
+
+
+def test_identity_when_client_refuses_compression():
+    headers = _auth_headers()
+    resp = requests.get(_url("/turmas/"), headers={**headers, "Accept-Encoding": "identity"}, timeout=30)
+    assert resp.status_code == 200
+    assert "content-encoding" not in resp.headers
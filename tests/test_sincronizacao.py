@@ -0,0 +1,150 @@
+import os
+import uuid
+
+import requests
+
+BASE_URL = os.getenv("API_BASE_URL", "http://localhost:8000")
+ADMIN_USER = os.getenv("API_ADMIN_USER", "admin")
+ADMIN_PASS = os.getenv("API_ADMIN_PASS", "admin123")
+
+
+def _url(path: str) -> str:
+    return f"{BASE_URL}{path}"
+
+
+def _auth_headers() -> dict:
+    resp = requests.post(
+        _url("/auth/login"),
+        json={"username": ADMIN_USER, "senha": ADMIN_PASS},
+        timeout=10,
+    )
+    assert resp.status_code == 200, resp.text
+    return {"Authorization": f"Bearer {resp.json()['access_token']}"}
+
+
+def _post(headers: dict, path: str, payload: dict) -> dict:
+    resp = requests.post(_url(path), json=payload, headers=headers, timeout=10)
+    assert resp.status_code in (200, 201), resp.text
+    return resp.json()
+
+
+def _sync(headers: dict, since=None) -> dict:
+    params = {} if since is None else {"since": since}
+    resp = requests.get(_url("/sync"), params=params, headers=headers, timeout=10)
+    assert resp.status_code == 200, resp.text
+    return resp.json()
+
+
+def _turno(headers: dict, suffix: str) -> dict:
+    return _post(headers, "/turnos/", {
+        "nome": f"Turno-sync-{suffix}", "hora_inicio": "07:00:00", "hora_fim": "12:00:00", "ativo": True,
+    })
+
+
+def _grade(headers: dict) -> dict:
+    """Turno com uma aula às 07h, turma, disciplina e professor vinculados."""
+    suffix = uuid.uuid4().hex[:8]
+    turno = _turno(headers, suffix)
+    _post(headers, "/periodos-aula/", {
+        "turno_id": turno["id"], "numero_aula": 1, "tipo": "AULA", "ativo": True,
+        "hora_inicio": "07:00:00", "hora_fim": "08:00:00",
+    })
+    disciplina = _post(headers, "/disciplinas/", {
+        "nome": f"Disc-sync-{suffix}", "codigo": f"DS-{suffix}", "carga_horaria_semanal": 2, "ativa": True,
+    })
+    turma = _post(headers, "/turmas/", {"nome": f"T-sync-{suffix}", "ano": "1", "turno_id": turno["id"], "ativa": True})
+    professor = _post(headers, "/professores/", {
+        "departamento": "Sync",
+        "carga_horaria_semanal": 20,
+        "usuario": {
+            "nome": f"Prof Sync {suffix}",
+            "username": f"prof-sync-{suffix}",
+            "email": f"prof-sync-{suffix}@example.com",
+            "role": "PROFESSOR",
+            "senha": "senha123",
+            "ativo": True,
+        },
+    })
+    _post(headers, "/turma-disciplinas/", {"turma_id": turma["id"], "disciplina_id": disciplina["id"]})
+    _post(headers, "/professor-disciplinas/", {"professor_id": professor["id"], "disciplina_id": disciplina["id"]})
+    return {"turno_id": turno["id"], "turma_id": turma["id"], "disciplina_id": disciplina["id"], "professor_id": professor["id"]}
+
+
+def _horario(headers: dict, grade: dict, dia: str) -> dict:
+    return _post(headers, "/horarios/", {
+        **{k: grade[k] for k in ("professor_id", "disciplina_id", "turma_id", "turno_id")},
+        "dia_semana": dia, "hora_inicio": "07:00:00", "hora_fim": "08:00:00",
+    })
+
+
+def _salvar_versao(headers: dict, grade: dict) -> int:
+    return _post(headers, "/versoes-grade/", {"nome": f"v-sync-{uuid.uuid4().hex[:8]}", "turno_id": grade["turno_id"]})["id"]
+
+
+def _restaurar(headers: dict, versao_id: int) -> None:
+    resp = requests.post(_url(f"/versoes-grade/{versao_id}/restaurar"), headers=headers, timeout=10)
+    assert resp.status_code == 200, resp.text
+
+
+def test_sync_sem_token_pede_carga_completa():
+    headers = _auth_headers()
+    resposta = _sync(headers)
+    assert resposta["recarregar"] == sorted(["turnos", "turmas", "disciplinas", "horarios", "periodos_aula", "reservas_espaco"])
+    assert resposta["alteracoes"] == {}
+    assert _sync(headers, resposta["token"])["alteracoes"] == {}
+
+
+def test_sync_devolve_exatamente_as_alteracoes_desde_o_token():
+    headers = _auth_headers()
+    suffix = uuid.uuid4().hex[:8]
+    turno = _turno(headers, suffix)
+    token = _sync(headers)["token"]
+
+    mantida = _post(headers, "/turmas/", {"nome": f"Sync-A-{suffix}", "ano": "1", "turno_id": turno["id"], "ativa": True})
+    resp = requests.put(_url(f"/turmas/{mantida['id']}"), json={"nome": f"Sync-B-{suffix}"}, headers=headers, timeout=10)
+    assert resp.status_code == 200, resp.text
+    removida = _post(headers, "/turmas/", {"nome": f"Sync-C-{suffix}", "ano": "1", "turno_id": turno["id"], "ativa": True})
+    resp = requests.delete(_url(f"/turmas/{removida['id']}"), headers=headers, timeout=10)
+    assert resp.status_code in (200, 204), resp.text
+
+    resposta = _sync(headers, token)
+    assert resposta["recarregar"] == []
+    assert resposta["tem_mais"] is False
+    assert list(resposta["alteracoes"]) == ["turmas"]
+    turmas = resposta["alteracoes"]["turmas"]
+    assert [(t["id"], t["nome"]) for t in turmas["upserts"]] == [(mantida["id"], f"Sync-B-{suffix}")]
+    assert turmas["removidos"] == [removida["id"]]
+    # Nada novo depois do token devolvido
+    assert _sync(headers, resposta["token"])["alteracoes"] == {}
+
+
+def test_sync_exclusao_em_lote_gera_lapides():
+    headers = _auth_headers()
+    grade = _grade(headers)
+    versao_id = _salvar_versao(headers, grade)
+    novo = _horario(headers, grade, "segunda")
+    token = _sync(headers)["token"]
+
+    # Restaurar a versão apaga o horário novo com DELETE ... WHERE (sem carregar objetos)
+    _restaurar(headers, versao_id)
+
+    resposta = _sync(headers, token)
+    assert resposta["recarregar"] == []
+    assert resposta["alteracoes"] == {"horarios": {"upserts": [], "removidos": [novo["id"]]}}
+
+
+def test_sync_insercao_em_lote_pede_recarregar():
+    headers = _auth_headers()
+    grade = _grade(headers)
+    horario = _horario(headers, grade, "terca")
+    versao_id = _salvar_versao(headers, grade)
+    resp = requests.delete(_url(f"/horarios/{horario['id']}"), headers=headers, timeout=10)
+    assert resp.status_code in (200, 204), resp.text
+    token = _sync(headers)["token"]
+
+    # A restauração reinsere o horário com INSERT em lote: os ids não são conhecidos
+    _restaurar(headers, versao_id)
+
+    resposta = _sync(headers, token)
+    assert resposta["recarregar"] == ["horarios"]
+    assert "horarios" not in resposta["alteracoes"]
@@ -0,0 +1,337 @@
+import os
+import uuid
+import datetime as dt
+
+import requests
+
+BASE_URL = os.getenv("API_BASE_URL", "http://localhost:8000")
+ADMIN_USER = os.getenv("API_ADMIN_USER", "admin")
+ADMIN_PASS = os.getenv("API_ADMIN_PASS", "admin123")
+
+DIAS = ["segunda", "terca", "quarta", "quinta", "sexta", "sabado", "domingo"]
+
+
+def _url(path: str) -> str:
+    return f"{BASE_URL}{path}"
+
+
+def _auth_headers() -> dict:
+    resp = requests.post(
+        _url("/auth/login"),
+        json={"username": ADMIN_USER, "senha": ADMIN_PASS},
+        timeout=10,
+    )
+    assert resp.status_code == 200, resp.text
+    token = resp.json().get("access_token")
+    assert token, resp.text
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _post(headers: dict, path: str, payload: dict) -> dict:
+    resp = requests.post(_url(path), json=payload, headers=headers, timeout=10)
+    assert resp.status_code in (200, 201), resp.text
+    return resp.json()
+
+
+def _create_grade(headers: dict, professores: int = 1) -> dict:
+    """Turno com três aulas (07h às 10h), uma turma, uma disciplina e professores vinculados."""
+    suffix = uuid.uuid4().hex[:8]
+    turno = _post(headers, "/turnos/", {
+        "nome": f"Turno-versao-{suffix}", "hora_inicio": "07:00:00", "hora_fim": "12:00:00", "ativo": True,
+    })
+    for k in range(3):
+        _post(headers, "/periodos-aula/", {
+            "turno_id": turno["id"], "numero_aula": k + 1, "tipo": "AULA", "ativo": True,
+            "hora_inicio": f"{7 + k:02d}:00:00", "hora_fim": f"{8 + k:02d}:00:00",
+        })
+    disciplina = _post(headers, "/disciplinas/", {
+        "nome": f"Disc-versao-{suffix}", "codigo": f"DV-{suffix}", "carga_horaria_semanal": 4, "ativa": True,
+    })
+    turma = _post(headers, "/turmas/", {"nome": f"T-versao-{suffix}", "ano": "1", "turno_id": turno["id"], "ativa": True})
+    _post(headers, "/turma-disciplinas/", {"turma_id": turma["id"], "disciplina_id": disciplina["id"]})
+    ids = []
+    for i in range(professores):
+        professor = _post(headers, "/professores/", {
+            "departamento": "Versao",
+            "carga_horaria_semanal": 20,
+            "usuario": {
+                "nome": f"Prof Versao {suffix}-{i}",
+                "username": f"prof-versao-{suffix}-{i}",
+                "email": f"prof-versao-{suffix}-{i}@example.com",
+                "role": "PROFESSOR",
+                "senha": "senha123",
+                "ativo": True,
+            },
+        })
+        _post(headers, "/professor-disciplinas/", {"professor_id": professor["id"], "disciplina_id": disciplina["id"]})
+        ids.append(professor["id"])
+    return {
+        "turno_id": turno["id"],
+        "turma_id": turma["id"],
+        "disciplina_id": disciplina["id"],
+        "professor_ids": ids,
+    }
+
+
+def _horario(grade: dict, dia: str, aula: int, professor: int = 0, **extra) -> dict:
+    return {
+        "professor_id": grade["professor_ids"][professor],
+        "disciplina_id": grade["disciplina_id"],
+        "turma_id": grade["turma_id"],
+        "turno_id": grade["turno_id"],
+        "dia_semana": dia,
+        "hora_inicio": f"{7 + aula:02d}:00:00",
+        "hora_fim": f"{8 + aula:02d}:00:00",
+        **extra,
+    }
+
+
+def _proxima_data(dia: str) -> str:
+    hoje = dt.date.today()
+    return (hoje + dt.timedelta(days=(DIAS.index(dia) - hoje.weekday()) % 7 + 7)).isoformat()
+
+
+def _excecoes(headers: dict, horario_id: int) -> list:
+    resp = requests.get(_url("/horario-excecoes/"), params={"horario_id": horario_id}, headers=headers, timeout=10)
+    assert resp.status_code == 200, resp.text
+    return resp.json()
+
+
+def _salvar_versao(headers: dict, grade: dict) -> int:
+    return _post(headers, "/versoes-grade/", {"nome": f"v-{uuid.uuid4().hex[:8]}", "turno_id": grade["turno_id"]})["id"]
+
+
+def test_restaurar_versao_desfaz_alteracoes_e_mantem_excecoes():
+    headers = _auth_headers()
+    grade = _create_grade(headers)
+    mantido = _post(headers, "/horarios/", _horario(grade, "segunda", 0, sala="101"))
+    removido = _post(headers, "/horarios/", _horario(grade, "segunda", 1))
+    excecao = _post(headers, "/horario-excecoes/", {
+        "horario_id": mantido["id"], "data": _proxima_data("segunda"), "cancelado": True,
+    })
+    versao_id = _salvar_versao(headers, grade)
+
+    resp = requests.put(_url(f"/horarios/{mantido['id']}"), json={"sala": "202"}, headers=headers, timeout=10)
+    assert resp.status_code == 200, resp.text
+    resp = requests.delete(_url(f"/horarios/{removido['id']}"), headers=headers, timeout=10)
+    assert resp.status_code in (200, 204), resp.text
+    novo = _post(headers, "/horarios/", _horario(grade, "quarta", 2))
+
+    resp = requests.post(_url(f"/versoes-grade/{versao_id}/restaurar"), headers=headers, timeout=10)
+    assert resp.status_code == 200, resp.text
+    restauracao = resp.json()
+    assert restauracao["excecoes_preservadas"] == 1
+    assert restauracao["excecoes_descartadas"] == []
+    assert [l["id"] for l in restauracao["diferenca"]["adicionados"]] == [removido["id"]]
+    assert [l["id"] for l in restauracao["diferenca"]["removidos"]] == [novo["id"]]
+
+    horarios = requests.get(_url("/horarios/"), params={"turno_id": grade["turno_id"]}, headers=headers, timeout=10).json()
+    assert {h["id"]: h["sala"] for h in horarios} == {mantido["id"]: "101", removido["id"]: None}
+    assert [e["id"] for e in _excecoes(headers, mantido["id"])] == [excecao["id"]]
+
+
+def test_restaurar_versao_descarta_excecao_fora_do_dia():
+    headers = _auth_headers()
+    grade = _create_grade(headers)
+    horario = _post(headers, "/horarios/", _horario(grade, "terca", 0))
+    versao_id = _salvar_versao(headers, grade)
+
+    resp = requests.put(_url(f"/horarios/{horario['id']}"), json={"dia_semana": "segunda"}, headers=headers, timeout=10)
+    assert resp.status_code == 200, resp.text
+    data = _proxima_data("segunda")
+    excecao = _post(headers, "/horario-excecoes/", {"horario_id": horario["id"], "data": data, "sala": "Lab"})
+
+    resp = requests.post(_url(f"/versoes-grade/{versao_id}/restaurar"), headers=headers, timeout=10)
+    assert resp.status_code == 200, resp.text
+    restauracao = resp.json()
+    assert restauracao["excecoes_preservadas"] == 0
+    assert restauracao["excecoes_descartadas"] == [{"id": excecao["id"], "horario_id": horario["id"], "data": data}]
+    assert _excecoes(headers, horario["id"]) == []
+
+
+def test_restaurar_versao_em_conflito_com_outro_turno_retorna_400():
+    headers = _auth_headers()
+    grade = _create_grade(headers)
+    outra = _create_grade(headers)
+    professor_id = grade["professor_ids"][0]
+    _post(headers, "/professor-disciplinas/", {"professor_id": professor_id, "disciplina_id": outra["disciplina_id"]})
+
+    horario = _post(headers, "/horarios/", _horario(grade, "quinta", 0))
+    versao_id = _salvar_versao(headers, grade)
+    resp = requests.delete(_url(f"/horarios/{horario['id']}"), headers=headers, timeout=10)
+    assert resp.status_code in (200, 204), resp.text
+    # O mesmo professor passa a dar aula no mesmo horário em outro turno
+    _post(headers, "/horarios/", {**_horario(outra, "quinta", 0), "professor_id": professor_id})
+
+    resp = requests.post(_url(f"/versoes-grade/{versao_id}/restaurar"), headers=headers, timeout=10)
+    assert resp.status_code == 400, resp.text
+    horarios = requests.get(_url("/horarios/"), params={"turno_id": grade["turno_id"]}, headers=headers, timeout=10).json()
+    assert horarios == []
+
+
+def _criar_cenario(headers: dict) -> int:
+    return _post(headers, "/cenarios/", {"nome": f"cenario-{uuid.uuid4().hex[:8]}"})["id"]
+
+
+def test_aplicar_cenario_insere_altera_e_remove():
+    headers = _auth_headers()
+    grade = _create_grade(headers, professores=2)
+    alterado = _post(headers, "/horarios/", _horario(grade, "segunda", 0))
+    removido = _post(headers, "/horarios/", _horario(grade, "segunda", 1))
+    cenario_id = _criar_cenario(headers)
+
+    resp = requests.put(
+        _url(f"/cenarios/{cenario_id}/horarios/{alterado['id']}"),
+        json={"professor_id": grade["professor_ids"][1], "sala": "Lab"},
+        headers=headers,
+        timeout=10,
+    )
+    assert resp.status_code == 200, resp.text
+    resp = requests.delete(_url(f"/cenarios/{cenario_id}/horarios/{removido['id']}"), headers=headers, timeout=10)
+    assert resp.status_code == 204, resp.text
+    novo = _post(headers, f"/cenarios/{cenario_id}/horarios", _horario(grade, "terca", 2))
+    assert novo["id"] < 0 and novo["origem"] == "novo"
+
+    # A grade atual não muda até o cenário ser aplicado
+    atual = requests.get(_url("/horarios/"), params={"turno_id": grade["turno_id"]}, headers=headers, timeout=10).json()
+    assert sorted(h["id"] for h in atual) == sorted([alterado["id"], removido["id"]])
+
+    resp = requests.post(_url(f"/cenarios/{cenario_id}/aplicar"), headers=headers, timeout=10)
+    assert resp.status_code == 200, resp.text
+    aplicacao = resp.json()
+    assert (aplicacao["inseridos"], aplicacao["atualizados"], aplicacao["removidos"]) == (1, 1, 1)
+
+    horarios = requests.get(_url("/horarios/"), params={"turno_id": grade["turno_id"]}, headers=headers, timeout=10).json()
+    por_dia = {(h["dia_semana"], h["hora_inicio"]): h for h in horarios}
+    assert len(horarios) == 2
+    assert por_dia[("segunda", "07:00:00")]["id"] == alterado["id"]
+    assert por_dia[("segunda", "07:00:00")]["professor_id"] == grade["professor_ids"][1]
+    assert por_dia[("segunda", "07:00:00")]["sala"] == "Lab"
+    assert ("terca", "09:00:00") in por_dia
+    alteracoes = requests.get(_url(f"/cenarios/{cenario_id}/alteracoes"), headers=headers, timeout=10).json()
+    assert alteracoes == []
+
+
+def test_aplicar_cenario_desatualizado_retorna_409():
+    headers = _auth_headers()
+    grade = _create_grade(headers)
+    horario = _post(headers, "/horarios/", _horario(grade, "quarta", 0))
+    cenario_id = _criar_cenario(headers)
+    # updated_at preenchido antes da cópia, para a alteração seguinte poder cair no mesmo segundo
+    resp = requests.put(_url(f"/horarios/{horario['id']}"), json={"sala": "Antes"}, headers=headers, timeout=10)
+    assert resp.status_code == 200, resp.text
+    resp = requests.put(
+        _url(f"/cenarios/{cenario_id}/horarios/{horario['id']}"), json={"sala": "Cenario"}, headers=headers, timeout=10,
+    )
+    assert resp.status_code == 200, resp.text
+
+    resp = requests.put(_url(f"/horarios/{horario['id']}"), json={"sala": "Grade"}, headers=headers, timeout=10)
+    assert resp.status_code == 200, resp.text
+
+    alteracoes = requests.get(_url(f"/cenarios/{cenario_id}/alteracoes"), headers=headers, timeout=10).json()
+    assert [a["desatualizada"] for a in alteracoes] == [True]
+    resp = requests.post(_url(f"/cenarios/{cenario_id}/aplicar"), headers=headers, timeout=10)
+    assert resp.status_code == 409, resp.text
+    horarios = requests.get(_url("/horarios/"), params={"turno_id": grade["turno_id"]}, headers=headers, timeout=10).json()
+    assert [h["sala"] for h in horarios] == ["Grade"]
+
+
+def test_aplicar_cenario_com_conflito_retorna_400():
+    headers = _auth_headers()
+    grade = _create_grade(headers, professores=2)
+    _post(headers, "/horarios/", _horario(grade, "quinta", 0))
+    cenario_id = _criar_cenario(headers)
+    # Mesma turma, mesmo horário, outro professor
+    _post(headers, f"/cenarios/{cenario_id}/horarios", _horario(grade, "quinta", 0, professor=1))
+
+    conflitos = requests.get(_url(f"/cenarios/{cenario_id}/conflitos"), headers=headers, timeout=10).json()
+    assert [c["motivos"] for c in conflitos] == [["conflito_turma"]]
+    resp = requests.post(_url(f"/cenarios/{cenario_id}/aplicar"), headers=headers, timeout=10)
+    assert resp.status_code == 400, resp.text
+    horarios = requests.get(_url("/horarios/"), params={"turno_id": grade["turno_id"]}, headers=headers, timeout=10).json()
+    assert len(horarios) == 1
+
+
+def test_aplicar_cenario_descarta_excecao_ao_mudar_de_dia():
+    headers = _auth_headers()
+    grade = _create_grade(headers)
+    horario = _post(headers, "/horarios/", _horario(grade, "segunda", 0))
+    data = _proxima_data("segunda")
+    excecao = _post(headers, "/horario-excecoes/", {"horario_id": horario["id"], "data": data, "cancelado": True})
+    cenario_id = _criar_cenario(headers)
+    resp = requests.put(
+        _url(f"/cenarios/{cenario_id}/horarios/{horario['id']}"), json={"dia_semana": "sexta"}, headers=headers, timeout=10,
+    )
+    assert resp.status_code == 200, resp.text
+
+    resp = requests.post(_url(f"/cenarios/{cenario_id}/aplicar"), headers=headers, timeout=10)
+    assert resp.status_code == 200, resp.text
+    aplicacao = resp.json()
+    assert aplicacao["excecoes_preservadas"] == 0
+    assert aplicacao["excecoes_descartadas"] == [{"id": excecao["id"], "horario_id": horario["id"], "data": data}]
+    assert _excecoes(headers, horario["id"]) == []
+
+
+def test_otimizar_janelas_descarta_excecao_do_horario_movido():
+    headers = _auth_headers()
+    grade = _create_grade(headers)
+    # Um professor em dois dias: juntar as aulas num dia só tira um dia de presença
+    horarios = [_post(headers, "/horarios/", _horario(grade, dia, 0)) for dia in ("segunda", "sexta")]
+    excecoes = {
+        h["id"]: _post(headers, "/horario-excecoes/", {
+            "horario_id": h["id"], "data": _proxima_data(h["dia_semana"]), "cancelado": True,
+        })
+        for h in horarios
+    }
+
+    resp = requests.post(
+        _url("/horarios/otimizar-janelas"),
+        params={"turno_id": grade["turno_id"], "tempo_segundos": 1, "aplicar": "true", "semente": 1},
+        headers=headers, timeout=30,
+    )
+    assert resp.status_code == 200, resp.text
+    otimizacao = resp.json()
+    assert otimizacao["aplicado"] is True
+    assert otimizacao["depois"]["dias_professores"] < otimizacao["antes"]["dias_professores"]
+    movidos = {a["horario_id"] for a in otimizacao["alterados"] if a["dia_semana"] != a["dia_semana_anterior"]}
+    assert len(movidos) == 1
+    movido = movidos.pop()
+    excecao = excecoes[movido]
+    assert otimizacao["excecoes_descartadas"] == [{"id": excecao["id"], "horario_id": movido, "data": excecao["data"]}]
+    assert _excecoes(headers, movido) == []
+    for h in horarios:
+        if h["id"] != movido:
+            assert [e["id"] for e in _excecoes(headers, h["id"])] == [excecoes[h["id"]]["id"]]
+
+
+def test_gerar_grade_passa_excecoes_aos_horarios_novos_do_mesmo_dia():
+    headers = _auth_headers()
+    grade = _create_grade(headers)
+    # Uma aula por dia com exceção; a grade gerada (4 aulas semanais) deixa ao menos um dia sem aula
+    antigos = {dia: _post(headers, "/horarios/", _horario(grade, dia, 0)) for dia in DIAS[:5]}
+    excecoes = {
+        dia: _post(headers, "/horario-excecoes/", {
+            "horario_id": h["id"], "data": _proxima_data(dia), "sala": "Lab",
+        })
+        for dia, h in antigos.items()
+    }
+
+    resp = requests.post(
+        _url("/horarios/gerar"),
+        params={"turno_id": grade["turno_id"], "tempo_segundos": 1, "workers": 1, "aplicar": "true", "semente": 1},
+        headers=headers, timeout=30,
+    )
+    assert resp.status_code == 200, resp.text
+    geracao = resp.json()
+    assert geracao["aplicado"] is True
+
+    horarios = requests.get(_url("/horarios/"), params={"turno_id": grade["turno_id"]}, headers=headers, timeout=10).json()
+    primeiro = {}
+    for h in sorted(horarios, key=lambda h: h["hora_inicio"]):
+        primeiro.setdefault(h["dia_semana"], h["id"])
+    assert 0 < len(primeiro) < 5
+    descartadas = {e["id"] for e in geracao["excecoes_descartadas"]}
+    assert geracao["excecoes_preservadas"] == len(primeiro)
+    assert descartadas == {e["id"] for dia, e in excecoes.items() if dia not in primeiro}
+    for dia, horario_id in primeiro.items():
+        assert [(e["id"], e["sala"]) for e in _excecoes(headers, horario_id)] == [(excecoes[dia]["id"], "Lab")]